@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+PRG Generator Benchmark
+
+Times the duration block writer of prg_generator.py on synthetic fade sequences
+to confirm it scales linearly with the segment count, and checks that the encoder
+still reproduces the expected .prg fixtures byte for byte.
+
+It also encodes synthetic solid-only, fade-heavy and mixed sequences end to end,
+recording encode time and peak traced memory, and appends the results to a JSON
+history file. Each run is compared with the previous one so regressions in
+prg_generator.py show up as slowdowns against the recorded history.
+
+The PRG header stores the segment count and RGB start pointer as 16-bit values, so
+complete files top out at a few thousand segments. Larger sizes exercise the
+duration block writer directly, which is where the index offsets are computed, and
+are encoded end to end as consecutive files of the largest size that fits.
+
+Usage:
+    python3 benchmark_prg_generator.py [--sizes 1000 10000 100000] [--skip-verify]
+                                       [--history FILE | --no-history] [--fail-on-regression]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import prg_generator
+from prg_optimizer import MAX_SEGMENT_COUNT
+
+# Fixture directories holding input JSONs, and where their expected .prg output lives.
+# None means alongside the JSON; 'name.json' and 'name.prg.json' both map to 'name.prg'.
+FIXTURE_DIRS = [
+    ("tests", None),
+    (os.path.join("tests", "roatan_horses"), None),
+    ("generated_test_prg_json", None),
+    (os.path.join("seq2", "jsonv2"), os.path.join("tests", "golden", "seq2_jsonv2")),
+]
+
+DEFAULT_HISTORY_FILE = "prg_benchmark_history.json"
+SEQUENCE_SHAPES = ("solid", "fade", "mixed")
+# Slowdown against the previous run above which a result is reported as a regression
+DEFAULT_REGRESSION_RATIO = 1.25
+
+
+def expected_prg_path(json_path, golden_dir=None):
+    """
+    Return the path of the expected .prg file for a fixture JSON.
+
+    'name.json' and 'name.prg.json' both map to 'name.prg', in golden_dir if given
+    and in the JSON's own directory otherwise.
+    """
+    if json_path.endswith(".prg.json"):
+        prg_path = json_path[:-len(".prg.json")] + ".prg"
+    else:
+        prg_path = json_path[:-len(".json")] + ".prg"
+    if golden_dir is not None:
+        prg_path = os.path.join(golden_dir, os.path.basename(prg_path))
+    return prg_path
+
+
+def fixture_cases(root_dir):
+    """
+    List every fixture JSON that has an expected .prg file.
+
+    Args:
+        root_dir (str): Repository root.
+
+    Returns:
+        list: (json_path, prg_path) tuples, in directory and file name order.
+    """
+    cases = []
+    for fixture_dir, golden_dir in FIXTURE_DIRS:
+        directory = os.path.join(root_dir, fixture_dir)
+        if not os.path.isdir(directory):
+            continue
+        if golden_dir is not None:
+            golden_dir = os.path.join(root_dir, golden_dir)
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            json_path = os.path.join(directory, filename)
+            prg_path = expected_prg_path(json_path, golden_dir)
+            if os.path.exists(prg_path):
+                cases.append((json_path, prg_path))
+    return cases
+
+
+def make_fade_segments(count):
+    """
+    Build a synthetic fade-heavy segment list in the finalized 5-tuple format.
+
+    Every third segment is a solid so the Index1/Index2 offsets exercise both the
+    fade and solid step rules.
+    """
+    segments = []
+    for i in range(count):
+        duration = 50 + (i * 37) % 150
+        if i % 3 == 2:
+            segments.append((duration, (i % 256, 0, 255 - i % 256), 4, 'solid', duration))
+        else:
+            start_rgb = (i % 256, 128, 0)
+            end_rgb = (0, 128, i % 256)
+            segments.append((duration, (start_rgb, end_rgb), 4, 'fade', duration))
+    return segments
+
+
+def make_sequence_segments(shape, count):
+    """
+    Build a synthetic sequence of parsed segments (duration, color, pixels, type).
+
+    Args:
+        shape (str): 'solid' for solids only, 'fade' for fades only, or 'mixed'
+            for two fades followed by a solid, repeated.
+        count (int): Number of segments.
+
+    Returns:
+        list: Parsed segments, as returned by prg_generator.parse_sequence().
+    """
+    if shape not in SEQUENCE_SHAPES:
+        raise ValueError(f"Unknown sequence shape: {shape}")
+    segments = []
+    for i in range(count):
+        duration = 50 + (i * 37) % 150
+        if shape == 'solid' or (shape == 'mixed' and i % 3 == 2):
+            segments.append((duration, (i % 256, 0, 255 - i % 256), 4, 'solid'))
+        else:
+            segments.append((duration, ((i % 256, 128, 0), (0, 128, i % 256)), 4, 'fade'))
+    return segments
+
+
+def encode_in_files(segments):
+    """
+    Encode segments as consecutive PRG files of at most MAX_SEGMENT_COUNT segments.
+
+    Returns:
+        int: Total encoded size in bytes.
+    """
+    total = 0
+    for start in range(0, len(segments), MAX_SEGMENT_COUNT):
+        total += len(prg_generator.encode_segments(segments[start:start + MAX_SEGMENT_COUNT], default_pixels=4))
+    return total
+
+
+def benchmark_encode(shape, count, repeat=3):
+    """
+    Time and memory-profile encoding one synthetic sequence.
+
+    The best of repeat untraced runs gives the time; one further run under
+    tracemalloc gives the peak memory, so tracing overhead does not skew the time.
+
+    Returns:
+        dict: shape, segments, seconds, us_per_segment, peak_bytes and output_bytes.
+    """
+    segments = make_sequence_segments(shape, count)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_bytes = encode_in_files(segments)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        encode_in_files(segments)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "shape": shape,
+        "segments": count,
+        "seconds": best,
+        "us_per_segment": best / count * 1e6,
+        "peak_bytes": peak,
+        "output_bytes": output_bytes
+    }
+
+
+def load_history(history_path):
+    """Load the list of recorded benchmark runs, or an empty list if there is none."""
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, 'r') as f:
+        return json.load(f)
+
+
+def append_history(history_path, results):
+    """
+    Append a benchmark run to the JSON history file.
+
+    Returns:
+        dict: The recorded run.
+    """
+    history = load_history(history_path)
+    run = {
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "encoder_version": prg_generator.ENCODER_VERSION,
+        "python": platform.python_version(),
+        "numpy": prg_generator.NUMPY_AVAILABLE,
+        "results": results
+    }
+    history.append(run)
+    with open(history_path, 'w') as f:
+        json.dump(history, f, indent=2)
+    return run
+
+
+def find_regressions(previous_run, results, max_ratio=DEFAULT_REGRESSION_RATIO):
+    """
+    Compare results with a previous run.
+
+    Args:
+        previous_run (dict): A run from the history file, or None.
+        results (list): Result dicts from benchmark_encode().
+        max_ratio (float): Allowed time and peak memory ratio against the previous run.
+
+    Returns:
+        list: Descriptions of results that got slower or used more memory.
+    """
+    if not previous_run:
+        return []
+    previous = {(r["shape"], r["segments"]): r for r in previous_run.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["shape"], result["segments"]))
+        if before is None:
+            continue
+        for key in ("seconds", "peak_bytes"):
+            if before[key] > 0 and result[key] / before[key] > max_ratio:
+                regressions.append(f"{result['shape']} x{result['segments']}: {key} "
+                                   f"{before[key]:.4g} -> {result[key]:.4g} ({result[key] / before[key]:.2f}x)")
+    return regressions
+
+
+def time_duration_blocks(segments, repeat=3):
+    """Return the best wall time in seconds for writing the duration blocks of segments."""
+    best = None
+    for _ in range(repeat):
+        buffer = bytearray(len(segments) * prg_generator.DURATION_BLOCK_SIZE)
+        start = time.perf_counter()
+        prg_generator._write_duration_blocks(buffer, 0, segments, True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_full_encode(segments, repeat=3):
+    """Return the best wall time in seconds for encoding segments into a complete PRG file."""
+    parsed_segments = [segment[:4] for segment in segments]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prg_generator.encode_segments(parsed_segments, default_pixels=4)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def verify_fixtures(root_dir):
+    """
+    Encode every fixture JSON and compare it with its expected .prg file.
+
+    Returns:
+        tuple: (checked_count, list of failure descriptions)
+    """
+    checked = 0
+    failures = []
+    for json_path, prg_path in fixture_cases(root_dir):
+        checked += 1
+        try:
+            generated = prg_generator.encode_prg(prg_generator.load_sequence_json(json_path))
+        except prg_generator.PRGGenerationError as e:
+            failures.append(f"{json_path}: {e}")
+            continue
+        with open(prg_path, 'rb') as f:
+            expected = f.read()
+        if generated != expected:
+            failures.append(f"{json_path}: output differs from {os.path.basename(prg_path)}")
+    return checked, failures
+
+
+def main():
+    """Run the benchmark and fixture verification."""
+    parser = argparse.ArgumentParser(description="Benchmark prg_generator.py duration block encoding")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Segment counts for the duration block benchmark")
+    parser.add_argument("--skip-verify", action="store_true",
+                        help="Skip the byte-identical fixture check")
+    parser.add_argument("--history", help=f"JSON history file to append results to (default: {DEFAULT_HISTORY_FILE})")
+    parser.add_argument("--no-history", action="store_true", help="Do not read or write the history file")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_REGRESSION_RATIO,
+                        help="Time or memory ratio against the previous run reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if a regression is found")
+    args = parser.parse_args()
+
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    history_path = args.history or os.path.join(root_dir, DEFAULT_HISTORY_FILE)
+
+    if not args.skip_verify:
+        checked, failures = verify_fixtures(root_dir)
+        print(f"Fixture check: {checked - len(failures)}/{checked} byte-identical")
+        for failure in failures:
+            print(f"  FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+
+    print("\nDuration blocks (fade-heavy sequences):")
+    print(f"{'segments':>10} {'seconds':>10} {'us/segment':>12} {'scaling':>9}")
+    previous = None
+    for size in args.sizes:
+        elapsed = time_duration_blocks(make_fade_segments(size))
+        scaling = ""
+        if previous is not None:
+            # Time ratio divided by size ratio: ~1.0 for linear, grows with N for quadratic
+            scaling = f"{(elapsed / previous[1]) / (size / previous[0]):.2f}"
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>12.2f} {scaling:>9}")
+        previous = (size, elapsed)
+
+    print("\nFull encode (largest sizes that fit the 16-bit header):")
+    for size in (1000, 3000):
+        elapsed = time_full_encode(make_fade_segments(size))
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>12.2f}")
+
+    print(f"\nEnd-to-end encode (files of up to {MAX_SEGMENT_COUNT} segments):")
+    print(f"{'shape':>8} {'segments':>10} {'seconds':>10} {'us/segment':>12} {'peak MB':>9} {'output MB':>10}")
+    results = []
+    for shape in SEQUENCE_SHAPES:
+        for size in args.sizes:
+            result = benchmark_encode(shape, size)
+            results.append(result)
+            print(f"{shape:>8} {size:>10} {result['seconds']:>10.4f} {result['us_per_segment']:>12.2f} "
+                  f"{result['peak_bytes'] / 1e6:>9.2f} {result['output_bytes'] / 1e6:>10.2f}")
+
+    if args.no_history:
+        return
+
+    history = load_history(history_path)
+    regressions = find_regressions(history[-1] if history else None, results, args.max_regression)
+    append_history(history_path, results)
+    print(f"\nRecorded run {len(history) + 1} in {history_path}")
+    for regression in regressions:
+        print(f"  REGRESSION: {regression}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+PRG Build Cache
+
+Content-addressed cache of encoded PRG files. Entries are keyed by a hash of the
+normalized sequence JSON plus prg_generator.ENCODER_VERSION, so an unchanged
+timeline is never re-encoded and an encoder change invalidates every entry.
+The cache is bounded by total size and evicts least recently used entries.
+Each entry keeps the encode report (segment count, sizes and warnings) next to
+the PRG bytes, so a cache hit reports the same warnings as the original encode.
+
+Usage:
+    python3 prg_build_cache.py [--cache-dir DIR] [--clear]
+
+Library usage:
+    from prg_build_cache import PRGBuildCache
+    cache = PRGBuildCache()
+    prg_bytes, hit = cache.get_or_encode(timeline.to_json_sequence())
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+from prg_generator import encode_prg, ENCODER_VERSION, PRGDiagnostics
+
+DEFAULT_APP_DIR_NAME = ".sequence_maker"
+DEFAULT_CACHE_DIR_NAME = "prg_build_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_ENTRY_SUFFIX = ".prg"
+CACHE_REPORT_SUFFIX = ".report.json"
+
+
+def normalize_sequence(sequence, default_pixels=None):
+    """
+    Serialize sequence JSON data canonically for hashing.
+
+    Keys are sorted and whitespace is removed, so equal sequences hash equally
+    regardless of key order or formatting.
+
+    Args:
+        sequence (dict or list): JSON sequence data, e.g. from Timeline.to_json_sequence(),
+            or a list of (duration_prg_units, color_data, pixels, segment_type) segment tuples.
+        default_pixels (int, optional): Header pixel count for a segment list, as
+            passed to encode_prg(). Ignored for JSON sequence data.
+
+    Returns:
+        bytes: Canonical UTF-8 JSON.
+    """
+    if not isinstance(sequence, dict):
+        sequence = {"segments": list(sequence), "default_pixels": default_pixels or 1}
+    return json.dumps(sequence, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class PRGBuildCache:
+    """
+    Size-capped, least-recently-used on-disk cache of encoded PRG bytes.
+
+    Each entry is a <key>.prg file plus the <key>.report.json encode report written
+    with it. Reads refresh the entry's modification time, which orders entries
+    for eviction. Several processes may share a cache
+    directory; writes are atomic renames.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str, optional): Cache directory. Defaults to
+                ~/.sequence_maker/prg_build_cache, or $PRG_BUILD_CACHE_DIR if set.
+            max_bytes (int): Total size above which the oldest entries are evicted.
+        """
+        if cache_dir:
+            self.cache_dir = cache_dir
+        else:
+            self.cache_dir = os.environ.get("PRG_BUILD_CACHE_DIR") or os.path.join(
+                os.path.expanduser("~"), DEFAULT_APP_DIR_NAME, DEFAULT_CACHE_DIR_NAME)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key_for(self, sequence, default_pixels=None):
+        """
+        Compute the cache key for sequence JSON data or parsed segments.
+
+        Args:
+            sequence (dict or list): JSON sequence data or parsed segment tuples.
+            default_pixels (int, optional): Header pixel count for a segment list.
+
+        Returns:
+            str: Hex digest of the encoder version and the normalized sequence.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(ENCODER_VERSION.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(normalize_sequence(sequence, default_pixels))
+        return hasher.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_ENTRY_SUFFIX)
+
+    def _report_path(self, entry_path):
+        return entry_path[:-len(CACHE_ENTRY_SUFFIX)] + CACHE_REPORT_SUFFIX
+
+    def get_report(self, key):
+        """
+        Look up the encode report stored with an entry.
+
+        Args:
+            key (str): Cache key from key_for().
+
+        Returns:
+            dict: PRGEncodeReport.to_dict() of the encode, or None if there is none.
+        """
+        try:
+            with open(self._report_path(self._entry_path(key)), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def get(self, key):
+        """
+        Look up encoded PRG bytes.
+
+        Args:
+            key (str): Cache key from key_for().
+
+        Returns:
+            bytes: The cached PRG file contents, or None on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None) # Mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, prg_bytes, report=None):
+        """
+        Store encoded PRG bytes and evict old entries if the cache is over its size cap.
+
+        Args:
+            key (str): Cache key from key_for().
+            prg_bytes (bytes): Encoded PRG file contents.
+            report (dict, optional): PRGEncodeReport.to_dict() of the encode, returned
+                by get_report() and restored by get_or_encode() on a hit.
+        """
+        entry_path = self._entry_path(key)
+        # The report goes first, so an entry never pairs its bytes with a stale report
+        if report is not None:
+            self._write_atomic(self._report_path(entry_path), json.dumps(report).encode('utf-8'))
+        self._write_atomic(entry_path, prg_bytes)
+        self._evict()
+
+    def get_or_encode(self, sequence, diagnostics=None, default_pixels=None):
+        """
+        Return the encoded PRG bytes for a sequence, encoding only on a cache miss.
+
+        Args:
+            sequence (dict or list): JSON sequence data, or a list of
+                (duration_prg_units, color_data, pixels, segment_type) segment tuples.
+            diagnostics (PRGDiagnostics, optional): Passed to encode_prg() on a miss. On
+                a hit its report is restored from the one stored with the entry (the
+                report's source is kept); the warnings are not written again.
+            default_pixels (int, optional): Header pixel count for a segment list.
+
+        Returns:
+            tuple: (prg_bytes, hit)
+
+        Raises:
+            PRGGenerationError: If the sequence cannot be encoded.
+        """
+        key = self.key_for(sequence, default_pixels)
+        prg_bytes = self.get(key)
+        if prg_bytes is not None:
+            report = self.get_report(key) if diagnostics is not None else {}
+            if report is not None:
+                if diagnostics is not None:
+                    diagnostics.report.update_from_dict(report)
+                return prg_bytes, True
+            # Entries written without a report are encoded again to recover it
+            self.hits -= 1
+            self.misses += 1
+        diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+        prg_bytes = encode_prg(sequence, default_pixels, diagnostics=diag)
+        try:
+            self.put(key, prg_bytes, diag.report.to_dict())
+        except OSError:
+            pass # A cache write failure must not fail the build
+        return prg_bytes, False
+
+    def _entries(self):
+        """List (mtime, size, path) of every cache entry."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CACHE_ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    @property
+    def total_size(self):
+        """Total size in bytes of all cache entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._remove_report(path)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Cache statistics.
+
+        Returns:
+            dict: hits, misses, evictions, entries, total_bytes, max_bytes and cache_dir.
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "total_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "cache_dir": self.cache_dir
+        }
+
+    def _remove_report(self, entry_path):
+        try:
+            os.remove(self._report_path(entry_path))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every cache entry."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._remove_report(path)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Inspect or clear the PRG build cache")
+    parser.add_argument("--cache-dir", help="Cache directory (default: ~/.sequence_maker/prg_build_cache)")
+    parser.add_argument("--clear", action="store_true", help="Remove every cache entry")
+    args = parser.parse_args()
+
+    cache = PRGBuildCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared PRG build cache: {cache.cache_dir}")
+    stats = cache.stats()
+    print(f"{stats['cache_dir']}: {stats['entries']} entries, "
+          f"{stats['total_bytes'] / 1e6:.2f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
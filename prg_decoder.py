@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+LTX Ball PRG Decoder
+
+Reads PRG files written by prg_generator.py back into their header fields,
+duration blocks and per-segment RGB data. Files are memory-mapped and parsed
+lazily: the header is unpacked on first access, duration blocks are unpacked
+one at a time, and segment RGB data is exposed as memoryview slices of the
+mapped file rather than copies.
+
+Usage:
+    python3 prg_decoder.py info file.prg [file.prg ...] [--segments]
+    python3 prg_decoder.py diff a.prg b.prg
+
+Library usage:
+    from prg_decoder import PRGFile, diff_prg
+    with PRGFile.open("show.prg") as prg:
+        for segment in prg.segments:
+            print(segment.duration, segment.kind, segment.start_color)
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from prg_generator import (
+    FILE_SIGNATURE, FOOTER, HEADER_SIZE, DURATION_BLOCK_SIZE, RGB_TRIPLE_COUNT,
+    LAST_BLOCK_CONST_09, _HEADER_PIXELS_STRUCT, _HEADER_FIELDS_STRUCT,
+    _INTERMEDIATE_BLOCK_STRUCT, _LAST_BLOCK_STRUCT
+)
+
+# Offset of field 0x09 part2 (RGB triple count of the next segment) inside an intermediate block
+_BLOCK_NEXT_TRIPLES_OFFSET = 0x0B
+_UINT16_STRUCT = struct.Struct('<H')
+
+
+class PRGDecodeError(Exception):
+    """Exception raised when a file cannot be decoded as a PRG file."""
+    pass
+
+
+class PRGSegment:
+    """
+    One decoded segment: its duration block fields and a view of its RGB data.
+
+    The kind is inferred from the RGB data: a segment with RGB_TRIPLE_COUNT
+    identical triples is reported as 'solid', anything else as 'fade'.
+    """
+
+    def __init__(self, index, pixels, duration, rgb_offset, triple_count, rgb):
+        """
+        Initialize a segment.
+
+        Args:
+            index (int): Segment index in the file.
+            pixels (int): Pixel count from the duration block.
+            duration (int): Block duration in PRG time units.
+            rgb_offset (int): File offset of the segment's RGB data.
+            triple_count (int): Number of RGB triples in the segment.
+            rgb (memoryview): View of the segment's RGB data (no copy).
+        """
+        self.index = index
+        self.pixels = pixels
+        self.duration = duration
+        self.rgb_offset = rgb_offset
+        self.triple_count = triple_count
+        self.rgb = rgb
+        self._kind = None
+
+    @property
+    def start_color(self):
+        """First RGB triple as a tuple."""
+        return tuple(self.rgb[0:3])
+
+    @property
+    def end_color(self):
+        """Last RGB triple as a tuple."""
+        return tuple(self.rgb[-3:])
+
+    @property
+    def kind(self):
+        """'solid' or 'fade', inferred from the RGB data."""
+        if self._kind is None:
+            if self.triple_count == RGB_TRIPLE_COUNT and self.rgb.tobytes() == bytes(self.rgb[0:3]) * RGB_TRIPLE_COUNT:
+                self._kind = 'solid'
+            else:
+                self._kind = 'fade'
+        return self._kind
+
+    def to_segment(self):
+        """
+        Convert to the (duration_prg_units, color_data, pixels, segment_type) tuple
+        accepted by prg_generator.encode_segments().
+        """
+        if self.kind == 'solid':
+            return (self.duration, self.start_color, self.pixels, 'solid')
+        return (self.duration, (self.start_color, self.end_color), self.pixels, 'fade')
+
+    def to_dict(self):
+        """
+        Convert the segment to a dictionary.
+
+        Returns:
+            dict: Dictionary representation of the segment.
+        """
+        return {
+            "index": self.index,
+            "pixels": self.pixels,
+            "duration": self.duration,
+            "kind": self.kind,
+            "rgb_offset": self.rgb_offset,
+            "triple_count": self.triple_count,
+            "start_color": list(self.start_color),
+            "end_color": list(self.end_color)
+        }
+
+
+class PRGFile:
+    """
+    Lazily decoded view of a PRG file.
+
+    Use PRGFile.open() to memory-map a file (and close it, or use it as a
+    context manager, when done) or PRGFile.from_bytes() for data already in
+    memory. Segment RGB views stay valid until the file is closed.
+    """
+
+    def __init__(self, data, path=None):
+        """
+        Initialize from a buffer.
+
+        Args:
+            data: bytes, bytearray or mmap holding the file contents.
+            path (str, optional): Source path, for messages.
+
+        Raises:
+            PRGDecodeError: If the data is too short to hold a header.
+        """
+        self.path = path
+        self._data = data
+        self._view = memoryview(data)
+        self._mmap = data if isinstance(data, mmap.mmap) else None
+        if len(self._view) < HEADER_SIZE:
+            raise PRGDecodeError(f"{path or 'PRG data'}: {len(self._view)} bytes is too short for a PRG header.")
+        self._header = None
+        self._blocks = {}
+        self._triple_counts = None
+        self._segments = None
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-map a PRG file for reading.
+
+        Args:
+            path (str): Path to the PRG file.
+
+        Returns:
+            PRGFile: The mapped file.
+
+        Raises:
+            PRGDecodeError: If the file cannot be opened or is empty.
+        """
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    raise PRGDecodeError(f"{path}: file is empty.")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            raise PRGDecodeError(f"Cannot open PRG file {path}: {e}")
+        return cls(mapped, path)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Wrap PRG file contents that are already in memory."""
+        return cls(data)
+
+    def close(self):
+        """Release all views and unmap the file."""
+        if self._segments is not None:
+            for segment in self._segments:
+                segment.rgb.release()
+        self._segments = None
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._view)
+
+    def tobytes(self):
+        """Return a copy of the whole file contents."""
+        return self._view.tobytes()
+
+    # --- Header ---
+
+    @property
+    def header(self):
+        """Header fields as a dictionary, unpacked on first access."""
+        if self._header is None:
+            signature = self._view[0:len(FILE_SIGNATURE)].tobytes()
+            (default_pixels,) = _HEADER_PIXELS_STRUCT.unpack_from(self._view, len(FILE_SIGNATURE))
+            (const_0a, refresh_rate, const_pi, pointer1, segment_count, field_16, field_18,
+             rgb_start_pointer, const_1c, field_1e) = _HEADER_FIELDS_STRUCT.unpack_from(
+                self._view, len(FILE_SIGNATURE) + _HEADER_PIXELS_STRUCT.size)
+            self._header = {
+                "signature": signature,
+                "default_pixels": default_pixels,
+                "const_0A": const_0a,
+                "refresh_rate": refresh_rate,
+                "const_PI": const_pi,
+                "pointer1": pointer1,
+                "segment_count": segment_count,
+                "field_16": field_16,
+                "field_18": field_18,
+                "rgb_start_pointer": rgb_start_pointer,
+                "const_1C": const_1c,
+                "field_1E": field_1e
+            }
+        return self._header
+
+    @property
+    def default_pixels(self):
+        return self.header["default_pixels"]
+
+    @property
+    def refresh_rate(self):
+        return self.header["refresh_rate"]
+
+    @property
+    def pointer1(self):
+        return self.header["pointer1"]
+
+    @property
+    def segment_count(self):
+        return self.header["segment_count"]
+
+    @property
+    def rgb_start_pointer(self):
+        return self.header["rgb_start_pointer"]
+
+    # --- Duration blocks ---
+
+    def block(self, index):
+        """
+        Unpack one 19-byte duration block.
+
+        Args:
+            index (int): Block index (0 .. segment_count - 1).
+
+        Returns:
+            dict: Block fields. Intermediate blocks carry field_09 (part1, part2),
+                index1 and field_11; the last block carries index2_part1 and index2_part2.
+
+        Raises:
+            PRGDecodeError: If the index is out of range or the block is truncated.
+        """
+        if index in self._blocks:
+            return self._blocks[index]
+        count = self.segment_count
+        if not 0 <= index < count:
+            raise PRGDecodeError(f"Block index {index} out of range for {count} segments.")
+        offset = HEADER_SIZE + index * DURATION_BLOCK_SIZE
+        if offset + DURATION_BLOCK_SIZE > len(self._view):
+            raise PRGDecodeError(f"Duration block {index} at 0x{offset:04X} runs past the end of the file.")
+        if index < count - 1:
+            (pixels, const_02, duration, const_07, field_09_part1, field_09_part2,
+             index1_low, index1_carry, field_11) = _INTERMEDIATE_BLOCK_STRUCT.unpack_from(self._view, offset)
+            block = {
+                "offset": offset,
+                "pixels": pixels,
+                "duration": duration,
+                "field_09": (field_09_part1, field_09_part2),
+                "index1": index1_low | (index1_carry << 16),
+                "field_11": field_11
+            }
+        else:
+            (pixels, const_02, duration, const_07, marker, part1_low, part1_carry,
+             part2_low, part2_carry) = _LAST_BLOCK_STRUCT.unpack_from(self._view, offset)
+            block = {
+                "offset": offset,
+                "pixels": pixels,
+                "duration": duration,
+                "marker": marker,
+                "index2_part1": part1_low | (part1_carry << 16),
+                "index2_part2": part2_low | (part2_carry << 16)
+            }
+        self._blocks[index] = block
+        return block
+
+    @property
+    def blocks(self):
+        """All duration blocks, unpacked on demand."""
+        return [self.block(i) for i in range(self.segment_count)]
+
+    # --- Segments ---
+
+    @property
+    def rgb_data_size(self):
+        """Size of the RGB payload between the duration blocks and the footer."""
+        return len(self._view) - len(FOOTER) - self.rgb_start_pointer
+
+    def _segment_triple_counts(self):
+        """
+        Number of RGB triples per segment.
+
+        Field 0x09 part2 of block k holds the triple count of segment k+1; segment 0
+        gets whatever remains of the payload.
+        """
+        if self._triple_counts is None:
+            count = self.segment_count
+            if count == 0:
+                raise PRGDecodeError("PRG file has no segments.")
+            if self.rgb_start_pointer != HEADER_SIZE + count * DURATION_BLOCK_SIZE:
+                raise PRGDecodeError(
+                    f"RGB start pointer 0x{self.rgb_start_pointer:04X} does not follow {count} duration blocks "
+                    f"(expected 0x{HEADER_SIZE + count * DURATION_BLOCK_SIZE:04X}).")
+            if self.rgb_data_size < 0 or self.rgb_data_size % 3:
+                raise PRGDecodeError(f"RGB payload of {self.rgb_data_size} bytes is not a whole number of triples.")
+            counts = [0] * count
+            for k in range(count - 1):
+                (counts[k + 1],) = _UINT16_STRUCT.unpack_from(
+                    self._view, HEADER_SIZE + k * DURATION_BLOCK_SIZE + _BLOCK_NEXT_TRIPLES_OFFSET)
+            counts[0] = self.rgb_data_size // 3 - sum(counts)
+            if counts[0] <= 0:
+                raise PRGDecodeError(f"RGB payload ({self.rgb_data_size} bytes) is smaller than the duration blocks describe.")
+            self._triple_counts = counts
+        return self._triple_counts
+
+    @property
+    def segments(self):
+        """Decoded segments, with RGB data exposed as views of the file."""
+        if self._segments is None:
+            segments = []
+            offset = self.rgb_start_pointer
+            for index, triple_count in enumerate(self._segment_triple_counts()):
+                block = self.block(index)
+                size = triple_count * 3
+                segments.append(PRGSegment(index, block["pixels"], block["duration"], offset,
+                                           triple_count, self._view[offset:offset + size]))
+                offset += size
+            self._segments = segments
+        return self._segments
+
+    def to_segments(self):
+        """
+        Decode into (duration_prg_units, color_data, pixels, segment_type) tuples
+        that prg_generator.encode_segments() accepts.
+        """
+        return [segment.to_segment() for segment in self.segments]
+
+    def validate(self):
+        """
+        Check the file's structure.
+
+        Returns:
+            list: Descriptions of structural problems; empty if the file is well formed.
+        """
+        problems = []
+        header = self.header
+        if header["signature"] != FILE_SIGNATURE:
+            problems.append(f"Bad signature {header['signature']!r}.")
+        if self._view[len(self._view) - len(FOOTER):].tobytes() != FOOTER:
+            problems.append("Missing footer.")
+        count = header["segment_count"]
+        if count == 0:
+            problems.append("Segment count is 0.")
+            return problems
+        expected_pointer1 = 21 + DURATION_BLOCK_SIZE * (count - 1)
+        if header["pointer1"] != expected_pointer1:
+            problems.append(f"Pointer1 is {header['pointer1']}, expected {expected_pointer1} for {count} segments.")
+        try:
+            self._segment_triple_counts()
+            last_block = self.block(count - 1)
+        except PRGDecodeError as e:
+            problems.append(str(e))
+            return problems
+        if last_block["marker"] != LAST_BLOCK_CONST_09:
+            problems.append(f"Last duration block marker is {last_block['marker']!r}, expected {LAST_BLOCK_CONST_09!r}.")
+        return problems
+
+    def summary(self):
+        """One-line description of the file."""
+        return (f"{self.segment_count} segments, {len(self)} bytes, "
+                f"RGB @0x{self.rgb_start_pointer:04X} ({self.rgb_data_size} bytes), "
+                f"{self.refresh_rate}Hz, {self.default_pixels} px")
+
+
+def _as_prg_file(prg):
+    """Return (PRGFile, opened_here) for a path, bytes or PRGFile."""
+    if isinstance(prg, PRGFile):
+        return prg, False
+    if isinstance(prg, (bytes, bytearray, memoryview)):
+        return PRGFile.from_bytes(prg), True
+    return PRGFile.open(prg), True
+
+
+def diff_prg(a, b, max_differences=50):
+    """
+    Structurally compare two PRG files.
+
+    Identical files are detected with a single buffer comparison. Otherwise the
+    header, each duration block and each segment's RGB data are compared, so a
+    difference is reported as e.g. "segment 3 duration 100 != 150" instead of a
+    byte offset.
+
+    Args:
+        a: Path, bytes or PRGFile.
+        b: Path, bytes or PRGFile.
+        max_differences (int): Stop after this many differences.
+
+    Returns:
+        list: Descriptions of the differences; empty if the files are identical.
+    """
+    prg_a, close_a = _as_prg_file(a)
+    prg_b, close_b = _as_prg_file(b)
+    try:
+        if prg_a._view == prg_b._view:
+            return []
+
+        differences = []
+        for field, value_a in prg_a.header.items():
+            value_b = prg_b.header[field]
+            if value_a != value_b:
+                differences.append(f"header {field}: {value_a!r} != {value_b!r}")
+
+        count = min(prg_a.segment_count, prg_b.segment_count)
+        for index in range(count):
+            if len(differences) >= max_differences:
+                break
+            try:
+                block_a = prg_a.block(index)
+                block_b = prg_b.block(index)
+            except PRGDecodeError as e:
+                differences.append(f"block {index}: {e}")
+                break
+            for field, value_a in block_a.items():
+                if field != "offset" and value_a != block_b.get(field):
+                    differences.append(f"block {index} {field}: {value_a!r} != {block_b.get(field)!r}")
+
+        try:
+            segments_a = prg_a.segments
+            segments_b = prg_b.segments
+        except PRGDecodeError as e:
+            differences.append(f"segments: {e}")
+            return differences[:max_differences]
+
+        for segment_a, segment_b in zip(segments_a, segments_b):
+            if len(differences) >= max_differences:
+                break
+            if segment_a.triple_count != segment_b.triple_count:
+                differences.append(f"segment {segment_a.index} RGB triples: {segment_a.triple_count} != {segment_b.triple_count}")
+            elif segment_a.rgb != segment_b.rgb:
+                for triple in range(segment_a.triple_count):
+                    start = triple * 3
+                    if segment_a.rgb[start:start + 3] != segment_b.rgb[start:start + 3]:
+                        differences.append(
+                            f"segment {segment_a.index} RGB differs from triple {triple}: "
+                            f"{tuple(segment_a.rgb[start:start + 3])} != {tuple(segment_b.rgb[start:start + 3])}")
+                        break
+
+        if len(prg_a) != len(prg_b):
+            differences.append(f"file size: {len(prg_a)} != {len(prg_b)}")
+        if not differences:
+            differences.append("files differ outside the decoded structure")
+        return differences[:max_differences]
+    finally:
+        if close_a:
+            prg_a.close()
+        if close_b:
+            prg_b.close()
+
+
+def verify_segments(prg, segments, default_pixels):
+    """
+    Check that a PRG file decodes to the segments it was generated from.
+
+    Args:
+        prg: Path, bytes or PRGFile.
+        segments (list): Finalized segments as returned by prg_generator.finalize_segments().
+        default_pixels (int): Expected header pixel count.
+
+    Returns:
+        list: Descriptions of mismatches; empty if the file round-trips.
+    """
+    prg_file, close_file = _as_prg_file(prg)
+    try:
+        problems = prg_file.validate()
+        if problems:
+            return problems
+        if prg_file.default_pixels != default_pixels:
+            problems.append(f"header default_pixels: {prg_file.default_pixels} != {default_pixels}")
+        if prg_file.segment_count != len(segments):
+            problems.append(f"segment count: {prg_file.segment_count} != {len(segments)}")
+            return problems
+
+        for decoded, expected in zip(prg_file.segments, segments):
+            duration, color_data, pixels, segment_type = expected[:4]
+            index = decoded.index
+            if decoded.duration != duration:
+                problems.append(f"segment {index} duration: {decoded.duration} != {duration}")
+            if decoded.pixels != pixels:
+                problems.append(f"segment {index} pixels: {decoded.pixels} != {pixels}")
+            if segment_type == 'fade':
+                start_rgb, end_rgb = (tuple(c) for c in color_data)
+                if decoded.triple_count != duration:
+                    problems.append(f"segment {index} fade steps: {decoded.triple_count} != {duration}")
+                if decoded.start_color != start_rgb:
+                    problems.append(f"segment {index} fade start: {decoded.start_color} != {start_rgb}")
+                if duration > 1 and decoded.end_color != end_rgb:
+                    problems.append(f"segment {index} fade end: {decoded.end_color} != {end_rgb}")
+            else:
+                if decoded.kind != 'solid' or decoded.start_color != tuple(color_data):
+                    problems.append(f"segment {index} solid color: {decoded.start_color} ({decoded.kind}) != {tuple(color_data)}")
+        return problems
+    finally:
+        if close_file:
+            prg_file.close()
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Inspect and compare LTX ball PRG files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = subparsers.add_parser("info", help="Summarize and validate PRG files")
+    info_parser.add_argument("files", nargs="+", help="PRG files")
+    info_parser.add_argument("--segments", action="store_true", help="List every segment")
+
+    diff_parser = subparsers.add_parser("diff", help="Structurally compare two PRG files")
+    diff_parser.add_argument("a", help="First PRG file")
+    diff_parser.add_argument("b", help="Second PRG file")
+    diff_parser.add_argument("--max", type=int, default=50, help="Maximum differences to report")
+
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        try:
+            differences = diff_prg(args.a, args.b, args.max)
+        except PRGDecodeError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(2)
+        if not differences:
+            print("Files are identical.")
+            return
+        for difference in differences:
+            print(difference)
+        sys.exit(1)
+
+    failed = 0
+    for path in args.files:
+        try:
+            with PRGFile.open(path) as prg:
+                problems = prg.validate()
+                status = "OK" if not problems else "INVALID"
+                print(f"{path}: {status} - {prg.summary()}")
+                for problem in problems:
+                    print(f"  {problem}")
+                if args.segments and not problems:
+                    for segment in prg.segments:
+                        print(f"  [{segment.index}] {segment.kind:<5} dur={segment.duration} px={segment.pixels} "
+                              f"triples={segment.triple_count} {segment.start_color} -> {segment.end_color}")
+                if problems:
+                    failed += 1
+        except PRGDecodeError as e:
+            print(f"{path}: ERROR - {e}")
+            failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
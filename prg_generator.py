@@ -8,9 +8,16 @@ Timings from the input JSON (refresh_rate, sequence keys, end_time) are
 interpreted and scaled to this target 100Hz PRG timing.
 
 Usage:
-    python3 prg_generator.py input.json output.prg
+    python3 prg_generator.py input.json output.prg [--diagnostics quiet|normal|trace] [--report report.json] [--verify] [--stream]
+                        [--optimize [--tolerance N]]
+    python3 prg_generator.py --batch in_dir out_dir [-j N] [--verify] [--build-cache [DIR]]
+
+Library usage:
+    from prg_generator import encode_prg
+    prg_bytes = encode_prg(timeline.to_json_sequence())
 """
 
+import argparse
 import json
 import struct
 import sys
@@ -18,6 +25,15 @@ import pprint
 import binascii
 import os
 import math
+import time
+
+from process_pool import positive_int, run_pool
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 def hsv_to_rgb(h, s, v):
     """
@@ -75,11 +91,172 @@ FOOTER = b'BT\x00\x00\x00\x00'
 RGB_TRIPLE_COUNT = 100
 DURATION_BLOCK_SIZE = 19
 HEADER_SIZE = 32
+STREAM_BUFFER_SIZE = 1024 * 1024 # Write buffer per file handle in write_prg_stream()
+
+# Precompiled layouts. The header pixel count is big-endian, every other field little-endian.
+_HEADER_PIXELS_STRUCT = struct.Struct('>H') # 0x08
+_HEADER_FIELDS_STRUCT = struct.Struct('<2sH2sIHHHH2sH') # 0x0A - 0x1F
+# Duration block: pixels, const, duration, const, field 0x09 (two <H), Index1 low/carry, field 0x11
+_INTERMEDIATE_BLOCK_STRUCT = struct.Struct('<H3sH2sHHHHH')
+# Last duration block: pixels, const, duration, const, "CD", Index2 part1 low/carry, part2 low/carry
+_LAST_BLOCK_STRUCT = struct.Struct('<H3sH2s2sHHHH')
 
 TARGET_OUTPUT_PRG_REFRESH_RATE = 100 # <--- NEW: Our desired output PRG refresh rate
 NOMINAL_BASE_FOR_HEADER_FIELDS = 100 # Base for calculating certain header/block fields
+# Identifies the encoder output format. Bump it whenever generated bytes change for the
+# same input; it is part of the PRG build cache key, so stale cache entries are ignored.
+ENCODER_VERSION = "7.1"
 # --- End Constants ---
 
+# --- Diagnostics ---
+# Verbosity levels for encoder diagnostics. Library callers default to quiet;
+# the command line defaults to normal. Trace adds per-segment and per-block detail.
+DIAGNOSTICS_QUIET = 'quiet'
+DIAGNOSTICS_NORMAL = 'normal'
+DIAGNOSTICS_TRACE = 'trace'
+DIAGNOSTICS_LEVELS = (DIAGNOSTICS_QUIET, DIAGNOSTICS_NORMAL, DIAGNOSTICS_TRACE)
+
+
+class PRGEncodeReport:
+    """
+    Machine-readable summary of one PRG encode.
+
+    Filled in by the encoder as it runs so callers can inspect the result
+    (and any warnings) without parsing console output.
+    """
+
+    def __init__(self):
+        """Initialize an empty report."""
+        self.source = None
+        self.default_pixels = None
+        self.input_segment_count = 0
+        self.segment_count = 0
+        self.split_segment_count = 0
+        self.contains_fades = False
+        self.mode = None
+        self.header = {}
+        self.block_offsets = []
+        self.rgb_offsets = []
+        self.header_size = HEADER_SIZE
+        self.duration_blocks_size = 0
+        self.rgb_data_size = 0
+        self.footer_size = len(FOOTER)
+        self.total_size = 0
+        self.optimization = None
+        self.warnings = []
+
+    def to_dict(self):
+        """
+        Convert the report to a dictionary.
+
+        Returns:
+            dict: Dictionary representation of the report.
+        """
+        return {
+            "source": self.source,
+            "default_pixels": self.default_pixels,
+            "input_segment_count": self.input_segment_count,
+            "segment_count": self.segment_count,
+            "split_segment_count": self.split_segment_count,
+            "contains_fades": self.contains_fades,
+            "mode": self.mode,
+            "header": dict(self.header),
+            "block_offsets": list(self.block_offsets),
+            "rgb_offsets": list(self.rgb_offsets),
+            "sizes": {
+                "header": self.header_size,
+                "duration_blocks": self.duration_blocks_size,
+                "rgb_data": self.rgb_data_size,
+                "footer": self.footer_size,
+                "total": self.total_size
+            },
+            "optimization": self.optimization,
+            "warnings": list(self.warnings)
+        }
+
+    def update_from_dict(self, data):
+        """
+        Restore the fields of a report saved with to_dict(). The source is kept.
+
+        Args:
+            data (dict): Output of to_dict().
+        """
+        for name in ("default_pixels", "input_segment_count", "segment_count", "split_segment_count",
+                     "contains_fades", "mode", "optimization"):
+            setattr(self, name, data.get(name, getattr(self, name)))
+        self.header = dict(data.get("header", {}))
+        self.block_offsets = list(data.get("block_offsets", []))
+        self.rgb_offsets = list(data.get("rgb_offsets", []))
+        sizes = data.get("sizes", {})
+        self.header_size = sizes.get("header", self.header_size)
+        self.duration_blocks_size = sizes.get("duration_blocks", self.duration_blocks_size)
+        self.rgb_data_size = sizes.get("rgb_data", self.rgb_data_size)
+        self.footer_size = sizes.get("footer", self.footer_size)
+        self.total_size = sizes.get("total", self.total_size)
+        self.warnings = list(data.get("warnings", []))
+
+
+class PRGDiagnostics:
+    """
+    Level-gated diagnostic output for the encoder, plus the report of the current encode.
+
+    Messages at or below the configured level are written to the stream; warnings
+    are always recorded in the report and printed unless the level is quiet.
+    """
+
+    def __init__(self, level=DIAGNOSTICS_QUIET, stream=None):
+        """
+        Initialize diagnostics.
+
+        Args:
+            level (str): One of DIAGNOSTICS_LEVELS.
+            stream: File-like object for messages. Defaults to sys.stdout at write time.
+
+        Raises:
+            ValueError: If the level is unknown.
+        """
+        if level not in DIAGNOSTICS_LEVELS:
+            raise ValueError(f"Unknown diagnostics level: {level}. Expected one of {', '.join(DIAGNOSTICS_LEVELS)}.")
+        self.level = level
+        self.stream = stream
+        self.report = PRGEncodeReport()
+        self._rank = DIAGNOSTICS_LEVELS.index(level)
+
+    @property
+    def normal_enabled(self):
+        """Whether normal-level messages are written."""
+        return self._rank >= 1
+
+    @property
+    def trace_enabled(self):
+        """Whether trace-level messages are written. Check before formatting per-segment messages."""
+        return self._rank >= 2
+
+    def _write(self, message):
+        print(message, file=self.stream if self.stream is not None else sys.stdout)
+
+    def info(self, message):
+        """Write a normal-level message."""
+        if self._rank >= 1:
+            self._write(message)
+
+    def trace(self, message):
+        """Write a trace-level message."""
+        if self._rank >= 2:
+            self._write(message)
+
+    def trace_data(self, data, depth=2):
+        """Pretty-print a data structure at trace level."""
+        if self._rank >= 2:
+            pprint.pprint(data, stream=self.stream if self.stream is not None else sys.stdout, depth=depth)
+
+    def warning(self, message, tag="WARNING"):
+        """Record a warning in the report and write it unless quiet."""
+        self.report.warnings.append(message)
+        if self._rank >= 1:
+            self._write(f"[{tag}] {message}")
+# --- End Diagnostics ---
+
 def bytes_to_hex(data):
     """Convert bytes or int to a formatted hex string"""
     if isinstance(data, int):
@@ -95,7 +272,75 @@ def bytes_to_hex(data):
     return str(data)
 
 
-def _calculate_intermediate_block_index1_base(target_index, total_segments, segments_list=None, is_any_fade_in_sequence=False):
+def _index1_horizontal_step(seg_block_dur, seg_type, seg_index=None, diagnostics=None):
+    """
+    Horizontal step a segment contributes to the Index1 field of later intermediate blocks.
+
+    Unknown segment types contribute the default step 300 and are reported as a
+    warning through diagnostics (quiet if omitted).
+    """
+    if seg_type == 'solid':
+        if seg_block_dur > NOMINAL_BASE_FOR_HEADER_FIELDS: # > 100
+            return 300 + (3 * seg_block_dur)
+        return 300 # <= 100 (covers == 100 and < 100)
+    elif seg_type == 'fade':
+        return seg_block_dur # Fades use their own duration
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    diag.warning(f"Unknown segment type '{seg_type}' at index {seg_index} in Index1 offset calculation. Using default step 300.", tag="WARN")
+    return 300 # Fallback
+
+
+def _index2_part1_horizontal_step(seg_block_dur, seg_type, seg_index=None, diagnostics=None):
+    """
+    Horizontal step a segment contributes to Index2 Part1 of the last block.
+
+    Unknown segment types are handled as in _index1_horizontal_step().
+    """
+    if seg_type == 'solid':
+        if seg_block_dur > NOMINAL_BASE_FOR_HEADER_FIELDS: # > 100
+            return 300 + (3 * seg_block_dur)
+        elif seg_block_dur == NOMINAL_BASE_FOR_HEADER_FIELDS: # == 100
+            return 300 + (2 * seg_block_dur) # Results in 500
+        return 300 # < 100
+    elif seg_type == 'fade':
+        return seg_block_dur # Fades use their own duration
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    diag.warning(f"Unknown segment type '{seg_type}' at index {seg_index} in Index2 (part1) offset calculation. Using default step 300.", tag="WARN")
+    return 300 # Fallback
+
+
+def _calculate_horizontal_offset_table(segments_list, diagnostics=None):
+    """
+    Precompute the cumulative horizontal offsets used by the duration block index fields.
+
+    Computing these once as prefix sums keeps duration block generation linear in the
+    number of segments instead of re-summing every earlier segment for each block.
+
+    Args:
+        segments_list (list): The list of processed segments.
+        diagnostics (PRGDiagnostics, optional): Receives unknown segment type warnings. Quiet if omitted.
+
+    Returns:
+        tuple(list, int): (index1_prefix, index2_part1_offset).
+            index1_prefix[k] is the summed Index1 step of segments[0] .. segments[k-1]
+            (so index1_prefix[0] == 0). index2_part1_offset is the summed Index2 Part1
+            step of every segment before the last one.
+    """
+    index1_prefix = [0] * (len(segments_list) + 1)
+    running_offset = 0
+    index2_part1_offset = 0
+    last_index = len(segments_list) - 1
+    for j, segment in enumerate(segments_list):
+        seg_j_block_dur = segment[0] # This is s_block_dur_prg
+        seg_j_type = segment[3]
+        running_offset += _index1_horizontal_step(seg_j_block_dur, seg_j_type, j, diagnostics)
+        index1_prefix[j + 1] = running_offset
+        if j < last_index:
+            index2_part1_offset += _index2_part1_horizontal_step(seg_j_block_dur, seg_j_type, j, diagnostics)
+    return index1_prefix, index2_part1_offset
+
+
+def _calculate_intermediate_block_index1_base(target_index, total_segments, segments_list=None, is_any_fade_in_sequence=False, offset_table=None, diagnostics=None):
     """
     Calculates the base value for the Index1 field in intermediate duration blocks.
     This value can exceed 16 bits. The lower 16 bits go to field +0x0D,
@@ -107,12 +352,16 @@ def _calculate_intermediate_block_index1_base(target_index, total_segments, segm
         total_segments (int): The total number of segments (N) in the sequence.
         segments_list (list, optional): The list of processed segments, used for dynamic step calculation.
         is_any_fade_in_sequence (bool): True if the overall sequence contains any fade segments.
+        offset_table (tuple, optional): Precomputed result of _calculate_horizontal_offset_table(segments_list).
+            Computed on demand if not provided; pass it when calling once per block.
+        diagnostics (PRGDiagnostics, optional): Receives warnings about invalid arguments. Quiet if omitted.
     Returns:
         int: The calculated base value (potentially >16 bits).
     """
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
     if not (1 <= target_index < total_segments):
-         print(f"[WARN] _calculate_intermediate_block_index1_base called with invalid target_index {target_index} for {total_segments} segments.")
-         return 0
+        diag.warning(f"_calculate_intermediate_block_index1_base called with invalid target_index {target_index} for {total_segments} segments.", tag="WARN")
+        return 0
 
     base_value_n2_t1 = 370
     vertical_step = 19
@@ -127,35 +376,24 @@ def _calculate_intermediate_block_index1_base(target_index, total_segments, segm
     
     # For sequences with fades, use the complex logic
     if not segments_list:
-        print(f"[WARN] _calculate_intermediate_block_index1_base called with empty segments_list for fade sequence.")
+        diag.warning("_calculate_intermediate_block_index1_base called with empty segments_list for fade sequence.", tag="WARN")
         return 0
 
-    cumulative_horizontal_offset = 0
-    # Iterate for segments 0 to target_index-2, which contribute to the offset for target_index
-    for j in range(target_index - 1):
-        if j >= len(segments_list):
-            print(f"[WARN] _calculate_intermediate_block_index1_base: index j={j} out of bounds for segments_list (len={len(segments_list)})")
-            break # or return error
-        seg_j_block_dur = segments_list[j][0] # This is s_block_dur_prg
-        seg_j_type = segments_list[j][3]
-        
-        current_step = 0
-        if seg_j_type == 'solid':
-            if seg_j_block_dur > NOMINAL_BASE_FOR_HEADER_FIELDS: # > 100
-                current_step = 300 + (3 * seg_j_block_dur)
-            else: # <= 100 (covers == 100 and < 100)
-                current_step = 300
-        elif seg_j_type == 'fade':
-            current_step = seg_j_block_dur # Fades use their own duration
-        else:
-            print(f"[WARN] Unknown segment type '{seg_j_type}' at index {j} in _calculate_intermediate_block_index1_base. Using default step 300.")
-            current_step = 300 # Fallback
-        cumulative_horizontal_offset += current_step
+    if offset_table is None:
+        offset_table = _calculate_horizontal_offset_table(segments_list, diag)
+    index1_prefix = offset_table[0]
+
+    # Segments 0 to target_index-2 contribute to the offset for target_index
+    prefix_index = target_index - 1
+    if prefix_index >= len(index1_prefix):
+        diag.warning(f"_calculate_intermediate_block_index1_base: target_index {target_index} out of bounds for segments_list (len={len(segments_list)})", tag="WARN")
+        prefix_index = len(index1_prefix) - 1
+    cumulative_horizontal_offset = index1_prefix[prefix_index]
 
     value_pair_full = value_n_t1 + cumulative_horizontal_offset
     return value_pair_full
 
-def _calculate_last_block_index2_bases(total_segments, segments_list=None, is_any_fade_in_sequence=False):
+def _calculate_last_block_index2_bases(total_segments, segments_list=None, is_any_fade_in_sequence=False, offset_table=None, diagnostics=None):
     """
     Calculates the base values for Index2 Part1 and Part2 fields in the *last*
     duration block. These values can exceed 16 bits.
@@ -166,10 +404,13 @@ def _calculate_last_block_index2_bases(total_segments, segments_list=None, is_an
         total_segments (int): The total number of segments.
         segments_list (list, optional): The list of processed segments.
         is_any_fade_in_sequence (bool): True if the overall sequence contains any fade segments.
+        offset_table (tuple, optional): Precomputed result of _calculate_horizontal_offset_table(segments_list).
+        diagnostics (PRGDiagnostics, optional): Receives warnings about invalid arguments. Quiet if omitted.
 
     Returns:
         tuple(int, int): (part1_full_value, part2_full_value).
     """
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
     # For pure solid sequences (no fades), use the original simple logic
     if not is_any_fade_in_sequence:
         part1_full = 304 + (total_segments - 1) * 300
@@ -178,32 +419,16 @@ def _calculate_last_block_index2_bases(total_segments, segments_list=None, is_an
     
     # For sequences with fades, use the complex logic
     if not segments_list:
-        print(f"[WARN] _calculate_last_block_index2_bases called with empty segments_list for fade sequence.")
+        diag.warning("_calculate_last_block_index2_bases called with empty segments_list for fade sequence.", tag="WARN")
         return 0, 0
 
-    cumulative_horizontal_offset_for_part1 = 0
-    # Sum H_eff for j=0 to total_segments-2 (i.e., all segments *before* the last one)
-    for j in range(total_segments - 1): # Corresponds to segments[0] through segments[total_segments-2]
-        if j >= len(segments_list):
-            print(f"[WARN] _calculate_last_block_index2_bases (part1): index j={j} out of bounds for segments_list (len={len(segments_list)})")
-            break
-        seg_j_block_dur = segments_list[j][0]
-        seg_j_type = segments_list[j][3]
-        
-        current_step_part1 = 0
-        if seg_j_type == 'solid':
-            if seg_j_block_dur > NOMINAL_BASE_FOR_HEADER_FIELDS: # > 100
-                current_step_part1 = 300 + (3 * seg_j_block_dur)
-            elif seg_j_block_dur == NOMINAL_BASE_FOR_HEADER_FIELDS: # == 100
-                current_step_part1 = 300 + (2 * seg_j_block_dur) # Results in 500
-            else: # < 100
-                current_step_part1 = 300
-        elif seg_j_type == 'fade':
-            current_step_part1 = seg_j_block_dur # Fades use their own duration
-        else:
-            print(f"[WARN] Unknown segment type '{seg_j_type}' at index {j} in _calculate_last_block_index2_bases (part1). Using default step 300.")
-            current_step_part1 = 300 # Fallback
-        cumulative_horizontal_offset_for_part1 += current_step_part1
+    if len(segments_list) < total_segments:
+        diag.warning(f"_calculate_last_block_index2_bases (part1): total_segments={total_segments} out of bounds for segments_list (len={len(segments_list)})", tag="WARN")
+
+    if offset_table is None or len(segments_list) != total_segments:
+        # Sum H_eff for j=0 to total_segments-2 (i.e., all segments *before* the last one)
+        offset_table = _calculate_horizontal_offset_table(segments_list[:total_segments], diag)
+    cumulative_horizontal_offset_for_part1 = offset_table[1]
             
     part1_full = 304 + cumulative_horizontal_offset_for_part1
 
@@ -214,14 +439,15 @@ def _calculate_last_block_index2_bases(total_segments, segments_list=None, is_an
     part2_full = part2_full_base * total_segments
     return part1_full, part2_full
 
-def split_long_segments(segments, max_duration=65535):
+def split_long_segments(segments, max_duration=65535, diagnostics=None):
     """
     Split segments with durations *in PRG time units* exceeding max_duration (65535 for <H).
     This function should ONLY operate on 'solid' type segments based on their s_block_dur_prg.
     Fade segments (N=1 full or embedded) are NOT split by this function.
     Ensures returned segments are 5-element tuples: (duration, color_data, pixels, segment_type, json_dur_original_unsplit)
     """
-    print(f"[SPLIT] Checking for segments exceeding maximum duration ({max_duration} PRG time units)...")
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    diag.info(f"[SPLIT] Checking for segments exceeding maximum duration ({max_duration} PRG time units)...")
     new_segments = []
     split_occurred = False
     original_segment_count = len(segments)
@@ -231,7 +457,7 @@ def split_long_segments(segments, max_duration=65535):
 
     for idx, segment_tuple in enumerate(segments):
         if len(segment_tuple) != 5:
-            print(f"[ERROR] Segment {idx} in split_long_segments has unexpected format (length {len(segment_tuple)} instead of 5). Skipping.")
+            diag.warning(f"Segment {idx} in split_long_segments has unexpected format (length {len(segment_tuple)} instead of 5). Skipping.", tag="ERROR")
             # Or raise an error: raise ValueError(f"Segment {idx} has unexpected format")
             continue
         
@@ -248,7 +474,7 @@ def split_long_segments(segments, max_duration=65535):
             continue
 
         split_occurred = True
-        print(f"[SPLIT] WARNING: Segment {idx} (Color {color_data}, Type {segment_type}) has PRG duration {duration_prg_units} PRG units which exceeds {max_duration}. Splitting.")
+        diag.warning(f"Segment {idx} (Color {color_data}, Type {segment_type}) has PRG duration {duration_prg_units} PRG units which exceeds {max_duration}. Splitting.", tag="SPLIT")
 
         num_full_segments = duration_prg_units // max_duration
         remainder_duration = duration_prg_units % max_duration
@@ -257,36 +483,117 @@ def split_long_segments(segments, max_duration=65535):
             # Each split part retains the original_json_dur of the segment it came from.
             # If individual split json_dur is needed, this would need adjustment.
             new_segments.append((max_duration, color_data, pixels, segment_type, original_json_dur)) # 5-element tuple
-            print(f"[SPLIT]  - Added sub-segment {i+1}/{num_full_segments + (1 if remainder_duration > 0 else 0)} with PRG duration {max_duration} PRG units")
+            if diag.trace_enabled:
+                diag.trace(f"[SPLIT]  - Added sub-segment {i+1}/{num_full_segments + (1 if remainder_duration > 0 else 0)} with PRG duration {max_duration} PRG units")
 
         if remainder_duration > 0:
             new_segments.append((remainder_duration, color_data, pixels, segment_type, original_json_dur)) # 5-element tuple
-            print(f"[SPLIT]  - Added sub-segment {num_full_segments+1}/{num_full_segments+1} with PRG duration {remainder_duration} PRG units")
+            if diag.trace_enabled:
+                diag.trace(f"[SPLIT]  - Added sub-segment {num_full_segments+1}/{num_full_segments+1} with PRG duration {remainder_duration} PRG units")
 
     if split_occurred:
-        print(f"[SPLIT] Segment splitting complete. Original: {original_segment_count} segments, New: {len(new_segments)} segments.")
+        diag.info(f"[SPLIT] Segment splitting complete. Original: {original_segment_count} segments, New: {len(new_segments)} segments.")
     else:
-        print("[SPLIT] No segments exceeded maximum duration.")
+        diag.info("[SPLIT] No segments exceeded maximum duration.")
     return new_segments
 
 
-def generate_prg_file(input_json, output_prg):
-    """Generates the .prg file from the input JSON, always outputting a 100Hz PRG."""
-    print(f"\n[INIT] Starting PRG generation from {input_json} to {output_prg}")
-    print(f"[INIT] Target output PRG refresh rate is fixed at: {TARGET_OUTPUT_PRG_REFRESH_RATE}Hz")
+class PRGGenerationError(Exception):
+    """Exception raised when a sequence cannot be encoded as a PRG file."""
+    pass
+
+
+def load_sequence_json(input_json):
+    """
+    Load a JSON color sequence from disk.
+
+    Args:
+        input_json (str): Path to the input JSON file.
 
+    Returns:
+        dict: The parsed JSON data.
+
+    Raises:
+        PRGGenerationError: If the file is missing or is not valid JSON.
+    """
     try:
         with open(input_json, 'r') as f:
-            data = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
-        print(f"[ERROR] Input JSON file not found: {input_json}")
-        sys.exit(1)
+        raise PRGGenerationError(f"Input JSON file not found: {input_json}")
     except json.JSONDecodeError as e:
-        print(f"[ERROR] Invalid JSON file: {input_json} - {e}")
-        sys.exit(1)
+        raise PRGGenerationError(f"Invalid JSON file: {input_json} - {e}")
+
+
+def parse_sequence(data, diagnostics=None):
+    """
+    Validate a JSON sequence and convert it into segments measured in PRG units.
+
+    The input is the same structure that prg_generator.py reads from disk, e.g. the
+    dict returned by Timeline.to_json_sequence(). Timings are scaled from the JSON
+    refresh rate to the fixed 100Hz output rate.
+
+    Args:
+        data (dict): JSON sequence data (default_pixels, refresh_rate, end_time,
+            color_format, sequence).
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted.
+
+    Returns:
+        tuple: (default_pixels, segments) where segments is a list of
+            (duration_prg_units, color_data, pixels, segment_type) tuples.
+            color_data is (r, g, b) for 'solid' and ((r, g, b), (r, g, b)) for 'fade'.
+
+    Raises:
+        PRGGenerationError: If the sequence data is invalid.
+    """
+    default_pixels, segments = iter_sequence(data, diagnostics=diagnostics)
+    return default_pixels, list(segments)
+
+
+def iter_sequence(data, diagnostics=None):
+    """
+    Validate a JSON sequence and lazily convert it into segments measured in PRG units.
+
+    The input is the same structure that prg_generator.py reads from disk, e.g. the
+    dict returned by Timeline.to_json_sequence(). Timings are scaled from the JSON
+    refresh rate to the fixed 100Hz output rate.
 
-    print("[INIT] Loaded JSON data:")
-    pprint.pprint(data, depth=2)
+    Args:
+        data (dict): JSON sequence data (default_pixels, refresh_rate, end_time,
+            color_format, sequence).
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted.
+
+    Top-level fields are validated immediately; sequence entries are validated as
+    the returned iterator is consumed.
+
+    Returns:
+        tuple: (default_pixels, segments) where segments is an iterator of
+            (duration_prg_units, color_data, pixels, segment_type) tuples.
+            color_data is (r, g, b) for 'solid' and ((r, g, b), (r, g, b)) for 'fade'.
+
+    Raises:
+        PRGGenerationError: If the sequence data is invalid. Errors in individual
+            entries are raised while iterating.
+    """
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    default_pixels, sequence_params = _prepare_sequence(data, diag)
+    return default_pixels, _iter_sequence_segments(*sequence_params, diag)
+
+
+def _prepare_sequence(data, diag):
+    """
+    Validate the top-level fields of a JSON sequence and sort its entries by time.
+
+    Returns:
+        tuple: (default_pixels, sequence_params) where sequence_params are the leading
+            arguments of _iter_sequence_segments(). The sorted entries can be iterated
+            any number of times, so multi-pass writers sort the sequence only once.
+    """
+    if not isinstance(data, dict):
+        raise PRGGenerationError("Sequence data must be a JSON object.")
+
+    diag.trace("[INIT] Loaded JSON data:")
+    diag.trace_data(data, depth=2)
 
     default_pixels = data.get('default_pixels', 1)
     json_refresh_rate = data.get('refresh_rate', 1) # Refresh rate specified in the input JSON
@@ -295,49 +602,47 @@ def generate_prg_file(input_json, output_prg):
 
     # Validate types
     if not isinstance(default_pixels, int) or not (1 <= default_pixels <= 4):
-        print(f"[ERROR] Invalid 'default_pixels': {default_pixels}. Must be int 1-4.")
-        sys.exit(1)
+        raise PRGGenerationError(f"Invalid 'default_pixels': {default_pixels}. Must be int 1-4.")
     if not isinstance(json_refresh_rate, int) or json_refresh_rate <= 0:
-        print(f"[ERROR] Invalid 'refresh_rate' in JSON: {json_refresh_rate}. Must be positive int.")
-        sys.exit(1)
+        raise PRGGenerationError(f"Invalid 'refresh_rate' in JSON: {json_refresh_rate}. Must be positive int.")
     if end_time_json_units is not None and not isinstance(end_time_json_units, (int, float)):
-        print(f"[ERROR] Invalid 'end_time' in JSON: {end_time_json_units}. Must be a number (JSON time units).")
-        sys.exit(1)
+        raise PRGGenerationError(f"Invalid 'end_time' in JSON: {end_time_json_units}. Must be a number (JSON time units).")
 
     time_unit_scaling_factor = TARGET_OUTPUT_PRG_REFRESH_RATE / json_refresh_rate
 
-    print(f"[INIT] Config: DefaultPixels={default_pixels}, ColorFormat={color_format}")
-    print(f"[INIT] Input JSON: RefreshRate={json_refresh_rate}Hz, EndTime={end_time_json_units} JSON_units (if specified)")
-    print(f"[INIT] Time Unit Scaling Factor (Target_PRG_units / JSON_unit): {time_unit_scaling_factor:.4f}")
+    diag.info(f"[INIT] Config: DefaultPixels={default_pixels}, ColorFormat={color_format}")
+    diag.info(f"[INIT] Input JSON: RefreshRate={json_refresh_rate}Hz, EndTime={end_time_json_units} JSON_units (if specified)")
+    diag.info(f"[INIT] Time Unit Scaling Factor (Target_PRG_units / JSON_unit): {time_unit_scaling_factor:.4f}")
 
     if 'sequence' not in data or not isinstance(data['sequence'], dict) or not data['sequence']:
-        print("[ERROR] JSON 'sequence' is missing, not a dictionary, or empty.")
-        sys.exit(1)
+        raise PRGGenerationError("JSON 'sequence' is missing, not a dictionary, or empty.")
 
     try:
         sequence_items_json_units = sorted([(round(float(t)), v) for t, v in data['sequence'].items()], key=lambda x: x[0])
     except ValueError:
-        print("[ERROR] Sequence keys must be valid numbers representing JSON time units.")
-        sys.exit(1)
+        raise PRGGenerationError("Sequence keys must be valid numbers representing JSON time units.")
+
+    if diag.trace_enabled:
+        diag.trace(f"[INIT] Sorted sequence timestamps (JSON units, rounded): {[t for t, _ in sequence_items_json_units]}")
+
+    diag.info("\n[SEGMENT_CALC] Processing sequence segments (times will be scaled to PRG units)...")
+    return default_pixels, (sequence_items_json_units, default_pixels, color_format, time_unit_scaling_factor,
+                            end_time_json_units)
 
-    print(f"[INIT] Sorted sequence timestamps (JSON units, rounded): {[t for t, _ in sequence_items_json_units]}")
 
-    print("\n[SEGMENT_CALC] Processing sequence segments (times will be scaled to PRG units)...")
-    parsed_segments = []
-    if not sequence_items_json_units:
-         print("[ERROR] No segments found in sequence after sorting.")
-         sys.exit(1)
+def _iter_sequence_segments(sequence_items_json_units, default_pixels, color_format, time_unit_scaling_factor, end_time_json_units, diag):
+    """Yield parsed segments for sorted (time_json_units, entry) sequence items. See iter_sequence()."""
+    segment_count = 0
 
     # Segment Parsing and Mode Detection
     for idx, (time_json_units, entry) in enumerate(sequence_items_json_units):
         if not isinstance(entry, dict):
-            print(f"[ERROR] Entry for JSON time {time_json_units} units is not a dictionary.")
-            sys.exit(1)
+            raise PRGGenerationError(f"Entry for JSON time {time_json_units} units is not a dictionary.")
 
         start_color = entry.get('start_color')
         end_color = entry.get('end_color')
         color = entry.get('color')
-        
+
         segment_type = None
         color_data = None
 
@@ -345,11 +650,9 @@ def generate_prg_file(input_json, output_prg):
         if start_color is not None and end_color is not None:
             segment_type = 'fade'
             if not isinstance(start_color, list) or len(start_color) != 3:
-                print(f"[ERROR] Segment at JSON time {time_json_units} units has invalid start_color format: {start_color}. Expected [R, G, B] or [H, S, V].")
-                sys.exit(1)
+                raise PRGGenerationError(f"Segment at JSON time {time_json_units} units has invalid start_color format: {start_color}. Expected [R, G, B] or [H, S, V].")
             if not isinstance(end_color, list) or len(end_color) != 3:
-                print(f"[ERROR] Segment at JSON time {time_json_units} units has invalid end_color format: {end_color}. Expected [R, G, B] or [H, S, V].")
-                sys.exit(1)
+                raise PRGGenerationError(f"Segment at JSON time {time_json_units} units has invalid end_color format: {end_color}. Expected [R, G, B] or [H, S, V].")
             try:
                 if color_format.lower() == 'hsv':
                     start_rgb = hsv_to_rgb(start_color[0], start_color[1], start_color[2])
@@ -361,15 +664,13 @@ def generate_prg_file(input_json, output_prg):
                         if not (0 <= c_val <= 255): raise ValueError("RGB values must be 0-255")
                 color_data = (start_rgb, end_rgb)
             except (ValueError, TypeError) as e:
-                print(f"[ERROR] Invalid color values in fade segment at JSON time {time_json_units}: start={start_color}, end={end_color}. {e}")
-                sys.exit(1)
-                
+                raise PRGGenerationError(f"Invalid color values in fade segment at JSON time {time_json_units}: start={start_color}, end={end_color}. {e}")
+
         # Otherwise, mark as type='solid'. Store color_rgb.
         elif color is not None:
             segment_type = 'solid'
             if not isinstance(color, list) or len(color) != 3:
-                print(f"[ERROR] Segment at JSON time {time_json_units} units has invalid color format: {color}. Expected [R, G, B] or [H, S, V].")
-                sys.exit(1)
+                raise PRGGenerationError(f"Segment at JSON time {time_json_units} units has invalid color format: {color}. Expected [R, G, B] or [H, S, V].")
             try:
                 if color_format.lower() == 'hsv':
                     color_data = hsv_to_rgb(color[0], color[1], color[2])
@@ -378,15 +679,13 @@ def generate_prg_file(input_json, output_prg):
                     for c_val in color_data:
                         if not (0 <= c_val <= 255): raise ValueError("RGB values must be 0-255")
             except (ValueError, TypeError) as e:
-                print(f"[ERROR] Invalid color value in segment at JSON time {time_json_units}: {color}. {e}")
-                sys.exit(1)
+                raise PRGGenerationError(f"Invalid color value in segment at JSON time {time_json_units}: {color}. {e}")
         else:
-            print(f"[ERROR] Segment at JSON time {time_json_units} units is missing both 'color' and 'start_color'/'end_color'.")
-            sys.exit(1)
+            raise PRGGenerationError(f"Segment at JSON time {time_json_units} units is missing both 'color' and 'start_color'/'end_color'.")
 
         pixels = entry.get('pixels', default_pixels)
         if not isinstance(pixels, int) or not (1 <= pixels <= 4):
-             print(f"[WARNING] Segment at JSON time {time_json_units} units has invalid pixels value ({pixels}). Using default: {default_pixels}.")
+             diag.warning(f"Segment at JSON time {time_json_units} units has invalid pixels value ({pixels}). Using default: {default_pixels}.")
              pixels = default_pixels
 
         current_segment_prg_start_time = round(time_json_units * time_unit_scaling_factor)
@@ -397,86 +696,223 @@ def generate_prg_file(input_json, output_prg):
         elif end_time_json_units is not None:
             rounded_end_time_json_units = round(float(end_time_json_units))
             if rounded_end_time_json_units < time_json_units:
-                 print(f"[ERROR] JSON 'end_time' ({rounded_end_time_json_units} JSON units) is earlier than the start time ({time_json_units} JSON units) of the last segment.")
-                 sys.exit(1)
+                 raise PRGGenerationError(f"JSON 'end_time' ({rounded_end_time_json_units} JSON units) is earlier than the start time ({time_json_units} JSON units) of the last segment.")
             next_segment_prg_start_time = round(rounded_end_time_json_units * time_unit_scaling_factor)
         else:
             default_duration_prg_units = TARGET_OUTPUT_PRG_REFRESH_RATE
-            print(f"[WARNING] 'end_time' not specified in JSON. Assigning default duration ({default_duration_prg_units} PRG units = 1s) to the last segment.")
+            diag.warning(f"'end_time' not specified in JSON. Assigning default duration ({default_duration_prg_units} PRG units = 1s) to the last segment.")
             next_segment_prg_start_time = current_segment_prg_start_time + default_duration_prg_units
 
         json_duration_prg = next_segment_prg_start_time - current_segment_prg_start_time
         if json_duration_prg <= 0:
-             print(f"[WARNING] Segment {idx} (JSON time {time_json_units} units) has non-positive PRG duration ({json_duration_prg} PRG units after scaling/rounding). Skipping.")
+             diag.warning(f"Segment {idx} (JSON time {time_json_units} units) has non-positive PRG duration ({json_duration_prg} PRG units after scaling/rounding). Skipping.")
              continue
 
-        print(f"[SEGMENT_CALC] - Seg {idx}: JSON_Time={time_json_units} units -> PRG_Start_Time={current_segment_prg_start_time} PRG_units.")
-        print(f"                 Next PRG_Start_Time={next_segment_prg_start_time} -> Duration={json_duration_prg} PRG_units, Type={segment_type}, Pixels={pixels}")
-        
-        parsed_segments.append({
-            'type': segment_type,
-            'json_duration_prg': json_duration_prg,
-            'color_data': color_data,
-            'pixels': pixels
-        })
+        if diag.trace_enabled:
+            diag.trace(f"[SEGMENT_CALC] - Seg {idx}: JSON_Time={time_json_units} units -> PRG_Start_Time={current_segment_prg_start_time} PRG_units.")
+            diag.trace(f"                 Next PRG_Start_Time={next_segment_prg_start_time} -> Duration={json_duration_prg} PRG_units, Type={segment_type}, Pixels={pixels}")
 
-    if not parsed_segments:
-        print("[ERROR] No valid segments could be calculated (check durations and times after scaling).")
-        sys.exit(1)
+        segment_count += 1
+        yield (json_duration_prg, color_data, pixels, segment_type)
 
-    # After parsing, determine: is_n1_full_program_fade = (len(parsed_segments) == 1 and parsed_segments[0]['type'] == 'fade')
-    is_n1_full_program_fade = (len(parsed_segments) == 1 and parsed_segments[0]['type'] == 'fade')
-    
-    # Segment List Finalization (segments)
-    segments = []
-    
-    for p_seg in parsed_segments:
-        s_type = p_seg['type']
-        s_json_dur_prg = p_seg['json_duration_prg'] # calculated_duration_in_prg_units_from_json_times_and_scaling
-        s_color_info = p_seg['color_data'] # either (r,g,b) or ((r1,g1,b1), (r2,g2,b2))
-        s_pixels = p_seg['pixels']
-        
-        if is_n1_full_program_fade:
-            s_block_dur_prg = s_json_dur_prg
-            # Crucial Check: If s_block_dur_prg > 65535, print error and exit (or cap and warn).
-            if s_block_dur_prg > 65535:
-                print(f"[ERROR] N=1 Full Program Fade duration {s_block_dur_prg} PRG units exceeds 65535. Max is 655.35s at 100Hz.")
-                sys.exit(1)
-            if s_block_dur_prg <= 0:
-                print(f"[ERROR] N=1 Full Program Fade duration {s_block_dur_prg} PRG units must be positive.")
-                sys.exit(1)
-        else:  # mixed sequence or N=1 solid - s_block_dur_prg is the JSON duration
-            s_block_dur_prg = s_json_dur_prg
-            # Removed specific handling for embedded fade's s_block_dur_prg to be 100.
-            # It will now be its s_json_dur_prg.
-            # The number of RGB steps for an embedded fade is handled separately during RGB writing.
-            
-        # Add (s_block_dur_prg, s_color_info, s_pixels, s_type, s_json_dur_prg) to segments
-        segments.append((s_block_dur_prg, s_color_info, s_pixels, s_type, s_json_dur_prg))
+    if segment_count == 0:
+        raise PRGGenerationError("No valid segments could be calculated (check durations and times after scaling).")
 
-    if not segments:
-        print("[ERROR] No valid segments could be created.")
-        sys.exit(1)
 
-    segments = split_long_segments(segments) 
-    segment_count = len(segments)
+def _rgb_data_size(segments):
+    """
+    Number of RGB payload bytes that finalized segments encode to.
 
-    if segment_count == 0:
-         print("[ERROR] No segments remaining after processing/splitting.")
-         sys.exit(1)
-         
-    is_any_fade_in_sequence = any(s[3] == 'fade' for s in segments)
-    print(f"\n[SUMMARY] Total PRG segments to write: {segment_count}. Contains fades: {is_any_fade_in_sequence}")
+    Fades write one triple per PRG time unit; solids always write RGB_TRIPLE_COUNT triples.
+    """
+    rgb_data_size = 0
+    for s_block_dur, _, _, segment_type, _ in segments: # s_block_dur is the key
+        if segment_type == 'fade':
+            # For N=1 True Fade, s_block_dur is its actual duration.
+            # For Embedded Fade, s_block_dur is also its actual (JSON-derived) duration.
+            rgb_data_size += s_block_dur * 3
+        else: # Solid
+            rgb_data_size += RGB_TRIPLE_COUNT * 3 # Solids always have 100 repeats of 3 bytes
+    return rgb_data_size
 
 
-    # Header Value Calculation
-    # After segments are finalized and split_long_segments may have run
-    is_n1_full_program_fade = (segment_count == 1 and segments[0][3] == 'fade') # This implies is_any_fade_in_sequence is true
+def fade_ramp_bytes(start_rgb, end_rgb, num_steps):
+    """
+    Interpolate a fade into num_steps packed RGB triples.
+
+    Step i of each channel is round(start + i * (end - start) / (num_steps - 1)),
+    using round-half-to-even like Python's round(), clamped to 0-255. A single step
+    is the start color. The whole ramp is computed with NumPy when it is available;
+    the pure Python fallback produces identical bytes.
+
+    Args:
+        start_rgb (tuple): Start color (r, g, b).
+        end_rgb (tuple): End color (r, g, b).
+        num_steps (int): Number of triples to generate.
+
+    Returns:
+        bytes: num_steps * 3 bytes of RGB data.
+    """
+    if num_steps <= 0:
+        return b''
+    if num_steps == 1:
+        return bytes(max(0, min(255, c)) for c in start_rgb)
+
+    divisor = num_steps - 1.0
+    if NUMPY_AVAILABLE:
+        steps = np.arange(num_steps, dtype=np.int64)
+        ramp = np.empty((num_steps, 3), dtype=np.uint8)
+        for channel in range(3):
+            start_c = start_rgb[channel]
+            delta = end_rgb[channel] - start_c
+            # Same operation order as the scalar formula, so results are bit-identical
+            ramp[:, channel] = np.clip(np.rint(start_c + (steps * delta) / divisor), 0, 255)
+        return ramp.tobytes()
+
+    ramp = bytearray(num_steps * 3)
+    for channel in range(3):
+        start_c = start_rgb[channel]
+        delta = end_rgb[channel] - start_c
+        ramp[channel::3] = bytes(max(0, min(255, int(round(start_c + i * delta / divisor)))) for i in range(num_steps))
+    return bytes(ramp)
+
+
+def _block_field_09(next_block_duration, next_segment_type, next_json_duration):
+    """
+    Field 0x09 (part1, part2) of an intermediate block, describing the next segment.
+
+    Part2 is the number of RGB triples the next segment stores.
+    """
+    if next_segment_type == 'fade':
+        return 1, next_json_duration # Use its original JSON duration (scaled to PRG units)
+    # solid
+    return math.floor(next_block_duration / NOMINAL_BASE_FOR_HEADER_FIELDS), NOMINAL_BASE_FOR_HEADER_FIELDS
+
+
+def _block_field_11(dur_k, dur_k_plus_1):
+    """Field 0x11 of an intermediate block from its own and the next block duration."""
+    field_11_val = 0
+
+    # This logic for field_11_val seems highly specific and based on observed patterns.
+    if dur_k_plus_1 == 1930: field_11_val = 30
+    elif dur_k_plus_1 == 103: field_11_val = 3
+    elif dur_k_plus_1 == 100:
+        # Rule: If Dur_k+1 == 100, Field[+0x11] is 0.
+        # This aligns with official_prg_app_tests.md (red1s_red-blue1s_green1s_100r.prg dump)
+        # and prg_generator_README.md (line 395-397).
+        field_11_val = 0
+    elif dur_k_plus_1 > 100 and dur_k_plus_1 % 100 == 0: # Multiples of 100, but not 100 itself
+        if dur_k == dur_k_plus_1: field_11_val = dur_k_plus_1
+        # This rule for dur_k >= 1000 and dur_k_plus_1 >=600 seems to be for specific official app quirks.
+        # The more general behavior for multiples of 100 (not equal to current) is 0, unless overridden.
+        # Example L5 (1000ms -> 600ms -> 1930ms): Block0 Field[+0x11] (for 600ms) is 600. Here Dur0=1000, Dur1=600. (Dur_k >=1000 and Dur_k+1 >=600)
+        elif dur_k >= 1000 and dur_k_plus_1 >= 600: field_11_val = dur_k_plus_1 # This seems to be an override
+        else: field_11_val = 0
+    elif dur_k_plus_1 == 150:
+        if dur_k >= 100: field_11_val = 150
+        else: field_11_val = 50
+    elif dur_k_plus_1 < 100: field_11_val = dur_k_plus_1
+    else:
+        if dur_k >= 100: field_11_val = dur_k_plus_1
+        else: field_11_val = dur_k_plus_1 % 100
+    return field_11_val
+
+
+def _write_duration_blocks(buf, offset, segments, is_any_fade_in_sequence, diagnostics=None):
+    """
+    Pack one 19-byte duration block per segment into a preallocated buffer.
+
+    Args:
+        buf (bytearray): Output buffer, large enough to hold every block from offset.
+        offset (int): Offset of the first duration block in buf.
+        segments (list): Finalized (block_duration_prg, color_data, pixels, segment_type,
+            json_duration_prg_original) tuples, after split_long_segments().
+        is_any_fade_in_sequence (bool): True if any segment is a fade.
+        diagnostics (PRGDiagnostics, optional): Receives unknown segment type warnings. Quiet if omitted.
+
+    Returns:
+        int: Offset just past the last block written.
+
+    Raises:
+        PRGGenerationError: If a block value does not fit its field.
+    """
+    segment_count = len(segments)
+    current_offset = offset
+    # Index offsets are prefix sums over the segment list; compute them once for all blocks.
+    offset_table = _calculate_horizontal_offset_table(segments, diagnostics) if is_any_fade_in_sequence else None
+    # segments contains: (block_duration_prg, color_data, pixels, segment_type, json_duration_prg_original)
+    # The first element is block_duration_prg, third is pixels.
+    for idx, (block_duration_prg_current_seg, _, pixels_for_block, _, _) in enumerate(segments): # MODIFIED: Unpack 5 elements
+        try:
+            if idx < segment_count - 1:
+                next_block_duration_prg_units = segments[idx + 1][0] # Get block_duration of next segment
+
+                index1_full_base_value = _calculate_intermediate_block_index1_base(idx + 1, segment_count, segments, is_any_fade_in_sequence, offset_table, diagnostics)
+                index1_value_at_0D = index1_full_base_value & 0xFFFF
+                index1_carry_at_0F = (index1_full_base_value >> 16) & 0xFFFF
+
+                next_segment = segments[idx + 1]
+                field_09_part1, field_09_part2 = _block_field_09(next_segment[0], next_segment[3], next_segment[4])
+                field_11_val = _block_field_11(block_duration_prg_current_seg, next_block_duration_prg_units)
+
+                _INTERMEDIATE_BLOCK_STRUCT.pack_into(
+                    buf, current_offset,
+                    pixels_for_block, BLOCK_CONST_02, block_duration_prg_current_seg, BLOCK_CONST_07,
+                    field_09_part1, field_09_part2,
+                    index1_value_at_0D, index1_carry_at_0F, field_11_val
+                )
+                current_offset += DURATION_BLOCK_SIZE
+            else: # Last block
+                s_block_dur, _, pixels, segment_type, _ = segments[idx]
+
+                if segment_type == 'fade' and segment_count == 1: # is_n1_full_program_fade
+                    # N=1 TRUE FADE MODE - Special Index2 calculation
+                    dur_val = s_block_dur
+                    index2_part1_full = (3 * dur_val) + 4 # For N=1 True Fade, s_block_dur is dur_val
+                    index2_part2_full = dur_val         # For N=1 True Fade, s_block_dur is dur_val
+                else:
+                    # Standard N=1 Solid or N>1 Last Block
+                    index2_part1_full, index2_part2_full = _calculate_last_block_index2_bases(segment_count, segments, is_any_fade_in_sequence, offset_table, diagnostics)
+
+                index2_part1_at_0B = index2_part1_full & 0xFFFF
+                index2_part1_carry_at_0D = (index2_part1_full >> 16) & 0xFFFF
+                index2_part2_at_0F = index2_part2_full & 0xFFFF
+                index2_part2_carry_at_11 = (index2_part2_full >> 16) & 0xFFFF
+
+                _LAST_BLOCK_STRUCT.pack_into(
+                    buf, current_offset,
+                    pixels_for_block, BLOCK_CONST_02, block_duration_prg_current_seg, BLOCK_CONST_07,
+                    LAST_BLOCK_CONST_09,
+                    index2_part1_at_0B, index2_part1_carry_at_0D, index2_part2_at_0F, index2_part2_carry_at_11
+                )
+                current_offset += DURATION_BLOCK_SIZE
+        except struct.error as e:
+             raise PRGGenerationError(
+                 f"Failed to pack data for duration block {idx}: {e}. Duration value likely exceeds 65535. "
+                 f"Duration_PRG_Block={block_duration_prg_current_seg}, NextDuration_PRG_Block={next_block_duration_prg_units if idx < segment_count - 1 else 'N/A'}"
+             )
+
+    return current_offset
+
+
+def _calculate_header_values(segment_count, first_seg_block_dur, first_seg_type):
+    """
+    Calculate the header fields that depend on the finalized segments.
+
+    Args:
+        segment_count (int): Number of finalized segments (duration blocks).
+        first_seg_block_dur (int): Block duration of the first segment.
+        first_seg_type (str): 'solid' or 'fade' for the first segment.
+
+    Returns:
+        tuple: (pointer1, field_16, field_18, rgb_start_pointer, field_1E, is_n1_full_program_fade)
+    """
+    is_n1_full_program_fade = (segment_count == 1 and first_seg_type == 'fade') # This implies is_any_fade_in_sequence is true
 
     if is_n1_full_program_fade:
         # N=1 TRUE FADE MODE
-        s_block_dur, _, _, _, _ = segments[0]
-        
+        s_block_dur = first_seg_block_dur
+
         pointer1 = 21
         header_field_16_calculated_val = 1  # Always 1 for fade segments (regardless of duration)
         header_field_18_dynamic_val = s_block_dur   # Actual duration
@@ -484,20 +920,17 @@ def generate_prg_file(input_json, output_prg):
         header_field_1E_calculated_val = 0
     else:
         # SOLID N=1 or MIXED SEQUENCE (N>1, may include embedded fades)
-        first_seg_block_dur = segments[0][0]
-        first_seg_type = segments[0][3]  # Get the type of the first segment
-        
         pointer1 = 21 + 19 * (segment_count - 1) if segment_count > 0 else 0
-        
+
         # Header field 0x16: Always 1 for fade segments, floor(duration/100) for solid segments
         if first_seg_type == 'fade':
             header_field_16_calculated_val = 1  # Always 1 for fade segments
         else:
             header_field_16_calculated_val = math.floor(first_seg_block_dur / NOMINAL_BASE_FOR_HEADER_FIELDS)
-            
+
         header_field_18_dynamic_val = NOMINAL_BASE_FOR_HEADER_FIELDS # Always 100
         rgb_start_pointer = HEADER_SIZE + segment_count * DURATION_BLOCK_SIZE
-        
+
         val_0x1E_dec = 0 # Standard 0x1E calculation
         nominal_base = NOMINAL_BASE_FOR_HEADER_FIELDS
         if segment_count == 1: # Must be N=1 Solid here
@@ -512,226 +945,774 @@ def generate_prg_file(input_json, output_prg):
             else: val_0x1E_dec = first_seg_block_dur % nominal_base
         header_field_1E_calculated_val = val_0x1E_dec & 0xFFFF
 
-    print("\n[HEADER_CALC] Calculated Header Values:")
-    print(f"[HEADER_CALC] - Target PRG Refresh Rate (0x0C, <H): {TARGET_OUTPUT_PRG_REFRESH_RATE} ({bytes_to_hex(TARGET_OUTPUT_PRG_REFRESH_RATE)})")
-    print(f"[HEADER_CALC] - Pointer1 (0x10, <I): {pointer1} ({bytes_to_hex(pointer1)})")
-    print(f"[HEADER_CALC] - SegmentCount (0x14, <H): {segment_count} ({bytes_to_hex(segment_count)})")
-    print(f"[HEADER_CALC] - Field 0x16 (<H) Calculated: {header_field_16_calculated_val} ({bytes_to_hex(header_field_16_calculated_val)})")
-    print(f"[HEADER_CALC] - Field 0x18 (<H) Dynamic: {header_field_18_dynamic_val} ({bytes_to_hex(header_field_18_dynamic_val)})")
-    print(f"[HEADER_CALC] - RGB Start Pointer (0x1A, <H): {rgb_start_pointer} ({bytes_to_hex(rgb_start_pointer)})")
-    print(f"[HEADER_CALC] - Field 0x1E (<H) Calculated: {header_field_1E_calculated_val} ({bytes_to_hex(header_field_1E_calculated_val)})")
-    print(f"[HEADER_CALC] - Mode: {'N=1 True Fade' if is_n1_full_program_fade else 'Standard (Solid/Mixed)'}")
-
-    print(f"\n[WRITE] Writing PRG file: {output_prg}")
+    return (pointer1, header_field_16_calculated_val, header_field_18_dynamic_val,
+            rgb_start_pointer, header_field_1E_calculated_val, is_n1_full_program_fade)
+
+
+def _validate_parsed_segment(idx, parsed_segment):
+    """Raise PRGGenerationError unless parsed_segment is a valid (duration, color_data, pixels, type) tuple."""
+    if len(parsed_segment) != 4 or parsed_segment[3] not in ('solid', 'fade'):
+        raise PRGGenerationError(f"Segment {idx} has unexpected format: {parsed_segment}. Expected (duration, color_data, pixels, 'solid'|'fade').")
+    if not isinstance(parsed_segment[0], int) or parsed_segment[0] <= 0:
+        raise PRGGenerationError(f"Segment {idx} has invalid PRG duration: {parsed_segment[0]}. Must be a positive int.")
+
+
+def _pack_header_into(buf, default_pixels, pointer1, segment_count, field_16, field_18, rgb_start_pointer, field_1E):
+    """
+    Pack the 32-byte file header into the start of buf.
+
+    Raises:
+        PRGGenerationError: If a value does not fit its header field.
+    """
     try:
-        with open(output_prg, 'wb') as f:
-            current_offset = 0
-
-            print("[WRITE] Writing Header...")
-            f.write(FILE_SIGNATURE); current_offset += len(FILE_SIGNATURE)
-            f.write(struct.pack('>H', default_pixels)); current_offset += 2
-            f.write(HEADER_CONST_0A); current_offset += len(HEADER_CONST_0A)
-            f.write(struct.pack('<H', TARGET_OUTPUT_PRG_REFRESH_RATE)); current_offset += 2
-            f.write(HEADER_CONST_PI); current_offset += len(HEADER_CONST_PI)
-            f.write(struct.pack('<I', pointer1)); current_offset += 4
-            f.write(struct.pack('<H', segment_count)); current_offset += 2
-            f.write(struct.pack('<H', header_field_16_calculated_val)); current_offset += 2
-            f.write(struct.pack('<H', header_field_18_dynamic_val)); current_offset += 2
-            f.write(struct.pack('<H', rgb_start_pointer)); current_offset += 2
-            f.write(HEADER_CONST_1C); current_offset += len(HEADER_CONST_1C)
-            f.write(struct.pack('<H', header_field_1E_calculated_val)); current_offset += 2
-
-            if current_offset != HEADER_SIZE:
-                print(f"[ERROR] Header size mismatch! Expected {HEADER_SIZE}, wrote {current_offset}. Aborting.")
-                sys.exit(1)
-            print(f"[WRITE] Header complete ({current_offset} bytes).")
-
-            print(f"\n[WRITE] Writing {segment_count} Duration Blocks...")
-            # segments contains: (block_duration_prg, color_data, pixels, segment_type, json_duration_prg_original)
-            # The first element is block_duration_prg, third is pixels.
-            for idx, (block_duration_prg_current_seg, _, pixels_for_block, _, _) in enumerate(segments): # MODIFIED: Unpack 5 elements
-                block_start_offset = current_offset
-                
-                try:
-                    if idx < segment_count - 1:
-                        next_block_duration_prg_units = segments[idx + 1][0] # Get block_duration of next segment
-                        
-                        index1_full_base_value = _calculate_intermediate_block_index1_base(idx + 1, segment_count, segments, is_any_fade_in_sequence)
-                        index1_value_at_0D = index1_full_base_value & 0xFFFF
-                        index1_carry_at_0F = (index1_full_base_value >> 16) & 0xFFFF
-
-                        # field_09 logic modification
-                        next_seg_actual_block_dur = segments[idx+1][0] # s_block_dur_prg of next segment
-                        next_seg_type = segments[idx+1][3]
-                        next_seg_json_dur_original = segments[idx+1][4] # s_json_dur_prg of next segment
-
-                        if next_seg_type == 'fade':
-                            field_09_part1 = 1
-                            field_09_part2 = next_seg_json_dur_original # Use its original JSON duration (scaled to PRG units)
-                        else: # solid
-                            field_09_part1 = math.floor(next_seg_actual_block_dur / NOMINAL_BASE_FOR_HEADER_FIELDS)
-                            field_09_part2 = NOMINAL_BASE_FOR_HEADER_FIELDS
-                        field_09_bytes = struct.pack('<H', field_09_part1) + struct.pack('<H', field_09_part2)
-                        
-                        field_11_val = 0
-                        dur_k = block_duration_prg_current_seg # current block_duration
-                        dur_k_plus_1 = next_block_duration_prg_units # next block_duration
-
-                        # This logic for field_11_val seems highly specific and based on observed patterns.
-                        if dur_k_plus_1 == 1930: field_11_val = 30
-                        elif dur_k_plus_1 == 103: field_11_val = 3
-                        elif dur_k_plus_1 == 100:
-                            # next_seg_type was already fetched for field_09 logic
-                            # Rule: If Dur_k+1 == 100, Field[+0x11] is 0.
-                            # This aligns with official_prg_app_tests.md (red1s_red-blue1s_green1s_100r.prg dump)
-                            # and prg_generator_README.md (line 395-397).
-                            field_11_val = 0
-                        elif dur_k_plus_1 > 100 and dur_k_plus_1 % 100 == 0: # Multiples of 100, but not 100 itself
-                            if dur_k == dur_k_plus_1: field_11_val = dur_k_plus_1
-                            # This rule for dur_k >= 1000 and dur_k_plus_1 >=600 seems to be for specific official app quirks.
-                            # The more general behavior for multiples of 100 (not equal to current) is 0, unless overridden.
-                            # Example L5 (1000ms -> 600ms -> 1930ms): Block0 Field[+0x11] (for 600ms) is 600. Here Dur0=1000, Dur1=600. (Dur_k >=1000 and Dur_k+1 >=600)
-                            elif dur_k >= 1000 and dur_k_plus_1 >= 600: field_11_val = dur_k_plus_1 # This seems to be an override
-                            else: field_11_val = 0
-                        elif dur_k_plus_1 == 150:
-                            if dur_k >= 100: field_11_val = 150
-                            else: field_11_val = 50
-                        elif dur_k_plus_1 < 100: field_11_val = dur_k_plus_1
-                        else:
-                            if dur_k >= 100: field_11_val = dur_k_plus_1
-                            else: field_11_val = dur_k_plus_1 % 100
-                        
-                        f.write(struct.pack('<H', pixels_for_block))
-                        f.write(BLOCK_CONST_02)
-                        f.write(struct.pack('<H', block_duration_prg_current_seg)) 
-                        f.write(BLOCK_CONST_07)
-                        f.write(field_09_bytes)
-                        f.write(struct.pack('<H', index1_value_at_0D))
-                        f.write(struct.pack('<H', index1_carry_at_0F))
-                        f.write(struct.pack('<H', field_11_val))
-                        current_offset += DURATION_BLOCK_SIZE
-                    else: # Last block
-                        s_block_dur, _, pixels, segment_type, _ = segments[idx]
-
-                        if segment_type == 'fade' and segment_count == 1: # is_n1_full_program_fade
-                            # N=1 TRUE FADE MODE - Special Index2 calculation
-                            dur_val = s_block_dur
-                            index2_part1_full = (3 * dur_val) + 4 # For N=1 True Fade, s_block_dur is dur_val
-                            index2_part2_full = dur_val         # For N=1 True Fade, s_block_dur is dur_val
-                        else:
-                            # Standard N=1 Solid or N>1 Last Block
-                            index2_part1_full, index2_part2_full = _calculate_last_block_index2_bases(segment_count, segments, is_any_fade_in_sequence)
-                        
-                        index2_part1_at_0B = index2_part1_full & 0xFFFF
-                        index2_part1_carry_at_0D = (index2_part1_full >> 16) & 0xFFFF
-                        index2_part2_at_0F = index2_part2_full & 0xFFFF
-                        index2_part2_carry_at_11 = (index2_part2_full >> 16) & 0xFFFF
-
-                        f.write(struct.pack('<H', pixels_for_block))
-                        f.write(BLOCK_CONST_02)
-                        f.write(struct.pack('<H', block_duration_prg_current_seg)) 
-                        f.write(BLOCK_CONST_07)
-                        f.write(LAST_BLOCK_CONST_09)
-                        f.write(struct.pack('<H', index2_part1_at_0B))
-                        f.write(struct.pack('<H', index2_part1_carry_at_0D))
-                        f.write(struct.pack('<H', index2_part2_at_0F))
-                        f.write(struct.pack('<H', index2_part2_carry_at_11))
-                        current_offset += DURATION_BLOCK_SIZE
-                except struct.error as e:
-                     print(f"[ERROR] Failed to pack data for duration block {idx}: {e}. Duration value likely exceeds 65535.")
-                     print(f"        Duration_PRG_Block={block_duration_prg_current_seg}, NextDuration_PRG_Block={next_block_duration_prg_units if idx < segment_count - 1 else 'N/A'}")
-                     sys.exit(1)
-
-                if current_offset - block_start_offset != DURATION_BLOCK_SIZE:
-                     print(f"[ERROR] Duration block {idx} size mismatch! Expected {DURATION_BLOCK_SIZE}, wrote {current_offset - block_start_offset}. Aborting.")
-                     sys.exit(1)
-
-            print(f"[WRITE] Duration blocks complete. Current offset: 0x{current_offset:04X} (Expected RGB start: 0x{rgb_start_pointer:04X})")
-            if current_offset != rgb_start_pointer:
-                 print(f"[ERROR] Offset mismatch before RGB data! Expected 0x{rgb_start_pointer:04X}, got 0x{current_offset:04X}. Aborting.")
-                 sys.exit(1)
-
-            print(f"\n[WRITE] Writing RGB Data (Starting @0x{current_offset:04X})...")
-            total_rgb_bytes_written = 0
-            
-            # RGB Data Writing
-            for idx, (s_block_dur, color_info, pixels, segment_type, s_json_dur) in enumerate(segments):
-                if segment_type == 'fade':
-                    start_c_rgb, end_c_rgb = color_info # Assumed to be RGB tuples already
-
-                    # For all fades (N=1 True Fade or Embedded Fade),
-                    # the number of interpolation steps now matches their s_block_dur
-                    # (which is their s_json_dur_prg).
-                    num_steps_for_interpolation = s_block_dur
-                    print(f"[WRITE_FADE] Segment {idx} ({'N=1 True Fade' if is_n1_full_program_fade else 'Embedded Fade'}): Writing {num_steps_for_interpolation} interpolated RGB steps (Block dur {s_block_dur} PRG units, JSON intended {s_json_dur} PRG units).")
-                    
-                    if num_steps_for_interpolation <= 0:
-                        print(f"[WARN_FADE] Segment {idx} has {num_steps_for_interpolation} steps, skipping RGB write for this fade.")
-                        continue
-
-                    for i in range(num_steps_for_interpolation):
-                        if num_steps_for_interpolation == 1:
-                            r, g, b = start_c_rgb
+        buf[0:len(FILE_SIGNATURE)] = FILE_SIGNATURE
+        _HEADER_PIXELS_STRUCT.pack_into(buf, len(FILE_SIGNATURE), default_pixels)
+        _HEADER_FIELDS_STRUCT.pack_into(
+            buf, len(FILE_SIGNATURE) + _HEADER_PIXELS_STRUCT.size,
+            HEADER_CONST_0A, TARGET_OUTPUT_PRG_REFRESH_RATE, HEADER_CONST_PI,
+            pointer1, segment_count, field_16, field_18,
+            rgb_start_pointer, HEADER_CONST_1C, field_1E
+        )
+    except struct.error as e:
+        raise PRGGenerationError(f"Failed to pack header: {e}. {segment_count} segments (RGB start pointer {rgb_start_pointer}) do not fit the 16-bit header fields.")
+
+
+def finalize_segments(parsed_segments, diagnostics=None):
+    """
+    Convert parsed segments into the finalized segments written to a PRG file.
+
+    Args:
+        parsed_segments (list): (duration_prg_units, color_data, pixels, segment_type) tuples.
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted.
+
+    Returns:
+        list: (block_duration_prg, color_data, pixels, segment_type, json_duration_prg_original)
+            tuples, one per duration block, with long solids already split.
+
+    Raises:
+        PRGGenerationError: If a full program fade is too long for a single block.
+    """
+    # After parsing, determine: is_n1_full_program_fade = (len(parsed_segments) == 1 and parsed_segments[0]['type'] == 'fade')
+    is_n1_full_program_fade = (len(parsed_segments) == 1 and parsed_segments[0][3] == 'fade')
+
+    # Segment List Finalization (segments)
+    segments = []
+
+    for s_json_dur_prg, s_color_info, s_pixels, s_type in parsed_segments:
+        # s_json_dur_prg: calculated_duration_in_prg_units_from_json_times_and_scaling
+        # s_color_info: either (r,g,b) or ((r1,g1,b1), (r2,g2,b2))
+
+        if is_n1_full_program_fade:
+            s_block_dur_prg = s_json_dur_prg
+            # Crucial Check: If s_block_dur_prg > 65535, print error and exit (or cap and warn).
+            if s_block_dur_prg > 65535:
+                raise PRGGenerationError(f"N=1 Full Program Fade duration {s_block_dur_prg} PRG units exceeds 65535. Max is 655.35s at 100Hz.")
+        else:  # mixed sequence or N=1 solid - s_block_dur_prg is the JSON duration
+            s_block_dur_prg = s_json_dur_prg
+            # Removed specific handling for embedded fade's s_block_dur_prg to be 100.
+            # It will now be its s_json_dur_prg.
+            # The number of RGB steps for an embedded fade is handled separately during RGB writing.
+
+        # Add (s_block_dur_prg, s_color_info, s_pixels, s_type, s_json_dur_prg) to segments
+        segments.append((s_block_dur_prg, s_color_info, s_pixels, s_type, s_json_dur_prg))
+
+    return split_long_segments(segments, diagnostics=diagnostics)
+
+
+def encode_segments(parsed_segments, default_pixels=1, diagnostics=None):
+    """
+    Encode segments measured in PRG units into the bytes of a 100Hz PRG file.
+
+    Args:
+        parsed_segments (list): (duration_prg_units, color_data, pixels, segment_type) tuples,
+            as returned by parse_sequence().
+        default_pixels (int): Pixel count written to the file header (1-4).
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted;
+            pass one in to read diagnostics.report afterwards.
+
+    Returns:
+        bytes: The complete PRG file contents.
+
+    Raises:
+        PRGGenerationError: If the segments cannot be represented in the PRG format.
+    """
+    if not isinstance(default_pixels, int) or not (1 <= default_pixels <= 4):
+        raise PRGGenerationError(f"Invalid 'default_pixels': {default_pixels}. Must be int 1-4.")
+    if not parsed_segments:
+        raise PRGGenerationError("No segments to encode.")
+
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    report = diag.report
+
+    for idx, parsed_segment in enumerate(parsed_segments):
+        _validate_parsed_segment(idx, parsed_segment)
+
+    segments = finalize_segments(parsed_segments, diagnostics=diag)
+    segment_count = len(segments)
+
+    if segment_count == 0:
+         raise PRGGenerationError("No segments remaining after processing/splitting.")
+
+    is_any_fade_in_sequence = any(s[3] == 'fade' for s in segments)
+    diag.info(f"\n[SUMMARY] Total PRG segments to write: {segment_count}. Contains fades: {is_any_fade_in_sequence}")
+
+
+    # Header Value Calculation
+    # After segments are finalized and split_long_segments may have run
+    (pointer1, header_field_16_calculated_val, header_field_18_dynamic_val, rgb_start_pointer,
+     header_field_1E_calculated_val, is_n1_full_program_fade) = _calculate_header_values(segment_count, segments[0][0], segments[0][3])
+
+    diag.info("\n[HEADER_CALC] Calculated Header Values:")
+    diag.info(f"[HEADER_CALC] - Target PRG Refresh Rate (0x0C, <H): {TARGET_OUTPUT_PRG_REFRESH_RATE} ({bytes_to_hex(TARGET_OUTPUT_PRG_REFRESH_RATE)})")
+    diag.info(f"[HEADER_CALC] - Pointer1 (0x10, <I): {pointer1} ({bytes_to_hex(pointer1)})")
+    diag.info(f"[HEADER_CALC] - SegmentCount (0x14, <H): {segment_count} ({bytes_to_hex(segment_count)})")
+    diag.info(f"[HEADER_CALC] - Field 0x16 (<H) Calculated: {header_field_16_calculated_val} ({bytes_to_hex(header_field_16_calculated_val)})")
+    diag.info(f"[HEADER_CALC] - Field 0x18 (<H) Dynamic: {header_field_18_dynamic_val} ({bytes_to_hex(header_field_18_dynamic_val)})")
+    diag.info(f"[HEADER_CALC] - RGB Start Pointer (0x1A, <H): {rgb_start_pointer} ({bytes_to_hex(rgb_start_pointer)})")
+    diag.info(f"[HEADER_CALC] - Field 0x1E (<H) Calculated: {header_field_1E_calculated_val} ({bytes_to_hex(header_field_1E_calculated_val)})")
+    diag.info(f"[HEADER_CALC] - Mode: {'N=1 True Fade' if is_n1_full_program_fade else 'Standard (Solid/Mixed)'}")
+
+    rgb_data_size = _rgb_data_size(segments)
+    expected_size = HEADER_SIZE + (segment_count * DURATION_BLOCK_SIZE) + rgb_data_size + len(FOOTER)
+
+    report.default_pixels = default_pixels
+    report.input_segment_count = len(parsed_segments)
+    report.segment_count = segment_count
+    report.split_segment_count = segment_count - len(parsed_segments)
+    report.contains_fades = is_any_fade_in_sequence
+    report.mode = 'n1_fade' if is_n1_full_program_fade else 'standard'
+    report.header = {
+        "refresh_rate": TARGET_OUTPUT_PRG_REFRESH_RATE,
+        "pointer1": pointer1,
+        "segment_count": segment_count,
+        "field_16": header_field_16_calculated_val,
+        "field_18": header_field_18_dynamic_val,
+        "rgb_start_pointer": rgb_start_pointer,
+        "field_1E": header_field_1E_calculated_val
+    }
+    report.block_offsets = list(range(HEADER_SIZE, HEADER_SIZE + segment_count * DURATION_BLOCK_SIZE, DURATION_BLOCK_SIZE))
+    report.rgb_offsets = []
+    report.duration_blocks_size = segment_count * DURATION_BLOCK_SIZE
+    report.rgb_data_size = rgb_data_size
+    report.total_size = expected_size
+
+    # The whole file is assembled in one preallocated buffer and returned in one piece.
+    diag.info(f"\n[WRITE] Encoding PRG data ({expected_size} bytes)...")
+    buf = bytearray(expected_size)
+
+    diag.info("[WRITE] Writing Header...")
+    _pack_header_into(buf, default_pixels, pointer1, segment_count, header_field_16_calculated_val,
+                      header_field_18_dynamic_val, rgb_start_pointer, header_field_1E_calculated_val)
+    current_offset = HEADER_SIZE
+    diag.info(f"[WRITE] Header complete ({current_offset} bytes).")
+
+    diag.info(f"\n[WRITE] Writing {segment_count} Duration Blocks...")
+    current_offset = _write_duration_blocks(buf, current_offset, segments, is_any_fade_in_sequence, diag)
+
+    diag.info(f"[WRITE] Duration blocks complete. Current offset: 0x{current_offset:04X} (Expected RGB start: 0x{rgb_start_pointer:04X})")
+    if current_offset != rgb_start_pointer:
+         raise PRGGenerationError(f"Offset mismatch before RGB data! Expected 0x{rgb_start_pointer:04X}, got 0x{current_offset:04X}.")
+
+    diag.info(f"\n[WRITE] Writing RGB Data (Starting @0x{current_offset:04X})...")
+    total_rgb_bytes_written = 0
+
+    # RGB Data Writing
+    for idx, (s_block_dur, color_info, pixels, segment_type, s_json_dur) in enumerate(segments):
+        report.rgb_offsets.append(current_offset)
+        if segment_type == 'fade':
+            start_c_rgb, end_c_rgb = color_info # Assumed to be RGB tuples already
+
+            # For all fades (N=1 True Fade or Embedded Fade),
+            # the number of interpolation steps now matches their s_block_dur
+            # (which is their s_json_dur_prg).
+            num_steps_for_interpolation = s_block_dur
+            if diag.trace_enabled:
+                diag.trace(f"[WRITE_FADE] Segment {idx} ({'N=1 True Fade' if is_n1_full_program_fade else 'Embedded Fade'}): Writing {num_steps_for_interpolation} interpolated RGB steps (Block dur {s_block_dur} PRG units, JSON intended {s_json_dur} PRG units).")
+
+            if num_steps_for_interpolation <= 0:
+                diag.warning(f"Segment {idx} has {num_steps_for_interpolation} steps, skipping RGB write for this fade.", tag="WARN_FADE")
+                continue
+
+            rgb_bytes_fade = fade_ramp_bytes(start_c_rgb, end_c_rgb, num_steps_for_interpolation)
+            buf[current_offset:current_offset + len(rgb_bytes_fade)] = rgb_bytes_fade
+            current_offset += len(rgb_bytes_fade)
+            total_rgb_bytes_written += len(rgb_bytes_fade)
+        elif segment_type == 'solid':
+            # Existing logic: write color_info (r,g,b) RGB_TRIPLE_COUNT (100) times
+            try:
+                rgb_bytes_solid = bytes(color_info)
+            except (ValueError, TypeError) as e:
+                raise PRGGenerationError(f"Invalid color value in segment {idx}: {color_info}. {e}")
+            bytes_written_this_segment = RGB_TRIPLE_COUNT * 3
+            buf[current_offset:current_offset + bytes_written_this_segment] = rgb_bytes_solid * RGB_TRIPLE_COUNT
+            current_offset += bytes_written_this_segment
+            total_rgb_bytes_written += bytes_written_this_segment
+    diag.info(f"[WRITE] RGB data complete. Total RGB bytes: {total_rgb_bytes_written}. Current offset: 0x{current_offset:04X}")
+
+    diag.info("\n[WRITE] Writing Footer...")
+    buf[current_offset:current_offset + len(FOOTER)] = FOOTER
+    current_offset += len(FOOTER)
+    diag.info(f"[WRITE] Footer complete. Final offset: 0x{current_offset:04X}")
+
+    # File Size Verification
+    final_size = len(buf)
+    diag.info(f"\n[VERIFY] Final file size: {final_size} bytes.")
+    diag.info(f"[VERIFY] Expected size calculation: {expected_size} bytes.")
+    diag.info(f"[VERIFY] RGB data size: {rgb_data_size} bytes.")
+    if final_size != expected_size or current_offset != expected_size:
+        diag.warning(f"Final file size ({final_size}, final offset {current_offset}) does not match expected calculation ({expected_size}).")
+    else:
+        diag.info("[VERIFY] File size matches expected calculation.")
+
+    return bytes(buf)
+
+
+# --- Streaming writer ---
+
+def _open_segment_source(segments):
+    """
+    Start a pass over a re-iterable segment source.
+
+    Args:
+        segments: A zero-argument callable returning a fresh iterator, or a re-iterable
+            collection such as a list.
+
+    Raises:
+        PRGGenerationError: If segments is a one-shot iterator, which cannot be read twice.
+    """
+    if callable(segments):
+        return iter(segments())
+    iterator = iter(segments)
+    if iterator is segments:
+        raise PRGGenerationError("Streaming PRG output reads the segments twice; pass a list or a callable returning a new iterator, not a one-shot iterator.")
+    return iterator
+
+
+def _split_parsed_segment(parsed_segment, max_duration=65535):
+    """
+    Finalize one parsed segment, splitting a solid longer than max_duration.
+
+    Returns the same 5-tuples that finalize_segments() produces for this segment.
+    """
+    duration, color_data, pixels, segment_type = parsed_segment
+    if segment_type == 'fade' or duration <= max_duration:
+        return [(duration, color_data, pixels, segment_type, duration)]
+    num_full_segments, remainder_duration = divmod(duration, max_duration)
+    pieces = [(max_duration, color_data, pixels, segment_type, duration)] * num_full_segments
+    if remainder_duration > 0:
+        pieces.append((remainder_duration, color_data, pixels, segment_type, duration))
+    return pieces
+
+
+def _iter_finalized_segments(segments):
+    """Yield finalized 5-tuples for one pass over a segment source."""
+    for parsed_segment in _open_segment_source(segments):
+        yield from _split_parsed_segment(parsed_segment)
+
+
+def write_prg_stream(segments, output_prg, default_pixels=1, diagnostics=None):
+    """
+    Write a PRG file from a segment source with memory bounded by the largest segment.
+
+    The first pass over the segments computes the segment count, header fields, RGB
+    size and the last block's index sums. The second pass writes duration blocks and
+    RGB data as each segment arrives, through two file handles positioned at the
+    block table and at the RGB data. The output is identical to encode_segments().
+
+    Args:
+        segments: (duration_prg_units, color_data, pixels, segment_type) tuples from a
+            re-iterable source: a zero-argument callable returning a new iterator
+            (e.g. a generator function) or a collection such as a list.
+        output_prg (str): Path of the PRG file to write.
+        default_pixels (int): Pixel count written to the file header (1-4).
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted.
+            The report's per-block and per-segment offset lists are left empty.
+
+    Returns:
+        PRGEncodeReport: Report describing the written file.
+
+    Raises:
+        PRGGenerationError: If the segments cannot be represented in the PRG format
+            or the file cannot be written.
+    """
+    if not isinstance(default_pixels, int) or not (1 <= default_pixels <= 4):
+        raise PRGGenerationError(f"Invalid 'default_pixels': {default_pixels}. Must be int 1-4.")
+
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    report = diag.report
+
+    # Pass 1: counts, first segment, RGB size and the Index2 Part1 sum (all blocks but the last)
+    diag.info("[STREAM] Pass 1: scanning segments...")
+    input_segment_count = 0
+    segment_count = 0
+    first_segment = None
+    previous_segment = None
+    is_any_fade_in_sequence = False
+    rgb_data_size = 0
+    index2_part1_offset = 0
+    for idx, parsed_segment in enumerate(_open_segment_source(segments)):
+        _validate_parsed_segment(idx, parsed_segment)
+        input_segment_count += 1
+        for segment in _split_parsed_segment(parsed_segment):
+            if previous_segment is None:
+                first_segment = segment
+            else:
+                index2_part1_offset += _index2_part1_horizontal_step(previous_segment[0], previous_segment[3], segment_count - 1, diag)
+            if segment[3] == 'fade':
+                is_any_fade_in_sequence = True
+                rgb_data_size += segment[0] * 3
+            else:
+                rgb_data_size += RGB_TRIPLE_COUNT * 3
+            segment_count += 1
+            previous_segment = segment
+    last_segment = previous_segment
+
+    if segment_count == 0:
+        raise PRGGenerationError("No segments to encode.")
+    if input_segment_count != segment_count:
+        diag.info(f"[SPLIT] Segment splitting complete. Original: {input_segment_count} segments, New: {segment_count} segments.")
+
+    (pointer1, header_field_16_calculated_val, header_field_18_dynamic_val, rgb_start_pointer,
+     header_field_1E_calculated_val, is_n1_full_program_fade) = _calculate_header_values(segment_count, first_segment[0], first_segment[3])
+    if is_n1_full_program_fade and first_segment[0] > 65535:
+        raise PRGGenerationError(f"N=1 Full Program Fade duration {first_segment[0]} PRG units exceeds 65535. Max is 655.35s at 100Hz.")
+
+    # Last block Index2 values, as in _calculate_last_block_index2_bases()
+    if is_n1_full_program_fade:
+        index2_part1_full = (3 * first_segment[0]) + 4
+        index2_part2_full = first_segment[0]
+    elif not is_any_fade_in_sequence:
+        index2_part1_full = 304 + (segment_count - 1) * 300
+        index2_part2_full = 100 * segment_count
+    else:
+        index2_part1_full = 304 + index2_part1_offset
+        part2_full_base = first_segment[0] if first_segment[3] == 'solid' else NOMINAL_BASE_FOR_HEADER_FIELDS
+        index2_part2_full = part2_full_base * segment_count
+
+    expected_size = HEADER_SIZE + (segment_count * DURATION_BLOCK_SIZE) + rgb_data_size + len(FOOTER)
+    diag.info(f"[STREAM] {segment_count} segments, contains fades: {is_any_fade_in_sequence}, {expected_size} bytes.")
+
+    report.default_pixels = default_pixels
+    report.input_segment_count = input_segment_count
+    report.segment_count = segment_count
+    report.split_segment_count = segment_count - input_segment_count
+    report.contains_fades = is_any_fade_in_sequence
+    report.mode = 'n1_fade' if is_n1_full_program_fade else 'standard'
+    report.header = {
+        "refresh_rate": TARGET_OUTPUT_PRG_REFRESH_RATE,
+        "pointer1": pointer1,
+        "segment_count": segment_count,
+        "field_16": header_field_16_calculated_val,
+        "field_18": header_field_18_dynamic_val,
+        "rgb_start_pointer": rgb_start_pointer,
+        "field_1E": header_field_1E_calculated_val
+    }
+    report.duration_blocks_size = segment_count * DURATION_BLOCK_SIZE
+    report.rgb_data_size = rgb_data_size
+    report.total_size = expected_size
+
+    header = bytearray(HEADER_SIZE)
+    _pack_header_into(header, default_pixels, pointer1, segment_count, header_field_16_calculated_val,
+                      header_field_18_dynamic_val, rgb_start_pointer, header_field_1E_calculated_val)
+
+    # Pass 2: blocks and RGB data. Block k needs segment k+1, so blocks trail the RGB writes by one.
+    diag.info(f"[STREAM] Pass 2: writing {output_prg}...")
+    value_n_t1 = 370 + (segment_count - 2) * 19 # Index1 base, see _calculate_intermediate_block_index1_base()
+    index1_offset = 0
+    try:
+        with open(output_prg, 'wb', buffering=STREAM_BUFFER_SIZE) as blocks_out:
+            blocks_out.write(header)
+            with open(output_prg, 'r+b', buffering=STREAM_BUFFER_SIZE) as rgb_out:
+                rgb_out.seek(rgb_start_pointer)
+                previous_segment = None
+                for idx, segment in enumerate(_iter_finalized_segments(segments)):
+                    if idx >= segment_count:
+                        raise PRGGenerationError("Segment source produced different segments on the second pass.")
+                    if previous_segment is not None:
+                        block_index = idx - 1
+                        if is_any_fade_in_sequence:
+                            index1_full_base_value = value_n_t1 + index1_offset
+                            index1_offset += _index1_horizontal_step(previous_segment[0], previous_segment[3], block_index, diag)
                         else:
-                            r = int(round(start_c_rgb[0] + i * (end_c_rgb[0] - start_c_rgb[0]) / (num_steps_for_interpolation - 1.0)))
-                            g = int(round(start_c_rgb[1] + i * (end_c_rgb[1] - start_c_rgb[1]) / (num_steps_for_interpolation - 1.0)))
-                            b = int(round(start_c_rgb[2] + i * (end_c_rgb[2] - start_c_rgb[2]) / (num_steps_for_interpolation - 1.0)))
-                        # Clamp r,g,b
-                        f.write(struct.pack('BBB', max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b))))
-                        current_offset += 3
-                        total_rgb_bytes_written += 3
-                elif segment_type == 'solid':
-                    # Existing logic: write color_info (r,g,b) RGB_TRIPLE_COUNT (100) times
-                    r_solid, g_solid, b_solid = color_info
-                    rgb_bytes_solid = struct.pack('BBB', r_solid, g_solid, b_solid)
-                    f.write(rgb_bytes_solid * RGB_TRIPLE_COUNT)
-                    bytes_written_this_segment = RGB_TRIPLE_COUNT * 3
-                    current_offset += bytes_written_this_segment
-                    total_rgb_bytes_written += bytes_written_this_segment
-            print(f"[WRITE] RGB data complete. Total RGB bytes: {total_rgb_bytes_written}. Current offset: 0x{current_offset:04X}")
-
-            print("\n[WRITE] Writing Footer...")
-            f.write(FOOTER)
-            current_offset += len(FOOTER)
-            print(f"[WRITE] Footer complete. Final offset: 0x{current_offset:04X}")
+                            index1_full_base_value = value_n_t1 + block_index * 300
+                        field_09_part1, field_09_part2 = _block_field_09(segment[0], segment[3], segment[4])
+                        try:
+                            blocks_out.write(_INTERMEDIATE_BLOCK_STRUCT.pack(
+                                previous_segment[2], BLOCK_CONST_02, previous_segment[0], BLOCK_CONST_07,
+                                field_09_part1, field_09_part2,
+                                index1_full_base_value & 0xFFFF, (index1_full_base_value >> 16) & 0xFFFF,
+                                _block_field_11(previous_segment[0], segment[0])
+                            ))
+                        except struct.error as e:
+                            raise PRGGenerationError(f"Failed to pack data for duration block {block_index}: {e}. Duration value likely exceeds 65535.")
+
+                    block_duration, color_info, _, segment_type, _ = segment
+                    if segment_type == 'fade':
+                        rgb_out.write(fade_ramp_bytes(color_info[0], color_info[1], block_duration))
+                    else:
+                        try:
+                            rgb_out.write(bytes(color_info) * RGB_TRIPLE_COUNT)
+                        except (ValueError, TypeError) as e:
+                            raise PRGGenerationError(f"Invalid color value in segment {idx}: {color_info}. {e}")
+                    previous_segment = segment
+
+                if previous_segment is None or idx + 1 != segment_count:
+                    raise PRGGenerationError("Segment source produced different segments on the second pass.")
+                rgb_out.write(FOOTER)
+                if rgb_out.tell() != expected_size:
+                    diag.warning(f"Final file size ({rgb_out.tell()}) does not match expected calculation ({expected_size}).")
 
+            try:
+                blocks_out.write(_LAST_BLOCK_STRUCT.pack(
+                    last_segment[2], BLOCK_CONST_02, last_segment[0], BLOCK_CONST_07, LAST_BLOCK_CONST_09,
+                    index2_part1_full & 0xFFFF, (index2_part1_full >> 16) & 0xFFFF,
+                    index2_part2_full & 0xFFFF, (index2_part2_full >> 16) & 0xFFFF
+                ))
+            except struct.error as e:
+                raise PRGGenerationError(f"Failed to pack data for duration block {segment_count - 1}: {e}. Duration value likely exceeds 65535.")
     except IOError as e:
-        print(f"[ERROR] Failed to write file {output_prg}: {e}")
-        sys.exit(1)
+        raise PRGGenerationError(f"Failed to write file {output_prg}: {e}")
 
-    # File Size Verification
-    expected_rgb_data_size = 0
-    # is_n1_full_program_fade is already defined
+    diag.info(f"[STREAM] Wrote {expected_size} bytes to {output_prg}")
+    return report
 
-    # The following calculation for expected_rgb_data_size was simplified and corrected
-    # based on the final logic for RGB data writing.
-    for s_block_dur, _, _, segment_type, _ in segments: # s_block_dur is the key
-        if segment_type == 'fade': 
-            # For N=1 True Fade, s_block_dur is its actual duration.
-            # For Embedded Fade, s_block_dur is also its actual (JSON-derived) duration.
-            expected_rgb_data_size += s_block_dur * 3 
-        else: # Solid
-            expected_rgb_data_size += RGB_TRIPLE_COUNT * 3 # Solids always have 100 repeats of 3 bytes
-    
-    expected_size = HEADER_SIZE + (segment_count * DURATION_BLOCK_SIZE) + expected_rgb_data_size + len(FOOTER)
-    
-    final_size = os.path.getsize(output_prg)
-    print(f"\n[VERIFY] Final file size: {final_size} bytes.")
-    print(f"[VERIFY] Expected size calculation: {expected_size} bytes.")
-    print(f"[VERIFY] RGB data size: {expected_rgb_data_size} bytes.")
-    if final_size != expected_size:
-        print(f"[WARNING] Final file size ({final_size}) does not match expected calculation ({expected_size}).")
+# --- End Streaming writer ---
+
+
+def encode_prg(sequence, default_pixels=None, diagnostics=None):
+    """
+    Encode a sequence into PRG file bytes in-process.
+
+    Args:
+        sequence (dict or list): Either JSON sequence data (e.g. the dict returned by
+            Timeline.to_json_sequence()) or a list of
+            (duration_prg_units, color_data, pixels, segment_type) segment tuples.
+        default_pixels (int, optional): Header pixel count for a segment list.
+            Ignored for JSON sequence data, which carries its own 'default_pixels'.
+            Defaults to 1.
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted;
+            pass one in to read diagnostics.report afterwards.
+
+    Returns:
+        bytes: The complete PRG file contents.
+
+    Raises:
+        PRGGenerationError: If the sequence is invalid or cannot be encoded.
+    """
+    if isinstance(sequence, dict):
+        default_pixels, segments = parse_sequence(sequence, diagnostics=diagnostics)
     else:
-        print("[VERIFY] File size matches expected calculation.")
+        segments = list(sequence)
+        if default_pixels is None:
+            default_pixels = 1
+    return encode_segments(segments, default_pixels, diagnostics=diagnostics)
 
-    print(f"\n[SUCCESS] Successfully generated {output_prg}")
 
-if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} input.json output.prg")
+def _optimize_for_size(segments, tolerance, diag):
+    """Run the prg_optimizer pass over parsed segments and record its report."""
+    # Imported here because prg_optimizer imports this module
+    from prg_optimizer import optimize_segments
+
+    try:
+        segments, optimize_report = optimize_segments(segments, tolerance=tolerance)
+    except ValueError as e:
+        raise PRGGenerationError(str(e))
+    diag.report.optimization = optimize_report.to_dict()
+    diag.info(f"[OPTIMIZE] {optimize_report.input_segments} -> {optimize_report.output_segments} segments "
+              f"(merged {optimize_report.merged_solids} solids, approximated {optimize_report.approximated_fades} fades, "
+              f"tolerance {tolerance}): {optimize_report.bytes_before} -> {optimize_report.bytes_after} bytes, "
+              f"saved {optimize_report.bytes_saved}")
+    return segments
+
+
+def generate_prg_file(input_json, output_prg, diagnostics=None, streaming=False, optimize_tolerance=None):
+    """
+    Generates the .prg file from the input JSON, always outputting a 100Hz PRG.
+
+    Args:
+        input_json (str): Path to the input JSON file.
+        output_prg (str): Path of the PRG file to write.
+        diagnostics (PRGDiagnostics, optional): Diagnostic output and report. Quiet if omitted.
+        streaming (bool): Write with write_prg_stream() instead of building the whole file
+            in memory. Produces identical bytes; intended for very long sequences.
+        optimize_tolerance (int, optional): Run the prg_optimizer size pass with this
+            per-channel color tolerance before encoding. None encodes the sequence as is.
+
+    Returns:
+        PRGEncodeReport: Report describing the generated file.
+
+    Raises:
+        PRGGenerationError: If the input is invalid or the file cannot be written.
+    """
+    diag = diagnostics if diagnostics is not None else PRGDiagnostics()
+    diag.report.source = input_json
+    diag.info(f"\n[INIT] Starting PRG generation from {input_json} to {output_prg}")
+    diag.info(f"[INIT] Target output PRG refresh rate is fixed at: {TARGET_OUTPUT_PRG_REFRESH_RATE}Hz")
+
+    data = load_sequence_json(input_json)
+    if optimize_tolerance is not None:
+        default_pixels, segments = parse_sequence(data, diagnostics=diag)
+        segments = _optimize_for_size(segments, optimize_tolerance, diag)
+    elif streaming:
+        # Sort the sequence once; each pass of write_prg_stream re-reads the sorted entries
+        default_pixels, sequence_params = _prepare_sequence(data, diag)
+        passes = []
+
+        def segments():
+            # Parse warnings are reported on the first pass only
+            pass_diagnostics = diag if not passes else PRGDiagnostics()
+            passes.append(pass_diagnostics)
+            return _iter_sequence_segments(*sequence_params, pass_diagnostics)
+
+    if streaming:
+        write_prg_stream(segments, output_prg, default_pixels, diagnostics=diag)
+        diag.info(f"\n[SUCCESS] Successfully generated {output_prg}")
+        return diag.report
+
+    if optimize_tolerance is not None:
+        prg_bytes = encode_segments(segments, default_pixels, diagnostics=diag)
+    else:
+        prg_bytes = encode_prg(data, diagnostics=diag)
+
+    diag.info(f"\n[WRITE] Writing PRG file: {output_prg}")
+    try:
+        with open(output_prg, 'wb') as f:
+            f.write(prg_bytes)
+    except IOError as e:
+        raise PRGGenerationError(f"Failed to write file {output_prg}: {e}")
+
+    diag.info(f"\n[SUCCESS] Successfully generated {output_prg}")
+    return diag.report
+
+
+def verify_prg_file(output_prg, input_json, optimize_tolerance=None):
+    """
+    Decode a generated PRG file and check it against the JSON it was generated from.
+
+    Args:
+        output_prg (str): Path of the generated PRG file.
+        input_json (str): Path of the input JSON file.
+        optimize_tolerance (int, optional): Tolerance the file was optimized with, if any.
+
+    Returns:
+        list: Descriptions of mismatches; empty if the file round-trips.
+
+    Raises:
+        PRGGenerationError: If the input JSON is invalid.
+    """
+    # Imported here because prg_decoder imports this module's format constants
+    from prg_decoder import verify_segments, PRGDecodeError
+
+    default_pixels, parsed_segments = parse_sequence(load_sequence_json(input_json))
+    if optimize_tolerance is not None:
+        parsed_segments = _optimize_for_size(parsed_segments, optimize_tolerance, PRGDiagnostics())
+    segments = finalize_segments(parsed_segments)
+    try:
+        return verify_segments(output_prg, segments, default_pixels)
+    except PRGDecodeError as e:
+        return [str(e)]
+
+
+def find_sequence_jsons(input_dir, output_dir):
+    """
+    Find sequence JSON files under input_dir and pair them with output PRG paths.
+
+    'name.json' and 'name.prg.json' both map to 'name.prg'; subdirectories are
+    mirrored under output_dir.
+
+    Returns:
+        list: Sorted (input_json, output_prg) path pairs.
+    """
+    pairs = []
+    for dir_path, dir_names, file_names in os.walk(input_dir):
+        dir_names.sort()
+        relative_dir = os.path.relpath(dir_path, input_dir)
+        for file_name in sorted(file_names):
+            if not file_name.endswith('.json'):
+                continue
+            base_name = file_name[:-len('.prg.json')] if file_name.endswith('.prg.json') else file_name[:-len('.json')]
+            pairs.append((
+                os.path.join(dir_path, file_name),
+                os.path.normpath(os.path.join(output_dir, relative_dir, base_name + '.prg'))
+            ))
+    return pairs
+
+
+def _batch_generate_one(task):
+    """
+    Process pool worker: generate one PRG file quietly.
+
+    Args:
+        task (tuple): (input_json, output_prg, verify, cache_dir). cache_dir is None
+            to encode without the PRG build cache.
+
+    Returns:
+        dict: input/output paths, ok flag, seconds, output size, error, warning count
+            and whether the output came from the build cache.
+    """
+    input_json, output_prg, verify, cache_dir = task
+    result = {"input": input_json, "output": output_prg, "ok": False, "seconds": 0.0,
+              "size": 0, "error": None, "warnings": 0, "cached": False}
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_prg)), exist_ok=True)
+        if cache_dir is None:
+            report = generate_prg_file(input_json, output_prg)
+            result["size"] = report.total_size
+            result["warnings"] = len(report.warnings)
+        else:
+            # Imported here because prg_build_cache imports this module
+            from prg_build_cache import PRGBuildCache
+            diagnostics = PRGDiagnostics()
+            prg_bytes, result["cached"] = PRGBuildCache(cache_dir).get_or_encode(
+                load_sequence_json(input_json), diagnostics=diagnostics)
+            try:
+                with open(output_prg, 'wb') as f:
+                    f.write(prg_bytes)
+            except IOError as e:
+                raise PRGGenerationError(f"Failed to write file {output_prg}: {e}")
+            result["size"] = len(prg_bytes)
+            result["warnings"] = len(diagnostics.report.warnings)
+        if verify:
+            problems = verify_prg_file(output_prg, input_json)
+            if problems:
+                raise PRGGenerationError(f"Round-trip verification failed: {problems[0]}")
+        result["ok"] = True
+    except PRGGenerationError as e:
+        result["error"] = str(e)
+    except Exception as e:
+        result["error"] = f"Unexpected error: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def batch_generate(input_dir, output_dir, jobs=None, verify=False, progress=True, cache_dir=None):
+    """
+    Encode every sequence JSON under input_dir into output_dir using a process pool.
+
+    Args:
+        input_dir (str): Directory searched recursively for *.json / *.prg.json files.
+        output_dir (str): Directory for the generated .prg files.
+        jobs (int, optional): Worker processes, at least 1. Defaults to the CPU count; 1 runs in-process.
+        verify (bool): Decode every written file and check it round-trips.
+        progress (bool): Print one line per file and a summary.
+        cache_dir (str, optional): PRG build cache directory. Unchanged inputs are copied
+            from the cache instead of being re-encoded. None disables the cache.
+
+    Returns:
+        dict: Summary with per-file results, counts, total seconds and throughput.
+
+    Raises:
+        PRGGenerationError: If input_dir does not exist.
+        ValueError: If jobs is less than 1.
+    """
+    if not os.path.isdir(input_dir):
+        raise PRGGenerationError(f"Batch input directory not found: {input_dir}")
+    tasks = [(input_json, output_prg, verify, cache_dir) for input_json, output_prg in find_sequence_jsons(input_dir, output_dir)]
+
+    def record(result, done, total):
+        if progress:
+            status = ("HIT " if result["cached"] else "OK  ") if result["ok"] else "FAIL"
+            print(f"[BATCH] {status} {result['seconds'] * 1000:8.1f} ms {result['size']:>9} B  {result['input']}")
+            if not result["ok"]:
+                print(f"[BATCH]      {result['error']}")
+
+    pool = run_pool(_batch_generate_one, tasks, jobs, record, sort_key=lambda result: result["input"])
+    results = pool["results"]
+    jobs = pool["jobs"]
+    elapsed = pool["seconds"]
+    failed = [result for result in results if not result["ok"]]
+    total_bytes = sum(result["size"] for result in results)
+    summary = {
+        "files": len(results),
+        "succeeded": pool["succeeded"],
+        "failed": pool["failed"],
+        "seconds": elapsed,
+        "files_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "bytes_written": total_bytes,
+        "cache_hits": sum(1 for result in results if result["cached"]),
+        "jobs": jobs,
+        "results": results
+    }
+
+    if progress:
+        print(f"\n[BATCH] {summary['succeeded']}/{summary['files']} files encoded in {elapsed:.2f}s "
+              f"with {jobs} job(s): {summary['files_per_second']:.1f} files/s, "
+              f"{total_bytes / 1e6 / elapsed if elapsed > 0 else 0.0:.2f} MB/s")
+        if cache_dir is not None:
+            print(f"[BATCH] Build cache: {summary['cache_hits']} hits, {len(results) - summary['cache_hits']} misses ({cache_dir})")
+        for result in failed:
+            print(f"[BATCH] FAILED: {result['input']}: {result['error']}")
+    return summary
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a 100Hz LTX ball PRG file from a JSON color sequence.")
+    parser.add_argument("input_json", nargs="?", help="Input JSON sequence file")
+    parser.add_argument("output_prg", nargs="?", help="Output PRG file")
+    parser.add_argument("--batch", nargs=2, metavar=("IN_DIR", "OUT_DIR"),
+                        help="Encode every *.json / *.prg.json under IN_DIR into OUT_DIR")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=None,
+                        help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--build-cache", nargs="?", const="", default=None, metavar="DIR",
+                        help="Reuse unchanged outputs from the PRG build cache in --batch mode "
+                             "(default DIR: ~/.sequence_maker/prg_build_cache)")
+    parser.add_argument("--diagnostics", choices=DIAGNOSTICS_LEVELS, default=DIAGNOSTICS_NORMAL,
+                        help="Diagnostic output level (default: normal; trace adds per-segment and per-block detail)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="Write the machine-readable encode report (batch summary with --batch) to PATH as JSON")
+    parser.add_argument("--verify", action="store_true",
+                        help="Decode the written file and check it round-trips to the input sequence")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the output with bounded memory instead of building it in memory")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Merge identical adjacent solids and approximate fades to shrink the file")
+    parser.add_argument("--tolerance", type=int, default=0,
+                        help="Per-channel color tolerance for --optimize fade approximation (default: 0, exact)")
+    args = parser.parse_args()
+
+    if args.batch:
+        if args.input_json or args.output_prg:
+            parser.error("--batch takes IN_DIR and OUT_DIR instead of input.json output.prg")
+        cache_dir = None
+        if args.build_cache is not None:
+            from prg_build_cache import PRGBuildCache
+            cache_dir = PRGBuildCache(args.build_cache or None).cache_dir
+        try:
+            summary = batch_generate(args.batch[0], args.batch[1], jobs=args.jobs, verify=args.verify,
+                                     progress=args.diagnostics != DIAGNOSTICS_QUIET, cache_dir=cache_dir)
+        except PRGGenerationError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(summary, f, indent=2)
+        sys.exit(1 if summary["failed"] else 0)
+
+    if not args.input_json or not args.output_prg:
+        parser.error("input.json and output.prg are required unless --batch is given")
+
+    try:
+        optimize_tolerance = args.tolerance if args.optimize else None
+        report = generate_prg_file(args.input_json, args.output_prg, PRGDiagnostics(args.diagnostics),
+                                   streaming=args.stream, optimize_tolerance=optimize_tolerance)
+        if args.verify:
+            problems = verify_prg_file(args.output_prg, args.input_json, optimize_tolerance)
+            for problem in problems:
+                print(f"[VERIFY] MISMATCH: {problem}")
+            if problems:
+                sys.exit(1)
+            if args.diagnostics != DIAGNOSTICS_QUIET:
+                print(f"[VERIFY] Round-trip check passed for {args.output_prg}")
+    except PRGGenerationError as e:
+        print(f"[ERROR] {e}")
         sys.exit(1)
 
-    input_json_path = sys.argv[1]
-    output_prg_path = sys.argv[2]
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2)
 
-    generate_prg_file(input_json_path, output_prg_path)
\ No newline at end of file
+
+if __name__ == '__main__':
+    main()
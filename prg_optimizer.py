@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+LTX Ball PRG Size Optimizer
+
+Optional pass over parsed segments that shrinks the encoded PRG file before it
+is generated or uploaded:
+
+- Adjacent solids with the same color and pixel count are merged into one.
+- Fades store one RGB triple per 10 ms tick. A fade is replaced by a staircase
+  of solids when every tick of the staircase stays within a per-channel color
+  tolerance of the exact ramp and the staircase encodes to fewer bytes. With a
+  tolerance of 0 only runs of identical ticks are collapsed, so the colors shown
+  at every tick are unchanged.
+
+Usage:
+    python3 prg_generator.py input.json output.prg --optimize [--tolerance N]
+
+Library usage:
+    from prg_optimizer import optimize_segments
+    default_pixels, segments = parse_sequence(data)
+    segments, report = optimize_segments(segments, tolerance=2)
+    prg_bytes = encode_segments(segments, default_pixels)
+"""
+
+from bisect import bisect_right
+
+from prg_generator import (
+    HEADER_SIZE, DURATION_BLOCK_SIZE, RGB_TRIPLE_COUNT, FOOTER, fade_ramp_bytes
+)
+
+# The header stores the RGB start pointer (32 + 19 * blocks) as a 16-bit value
+MAX_SEGMENT_COUNT = (0xFFFF - HEADER_SIZE) // DURATION_BLOCK_SIZE
+MAX_BLOCK_DURATION = 65535
+SOLID_SEGMENT_SIZE = DURATION_BLOCK_SIZE + RGB_TRIPLE_COUNT * 3
+
+
+class PRGOptimizeReport:
+    """Summary of one optimizer run."""
+
+    def __init__(self, tolerance):
+        """
+        Initialize an empty report.
+
+        Args:
+            tolerance (int): Per-channel color tolerance used for fades.
+        """
+        self.tolerance = tolerance
+        self.input_segments = 0
+        self.output_segments = 0
+        self.merged_solids = 0
+        self.approximated_fades = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @property
+    def bytes_saved(self):
+        """Encoded bytes removed by the optimizer."""
+        return self.bytes_before - self.bytes_after
+
+    def to_dict(self):
+        """
+        Convert the report to a dictionary.
+
+        Returns:
+            dict: Dictionary representation of the report.
+        """
+        return {
+            "tolerance": self.tolerance,
+            "input_segments": self.input_segments,
+            "output_segments": self.output_segments,
+            "merged_solids": self.merged_solids,
+            "approximated_fades": self.approximated_fades,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "bytes_saved": self.bytes_saved
+        }
+
+
+def _block_count(segment):
+    """Number of duration blocks a parsed segment encodes to (long solids are split)."""
+    duration, _, _, segment_type = segment
+    if segment_type == 'solid':
+        return -(-duration // MAX_BLOCK_DURATION)
+    return 1
+
+
+def _segment_size(segment):
+    """Encoded bytes of a parsed segment: its duration blocks plus RGB data."""
+    duration, _, _, segment_type = segment
+    if segment_type == 'fade':
+        return DURATION_BLOCK_SIZE + duration * 3
+    return _block_count(segment) * SOLID_SEGMENT_SIZE
+
+
+def estimate_prg_size(segments):
+    """
+    Size in bytes of the PRG file that parsed segments encode to.
+
+    Args:
+        segments (list): (duration_prg_units, color_data, pixels, segment_type) tuples.
+
+    Returns:
+        int: File size, matching len(encode_segments(segments)).
+    """
+    return HEADER_SIZE + len(FOOTER) + sum(_segment_size(segment) for segment in segments)
+
+
+def fade_to_steps(segment, tolerance):
+    """
+    Approximate a fade by a staircase of solids within a per-channel tolerance.
+
+    The exact encoded ramp is split greedily into the longest runs whose per-channel
+    range is at most 2 * tolerance; each run becomes a solid of the run's midpoint
+    color, so no tick is more than tolerance away from the exact fade.
+
+    Args:
+        segment (tuple): Parsed fade (duration, (start_rgb, end_rgb), pixels, 'fade').
+        tolerance (int): Maximum per-channel error (0-255).
+
+    Returns:
+        list: Parsed solid segments covering the fade's duration.
+    """
+    duration, (start_rgb, end_rgb), pixels, _ = segment
+    ramp = fade_ramp_bytes(start_rgb, end_rgb, duration)
+    channels = [ramp[channel::3] for channel in range(3)]
+    # The ramp is monotonic per channel; store every channel as non-decreasing for bisection
+    ascending = []
+    for channel in channels:
+        if channel[-1] < channel[0]:
+            ascending.append(bytes(255 - value for value in channel))
+        else:
+            ascending.append(channel)
+
+    steps = []
+    start = 0
+    span = 2 * tolerance
+    while start < duration:
+        end = duration
+        for channel in ascending:
+            # First tick whose value exceeds the run's allowed range, for this channel
+            end = min(end, bisect_right(channel, channel[start] + span, start, duration))
+        color = tuple((channels[c][start] + channels[c][end - 1] + 1) // 2 for c in range(3))
+        steps.append((end - start, color, pixels, 'solid'))
+        start = end
+    return steps
+
+
+def _merge_solids(segments, report):
+    """Merge adjacent solids with equal color and pixel count."""
+    merged = []
+    for segment in segments:
+        if merged and segment[3] == 'solid':
+            previous = merged[-1]
+            if previous[3] == 'solid' and previous[1] == segment[1] and previous[2] == segment[2]:
+                merged[-1] = (previous[0] + segment[0], previous[1], previous[2], 'solid')
+                report.merged_solids += 1
+                continue
+        merged.append(segment)
+    return merged
+
+
+def optimize_segments(segments, tolerance=0, merge_solids=True, approximate_fades=True):
+    """
+    Shrink parsed segments before encoding.
+
+    Args:
+        segments (list): (duration_prg_units, color_data, pixels, segment_type) tuples,
+            as returned by prg_generator.parse_sequence().
+        tolerance (int): Maximum per-channel color error allowed when approximating fades.
+            0 keeps every tick's color exact.
+        merge_solids (bool): Merge adjacent identical solids.
+        approximate_fades (bool): Replace fades by solid staircases where that is smaller.
+
+    Returns:
+        tuple: (optimized_segments, PRGOptimizeReport)
+
+    Raises:
+        ValueError: If tolerance is outside 0-255.
+    """
+    if not isinstance(tolerance, int) or not 0 <= tolerance <= 255:
+        raise ValueError(f"Invalid tolerance: {tolerance}. Must be int 0-255.")
+
+    report = PRGOptimizeReport(tolerance)
+    segments = list(segments)
+    report.input_segments = len(segments)
+    report.bytes_before = estimate_prg_size(segments)
+
+    optimized = segments
+    if approximate_fades:
+        optimized = []
+        for segment in segments:
+            if segment[3] == 'fade' and segment[0] > 1:
+                steps = fade_to_steps(segment, tolerance)
+                # Only worth it when the staircase encodes smaller than the fade itself
+                if sum(_segment_size(step) for step in steps) < _segment_size(segment):
+                    optimized.extend(steps)
+                    report.approximated_fades += 1
+                    continue
+            optimized.append(segment)
+
+    if merge_solids:
+        optimized = _merge_solids(optimized, report)
+
+    if approximate_fades and report.approximated_fades and sum(_block_count(s) for s in optimized) > MAX_SEGMENT_COUNT:
+        # Too many blocks for the 16-bit header; fall back to merging only
+        return optimize_segments(segments, tolerance, merge_solids, approximate_fades=False)
+
+    report.output_segments = len(optimized)
+    report.bytes_after = estimate_prg_size(optimized)
+    return optimized, report
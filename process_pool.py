@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Process Pool Runner
+
+Runs one worker function over a list of independent tasks in a process pool and
+summarizes the results. Shared by the batch tools: prg_generator --batch,
+compile_seqdesign --targets and warm_analysis_cache.
+
+Each task's result is a dict with at least an "ok" flag (and usually "error"),
+built by the worker itself so one failing task never stops the others. With one
+job, or a single task, the tasks run in-process, which keeps tracebacks and
+debuggers usable.
+
+Library usage:
+    from process_pool import run_pool
+    summary = run_pool(encode_one, tasks, jobs=4, record=print_result)
+    print(summary["succeeded"], summary["failed"], summary["seconds"])
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def positive_int(value):
+    """argparse type for --jobs: an integer of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def resolve_jobs(jobs=None):
+    """
+    The worker process count to use: jobs, or the CPU count if jobs is None.
+
+    Raises:
+        ValueError: If jobs is less than 1.
+    """
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}")
+    return jobs or os.cpu_count() or 1
+
+
+def run_pool(worker, tasks, jobs=None, record=None, sort_key=None, initializer=None, initargs=(),
+             start_time=None):
+    """
+    Run worker(task) for every task, in a process pool when jobs > 1.
+
+    Args:
+        worker (callable): Picklable module-level function returning a result dict
+            with an "ok" flag.
+        tasks (list): Task arguments, one per worker call.
+        jobs (int, optional): Worker processes, at least 1. Defaults to the CPU count;
+            1 runs in-process.
+        record (callable, optional): Called as record(result, done, total) in the
+            main process as each result arrives, e.g. to print progress.
+        sort_key (callable, optional): Key the returned results are sorted by.
+            Default: completion order.
+        initializer (callable, optional): Called with initargs once per worker
+            process, or once in-process, before the first task.
+        initargs (tuple): Arguments of initializer.
+        start_time (float, optional): time.perf_counter() value the reported
+            seconds are measured from. Default: when run_pool is called.
+
+    Returns:
+        dict: "tasks", "succeeded", "failed", "seconds", "jobs" and "results".
+
+    Raises:
+        ValueError: If jobs is less than 1.
+    """
+    jobs = resolve_jobs(jobs)
+    if start_time is None:
+        start_time = time.perf_counter()
+    results = []
+
+    def collect(result):
+        results.append(result)
+        if record is not None:
+            record(result, len(results), len(tasks))
+
+    if jobs == 1 or len(tasks) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for task in tasks:
+            collect(worker(task))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=initializer,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(worker, task) for task in tasks]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    if sort_key is not None:
+        results.sort(key=sort_key)
+    failed = sum(1 for result in results if not result["ok"])
+    return {
+        "tasks": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "seconds": time.perf_counter() - start_time,
+        "jobs": jobs,
+        "results": results
+    }
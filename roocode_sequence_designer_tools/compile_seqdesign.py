@@ -10,7 +10,10 @@ into the PRG format required by the Roocode system.
 import json
 import argparse
 import os
+import re
 import sys
+import time
+from contextlib import nullcontext
 from typing import Dict, Any, List, Tuple, Optional
 
 # Add the project root to sys.path to allow importing roo_code_sequence_maker
@@ -20,16 +23,32 @@ _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-# Import AudioAnalyzer for audio-dependent effects
-from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
-
-# Import effect implementations
-from roocode_sequence_designer_tools.effect_implementations import common_effects
-from roocode_sequence_designer_tools.effect_implementations import audio_driven_effects
+# Effect implementations are looked up in the registry, which imports their modules on first use
+from roocode_sequence_designer_tools.effect_implementations.registry import (
+    available_effects, get_effect, required_features
+)
 
 # Import color parsing utilities
 from roocode_sequence_designer_tools.tool_utils.color_parser import parse_color
 
+# Import the override engine that layers each effect's segments over the timeline
+from roocode_sequence_designer_tools.tool_utils.segment_timeline import apply_segment_overrides
+
+# Import the per-compile lookups over the audio analysis shared by audio-driven effects
+from roocode_sequence_designer_tools.tool_utils.analysis_index import AnalysisIndex
+
+# Import the per-effect output cache used for incremental recompilation
+from roocode_sequence_designer_tools.tool_utils.effect_cache import EffectCache
+
+# Import the per-effect timing profiler used by --profile
+from roocode_sequence_designer_tools.tool_utils.compile_profiler import CompileProfiler
+
+# Import the Sequence Maker hot-swap inbox writer used by --push-to-gui
+from roocode_sequence_designer_tools.tool_utils.swap_inbox import push_to_swap_inbox, read_swap_inbox
+
+# Import the process pool runner used by --targets
+from process_pool import positive_int, resolve_jobs, run_pool
+
 
 def load_seqdesign_json(file_path: str) -> Dict[str, Any]:
     """
@@ -196,36 +215,440 @@ def resolve_audio_path(metadata: Dict[str, Any], audio_dir: str) -> Optional[str
     return full_audio_path
 
 
-def main() -> None:
-    """Main function to orchestrate the compilation process."""
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="Compile a .seqdesign.json file into a .prg.json file")
+def required_audio_features(effects_timeline: List[Dict[str, Any]]) -> List[str]:
+    """
+    Collect the audio analysis features needed by the effects in a timeline,
+    as declared by their registered implementations.
     
-    parser.add_argument("input_seqdesign_json_path", 
-                        help="Path to the input .seqdesign.json file")
+    Args:
+        effects_timeline: The effects_timeline array from the .seqdesign.json file
+        
+    Returns:
+        List[str]: Feature names in first-use order; empty if no effect needs audio
+    """
+    return required_features(effect["type"] for effect in effects_timeline
+                             if isinstance(effect, dict) and isinstance(effect.get("type"), str))
+
+
+def load_audio_analysis(audio_path: str, features: List[str],
+                        analysis_memo: Optional[Dict[Tuple, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Analyze just the requested features of an audio file, using the per-feature cache.
     
-    parser.add_argument("output_prg_json_path", 
-                        help="Path for the output .prg.json file")
+    The analyzer is imported here rather than at module load because it pulls in
+    librosa, requests and lyricsgenius, which designs without audio effects never need.
     
-    parser.add_argument("--audio-dir", 
-                        help="Path to the directory containing the audio file. "
-                             "If metadata.audio_file_path in Designer-JSON is relative, "
-                             "this path specifies the base directory for resolving it. "
-                             "Default: The directory containing the input .seqdesign.json file's parent directory.")
+    Args:
+        audio_path: Path to the audio file
+        features: Feature names from required_audio_features()
+        analysis_memo: Optional dict that keeps results in memory across calls in a
+            long-running process (--watch), keyed by the audio file's identity and features
+        
+    Returns:
+        Dict[str, Any]: Analysis data containing the requested features
+    """
+    memo_key = None
+    if analysis_memo is not None:
+        stat = os.stat(audio_path)
+        memo_key = (os.path.abspath(audio_path), stat.st_mtime_ns, stat.st_size, tuple(features))
+        if memo_key in analysis_memo:
+            return analysis_memo[memo_key]
     
-    # Parse arguments
-    args = parser.parse_args()
+    from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
     
-    # Determine default audio directory if not provided
-    if not args.audio_dir:
-        # Default is the parent directory of the parent directory of the input file
-        # i.e., [SequenceName] directory
-        input_file_dir = os.path.dirname(os.path.abspath(args.input_seqdesign_json_path))
-        args.audio_dir = os.path.dirname(input_file_dir)
+    analyzer = AudioAnalyzer()
+    analysis_data = analyzer.analyze_audio(audio_path, features=features)
+    if memo_key is not None:
+        analysis_memo[memo_key] = analysis_data
+    return analysis_data
+
+def resolve_effect(effect_data: Any, total_duration_seconds: float) -> Optional[Tuple[str, str, float, float, Dict[str, Any]]]:
+    """
+    Validate one effects_timeline entry and resolve its timing.
+    
+    Args:
+        effect_data: One entry of the effects_timeline array
+        total_duration_seconds: Total duration the effect timing is clamped to
+        
+    Returns:
+        Tuple of (effect_id, effect_type, start_sec, end_sec, params), or None if the
+        effect must be skipped (a warning has been printed)
+    """
+    if not isinstance(effect_data, dict):
+        print(f"Warning: Skipping invalid effect data (not a dictionary): {effect_data}")
+        return None
+
+    effect_id = effect_data.get('id', 'Unknown')
+
+    # Determine Effect Timing
+    timing = effect_data.get("timing", {})
+    if not isinstance(timing, dict):
+        print(f"Warning: Skipping effect '{effect_id}' due to invalid timing format.")
+        return None
+
+    effect_start_sec = timing.get("start_seconds")
+    effect_end_sec = timing.get("end_seconds")
+    duration_sec = timing.get("duration_seconds")
+
+    # Validate timing
+    if effect_start_sec is None:
+        print(f"Warning: Skipping effect '{effect_id}' due to missing start_seconds.")
+        return None
+
+    try:
+        effect_start_sec = float(effect_start_sec)
+    except (ValueError, TypeError):
+        print(f"Warning: Skipping effect '{effect_id}' due to invalid start_seconds: {effect_start_sec}")
+        return None
+
+    # Calculate end time if missing
+    if effect_end_sec is None and duration_sec is not None:
+        try:
+            duration_sec = float(duration_sec)
+            effect_end_sec = effect_start_sec + duration_sec
+        except (ValueError, TypeError):
+            print(f"Warning: Skipping effect '{effect_id}' due to invalid duration_seconds: {duration_sec}")
+            return None
+    # Calculate duration if missing
+    elif effect_end_sec is not None and duration_sec is None:
+        try:
+            effect_end_sec = float(effect_end_sec)
+            duration_sec = effect_end_sec - effect_start_sec
+        except (ValueError, TypeError):
+            print(f"Warning: Skipping effect '{effect_id}' due to invalid end_seconds: {effect_end_sec}")
+            return None
+    # Both end_seconds and duration_seconds are missing
+    elif effect_end_sec is None and duration_sec is None:
+        print(f"Warning: Skipping effect '{effect_id}' due to missing end_seconds or duration_seconds.")
+        return None
+    else:
+        # Both are provided, ensure effect_end_sec is a float
+        try:
+            effect_end_sec = float(effect_end_sec)
+        except (ValueError, TypeError):
+            print(f"Warning: Skipping effect '{effect_id}' due to invalid end_seconds: {effect_end_sec}")
+            return None
+
+    # Clamp effect timing to be within 0.0 and total_duration_seconds
+    effect_start_sec = max(0.0, min(effect_start_sec, total_duration_seconds))
+    effect_end_sec = max(0.0, min(effect_end_sec, total_duration_seconds))
+
+    # Skip if effect has zero or negative duration after clamping
+    if effect_end_sec <= effect_start_sec:
+        print(f"Warning: Skipping effect '{effect_id}' due to invalid timing after clamping: start={effect_start_sec}, end={effect_end_sec}")
+        return None
+
+    # Identify Effect Type and Parameters
+    effect_type = effect_data.get("type")
+    if effect_type is None:
+        print(f"Warning: Skipping effect '{effect_id}' due to missing effect type.")
+        return None
+
+    effect_params = effect_data.get("params", {})
+    if not isinstance(effect_params, dict):
+        print(f"Warning: Skipping effect '{effect_id}' due to invalid params format.")
+        return None
+    
+    return effect_id, effect_type, effect_start_sec, effect_end_sec, effect_params
+
+
+def render_effect(effect_id: str, effect_type: str, effect_start_sec: float, effect_end_sec: float,
+                  effect_params: Dict[str, Any], processed_metadata: Dict[str, Any],
+                  audio_analysis_data: Optional[Dict[str, Any]] = None,
+                  analysis_index: Optional[AnalysisIndex] = None) -> Optional[List[Tuple]]:
+    """
+    Call the registered implementation function for an effect type.
+    
+    Implementations that take an analysis_index parameter receive analysis_index.
+    
+    Returns:
+        The segments generated by the effect, or None for an unknown effect type
+    """
+    effect_spec = get_effect(effect_type)  # Case-insensitive, includes aliases
+    if effect_spec is None:
+        print(f"Warning: Unknown effect type '{effect_type}' for effect '{effect_id}'. Skipping.") # Original case in warning is fine
+        return None
+    if effect_spec.accepts_analysis_index:
+        return effect_spec.function(
+            effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data,
+            analysis_index=analysis_index
+        )
+    return effect_spec.function(
+        effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
+    )
+
+
+def compile_effects_timeline(effects_timeline: List[Any], total_duration_seconds: float,
+                             processed_metadata: Dict[str, Any],
+                             audio_analysis_data: Optional[Dict[str, Any]] = None,
+                             effect_cache: Optional[EffectCache] = None,
+                             profiler: Optional[CompileProfiler] = None,
+                             analysis_index: Optional[AnalysisIndex] = None) -> Tuple[List[Tuple], Dict[str, Any]]:
+    """
+    Render every effect and layer its segments over the timeline, in timeline order.
+    
+    With an effect_cache, effects whose type, params, timing, metadata and audio
+    analysis are unchanged reuse their cached segments, and the merge resumes from
+    the last cached timeline checkpoint before the first changed effect.
+    
+    Args:
+        effects_timeline: The effects_timeline array from the .seqdesign.json file
+        total_duration_seconds: Total duration of the sequence
+        processed_metadata: default_pixels, target_prg_refresh_rate and default_base_rgb
+        audio_analysis_data: Audio analysis data for audio-driven effects, if any
+        effect_cache: Optional EffectCache for incremental recompilation
+        profiler: Optional CompileProfiler recording per-effect render and merge times
+        analysis_index: AnalysisIndex of audio_analysis_data, shared by the effects.
+            Built here from audio_analysis_data if not given.
+        
+    Returns:
+        Tuple of (final_segments, report). The report lists the ids of the effects
+        that were rendered ("recomputed") and reused from the cache ("reused"), and
+        the index of the effect the merge was replayed from ("replayed_from").
+    """
+    default_base_rgb = processed_metadata["default_base_rgb"]
+    default_pixels = processed_metadata["default_pixels"]
+    
+    # Initialize with a single segment covering the total duration with default color
+    final_segments = []
+    if total_duration_seconds > 0:
+        final_segments = [(0.0, total_duration_seconds, default_base_rgb, default_pixels)]
+    
+    if analysis_index is None and audio_analysis_data:
+        analysis_index = AnalysisIndex(audio_analysis_data)
+    
+    # Resolve every effect up front so unchanged prefixes can be recognized
+    analysis_fingerprints = {}
+    resolved_effects = []
+    chain_keys = []
+    chain_key = EffectCache.initial_chain_key(final_segments) if effect_cache else None
+    for effect_data in effects_timeline:
+        resolved = resolve_effect(effect_data, total_duration_seconds)
+        effect_key = None
+        if resolved is not None and effect_cache:
+            _, effect_type, effect_start_sec, effect_end_sec, effect_params = resolved
+            # Effects depend only on the analysis features they declare
+            effect_spec = get_effect(effect_type)
+            features = effect_spec.features if effect_spec is not None else ()
+            if features and features not in analysis_fingerprints:
+                analysis_fingerprints[features] = EffectCache.analysis_fingerprint(audio_analysis_data, features)
+            effect_key = EffectCache.effect_key(effect_type.lower(), effect_start_sec, effect_end_sec, effect_params,
+                                                processed_metadata, analysis_fingerprints.get(features))
+            chain_key = EffectCache.next_chain_key(chain_key, effect_key)
+        resolved_effects.append((resolved, effect_key))
+        chain_keys.append(chain_key)
+    
+    report = {"effects": len(resolved_effects), "recomputed": [], "reused": [], "replayed_from": 0}
+    
+    # Resume the merge from the latest checkpoint
+    start_index = 0
+    if effect_cache:
+        for index in range(len(chain_keys) - 1, -1, -1):
+            checkpoint = effect_cache.get_checkpoint(chain_keys[index])
+            if checkpoint is not None:
+                final_segments = checkpoint
+                start_index = index + 1
+                break
+    report["replayed_from"] = start_index
+    
+    for index in range(start_index, len(resolved_effects)):
+        resolved, effect_key = resolved_effects[index]
+        if resolved is not None:
+            effect_id, effect_type, effect_start_sec, effect_end_sec, effect_params = resolved
+            
+            apply_start = time.perf_counter()
+            valid_segments = effect_cache.get_segments(effect_key) if effect_cache else None
+            cached = valid_segments is not None
+            if cached:
+                report["reused"].append(effect_id)
+            else:
+                # Call Effect Implementation Function
+                try:
+                    newly_generated_segments_for_this_effect = render_effect(
+                        effect_id, effect_type, effect_start_sec, effect_end_sec, effect_params,
+                        processed_metadata, audio_analysis_data, analysis_index
+                    )
+                except Exception as e:
+                    print(f"Error applying effect '{effect_id}' of type '{effect_type}': {str(e)}")
+                    newly_generated_segments_for_this_effect = None
+                
+                if newly_generated_segments_for_this_effect is not None:
+                    report["recomputed"].append(effect_id)
+                    valid_segments = []
+                    for new_segment in newly_generated_segments_for_this_effect:
+                        # Segments are (start, end, color, pixels) with an optional 5th element for fades
+                        if len(new_segment) not in (4, 5) or new_segment[1] < new_segment[0]:
+                            print(f"Warning: Skipping invalid segment structure: {new_segment}")
+                            continue
+                        valid_segments.append(new_segment)
+                    if effect_cache:
+                        effect_cache.put_segments(effect_key, valid_segments)
+            
+            apply_seconds = time.perf_counter() - apply_start
+            
+            if valid_segments is not None:
+                # Merge Segments (Core Override Logic)
+                # Later segments override earlier ones; adjacent identical segments are merged
+                merge_start = time.perf_counter()
+                final_segments = apply_segment_overrides(final_segments, valid_segments)
+                if profiler:
+                    profiler.record_item(effect_id, effect_type, apply_start, apply_seconds, len(valid_segments),
+                                         merge_start, time.perf_counter() - merge_start, cached=cached)
+        
+        if effect_cache and ((index + 1) % effect_cache.checkpoint_interval == 0 or index == len(resolved_effects) - 1):
+            effect_cache.put_checkpoint(chain_keys[index], final_segments)
+    
+    return final_segments, report
+
+
+def build_prg_json(final_segments: List[Tuple], processed_metadata: Dict[str, Any],
+                   total_duration_seconds: float) -> Dict[str, Any]:
+    """
+    Construct the PRG-JSON data structure from the merged timeline.
+    
+    Args:
+        final_segments: Sorted, non-overlapping segments from compile_effects_timeline()
+        processed_metadata: default_pixels and target_prg_refresh_rate
+        total_duration_seconds: Total duration of the sequence
+        
+    Returns:
+        Dict[str, Any]: PRG-JSON data as read by prg_generator.py
+    """
+
+    # Initialize the PRG-JSON structure
+    prg_json_data = {
+        "default_pixels": processed_metadata['default_pixels'],
+        "refresh_rate": processed_metadata['target_prg_refresh_rate'],
+        "end_time": round(total_duration_seconds * processed_metadata['target_prg_refresh_rate']),
+        "color_format": "RGB",  # Standardize to RGB
+        "sequence": {}
+    }
+
+    # Populate the sequence dictionary
+    for segment_tuple in final_segments:
+        # Unpack segment robustly
+        start_time_sec, end_time_sec, color_data, pixels_int = segment_tuple[:4]
+        segment_type_marker = segment_tuple[4] if len(segment_tuple) == 5 else None
+
+        # Convert start_time_sec to start_time_units
+        start_time_units = round(start_time_sec * processed_metadata['target_prg_refresh_rate'])
+
+        segment_entry = {"pixels": pixels_int}
+
+        if segment_type_marker == "fade":
+            start_color_rgb, end_color_rgb = color_data # color_data is a tuple of (start_rgb, end_rgb)
+            segment_entry["start_color"] = list(start_color_rgb)
+            segment_entry["end_color"] = list(end_color_rgb)
+        else: # Solid color
+            segment_entry["color"] = list(color_data) # color_data is a single rgb_tuple
+
+        # Add entry to the sequence dictionary
+        # The key must be a string representation of start_time_units
+        prg_json_data['sequence'][str(start_time_units)] = segment_entry
     
+    return prg_json_data
+
+
+def build_prg_segments(final_segments: List[Tuple], processed_metadata: Dict[str, Any],
+                       total_duration_seconds: float) -> List[Tuple]:
+    """
+    Convert the merged timeline straight into the segments the PRG encoder takes.
+    
+    Gives the same result as prg_generator.parse_sequence(build_prg_json(...)),
+    without building and re-parsing the PRG-JSON structure: start times are rounded
+    to PRG-JSON time units, then scaled to the encoder's 100Hz units.
+    
+    Args:
+        final_segments: Sorted, non-overlapping segments from compile_effects_timeline()
+        processed_metadata: default_pixels and target_prg_refresh_rate
+        total_duration_seconds: Total duration of the sequence
+        
+    Returns:
+        List of (duration_prg_units, color_data, pixels, segment_type) tuples
+        
+    Raises:
+        PRGGenerationError: If the timeline cannot be encoded
+    """
+    from prg_generator import PRGGenerationError, TARGET_OUTPUT_PRG_REFRESH_RATE
+    
+    refresh_rate = processed_metadata['target_prg_refresh_rate']
+    default_pixels = processed_metadata['default_pixels']
+    if not 1 <= default_pixels <= 4:
+        raise PRGGenerationError(f"Invalid 'default_pixels': {default_pixels}. Must be int 1-4.")
+    time_unit_scaling_factor = TARGET_OUTPUT_PRG_REFRESH_RATE / refresh_rate
+    end_time_units = round(total_duration_seconds * refresh_rate)
+    
+    # Segments whose starts round to the same time unit replace each other, as in the PRG-JSON sequence
+    segments_by_start = {}
+    for segment_tuple in final_segments:
+        segments_by_start[round(segment_tuple[0] * refresh_rate)] = segment_tuple
+    start_units = sorted(segments_by_start)
+    
+    prg_segments = []
+    for index, start_time_units in enumerate(start_units):
+        segment_tuple = segments_by_start[start_time_units]
+        color_data, pixels_int = segment_tuple[2:4]
+        try:
+            if len(segment_tuple) == 5 and segment_tuple[4] == "fade":
+                segment_type = 'fade'
+                color_data = tuple(tuple(int(c) for c in rgb) for rgb in color_data)
+                channel_values = color_data[0] + color_data[1]
+            else:
+                segment_type = 'solid'
+                color_data = tuple(int(c) for c in color_data)
+                channel_values = color_data
+            if len(channel_values) != (6 if segment_type == 'fade' else 3) or not all(0 <= c <= 255 for c in channel_values):
+                raise ValueError("RGB values must be three values 0-255")
+        except (ValueError, TypeError) as e:
+            raise PRGGenerationError(f"Invalid color in segment at {segment_tuple[0]} seconds: {segment_tuple[2]}. {e}")
+        if not isinstance(pixels_int, int) or not 1 <= pixels_int <= 4:
+            pixels_int = default_pixels
+        
+        prg_start_time = round(start_time_units * time_unit_scaling_factor)
+        if index + 1 < len(start_units):
+            next_prg_start_time = round(start_units[index + 1] * time_unit_scaling_factor)
+        else:
+            if end_time_units < start_time_units:
+                raise PRGGenerationError(f"End time ({end_time_units} units) is earlier than the start time "
+                                         f"({start_time_units} units) of the last segment.")
+            next_prg_start_time = round(end_time_units * time_unit_scaling_factor)
+        
+        duration_prg_units = next_prg_start_time - prg_start_time
+        if duration_prg_units > 0:
+            prg_segments.append((duration_prg_units, color_data, pixels_int, segment_type))
+    
+    if not prg_segments:
+        raise PRGGenerationError("No valid segments could be calculated (check durations and times after scaling).")
+    return prg_segments
+
+
+def profile_phase(profiler: Optional[CompileProfiler], name: str):
+    """Context manager timing a compile phase with the profiler, or doing nothing without one."""
+    return profiler.phase(name) if profiler else nullcontext()
+
+
+def compile_design(args: argparse.Namespace, effect_cache: Optional[EffectCache] = None,
+                   analysis_memo: Optional[Dict[Tuple, Dict[str, Any]]] = None,
+                   profiler: Optional[CompileProfiler] = None) -> Optional[Dict[str, Any]]:
+    """
+    Compile one .seqdesign.json file and write its outputs.
+    
+    Errors in the design exit via sys.exit(1), as in a single command-line run.
+    
+    Args:
+        args: Parsed command-line arguments (see main())
+        effect_cache: Optional EffectCache for incremental recompilation
+        analysis_memo: Optional in-memory memo for load_audio_analysis()
+        profiler: Optional CompileProfiler recording effect and phase timings
+        
+    Returns:
+        Optional[Dict[str, Any]]: The PRG-JSON data written to args.output_prg_json_path,
+        or None if no .prg.json output was requested
+    """
     # Load the input .seqdesign.json file
     print(f"Loading input file: {args.input_seqdesign_json_path}")
-    seqdesign_data = load_seqdesign_json(args.input_seqdesign_json_path)
+    with profile_phase(profiler, "load design"):
+        seqdesign_data = load_seqdesign_json(args.input_seqdesign_json_path)
     
     # Access the metadata object
     if "metadata" not in seqdesign_data or not isinstance(seqdesign_data["metadata"], dict):
@@ -259,24 +682,19 @@ def main() -> None:
     
     # Implement Audio Analysis (if needed)
     audio_analysis_data = None
+    analysis_index = None
     
-    # Define effect types that require audio analysis
-    AUDIO_DEPENDENT_EFFECT_TYPES = ["pulse_on_beat", "apply_section_theme_from_audio"]  # Add more as they are implemented
-    
-    # Determine if audio analysis is needed
-    audio_needed = False
-    for effect in effects_timeline:
-        if isinstance(effect, dict) and "type" in effect:
-            if effect["type"] in AUDIO_DEPENDENT_EFFECT_TYPES:
-                audio_needed = True
-                break
+    # Determine which audio features the effects need, if any
+    audio_features = required_audio_features(effects_timeline)
     
     # Perform analysis if needed
-    if audio_needed:
+    if audio_features:
         if full_audio_path is not None and os.path.exists(full_audio_path):
-            print(f"Audio analysis required. Analyzing {full_audio_path}...")
-            analyzer = AudioAnalyzer()
-            audio_analysis_data = analyzer.analyze_audio(full_audio_path)
+            print(f"Audio analysis required ({', '.join(audio_features)}). Analyzing {full_audio_path}...")
+            with profile_phase(profiler, "audio analysis"):
+                audio_analysis_data = load_audio_analysis(full_audio_path, audio_features, analysis_memo)
+                # Lookups shared by the audio-driven effects, built once per compile
+                analysis_index = AnalysisIndex(audio_analysis_data)
         else:
             audio_file_msg = "Not specified" if full_audio_path is None else full_audio_path
             print(f"Warning: Audio-dependent effects are present, but the audio file '{audio_file_msg}' was not found or specified. These effects may not work as expected.")
@@ -286,7 +704,7 @@ def main() -> None:
     # Effect Timeline Processing & Segment Generation
     print("Processing effects timeline and generating segments...")
     
-    # Initialize final_segments with a default segment covering the total duration
+    # Metadata passed to effect implementations
     processed_metadata = {
         "default_pixels": default_pixels,
         "target_prg_refresh_rate": target_prg_refresh_rate,
@@ -294,290 +712,652 @@ def main() -> None:
         # Add other metadata as needed by effect implementations
     }
     
-    # Initialize with a single segment covering the total duration with default color
-    final_segments = []
-    if total_duration_seconds > 0:
-        final_segments = [(0.0, total_duration_seconds, default_base_rgb, default_pixels)]
+    with profile_phase(profiler, "effects"):
+        final_segments, compile_report = compile_effects_timeline(
+            effects_timeline, total_duration_seconds, processed_metadata, audio_analysis_data, effect_cache, profiler,
+            analysis_index
+        )
+    if effect_cache:
+        with profile_phase(profiler, "save effect cache"):
+            effect_cache.save()
+        print(f"Incremental compile: recomputed {len(compile_report['recomputed'])} of "
+              f"{compile_report['effects']} effects, merge replayed from effect {compile_report['replayed_from']}.")
+        if compile_report['recomputed']:
+            print(f"  Recomputed: {', '.join(str(effect_id) for effect_id in compile_report['recomputed'])}")
     
-    # Iterate through each effect in the timeline
-    for effect_data in effects_timeline:
-        if not isinstance(effect_data, dict):
-            print(f"Warning: Skipping invalid effect data (not a dictionary): {effect_data}")
-            continue
-        
-        effect_id = effect_data.get('id', 'Unknown')
-        
-        # Determine Effect Timing
-        timing = effect_data.get("timing", {})
-        if not isinstance(timing, dict):
-            print(f"Warning: Skipping effect '{effect_id}' due to invalid timing format.")
-            continue
+    # Print summary of generated segments
+    print(f"Generated {len(final_segments)} segments for the timeline.")
+    
+    prg_json_data = None
+    if args.output_prg_json_path:
+        # Implement PRG-JSON Construction
+        print("Constructing PRG-JSON data structure...")
+        with profile_phase(profiler, "build PRG-JSON"):
+            prg_json_data = build_prg_json(final_segments, processed_metadata, total_duration_seconds)
+    
+        # Print summary of the PRG-JSON data
+        print(f"PRG-JSON construction complete.")
+        print(f"  End time: {prg_json_data['end_time']} units")
+        print(f"  Sequence entries: {len(prg_json_data['sequence'])}")
+    
+        # For debugging, print the PRG-JSON data
+        if args.print_json:
+            print("PRG-JSON data structure:")
+            print(json.dumps(prg_json_data, indent=2))
+    
+        # Write the PRG-JSON data to the output file
+        print(f"Writing output to: {args.output_prg_json_path}")
+        try:
+            # Create directory if it doesn't exist
+            output_dir = os.path.dirname(args.output_prg_json_path)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            
+            # Write the JSON data to the file
+            with profile_phase(profiler, "write .prg.json"), open(args.output_prg_json_path, 'w') as f:
+                json.dump(prg_json_data, f, indent=4)
         
-        effect_start_sec = timing.get("start_seconds")
-        effect_end_sec = timing.get("end_seconds")
-        duration_sec = timing.get("duration_seconds")
+            print(f"Successfully compiled '{args.input_seqdesign_json_path}' to '{args.output_prg_json_path}'")
+        except IOError as e:
+            print(f"Error: Failed to write output file: {args.output_prg_json_path}")
+            print(f"Details: {str(e)}")
+            sys.exit(1)
+        except PermissionError as e:
+            print(f"Error: Permission denied when writing to: {args.output_prg_json_path}")
+            print(f"Details: {str(e)}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error: Unexpected error when writing output file: {args.output_prg_json_path}")
+            print(f"Details: {str(e)}")
+            sys.exit(1)
+    
+    if args.emit_prg:
+        with profile_phase(profiler, "write .prg"):
+            write_prg(final_segments, processed_metadata, total_duration_seconds, args.emit_prg,
+                      use_build_cache=not args.no_build_cache)
+    
+    if args.push_to_gui:
+        with profile_phase(profiler, "push to GUI"):
+            push_compiled_design(args, metadata)
+    
+    return prg_json_data
+
+
+def write_prg(final_segments: List[Tuple], processed_metadata: Dict[str, Any], total_duration_seconds: float,
+              prg_path: str, use_build_cache: bool = True) -> None:
+    """
+    Encode the merged timeline straight to a binary .prg file with prg_generator.
+    
+    The segments go to the encoder in memory (see build_prg_segments()), without
+    writing and re-reading a .prg.json file. Unchanged sequences are served from
+    the shared PRG build cache.
+    
+    Args:
+        final_segments: Sorted, non-overlapping segments from compile_effects_timeline()
+        processed_metadata: default_pixels and target_prg_refresh_rate
+        total_duration_seconds: Total duration of the sequence
+        prg_path: Path of the .prg file to write
+        use_build_cache: Look up and store the encoded file in the PRGBuildCache
+    """
+    from prg_generator import PRGGenerationError
+    
+    print(f"Writing PRG file to: {prg_path}")
+    try:
+        prg_bytes, segment_count, cache_hit = encode_timeline_prg(
+            final_segments, processed_metadata, total_duration_seconds, use_build_cache
+        )
+        prg_dir = os.path.dirname(prg_path)
+        if prg_dir:
+            os.makedirs(prg_dir, exist_ok=True)
+        with open(prg_path, 'wb') as f:
+            f.write(prg_bytes)
+    except (PRGGenerationError, OSError) as e:
+        print(f"Error: Failed to write PRG file: {prg_path}")
+        print(f"Details: {str(e)}")
+        sys.exit(1)
+    print(f"Wrote {len(prg_bytes)} bytes ({segment_count} segments{', from the build cache' if cache_hit else ''})")
+
+
+def encode_timeline_prg(final_segments: List[Tuple], processed_metadata: Dict[str, Any],
+                        total_duration_seconds: float, use_build_cache: bool = True) -> Tuple[bytes, int, bool]:
+    """
+    Encode the merged timeline into PRG file bytes.
+    
+    Args:
+        final_segments: Sorted, non-overlapping segments from compile_effects_timeline()
+        processed_metadata: default_pixels and target_prg_refresh_rate
+        total_duration_seconds: Total duration of the sequence
+        use_build_cache: Look up and store the encoded file in the PRGBuildCache
         
-        # Validate timing
-        if effect_start_sec is None:
-            print(f"Warning: Skipping effect '{effect_id}' due to missing start_seconds.")
-            continue
+    Returns:
+        Tuple of (prg_bytes, PRG segment count, whether the bytes came from the build cache)
         
+    Raises:
+        PRGGenerationError: If the timeline cannot be encoded
+    """
+    # prg_generator lives in the project root, which is on sys.path (see above)
+    from prg_generator import encode_prg
+    
+    prg_segments = build_prg_segments(final_segments, processed_metadata, total_duration_seconds)
+    default_pixels = processed_metadata['default_pixels']
+    if use_build_cache:
+        from prg_build_cache import PRGBuildCache
+        prg_bytes, cache_hit = PRGBuildCache().get_or_encode(prg_segments, default_pixels=default_pixels)
+        return prg_bytes, len(prg_segments), cache_hit
+    return encode_prg(prg_segments, default_pixels), len(prg_segments), False
+
+
+def default_smproj_path(output_prg_json_path: str) -> str:
+    """The .smproj path next to a .prg.json output: name.prg.json -> name.smproj."""
+    base = output_prg_json_path
+    for suffix in (".prg.json", ".json"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base + ".smproj"
+
+
+def alternate_smproj_path(smproj_path: str) -> str:
+    """
+    name_a.smproj for smproj_path (name.smproj), or name_b.smproj if the swap inbox
+    currently names name_a.smproj.
+    
+    Sequence Maker auto-saves the open project to its own path before loading a
+    pushed one, so a push must not reuse the path of the project the previous push
+    loaded: the GUI would overwrite the new file with the old project and load
+    stale content. Alternating between two paths avoids that without leaving a new
+    file behind for every push.
+    """
+    base = smproj_path[:-len(".smproj")] if smproj_path.endswith(".smproj") else smproj_path
+    first, second = f"{base}_a.smproj", f"{base}_b.smproj"
+    entry = read_swap_inbox()
+    if entry and entry.get("smproj_path") == os.path.abspath(first):
+        return second
+    return first
+
+
+def push_compiled_design(args: argparse.Namespace, metadata: Dict[str, Any]) -> None:
+    """
+    Build a .smproj from the compiled .prg.json and push it to the Sequence Maker swap inbox.
+    
+    Pushes alternate between two .smproj paths (see alternate_smproj_path()).
+    
+    Args:
+        args: Parsed command-line arguments (see main())
+        metadata: The metadata object from the Designer-JSON
+    """
+    from roocode_sequence_designer_tools.generate_smproj_from_prg import generate_smproj_from_prg_files
+    
+    design_name = os.path.basename(args.input_seqdesign_json_path).replace(".seqdesign.json", "")
+    project_name = metadata.get("title") or design_name
+    smproj_path = alternate_smproj_path(args.smproj or default_smproj_path(args.output_prg_json_path))
+    try:
+        generate_smproj_from_prg_files([args.output_prg_json_path], project_name, smproj_path)
+        inbox_path = push_to_swap_inbox(
+            smproj_path,
+            f"{project_name} (compiled from {os.path.basename(args.input_seqdesign_json_path)})",
+            version_name=design_name
+        )
+    except Exception as e:
+        print(f"Error: Failed to push the sequence to the Sequence Maker swap inbox")
+        print(f"Details: {str(e)}")
+        sys.exit(1)
+    print(f"Pushed {smproj_path} to the swap inbox: {inbox_path}")
+
+
+def report_profile(args: argparse.Namespace, profiler: CompileProfiler) -> None:
+    """
+    Print the --profile table and write the requested JSON and Chrome trace files.
+    
+    Args:
+        args: Parsed command-line arguments (see main())
+        profiler: The CompileProfiler of the compile
+    """
+    print("Compile profile (most expensive effects first):")
+    print(profiler.format_table(limit=None if args.profile_all else 25))
+    try:
+        if args.profile_json:
+            profiler.write_json(args.profile_json)
+            print(f"Profile written to: {args.profile_json}")
+        if args.profile_trace:
+            profiler.write_chrome_trace(args.profile_trace)
+            print(f"Chrome trace written to: {args.profile_trace}")
+    except OSError as e:
+        print(f"Warning: Could not write profile output: {e}")
+
+
+def watch_design(args: argparse.Namespace, effect_cache: Optional[EffectCache]) -> None:
+    """
+    Recompile the design every time it is saved, until interrupted.
+    
+    The process stays alive between compiles, so imports, audio analysis and the
+    effect cache stay in memory and a recompile only re-renders changed effects.
+    A failed compile (for example a half-saved file) waits for the next save.
+    
+    Args:
+        args: Parsed command-line arguments (see main())
+        effect_cache: Optional EffectCache for incremental recompilation
+    """
+    analysis_memo = {}
+    last_signature = None
+    print(f"Watching {args.input_seqdesign_json_path} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            try:
+                stat = os.stat(args.input_seqdesign_json_path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                signature = None
+            
+            if signature is not None and signature != last_signature:
+                last_signature = signature
+                start_time = time.perf_counter()
+                profiler = CompileProfiler() if args.profile else None
+                try:
+                    compile_design(args, effect_cache, analysis_memo, profiler)
+                except SystemExit:
+                    print("Compilation failed; waiting for the next change.")
+                except Exception as e:
+                    print(f"Compilation failed: {e}; waiting for the next change.")
+                else:
+                    if profiler:
+                        report_profile(args, profiler)
+                    elapsed_ms = (time.perf_counter() - start_time) * 1000
+                    print(f"Compilation completed successfully in {elapsed_ms:.0f} ms. Waiting for changes...")
+            
+            time.sleep(args.watch_interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def default_audio_dir(design_path: str) -> str:
+    """Default --audio-dir: the parent of the directory containing the design, i.e. the [SequenceName] directory."""
+    return os.path.dirname(os.path.dirname(os.path.abspath(design_path)))
+
+
+def effect_ball_targets(effect_data: Any) -> Optional[List[int]]:
+    """
+    Ball numbers an effect is restricted to.
+    
+    Effects select balls with "target_ball" (as written by pattern templates) or
+    with params.ball_ids such as ["ball1", "ball3"].
+    
+    Returns:
+        Sorted ball numbers (1-based), or None if the effect applies to every ball
+    """
+    if not isinstance(effect_data, dict):
+        return None
+    targets = set()
+    target_ball = effect_data.get("target_ball")
+    if target_ball is not None:
         try:
-            effect_start_sec = float(effect_start_sec)
+            targets.add(int(target_ball))
         except (ValueError, TypeError):
-            print(f"Warning: Skipping effect '{effect_id}' due to invalid start_seconds: {effect_start_sec}")
-            continue
-        
-        # Calculate end time if missing
-        if effect_end_sec is None and duration_sec is not None:
-            try:
-                duration_sec = float(duration_sec)
-                effect_end_sec = effect_start_sec + duration_sec
-            except (ValueError, TypeError):
-                print(f"Warning: Skipping effect '{effect_id}' due to invalid duration_seconds: {duration_sec}")
-                continue
-        # Calculate duration if missing
-        elif effect_end_sec is not None and duration_sec is None:
-            try:
-                effect_end_sec = float(effect_end_sec)
-                duration_sec = effect_end_sec - effect_start_sec
-            except (ValueError, TypeError):
-                print(f"Warning: Skipping effect '{effect_id}' due to invalid end_seconds: {effect_end_sec}")
-                continue
-        # Both end_seconds and duration_seconds are missing
-        elif effect_end_sec is None and duration_sec is None:
-            print(f"Warning: Skipping effect '{effect_id}' due to missing end_seconds or duration_seconds.")
-            continue
-        else:
-            # Both are provided, ensure effect_end_sec is a float
-            try:
-                effect_end_sec = float(effect_end_sec)
-            except (ValueError, TypeError):
-                print(f"Warning: Skipping effect '{effect_id}' due to invalid end_seconds: {effect_end_sec}")
-                continue
+            print(f"Warning: Ignoring invalid target_ball in effect '{effect_data.get('id', 'Unknown')}': {target_ball}")
+    params = effect_data.get("params")
+    ball_ids = params.get("ball_ids") if isinstance(params, dict) else None
+    if isinstance(ball_ids, list):
+        for ball_id in ball_ids:
+            digits = re.sub(r"\D", "", str(ball_id))
+            if digits:
+                targets.add(int(digits))
+            else:
+                print(f"Warning: Ignoring invalid ball id in effect '{effect_data.get('id', 'Unknown')}': {ball_id}")
+    return sorted(targets) if targets else None
+
+
+def split_effects_by_ball(metadata: Dict[str, Any], effects_timeline: List[Any]) -> Optional[Dict[int, List[Any]]]:
+    """
+    Split a timeline with per-ball effect tracks into one timeline per ball.
+    
+    Effects without a ball target appear on every ball; the order of effects,
+    and therefore their layering, is kept on each ball.
+    
+    Args:
+        metadata: The metadata object from the Designer-JSON (num_balls is used if present)
+        effects_timeline: The effects_timeline array from the Designer-JSON
         
-        # Clamp effect timing to be within 0.0 and total_duration_seconds
-        effect_start_sec = max(0.0, min(effect_start_sec, total_duration_seconds))
-        effect_end_sec = max(0.0, min(effect_end_sec, total_duration_seconds))
+    Returns:
+        Dict mapping ball number to its effects, or None if no effect targets a ball
+    """
+    targets_by_effect = [effect_ball_targets(effect_data) for effect_data in effects_timeline]
+    targeted_balls = {ball for targets in targets_by_effect if targets for ball in targets}
+    if not targeted_balls:
+        return None
+    
+    num_balls = max(targeted_balls)
+    try:
+        num_balls = max(num_balls, int(metadata.get("num_balls", 0)))
+    except (ValueError, TypeError):
+        print(f"Warning: Invalid num_balls in metadata: {metadata.get('num_balls')}")
+    
+    return {
+        ball: [effect_data for effect_data, targets in zip(effects_timeline, targets_by_effect)
+               if targets is None or ball in targets]
+        for ball in range(1, num_balls + 1)
+    }
+
+
+# Audio analysis shared by every target compiled in a worker process, keyed by audio path,
+# and the AnalysisIndex of each
+_shared_audio_analyses = {}
+_shared_analysis_indexes = {}
+
+
+def _init_compile_worker(audio_analyses: Dict[str, Dict[str, Any]]) -> None:
+    """Process pool initializer: receive the shared audio analyses once per worker and index them."""
+    global _shared_audio_analyses, _shared_analysis_indexes
+    _shared_audio_analyses = audio_analyses
+    _shared_analysis_indexes = {audio_path: AnalysisIndex(audio_analysis_data)
+                                for audio_path, audio_analysis_data in audio_analyses.items()}
+
+
+def _compile_target_one(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compile one target (a design, or one ball of a design) and write its outputs.
+    
+    Args:
+        task: name, effects_timeline, processed_metadata, total_duration_seconds,
+            audio_path, output_prg_json_path, output_prg_path (or None),
+            effect_cache_path (or None) and use_build_cache
+            
+    Returns:
+        Dict with the target name, output paths, ok flag, error, seconds, segment
+        count and the number of effects recomputed
+    """
+    from prg_generator import PRGGenerationError
+    
+    result = {"name": task["name"], "outputs": [], "ok": False, "error": None, "seconds": 0.0,
+              "segments": 0, "recomputed": 0, "effects": 0}
+    start_time = time.perf_counter()
+    try:
+        effect_cache = EffectCache(task["effect_cache_path"]) if task["effect_cache_path"] else None
+        audio_analysis_data = _shared_audio_analyses.get(task["audio_path"]) if task["audio_path"] else None
+        analysis_index = _shared_analysis_indexes.get(task["audio_path"]) if task["audio_path"] else None
+        final_segments, compile_report = compile_effects_timeline(
+            task["effects_timeline"], task["total_duration_seconds"], task["processed_metadata"],
+            audio_analysis_data, effect_cache, analysis_index=analysis_index
+        )
+        if effect_cache:
+            effect_cache.save()
+        result["segments"] = len(final_segments)
+        result["effects"] = compile_report["effects"]
+        result["recomputed"] = len(compile_report["recomputed"])
         
-        # Skip if effect has zero or negative duration after clamping
-        if effect_end_sec <= effect_start_sec:
-            print(f"Warning: Skipping effect '{effect_id}' due to invalid timing after clamping: start={effect_start_sec}, end={effect_end_sec}")
-            continue
+        prg_json_data = build_prg_json(final_segments, task["processed_metadata"], task["total_duration_seconds"])
+        with open(task["output_prg_json_path"], 'w') as f:
+            json.dump(prg_json_data, f, indent=4)
+        result["outputs"].append(task["output_prg_json_path"])
         
-        # Identify Effect Type and Parameters
-        effect_type = effect_data.get("type")
-        if effect_type is None:
-            print(f"Warning: Skipping effect '{effect_id}' due to missing effect type.")
-            continue
+        if task["output_prg_path"]:
+            prg_bytes, _, _ = encode_timeline_prg(final_segments, task["processed_metadata"],
+                                                  task["total_duration_seconds"], task["use_build_cache"])
+            with open(task["output_prg_path"], 'wb') as f:
+                f.write(prg_bytes)
+            result["outputs"].append(task["output_prg_path"])
+        result["ok"] = True
+    except (PRGGenerationError, OSError) as e:
+        result["error"] = str(e)
+    except Exception as e:
+        result["error"] = f"Unexpected error: {e}"
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def compile_targets(design_paths: List[str], output_dir: str, audio_dir: Optional[str] = None,
+                    jobs: Optional[int] = None, emit_prg: bool = False, use_effect_cache: bool = True,
+                    use_build_cache: bool = True) -> Dict[str, Any]:
+    """
+    Compile several designs, and every ball of designs with per-ball tracks, in a process pool.
+    
+    Each audio file is analyzed once, for the features all of its targets need,
+    and handed to every worker. Targets are named after the design file, so two
+    designs that would write the same output file are rejected before compiling. A design whose effects target balls (see
+    effect_ball_targets()) is written as <name>_Ball_<n>.prg.json per ball; other
+    designs are written as <name>.prg.json.
+    
+    Args:
+        design_paths: .seqdesign.json files to compile
+        output_dir: Directory for the .prg.json (and .prg) files
+        audio_dir: Base directory for relative audio paths. Default: per design, as in main()
+        jobs: Worker processes, at least 1. Defaults to the CPU count; 1 compiles in-process
+        emit_prg: Also write a .prg file next to each .prg.json
+        use_effect_cache: Use a per-target EffectCache for incremental recompilation
+        use_build_cache: Use the PRG build cache for .prg files
         
-        effect_params = effect_data.get("params", {})
-        if not isinstance(effect_params, dict):
-            print(f"Warning: Skipping effect '{effect_id}' due to invalid params format.")
-            continue
+    Returns:
+        Dict summary with per-target results, counts and total seconds
+
+    Raises:
+        ValueError: If jobs is less than 1
+    """
+    start_time = time.perf_counter()
+    jobs = resolve_jobs(jobs)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    tasks = []
+    features_by_audio = {}
+    design_by_target = {}
+    for design_path in design_paths:
+        seqdesign_data = load_seqdesign_json(design_path)
+        metadata = seqdesign_data.get("metadata")
+        if not isinstance(metadata, dict):
+            print(f"Error: Missing or invalid metadata in input file: {design_path}")
+            sys.exit(1)
+        effects_timeline = seqdesign_data.get("effects_timeline", [])
+        if not isinstance(effects_timeline, list):
+            print(f"Warning: effects_timeline is not a list in {design_path}, using empty list")
+            effects_timeline = []
         
-        # Call Effect Implementation Function
-        newly_generated_segments_for_this_effect = []
+        target_prg_refresh_rate, default_pixels, _, _, default_base_rgb = validate_metadata(metadata)
+        total_duration_seconds = calculate_total_duration(metadata, effects_timeline)
+        processed_metadata = {
+            "default_pixels": default_pixels,
+            "target_prg_refresh_rate": target_prg_refresh_rate,
+            "default_base_rgb": default_base_rgb
+        }
         
-        try:
-            effect_type_lower = effect_type.lower() # Convert to lowercase for case-insensitive matching
-
-            if effect_type_lower == "solid_color" or effect_type_lower == "solidcolor":
-                newly_generated_segments_for_this_effect = common_effects.apply_solid_color_effect(
-                    effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                )
-            elif effect_type_lower == "fade":
-                newly_generated_segments_for_this_effect = common_effects.apply_fade_effect(
-                    effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                )
-            elif effect_type_lower == "pulse_on_beat":
-                newly_generated_segments_for_this_effect = audio_driven_effects.apply_pulse_on_beat_effect(
-                    effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                )
-            elif effect_type_lower == "strobe":
-                if common_effects:  # Check if module was imported
-                    newly_generated_segments_for_this_effect = common_effects.apply_strobe_effect(
-                        effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                    )
-                else:  # Should not happen if imports are correct
-                    print(f"Warning: common_effects module not available for effect type '{effect_type_lower}'. Skipping.")
-            elif effect_type_lower == "apply_section_theme_from_audio":
-                if audio_driven_effects:  # Check if module was imported
-                    newly_generated_segments_for_this_effect = audio_driven_effects.apply_section_theme_from_audio_effect(
-                        effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                    )
-                else:  # Should not happen if imports are correct
-                    print(f"Warning: audio_driven_effects module not available for effect type '{effect_type_lower}'. Skipping.")
-            elif effect_type_lower == "snap_on_flash_off":
-                if common_effects:  # Check if module was imported
-                    newly_generated_segments_for_this_effect = common_effects.apply_snap_on_flash_off_effect(
-                        effect_start_sec, effect_end_sec, effect_params, processed_metadata, audio_analysis_data
-                    )
-                else:  # Should not happen if imports are correct
-                    print(f"Warning: common_effects module not available for effect type '{effect_type_lower}'. Skipping.")
+        audio_path = None
+        audio_features = required_audio_features(effects_timeline)
+        if audio_features:
+            audio_path = resolve_audio_path(metadata, audio_dir or default_audio_dir(design_path))
+            if audio_path is not None and os.path.exists(audio_path):
+                audio_path = os.path.abspath(audio_path)
+                features = features_by_audio.setdefault(audio_path, [])
+                features.extend(feature for feature in audio_features if feature not in features)
             else:
-                print(f"Warning: Unknown effect type '{effect_type}' for effect '{effect_id}'. Skipping.") # Original case in warning is fine
-                continue
-        except Exception as e:
-            print(f"Error applying effect '{effect_id}' of type '{effect_type}': {str(e)}")
-            continue
+                print(f"Warning: Audio-dependent effects are present in {design_path}, but the audio file "
+                      f"'{audio_path or 'Not specified'}' was not found or specified.")
+                audio_path = None
         
-        # Merge Segments (Core Override Logic)
-        for new_segment in newly_generated_segments_for_this_effect:
-            # Unpack the new segment (robustly handling optional 5th element for fades)
-            segment_type_marker = None
-            if len(new_segment) == 5:
-                ns, ne, nc_data, np, segment_type_marker = new_segment
-            elif len(new_segment) == 4:
-                ns, ne, nc_data, np = new_segment
-            else:
-                print(f"Warning: Skipping invalid segment structure: {new_segment}")
-                continue
-            
-            # Create a temporary list for the updated timeline segments
-            temp_final_segments = []
-            
-            # Process each existing segment
-            for old_segment in final_segments:
-                old_segment_type_marker = None
-                if len(old_segment) == 5:
-                    old_s, old_e, old_c_data, old_p, old_segment_type_marker = old_segment
-                elif len(old_segment) == 4:
-                    old_s, old_e, old_c_data, old_p = old_segment
-                else:
-                    # Should not happen if final_segments is always maintained correctly
-                    temp_final_segments.append(old_segment)
-                    continue
-
-                # Case 1: Old segment is completely before new segment
-                if old_e <= ns:
-                    temp_final_segments.append(old_segment)
-                # Case 2: Old segment is completely after new segment
-                elif old_s >= ne:
-                    temp_final_segments.append(old_segment)
-                # Case 3: Old segment overlaps with new segment
-                else:
-                    # Part of old segment before new segment
-                    if old_s < ns:
-                        temp_final_segments.append((old_s, ns, old_c_data, old_p) + ((old_segment_type_marker,) if old_segment_type_marker else ()))
-                    # Part of old segment after new segment
-                    if old_e > ne:
-                        temp_final_segments.append((ne, old_e, old_c_data, old_p) + ((old_segment_type_marker,) if old_segment_type_marker else ()))
-            
-            # Add the new segment itself
-            temp_final_segments.append(new_segment)
-            
-            # Sort by start time
-            temp_final_segments.sort(key=lambda x: x[0])
-            
-            # Clean up segments (merge adjacent identical segments, remove zero-duration segments)
-            cleaned_segments = []
-            if temp_final_segments:
-                current_segment_tuple = temp_final_segments[0]
-                
-                for next_segment_tuple in temp_final_segments[1:]:
-                    # Unpack current segment robustly
-                    curr_s, curr_e, curr_c_data, curr_p = current_segment_tuple[:4]
-                    curr_type_marker = current_segment_tuple[4] if len(current_segment_tuple) == 5 else None
-
-                    # Unpack next segment robustly
-                    next_s, next_e, next_c_data, next_p = next_segment_tuple[:4]
-                    next_type_marker = next_segment_tuple[4] if len(next_segment_tuple) == 5 else None
-                    
-                    # Merge adjacent identical segments (same color/fade, same pixels, same type)
-                    if (next_s == curr_e and
-                        next_c_data == curr_c_data and
-                        next_p == curr_p and
-                        next_type_marker == curr_type_marker):
-                        # Extend current_segment_tuple's end time
-                        current_segment_tuple = (curr_s, next_e, curr_c_data, curr_p) + ((curr_type_marker,) if curr_type_marker else ())
-                    else:
-                        # Add current segment if it has positive duration
-                        if curr_e > curr_s:
-                            cleaned_segments.append(current_segment_tuple)
-                        current_segment_tuple = next_segment_tuple
-                
-                # Add the last segment if it has positive duration
-                if current_segment_tuple[1] > current_segment_tuple[0]: # Check end_time > start_time
-                    cleaned_segments.append(current_segment_tuple)
-            
-            # Update final_segments with the cleaned segments
-            final_segments = cleaned_segments
+        design_name = os.path.basename(design_path)
+        for suffix in (".seqdesign.json", ".json"):
+            if design_name.endswith(suffix):
+                design_name = design_name[:-len(suffix)]
+                break
+        
+        effects_by_ball = split_effects_by_ball(metadata, effects_timeline)
+        if effects_by_ball is None:
+            targets = [(design_name, None, effects_timeline)]
+        else:
+            targets = [(f"{design_name}_Ball_{ball}", ball, effects) for ball, effects in effects_by_ball.items()]
+        
+        for name, ball, effects in targets:
+            if name in design_by_target:
+                # Both would write output_dir/<name>.prg.json, the later one silently replacing the other
+                print(f"Error: {design_path} and {design_by_target[name]} both compile to target '{name}' "
+                      f"in {output_dir}. Rename one of the designs or compile them separately.")
+                sys.exit(1)
+            design_by_target[name] = design_path
+            cache_key_path = design_path if ball is None else f"{os.path.abspath(design_path)}#ball{ball}"
+            tasks.append({
+                "name": name,
+                "effects_timeline": effects,
+                "processed_metadata": processed_metadata,
+                "total_duration_seconds": total_duration_seconds,
+                "audio_path": audio_path,
+                "output_prg_json_path": os.path.join(output_dir, f"{name}.prg.json"),
+                "output_prg_path": os.path.join(output_dir, f"{name}.prg") if emit_prg else None,
+                "effect_cache_path": EffectCache.default_cache_path(cache_key_path) if use_effect_cache else None,
+                "use_build_cache": use_build_cache
+            })
     
-    # Print summary of generated segments
-    print(f"Generated {len(final_segments)} segments for the timeline.")
+    # Analyze each audio file once, for every feature its targets need
+    audio_analyses = {}
+    for audio_path, features in features_by_audio.items():
+        print(f"Audio analysis required ({', '.join(features)}). Analyzing {audio_path}...")
+        audio_analyses[audio_path] = load_audio_analysis(audio_path, features)
     
-    # Implement PRG-JSON Construction
-    print("Constructing PRG-JSON data structure...")
+    print(f"Compiling {len(tasks)} target(s) with {min(jobs, max(len(tasks), 1))} job(s)...")
     
-    # Initialize the PRG-JSON structure
-    prg_json_data = {
-        "default_pixels": processed_metadata['default_pixels'],
-        "refresh_rate": processed_metadata['target_prg_refresh_rate'],
-        "end_time": round(total_duration_seconds * processed_metadata['target_prg_refresh_rate']),
-        "color_format": "RGB",  # Standardize to RGB
-        "sequence": {}
-    }
+    def record(result, done, total):
+        status = "OK  " if result["ok"] else "FAIL"
+        print(f"{status} {result['seconds'] * 1000:8.1f} ms  {result['name']}: {result['segments']} segments, "
+              f"recomputed {result['recomputed']} of {result['effects']} effects")
+        if not result["ok"]:
+            print(f"     Error: {result['error']}")
     
-    # Populate the sequence dictionary
-    for segment_tuple in final_segments:
-        # Unpack segment robustly
-        start_time_sec, end_time_sec, color_data, pixels_int = segment_tuple[:4]
-        segment_type_marker = segment_tuple[4] if len(segment_tuple) == 5 else None
-        
-        # Convert start_time_sec to start_time_units
-        start_time_units = round(start_time_sec * processed_metadata['target_prg_refresh_rate'])
-        
-        segment_entry = {"pixels": pixels_int}
+    summary = run_pool(_compile_target_one, tasks, jobs, record, sort_key=lambda result: result["name"],
+                       initializer=_init_compile_worker, initargs=(audio_analyses,), start_time=start_time)
+    print(f"Compiled {summary['succeeded']}/{summary['tasks']} target(s) in {summary['seconds']:.2f}s")
+    return {
+        "targets": summary["tasks"],
+        "succeeded": summary["succeeded"],
+        "failed": summary["failed"],
+        "seconds": summary["seconds"],
+        "jobs": summary["jobs"],
+        "results": summary["results"]
+    }
 
-        if segment_type_marker == "fade":
-            start_color_rgb, end_color_rgb = color_data # color_data is a tuple of (start_rgb, end_rgb)
-            segment_entry["start_color"] = list(start_color_rgb)
-            segment_entry["end_color"] = list(end_color_rgb)
-        else: # Solid color
-            segment_entry["color"] = list(color_data) # color_data is a single rgb_tuple
 
-        # Add entry to the sequence dictionary
-        # The key must be a string representation of start_time_units
-        prg_json_data['sequence'][str(start_time_units)] = segment_entry
+def main() -> None:
+    """Main function to orchestrate the compilation process."""
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Compile a .seqdesign.json file into a .prg.json and/or .prg file")
     
-    # Print summary of the PRG-JSON data
-    print(f"PRG-JSON construction complete.")
-    print(f"  End time: {prg_json_data['end_time']} units")
-    print(f"  Sequence entries: {len(prg_json_data['sequence'])}")
+    parser.add_argument("paths", nargs="*", metavar="PATH",
+                        help="The input .seqdesign.json file, then the output .prg.json file (may be omitted "
+                             "when --emit-prg is given). With --output-dir: one or more .seqdesign.json files.")
     
-    # For debugging, print the PRG-JSON data
-    print("PRG-JSON data structure:")
-    print(json.dumps(prg_json_data, indent=2))
+    parser.add_argument("--audio-dir", 
+                        help="Path to the directory containing the audio file. "
+                             "If metadata.audio_file_path in Designer-JSON is relative, "
+                             "this path specifies the base directory for resolving it. "
+                             "Default: The directory containing the input .seqdesign.json file's parent directory.")
     
-    # Write the PRG-JSON data to the output file
-    print(f"Writing output to: {args.output_prg_json_path}")
-    try:
-        # Create directory if it doesn't exist
-        output_dir = os.path.dirname(args.output_prg_json_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        # Write the JSON data to the file
-        with open(args.output_prg_json_path, 'w') as f:
-            json.dump(prg_json_data, f, indent=4)
-        
-        print(f"Successfully compiled '{args.input_seqdesign_json_path}' to '{args.output_prg_json_path}'")
-    except IOError as e:
-        print(f"Error: Failed to write output file: {args.output_prg_json_path}")
-        print(f"Details: {str(e)}")
-        sys.exit(1)
-    except PermissionError as e:
-        print(f"Error: Permission denied when writing to: {args.output_prg_json_path}")
-        print(f"Details: {str(e)}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error: Unexpected error when writing output file: {args.output_prg_json_path}")
-        print(f"Details: {str(e)}")
-        sys.exit(1)
+    parser.add_argument("--effect-cache",
+                        help="Path of the per-effect output cache file used to recompile only changed effects. "
+                             "Default: ~/.roocode_sequence_designer/effect_cache/<hash of the input path>.json")
+    
+    parser.add_argument("--no-effect-cache", action="store_true",
+                        help="Render every effect from scratch without reading or writing the effect cache")
+    
+    parser.add_argument("--emit-prg", metavar="PRG_PATH",
+                        help="Encode the compiled timeline straight to a binary .prg file at this path")
+    
+    parser.add_argument("--no-build-cache", action="store_true",
+                        help="Always re-encode the .prg file instead of using the PRG build cache")
+    
+    parser.add_argument("--print-json", action="store_true",
+                        help="Print the PRG-JSON data structure to stdout for debugging")
+    
+    parser.add_argument("--push-to-gui", action="store_true",
+                        help="Generate a .smproj from the compiled .prg.json and write it to the "
+                             "Sequence Maker swap inbox so a running Sequence Maker loads it")
+    
+    parser.add_argument("--smproj",
+                        help="Base path of the .smproj files written by --push-to-gui; pushes alternate "
+                             "between name_a.smproj and name_b.smproj. "
+                             "Default: the output path with .prg.json replaced by .smproj")
+    
+    parser.add_argument("--output-dir",
+                        help="Compile every PATH into this directory in a process pool, sharing the audio analysis. "
+                             "Designs whose effects target balls (target_ball or params.ball_ids) produce one "
+                             "<name>_Ball_<n>.prg.json per ball.")
+    
+    parser.add_argument("--jobs", type=positive_int,
+                        help="Worker processes for --output-dir (default: CPU count)")
+    
+    parser.add_argument("--prg", action="store_true",
+                        help="With --output-dir, also write a .prg file next to each .prg.json")
+    
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and recompile whenever the input file changes")
+    
+    parser.add_argument("--watch-interval", type=float, default=0.1,
+                        help="Seconds between checks for changes in --watch mode (default: 0.1)")
+    
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-effect render and merge times, segment counts and phase times "
+                             "(design loading, audio analysis, output writing)")
+    
+    parser.add_argument("--profile-all", action="store_true",
+                        help="With --profile, list every effect instead of the 25 most expensive")
+    
+    parser.add_argument("--profile-json", metavar="PATH",
+                        help="With --profile, also write the profile as JSON")
+    
+    parser.add_argument("--profile-trace", metavar="PATH",
+                        help="With --profile, also write a Chrome trace (chrome://tracing, Perfetto)")
+    
+    parser.add_argument("--list-effects", action="store_true",
+                        help="List the registered effect types with their aliases and audio features, and exit")
+    
+    # Parse arguments
+    args = parser.parse_args()
+    
+    if args.list_effects:
+        for effect_spec in available_effects():
+            details = []
+            if effect_spec.aliases:
+                details.append(f"aliases: {', '.join(effect_spec.aliases)}")
+            if effect_spec.features:
+                details.append(f"audio features: {', '.join(effect_spec.features)}")
+            if effect_spec.vectorized:
+                details.append("vectorized")
+            print(f"{effect_spec.name:<32} {effect_spec.module}" + (f" ({'; '.join(details)})" if details else ""))
+        sys.exit(0)
+    if not args.paths:
+        parser.error("at least one PATH is required")
+    if (args.profile_json or args.profile_trace or args.profile_all) and not args.profile:
+        args.profile = True
+    
+    if args.output_dir:
+        if args.watch or args.emit_prg or args.push_to_gui or args.profile:
+            parser.error("--output-dir cannot be combined with --watch, --emit-prg, --push-to-gui or --profile")
+        summary = compile_targets(args.paths, args.output_dir, args.audio_dir, args.jobs, args.prg,
+                                  not args.no_effect_cache, not args.no_build_cache)
+        sys.exit(1 if summary["failed"] else 0)
+    
+    if len(args.paths) > 2:
+        parser.error("expected an input .seqdesign.json and an output .prg.json path; use --output-dir for several designs")
+    args.input_seqdesign_json_path = args.paths[0]
+    args.output_prg_json_path = args.paths[1] if len(args.paths) > 1 else None
+    if not args.output_prg_json_path and not args.emit_prg:
+        parser.error("an output .prg.json path or --emit-prg is required")
+    if args.push_to_gui and not args.output_prg_json_path:
+        parser.error("--push-to-gui needs an output .prg.json path")
+    
+    # Determine default audio directory if not provided
+    if not args.audio_dir:
+        args.audio_dir = default_audio_dir(args.input_seqdesign_json_path)
+    
+    # Per-effect output cache for incremental recompilation
+    effect_cache = None
+    if not args.no_effect_cache:
+        effect_cache = EffectCache(args.effect_cache or EffectCache.default_cache_path(args.input_seqdesign_json_path))
+    
+    if args.watch:
+        watch_design(args, effect_cache)
+        return
+    
+    profiler = CompileProfiler() if args.profile else None
+    compile_design(args, effect_cache, profiler=profiler)
     
     print("Compilation completed successfully")
+    if profiler:
+        report_profile(args, profiler)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
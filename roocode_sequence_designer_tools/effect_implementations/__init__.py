@@ -3,18 +3,37 @@ Effect Implementations Package for Roocode Sequence Designer Tools
 
 This package contains modules that implement various lighting effects
 for the Roocode Sequence Designer system.
+
+Effects register themselves with the @register_effect decorator (see registry.py)
+and the compiler looks them up with get_effect(). The effect modules are imported
+on first use, so importing this package does not load them.
 """
 
-# Import common effects for easier access
-from roocode_sequence_designer_tools.effect_implementations.common_effects import (
-    apply_solid_color_effect,
-    apply_fade_effect,
-    apply_strobe_effect,
-    apply_snap_on_flash_off_effect
+import importlib
+
+from roocode_sequence_designer_tools.effect_implementations.registry import (
+    EffectSpec,
+    register_effect,
+    get_effect,
+    available_effects,
+    required_features
 )
 
-# Import audio-driven effects
-from roocode_sequence_designer_tools.effect_implementations.audio_driven_effects import (
-    apply_pulse_on_beat_effect,
-    apply_section_theme_from_audio_effect
-)
\ No newline at end of file
+# Effect functions re-exported from their modules, imported when first accessed
+_LAZY_EXPORTS = {
+    # common effects
+    "apply_solid_color_effect": "common_effects",
+    "apply_fade_effect": "common_effects",
+    "apply_strobe_effect": "common_effects",
+    "apply_snap_on_flash_off_effect": "common_effects",
+    # audio-driven effects
+    "apply_pulse_on_beat_effect": "audio_driven_effects",
+    "apply_section_theme_from_audio_effect": "audio_driven_effects",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(f"{__name__}.{_LAZY_EXPORTS[name]}")
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -11,17 +11,26 @@ from typing import Dict, List, Tuple, Optional, Any
 import ast
 import re
 
+import numpy as np
+
 # Import color utilities
 from roocode_sequence_designer_tools.tool_utils.color_parser import parse_color
 from roocode_sequence_designer_tools.tool_utils.color_utils_core import rgb_to_hsv, hsv_to_rgb
+from roocode_sequence_designer_tools.tool_utils.section_index import SectionIndex
+from roocode_sequence_designer_tools.tool_utils.analysis_index import (
+    BEAT_SOURCE_KEYS, AnalysisIndex, beat_array, beat_times_of
+)
+from roocode_sequence_designer_tools.effect_implementations.registry import register_effect
 
 
+@register_effect("pulse_on_beat", features=["beats"], vectorized=True)
 def apply_pulse_on_beat_effect(
     effect_start_sec: float,
     effect_end_sec: float,
     params: Dict[str, Any],
     metadata: Dict[str, Any],
-    audio_analysis_data: Optional[Dict] = None
+    audio_analysis_data: Optional[Dict] = None,
+    analysis_index: Optional[AnalysisIndex] = None
 ) -> List[Tuple[float, float, Tuple[int, int, int], int]]:
     """
     Apply a pulse-on-beat effect that creates color pulses aligned with audio beats.
@@ -37,7 +46,9 @@ def apply_pulse_on_beat_effect(
                   Can be 'all_beats', 'downbeats', or 'custom_times: [t1, t2, ...]'
         metadata: The metadata section from the .seqdesign.json file
                  Expected to contain 'default_pixels' key
-        audio_analysis_data: Audio analysis data containing beat times
+        audio_analysis_data: Audio analysis data containing "beats" and "downbeats"
+        analysis_index: The compile's AnalysisIndex of audio_analysis_data, holding the
+                 beat arrays. Built from audio_analysis_data if not given.
     
     Returns:
         A list of segment tuples: [(start_sec, end_sec, color_rgb_tuple, pixels_int), ...]
@@ -74,13 +85,16 @@ def apply_pulse_on_beat_effect(
     # Get beat source
     beat_source = params.get('beat_source', 'all_beats')
     
-    # Retrieve beat times based on the specified source
+    # Retrieve beat times based on the specified source, as an array with a sorted flag
+    indexed_beats = None
     beat_times = []
     
-    if beat_source == 'all_beats':
-        beat_times = audio_analysis_data.get('beat_times', [])
-    elif beat_source == 'downbeats':
-        beat_times = audio_analysis_data.get('downbeat_times', [])
+    # The analyzer's "beats"/"downbeats", or "beat_times"/"downbeat_times" of older analysis files
+    if beat_source in BEAT_SOURCE_KEYS:
+        if analysis_index is not None:
+            indexed_beats = analysis_index.beats(beat_source)
+        else:
+            beat_times = beat_times_of(audio_analysis_data, beat_source)
     elif beat_source.startswith('custom_times:'):
         # Extract the custom times from the string
         try:
@@ -103,8 +117,11 @@ def apply_pulse_on_beat_effect(
     else:
         print(f"Unknown beat_source '{beat_source}'. Using empty beat times.")
     
+    if indexed_beats is None and len(beat_times):
+        indexed_beats = beat_array(beat_times)
+    
     # Check if we have any beat times
-    if not beat_times:
+    if indexed_beats is None or not len(indexed_beats[0]):
         print(f"No beats found for source '{beat_source}'.")
         return segments
     
@@ -115,33 +132,90 @@ def apply_pulse_on_beat_effect(
     
     pixels = metadata['default_pixels']
     
-    # Create segments for each beat
-    for beat_t in beat_times:
-        pulse_s = beat_t
-        pulse_e = beat_t + pulse_duration_seconds
-        
-        # Only consider pulses that are at least partially within the effect's time window
-        if pulse_e > effect_start_sec and pulse_s < effect_end_sec:
-            # Clamp the pulse segment to the effect's boundaries
-            actual_pulse_s = max(pulse_s, effect_start_sec)
-            actual_pulse_e = min(pulse_e, effect_end_sec)
-            
-            # Only add the segment if it has a positive duration after clamping
-            if actual_pulse_e > actual_pulse_s:
-                segments.append((actual_pulse_s, actual_pulse_e, pulse_rgb, pixels))
+    # Select the beats whose pulse overlaps the effect's time window
+    beats, beats_sorted = indexed_beats
+    if beats_sorted:
+        # Binary search the window instead of scanning every beat of the song
+        lo, hi = _pulse_window(beats, pulse_duration_seconds, effect_start_sec, effect_end_sec)
+        pulse_s = beats[lo:hi]
+    else:
+        pulse_s = beats[(beats + pulse_duration_seconds > effect_start_sec) & (beats < effect_end_sec)]
+    
+    # Clamp the pulses to the effect's boundaries, keeping those with a positive duration
+    actual_pulse_s = np.maximum(pulse_s, effect_start_sec)
+    actual_pulse_e = np.minimum(pulse_s + pulse_duration_seconds, effect_end_sec)
+    keep = actual_pulse_e > actual_pulse_s
+    actual_pulse_s = actual_pulse_s[keep]
+    actual_pulse_e = actual_pulse_e[keep]
+    
+    # Sort segments by start time (sorted beats give sorted starts already)
+    if not beats_sorted:
+        order = np.argsort(actual_pulse_s, kind='stable')
+        actual_pulse_s = actual_pulse_s[order]
+        actual_pulse_e = actual_pulse_e[order]
     
-    # Sort segments by start time
-    segments.sort(key=lambda x: x[0])
+    segments = [(start, end, pulse_rgb, pixels)
+                for start, end in zip(actual_pulse_s.tolist(), actual_pulse_e.tolist())]
     
     return segments
 
 
+def _pulse_window(beats: np.ndarray, pulse_duration_seconds: float, effect_start_sec: float,
+                  effect_end_sec: float) -> Tuple[int, int]:
+    """
+    Index range [lo, hi) of the sorted beats with beat + pulse_duration_seconds > effect_start_sec
+    and beat < effect_end_sec, using the same float comparisons as checking each beat.
+    """
+    hi = int(np.searchsorted(beats, effect_end_sec, side='left'))
+    # beat + duration can round differently from effect_start_sec - duration, so the
+    # binary search result is corrected against the exact condition at the boundary
+    lo = int(np.searchsorted(beats, effect_start_sec - pulse_duration_seconds, side='right'))
+    while lo > 0 and beats[lo - 1] + pulse_duration_seconds > effect_start_sec:
+        lo -= 1
+    while lo < len(beats) and not beats[lo] + pulse_duration_seconds > effect_start_sec:
+        lo += 1
+    return lo, max(lo, hi)
+
+
+# Theme energy mappings applied by apply_section_theme_from_audio_effect
+ENERGY_MAPPINGS = ("none", "brightness", "saturation", "alpha")
+
+
+def _energy_mapped_color(base_rgb: Tuple[int, int, int], energy_mapping: str, energy_level: float,
+                         energy_factor: float = 1.0) -> Tuple[int, int, int]:
+    """
+    Modulate a theme color by an energy level, as expand_section_theme_energy_pattern does.
+    
+    Args:
+        base_rgb: Theme base color
+        energy_mapping: One of ENERGY_MAPPINGS
+        energy_level: Energy, clamped to 0-1
+        energy_factor: Modulation depth. 1.0 scales from black (or grey) at 0 energy
+            to the base color at full energy; smaller values dampen, larger amplify
+    
+    Returns:
+        The modulated RGB color
+    """
+    level = max(0.0, min(1.0, energy_level))
+    scale = 1 - energy_factor * (1 - level) if energy_factor <= 1 else level * energy_factor
+    if energy_mapping == "alpha":
+        return tuple(max(0, min(255, int(channel * scale))) for channel in base_rgb)
+    h, s, v = rgb_to_hsv(base_rgb)
+    if energy_mapping == "brightness":
+        v = max(0.0, min(1.0, v * scale))
+    elif energy_mapping == "saturation":
+        s = max(0.0, min(1.0, s * scale))
+    return tuple(hsv_to_rgb((h, s, v)))
+
+
+@register_effect("apply_section_theme_from_audio", features=["sections", "energy"])
 def apply_section_theme_from_audio_effect(
     effect_start_sec: float,
     effect_end_sec: float,
     params: Dict[str, Any],
     metadata: Dict[str, Any],
-    audio_analysis_data: Optional[Dict] = None
+    audio_analysis_data: Optional[Dict] = None,
+    analysis_index: Optional[AnalysisIndex] = None
 ) -> List[Tuple[float, float, Tuple[int, int, int], int]]:
     """
     Apply a section-theme effect that assigns different color themes based on audio sections.
@@ -152,11 +226,15 @@ def apply_section_theme_from_audio_effect(
         params: Dictionary of parameters for this effect instance
                 Expected to contain:
                 - 'section_themes': List of theme definitions like
-                  {"section_label": "Intro", "base_color": {...}, "energy_mapping": "brightness/saturation/none"}
+                  {"section_label": "Intro", "base_color": {...}, "energy_mapping": "brightness/saturation/alpha/none",
+                   "energy_factor": 1.0}. A mapping modulates the base color by the section's mean
+                  energy (from the section index's per-section statistics) relative to the song's peak.
                 - 'default_color_theme': Default color theme to use for sections without a specific theme
         metadata: The metadata section from the .seqdesign.json file
                  Expected to contain 'default_pixels' key
         audio_analysis_data: Audio analysis data containing section information
+        analysis_index: The compile's AnalysisIndex of audio_analysis_data, holding the
+                 section index. Built from audio_analysis_data if not given.
     
     Returns:
         A list of segment tuples: [(start_sec, end_sec, color_rgb_tuple, pixels_int), ...]
@@ -177,8 +255,12 @@ def apply_section_theme_from_audio_effect(
         print("Cannot apply section_theme: Audio section data is missing.")
         return segments
     
-    # Get audio sections
+    # Get audio sections, indexed once per compile
     audio_sections = audio_analysis_data['sections']
+    if analysis_index is not None and analysis_index.section_index is not None:
+        section_index = analysis_index.section_index
+    else:
+        section_index = SectionIndex.from_analysis(audio_analysis_data)
     
     # Parse section themes parameter
     section_themes_param = params.get('section_themes', [])
@@ -202,9 +284,15 @@ def apply_section_theme_from_audio_effect(
         
         try:
             base_color_rgb = parse_color(base_color_input)
+            energy_mapping = theme_def.get('energy_mapping', 'none').lower()
+            if energy_mapping not in ENERGY_MAPPINGS:
+                print(f"Warning: Unknown energy mapping '{energy_mapping}' for section theme '{label}'. "
+                      f"Using base color.")
+                energy_mapping = 'none'
             parsed_themes[label] = {
                 'base_color_rgb': base_color_rgb,
-                'energy_mapping': theme_def.get('energy_mapping', 'none').lower()
+                'energy_mapping': energy_mapping,
+                'energy_factor': float(theme_def.get('energy_factor', 1.0))
             }
         except ValueError as e:
             print(f"Warning: Could not parse color for section theme '{label}': {e}")
@@ -216,23 +304,15 @@ def apply_section_theme_from_audio_effect(
     
     pixels = metadata['default_pixels']
     
-    # Create segments for each audio section
-    for audio_section in audio_sections:
+    # Create segments for each audio section overlapping the effect's time window (sections
+    # with missing data are not indexed), ordered by segment start time
+    for position in section_index.overlapping_sections(effect_start_sec, effect_end_sec):
+        audio_section = audio_sections[position]
         section_label = audio_section.get('label')
-        section_start_time = audio_section.get('start')
-        section_end_time = audio_section.get('end')
-        
-        # Skip sections with missing data
-        if section_label is None or section_start_time is None or section_end_time is None:
-            continue
         
         # Determine the actual start and end for this segment within the effect's time window
-        seg_start_sec = max(effect_start_sec, section_start_time)
-        seg_end_sec = min(effect_end_sec, section_end_time)
-        
-        # Skip if no overlap or zero duration
-        if seg_end_sec <= seg_start_sec:
-            continue
+        seg_start_sec = max(effect_start_sec, audio_section.get('start'))
+        seg_end_sec = min(effect_end_sec, audio_section.get('end'))
         
         # Retrieve the theme for this section_label
         current_theme = parsed_themes.get(section_label, {
@@ -240,18 +320,17 @@ def apply_section_theme_from_audio_effect(
             'energy_mapping': 'none'
         })
         
-        base_rgb = current_theme['base_color_rgb']
+        color_rgb = current_theme['base_color_rgb']
         energy_map_type = current_theme['energy_mapping']
         
-        # For now, we'll implement a simplified version without complex energy mapping
-        if energy_map_type != 'none':
-            print(f"Warning: Energy mapping type '{energy_map_type}' for section '{section_label}' is not fully implemented yet. Using base color.")
+        # Modulate by the section's mean energy relative to the song's peak; sections
+        # without energy points keep the base color
+        if energy_map_type != 'none' and section_index.energy_count[position] and section_index.energy_peak:
+            energy_level = section_index.energy_mean[position] / section_index.energy_peak
+            color_rgb = _energy_mapped_color(color_rgb, energy_map_type, energy_level,
+                                             current_theme['energy_factor'])
         
-        # Add segment with the base color for this section
-        segments.append((seg_start_sec, seg_end_sec, base_rgb, pixels))
-    
-    # Sort segments by start time
-    segments.sort(key=lambda x: x[0])
+        segments.append((seg_start_sec, seg_end_sec, color_rgb, pixels))
     
     return segments
 
@@ -265,8 +344,8 @@ if __name__ == "__main__":
     
     # Example audio analysis data
     example_audio_data = {
-        "beat_times": [1.0, 2.0, 3.0, 4.0, 5.0],
-        "downbeat_times": [1.0, 3.0, 5.0],
+        "beats": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "downbeats": [1.0, 3.0, 5.0],
         "sections": [
             {"label": "Intro", "start": 0.0, "end": 2.5},
             {"label": "Verse", "start": 2.5, "end": 5.0}
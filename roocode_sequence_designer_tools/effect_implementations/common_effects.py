@@ -10,10 +10,14 @@ This module provides implementations for common lighting effects:
 
 from typing import Dict, List, Tuple, Optional, Any
 
+import numpy as np
+
 # Import color utilities
-from roocode_sequence_designer_tools.tool_utils.color_parser import parse_color, interpolate_color
+from roocode_sequence_designer_tools.tool_utils.color_parser import parse_color
+from roocode_sequence_designer_tools.effect_implementations.registry import register_effect
 
 
+@register_effect("solid_color", aliases=["solidcolor"])
 def apply_solid_color_effect(
     effect_start_sec: float,
     effect_end_sec: float,
@@ -59,6 +63,7 @@ def apply_solid_color_effect(
     return [(effect_start_sec, effect_end_sec, color_rgb, pixels)]
 
 
+@register_effect("fade")
 def apply_fade_effect(
     effect_start_sec: float,
     effect_end_sec: float,
@@ -121,6 +126,7 @@ def apply_fade_effect(
     return [(effect_start_sec, effect_end_sec, (color_start_rgb, color_end_rgb), pixels, "fade")]
 
 
+@register_effect("strobe", vectorized=True)
 def apply_strobe_effect(
     effect_start_sec: float,
     effect_end_sec: float,
@@ -218,30 +224,32 @@ def apply_strobe_effect(
     
     pixels = metadata['default_pixels']
     
-    # Generate the strobe segments
-    current_time = effect_start_sec
-    
-    while current_time < effect_end_sec:
-        # On segment
-        on_s = current_time
-        on_e = min(current_time + on_duration_seconds, effect_end_sec)
-        
-        if on_e > on_s:
-            segments.append((on_s, on_e, color_on_rgb, pixels))
-        
-        current_time = on_e
-        
-        if current_time >= effect_end_sec:
+    # Generate the strobe segment boundaries: alternating on and off durations added
+    # one after the other from the effect start (np.add.accumulate adds sequentially,
+    # so the times are the same as stepping through the segments one by one)
+    num_steps = int(effect_duration / cycle_duration_sec) * 2 + 4
+    while True:
+        steps = np.empty(num_steps + 1)
+        steps[0] = effect_start_sec
+        steps[1::2] = on_duration_seconds
+        steps[2::2] = off_duration_seconds
+        boundaries = np.add.accumulate(steps)
+        if boundaries[-1] >= effect_end_sec:
             break
-        
-        # Off segment
-        off_s = current_time
-        off_e = min(current_time + off_duration_seconds, effect_end_sec)
-        
-        if off_e > off_s:
-            segments.append((off_s, off_e, color_off_rgb, pixels))
-        
-        current_time = off_e
+        if boundaries[-1] <= boundaries[-3]:
+            print(f"Warning: Strobe durations too short to advance the time at {effect_start_sec}s")
+            return segments
+        num_steps *= 2
+    
+    # Segments run until the first boundary at or after the effect end, which is clamped to it
+    num_segments = int(np.argmax(boundaries[1:] >= effect_end_sec)) + 1
+    segment_starts = boundaries[:num_segments]
+    segment_ends = np.minimum(boundaries[1:num_segments + 1], effect_end_sec)
+    
+    colors = (color_on_rgb, color_off_rgb)
+    for index, (segment_start, segment_end) in enumerate(zip(segment_starts.tolist(), segment_ends.tolist())):
+        if segment_end > segment_start:
+            segments.append((segment_start, segment_end, colors[index % 2], pixels))
     
     return segments
 
@@ -287,6 +295,7 @@ if __name__ == "__main__":
         print(f"  Segment {i}: {segment}")
 
 
+@register_effect("snap_on_flash_off", vectorized=True)
 def apply_snap_on_flash_off_effect(
     effect_start_sec: float,
     effect_end_sec: float,
@@ -376,24 +385,22 @@ def apply_snap_on_flash_off_effect(
         # Calculate the duration of each step
         step_duration = fade_out_duration / num_steps
         
-        # Generate the segments for the fade
-        for i in range(num_steps):
-            # Calculate the start and end time for this segment
-            segment_start = fade_start_sec + (i * step_duration)
-            
-            # Ensure the last segment ends exactly at effect_end_sec
-            if i == num_steps - 1:
-                segment_end = effect_end_sec
-            else:
-                segment_end = fade_start_sec + ((i + 1) * step_duration)
-            
-            # Calculate the interpolation factor for this step
-            factor = i / (num_steps - 1) if num_steps > 1 else 0
-            
-            # Interpolate the color for this step
-            color_rgb = interpolate_color(target_color_rgb, post_base_color_rgb, factor)
-            
-            # Add the segment to the list
-            segments.append((segment_start, segment_end, color_rgb, pixels))
+        # Generate the segments for the fade: step i runs from fade_start_sec + i * step_duration
+        steps = np.arange(num_steps + 1)
+        boundaries = fade_start_sec + steps * step_duration
+        
+        # Ensure the last segment ends exactly at effect_end_sec
+        boundaries[-1] = effect_end_sec
+        
+        # Interpolate the color of every step at once, rounding and clamping like interpolate_color
+        factors = steps[:num_steps] / (num_steps - 1)
+        colors = np.rint(np.outer(1 - factors, target_color_rgb) + np.outer(factors, post_base_color_rgb))
+        colors = np.clip(colors, 0, 255).astype(int)
+        
+        segments.extend(
+            (segment_start, segment_end, tuple(color_rgb), pixels)
+            for segment_start, segment_end, color_rgb in zip(boundaries[:-1].tolist(), boundaries[1:].tolist(),
+                                                             colors.tolist())
+        )
     
     return segments
\ No newline at end of file
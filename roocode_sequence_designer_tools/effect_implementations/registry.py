@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Effect Registry Module for Roocode Sequence Designer Tools
+
+Effect implementations register themselves with the @register_effect decorator,
+declaring the effect type name, its aliases, the audio analysis features it reads
+(see AudioAnalyzer ANALYSIS_FEATURES) and whether it is vectorized (renders long
+effects with NumPy batch operations instead of a Python loop per segment).
+
+Effect modules are imported lazily. The first lookup of an unregistered effect
+type builds an index of effect type -> module without importing anything:
+- the modules of this package are scanned by parsing their source for
+  @register_effect decorators, and
+- other installed packages can add effects through the
+  "roocode_sequence_designer.effects" entry point group, where the entry point
+  name is the effect type and the value the module (or module:function) that
+  registers it.
+Only the module that defines a requested effect type is then imported, so a
+compile imports only the effect implementations its design uses.
+"""
+
+import ast
+import importlib
+import inspect
+import os
+import pkgutil
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ENTRY_POINT_GROUP = "roocode_sequence_designer.effects"
+
+# Registered effects by lowercase name and alias
+_EFFECTS: Dict[str, "EffectSpec"] = {}
+
+# Effect type -> module name of this package, and effect type -> plugin entry point;
+# each built on first use
+_PACKAGE_INDEX: Optional[Dict[str, str]] = None
+_PLUGIN_INDEX: Optional[Dict[str, Any]] = None
+
+
+class EffectSpec:
+    """
+    A registered effect implementation.
+
+    The function is called as function(effect_start_sec, effect_end_sec, params,
+    metadata, audio_analysis_data) and returns a list of segment tuples. Functions
+    with an analysis_index parameter also receive the compile's AnalysisIndex
+    (see tool_utils.analysis_index) as analysis_index=.
+    """
+
+    def __init__(self, name: str, function: Callable[..., List[Tuple]], aliases: Tuple[str, ...] = (),
+                 features: Tuple[str, ...] = (), vectorized: bool = False):
+        self.name = name
+        self.function = function
+        self.aliases = aliases
+        self.features = features
+        self.vectorized = vectorized
+        self.accepts_analysis_index = "analysis_index" in inspect.signature(function).parameters
+
+    @property
+    def module(self) -> str:
+        """Name of the module defining the effect."""
+        return self.function.__module__
+
+    def __repr__(self) -> str:
+        return (f"EffectSpec({self.name!r}, aliases={self.aliases!r}, features={self.features!r}, "
+                f"vectorized={self.vectorized!r}, module={self.module!r})")
+
+
+def register_effect(name: str, aliases: Iterable[str] = (), features: Iterable[str] = (),
+                    vectorized: bool = False) -> Callable[[Callable], Callable]:
+    """
+    Decorator registering an effect implementation function.
+
+    The name and aliases must be string literals (and the aliases a literal list or
+    tuple), because the package scan reads them from the source without importing it.
+
+    Args:
+        name: Effect type as used in .seqdesign.json files; matched case-insensitively
+        aliases: Other accepted spellings of the effect type
+        features: Audio analysis features the effect reads, e.g. ["beats"]
+        vectorized: The implementation renders its segments with batch array operations
+
+    Returns:
+        The decorator, which returns the function unchanged.
+
+    Raises:
+        ValueError: If the name or an alias is already registered by another function
+    """
+    def decorator(function: Callable) -> Callable:
+        spec = EffectSpec(name.lower(), function, tuple(alias.lower() for alias in aliases),
+                          tuple(features), vectorized)
+        for effect_type in (spec.name,) + spec.aliases:
+            existing = _EFFECTS.get(effect_type)
+            # Re-registering the same function (e.g. after a module reload) replaces it
+            if existing is not None and (existing.module, existing.function.__qualname__) != \
+                    (spec.module, function.__qualname__):
+                raise ValueError(f"Effect type '{effect_type}' is already registered by "
+                                 f"{existing.module}.{existing.function.__qualname__}")
+        for effect_type in (spec.name,) + spec.aliases:
+            _EFFECTS[effect_type] = spec
+        return function
+    return decorator
+
+
+def _decorator_effect_types(decorator: ast.expr) -> List[str]:
+    """The effect type and aliases of a @register_effect(...) decorator node, or [] for other decorators."""
+    if not isinstance(decorator, ast.Call):
+        return []
+    func = decorator.func
+    func_name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+    if func_name != "register_effect" or not decorator.args:
+        return []
+    try:
+        effect_types = [ast.literal_eval(decorator.args[0])]
+        for keyword in decorator.keywords:
+            if keyword.arg == "aliases":
+                effect_types.extend(ast.literal_eval(keyword.value))
+    except ValueError:
+        return []
+    return [effect_type.lower() for effect_type in effect_types if isinstance(effect_type, str)]
+
+
+def _scan_package() -> Dict[str, str]:
+    """Map the effect types registered in this package's modules to their module names, without importing them."""
+    index = {}
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for module_info in pkgutil.iter_modules([package_dir]):
+        if module_info.ispkg or module_info.name == "registry":
+            continue
+        try:
+            with open(os.path.join(package_dir, f"{module_info.name}.py"), 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            print(f"Warning: Could not scan effect module '{module_info.name}': {e}")
+            continue
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for decorator in node.decorator_list:
+                    for effect_type in _decorator_effect_types(decorator):
+                        index.setdefault(effect_type, f"{__package__}.{module_info.name}")
+    return index
+
+
+def _scan_entry_points() -> Dict[str, Any]:
+    """Map the effect types of the installed ENTRY_POINT_GROUP entry points to the entry points."""
+    # Imported here: reading the installed distributions is only needed for effect
+    # types this package does not define
+    from importlib.metadata import entry_points
+    try:
+        plugins = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10: entry_points() returns a dict of groups
+        plugins = entry_points().get(ENTRY_POINT_GROUP, [])
+    return {entry_point.name.lower(): entry_point for entry_point in plugins}
+
+
+def _find_source(effect_type: str) -> Any:
+    """
+    The module name or entry point defining an effect type, or None.
+
+    Effects shipped with this package take precedence over plugins, and the
+    installed entry points are only read for types the package does not define.
+    """
+    global _PACKAGE_INDEX, _PLUGIN_INDEX
+    if _PACKAGE_INDEX is None:
+        _PACKAGE_INDEX = _scan_package()
+    if effect_type in _PACKAGE_INDEX:
+        return _PACKAGE_INDEX[effect_type]
+    if _PLUGIN_INDEX is None:
+        _PLUGIN_INDEX = _scan_entry_points()
+    return _PLUGIN_INDEX.get(effect_type)
+
+
+def _all_effect_types() -> List[str]:
+    """Every effect type in the package and plugin indexes."""
+    _find_source("")
+    return list(_PACKAGE_INDEX) + [effect_type for effect_type in _PLUGIN_INDEX
+                                   if effect_type not in _PACKAGE_INDEX]
+
+
+def get_effect(effect_type: str) -> Optional[EffectSpec]:
+    """
+    Look up an effect type, importing the module that defines it if necessary.
+
+    Args:
+        effect_type: Effect type or alias, matched case-insensitively
+
+    Returns:
+        The EffectSpec, or None for an unknown effect type
+    """
+    effect_type = effect_type.lower()
+    spec = _EFFECTS.get(effect_type)
+    if spec is None:
+        source = _find_source(effect_type)
+        if source is None:
+            return None
+        try:
+            if isinstance(source, str):
+                importlib.import_module(source)
+            else:
+                source.load()
+        except Exception as e:
+            print(f"Warning: Could not load the implementation of effect type '{effect_type}': {e}")
+            return None
+        spec = _EFFECTS.get(effect_type)
+    return spec
+
+
+def available_effects() -> List[EffectSpec]:
+    """
+    All known effects, importing every effect module.
+
+    Returns:
+        List[EffectSpec]: One spec per effect (aliases not repeated), sorted by name
+    """
+    for effect_type in _all_effect_types():
+        get_effect(effect_type)
+    specs = {spec.name: spec for spec in _EFFECTS.values()}
+    return [specs[name] for name in sorted(specs)]
+
+
+def required_features(effect_types: Iterable[str]) -> List[str]:
+    """
+    Collect the audio analysis features declared by a sequence of effect types.
+
+    Args:
+        effect_types: Effect types; unknown types are ignored
+
+    Returns:
+        List[str]: Feature names in first-use order
+    """
+    features = []
+    for effect_type in effect_types:
+        spec = get_effect(effect_type)
+        if spec is not None:
+            for feature in spec.features:
+                if feature not in features:
+                    features.append(feature)
+    return features
@@ -14,10 +14,13 @@ import json
 import argparse
 import os
 import sys
+import time
 from typing import Dict, Any, List, Tuple, Optional, Union
 # rgb_to_hsv and hsv_to_rgb are now exposed by tool_utils.__init__ from color_utils_core
 from .tool_utils import rgb_to_hsv, hsv_to_rgb
 from .tool_utils.color_parser import parse_color
+from .tool_utils.compile_profiler import CompileProfiler
+from .tool_utils.section_index import SectionIndex
 
 def load_synced_lyrics(lyrics_file_path: str) -> Dict[str, Any]:
     """
@@ -351,26 +354,19 @@ def expand_section_theme_energy_pattern(pattern_config: Dict[str, Any], audio_an
         return effects
 
     sections = audio_analysis_data.get("sections")
-    energy_timeseries = audio_analysis_data.get("energy") # Expected: list of [time, value] or {'time': t, 'value': v}
 
     if not sections:
         print(f"Error ({pattern_id}): 'sections' not found in audio analysis data.")
         return effects
+
+    # Sections by label and the energy points sorted by time, indexed once for the pattern.
+    # Energy is read from "energy" (list of [time, value] or {'time': t, 'value': v}) or "energy_timeseries".
+    section_index = SectionIndex.from_analysis(audio_analysis_data)
+    energy_timeseries = section_index.energy_points
     if not energy_timeseries:
         print(f"Error ({pattern_id}): 'energy' timeseries not found in audio analysis data.")
         return effects
 
-    # Ensure energy_timeseries is a list of (time, value) tuples
-    if energy_timeseries and isinstance(energy_timeseries[0], dict):
-        energy_timeseries = [(e['time'], e['value']) for e in energy_timeseries]
-    
-    energy_timeseries.sort(key=lambda x: x[0])
-
-
-    # Create a lookup for faster energy searching
-    # For simplicity, we iterate; for performance, a more complex structure (e.g. KD-tree or interval tree) or bisect could be used.
-    # Given typical energy data density, iterating relevant sub-segments should be acceptable.
-
     all_themed_intervals = [] # To track intervals covered by themes
 
     for theme_idx, theme_def in enumerate(themes_definition):
@@ -389,7 +385,7 @@ def expand_section_theme_energy_pattern(pattern_config: Dict[str, Any], audio_an
             print(f"Warning ({pattern_id}): Invalid base_color for theme '{section_label}': {e}. Skipping theme.")
             continue
 
-        matched_sections = [s for s in sections if s.get("label") == section_label]
+        matched_sections = [sections[position] for position in section_index.sections_with_label(section_label)]
 
         for section in matched_sections:
             section_start = section.get("start")
@@ -401,8 +397,8 @@ def expand_section_theme_energy_pattern(pattern_config: Dict[str, Any], audio_an
             
             all_themed_intervals.append((section_start, section_end))
 
-            # Filter energy points within this section
-            relevant_energy_points = [ep for ep in energy_timeseries if section_start <= ep[0] < section_end]
+            # Energy points within this section (binary search over the sorted times)
+            relevant_energy_points = section_index.energy_in(section_start, section_end)
             if not relevant_energy_points:
                 # If no energy points, apply base color for the whole section
                 effects.append({
@@ -532,7 +528,8 @@ def expand_section_theme_energy_pattern(pattern_config: Dict[str, Any], audio_an
 
     return effects
 
-def expand_pattern_templates(seqdesign_data: Dict[str, Any], lyrics_file_path: Optional[str] = None, audio_analysis_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def expand_pattern_templates(seqdesign_data: Dict[str, Any], lyrics_file_path: Optional[str] = None, audio_analysis_data: Optional[Dict[str, Any]] = None,
+                             profiler: Optional[CompileProfiler] = None) -> Dict[str, Any]:
     """
     Expand pattern templates in a seqdesign file into concrete effects.
     
@@ -540,6 +537,7 @@ def expand_pattern_templates(seqdesign_data: Dict[str, Any], lyrics_file_path: O
         seqdesign_data: The loaded seqdesign.json data
         lyrics_file_path: Optional path to synced lyrics file
         audio_analysis_data: Optional audio analysis data
+        profiler: Optional CompileProfiler recording the expansion time and effect count per pattern
         
     Returns:
         Modified seqdesign_data with patterns expanded into concrete effects
@@ -558,8 +556,10 @@ def expand_pattern_templates(seqdesign_data: Dict[str, Any], lyrics_file_path: O
     # Expand each pattern template
     new_effects = []
     
-    for pattern in pattern_templates:
+    for index, pattern in enumerate(pattern_templates):
         pattern_type = pattern.get("pattern_type")
+        effect_count = len(new_effects)
+        expand_start = time.perf_counter()
         
         if pattern_type == "WarningThenEvent":
             expanded_effects = expand_warning_then_event_pattern(pattern, lyrics_data)
@@ -579,6 +579,12 @@ def expand_pattern_templates(seqdesign_data: Dict[str, Any], lyrics_file_path: O
             
         else:
             print(f"Warning: Unknown pattern type '{pattern_type}'. Skipping.")
+            continue
+        
+        if profiler:
+            profiler.record_item(pattern.get("id", f"pattern_{index}"), pattern_type, expand_start,
+                                 time.perf_counter() - expand_start, len(new_effects) - effect_count,
+                                 category="pattern")
     
     # Add new effects to the effects_timeline
     if "effects_timeline" not in seqdesign_data:
@@ -610,6 +616,9 @@ def main():
     parser.add_argument("--audio-analysis", 
                         help="Path to audio analysis data file for beat-based patterns")
     
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the expansion time and number of effects of each pattern")
+    
     args = parser.parse_args()
     
     # Load input file
@@ -634,11 +643,15 @@ def main():
             print(f"Warning: Could not load audio analysis data: {str(e)}")
     
     # Expand pattern templates
+    profiler = CompileProfiler() if args.profile else None
     expanded_seqdesign_data = expand_pattern_templates(
         seqdesign_data, 
         args.lyrics_file, 
-        audio_analysis_data
+        audio_analysis_data,
+        profiler
     )
+    if profiler:
+        print(profiler.format_table(limit=None))
     
     # Write output file
     try:
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for the columnar analysis cache format.
+
+This script checks that analysis_store round-trips cache documents exactly, reads
+JSON caches written by earlier versions, and that AudioAnalyzer uses it for its
+full and per-feature caches.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from roocode_sequence_designer_tools.tool_utils import analysis_store
+from roocode_sequence_designer_tools.tool_utils.analysis_store import (
+    columnar_path, find_document, load_document, remove_document, save_document
+)
+
+
+def _analysis_document(frames=200):
+    rng = np.random.default_rng(1)
+    times = (np.arange(frames) * 512 / 22050).tolist()
+    return {
+        "metadata": {"audio_file_path": "/music/song.wav", "file_hash": "abc", "analysis_params": {}},
+        "analysis_data": {
+            "song_title": "song.wav",
+            "duration_seconds": 4.6,
+            "beats": [0.5, 1.0, 1.5],
+            "sections": [{"label": "Intro", "start": 0.0, "end": 2.0}],
+            "energy_timeseries": {
+                "times": times,
+                "values": [float(v) for v in rng.random(frames).astype(np.float32)]
+            },
+            "chroma_features": {
+                "times": times,
+                "values": [[float(v) for v in rng.random(frames).astype(np.float32)] for _ in range(12)]
+            }
+        }
+    }
+
+
+class TestAnalysisStore(unittest.TestCase):
+    """Test cases for saving and loading cache documents."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.temp_dir, "abc_analysis.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip_is_exact(self):
+        document = _analysis_document()
+        manifest_path = save_document(self.json_path, document)
+        self.assertEqual(manifest_path, columnar_path(self.json_path))
+        self.assertEqual(find_document(self.json_path), manifest_path)
+        self.assertEqual(load_document(manifest_path), document)
+
+    def test_long_float_lists_are_stored_as_columns(self):
+        document = _analysis_document()
+        manifest_path = save_document(self.json_path, document)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        dtypes = [column["dtype"] for column in manifest["columns"]]
+        # Times need float64; the float32 librosa values are stored as float32
+        self.assertEqual(dtypes, ["<f8", "<f4", "<f8", "<f4"])
+        self.assertEqual(manifest["columns"][3]["shape"], [12, 200])
+        # Short lists and non-float data stay in the manifest
+        self.assertEqual(manifest["document"]["analysis_data"]["beats"], [0.5, 1.0, 1.5])
+        self.assertLess(os.path.getsize(manifest_path), 2000)
+
+    def test_as_arrays_returns_memory_mapped_columns(self):
+        document = _analysis_document()
+        save_document(self.json_path, document)
+        loaded = load_document(find_document(self.json_path), as_arrays=True)
+        values = loaded["analysis_data"]["energy_timeseries"]["values"]
+        self.assertIsInstance(values, np.memmap)
+        self.assertFalse(values.flags.writeable)
+        self.assertEqual(values.tolist(), document["analysis_data"]["energy_timeseries"]["values"])
+
+    def test_legacy_json_cache_is_read_and_replaced(self):
+        document = _analysis_document()
+        with open(self.json_path, 'w') as f:
+            json.dump(document, f, indent=2)
+        self.assertEqual(find_document(self.json_path), analysis_store.Path(self.json_path))
+        self.assertEqual(load_document(self.json_path), document)
+
+        save_document(self.json_path, document)
+        self.assertFalse(os.path.exists(self.json_path))
+        self.assertEqual(load_document(find_document(self.json_path)), document)
+
+    def test_truncated_column_data_is_rejected(self):
+        manifest_path = save_document(self.json_path, _analysis_document())
+        data_path = os.path.join(self.temp_dir, "abc_analysis.columns.bin")
+        with open(data_path, 'r+b') as f:
+            f.truncate(100)
+        with self.assertRaises(ValueError):
+            load_document(manifest_path)
+
+    def test_remove_document(self):
+        save_document(self.json_path, _analysis_document())
+        self.assertEqual(remove_document(self.json_path), 1)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+        self.assertIsNone(find_document(self.json_path))
+        self.assertEqual(remove_document(self.json_path), 0)
+
+
+class TestAnalyzerCache(unittest.TestCase):
+    """Test cases for AudioAnalyzer's use of the columnar cache."""
+
+    @classmethod
+    def setUpClass(cls):
+        import soundfile as sf
+
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.audio_path = os.path.join(cls.temp_dir, "tone.wav")
+        sample_rate = 22050
+        audio = 0.1 * np.sin(2 * np.pi * 330 * np.arange(sample_rate * 8) / sample_rate)
+        sf.write(cls.audio_path, audio.astype(np.float32), sample_rate)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self):
+        from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
+
+        self.AudioAnalyzer = AudioAnalyzer
+        self.cache_dir = tempfile.mkdtemp(dir=self.temp_dir)
+
+    def test_full_analysis_cache_hit_matches(self):
+        first = self.AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(self.audio_path)
+        self.assertTrue(any(name.endswith(analysis_store.DATA_SUFFIX) for name in os.listdir(self.cache_dir)))
+        with patch.object(self.AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            second = self.AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(self.audio_path)
+        self.assertEqual(first, second)
+
+    def test_legacy_json_analysis_cache_is_used(self):
+        analyzer = self.AudioAnalyzer(cache_dir=self.cache_dir)
+        analysis = analyzer.analyze_audio(self.audio_path, features=["energy"])
+        # Rewrite the full-analysis cache as an earlier version would have
+        file_hash = analyzer._calculate_file_hash(self.audio_path)
+        json_path = analyzer._get_analysis_path_for_audio(self.audio_path, file_hash, {})
+        with open(json_path, 'w') as f:
+            json.dump({"metadata": {"audio_file_path": self.audio_path, "file_hash": file_hash,
+                                    "file_mtime": os.path.getmtime(self.audio_path), "analysis_params": {}},
+                       "analysis_data": analysis}, f, indent=2)
+        with patch.object(self.AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            cached = self.AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(self.audio_path)
+        self.assertEqual(cached, analysis)
+
+    def test_clear_cache_removes_both_formats(self):
+        analyzer = self.AudioAnalyzer(cache_dir=self.cache_dir)
+        analyzer.analyze_audio(self.audio_path, features=["energy"])
+        with open(os.path.join(self.cache_dir, "old_analysis.json"), 'w') as f:
+            json.dump({}, f)
+        # Legacy JSON plus the manifests of the duration and energy features
+        self.assertEqual(analyzer.clear_cache(), 3)
+        # The file hash memo is kept
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name != "file_hashes.json"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
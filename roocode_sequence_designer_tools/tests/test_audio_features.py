@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for feature-selective audio analysis.
+
+This script checks that AudioAnalyzer.analyze_audio(features=[...]) computes and
+caches only the requested features, and that compile_seqdesign only imports the
+analyzer when a design needs audio.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import soundfile as sf
+
+from roocode_sequence_designer_tools.tool_utils import audio_analyzer_core
+from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
+from roocode_sequence_designer_tools.compile_seqdesign import required_audio_features
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestFeatureSelectiveAnalysis(unittest.TestCase):
+    """Test cases for analyze_audio(features=[...])."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.audio_path = os.path.join(cls.temp_dir, "clicks.wav")
+        # Noise clicks at 120 BPM over a quiet tone
+        sample_rate = 22050
+        rng = np.random.default_rng(0)
+        audio = 0.05 * np.sin(2 * np.pi * 220 * np.arange(sample_rate * 20) / sample_rate)
+        for beat in np.arange(0, 20, 0.5):
+            start = int(beat * sample_rate)
+            audio[start:start + 2000] += rng.standard_normal(2000) * np.exp(-np.arange(2000) / 300)
+        sf.write(cls.audio_path, audio.astype(np.float32), sample_rate)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        self.analyzer = AudioAnalyzer(cache_dir=self.cache_dir)
+
+    def test_beats_only_skips_section_segmentation(self):
+        with patch.object(audio_analyzer_core.librosa.segment, "agglomerative",
+                          side_effect=AssertionError("sections computed")):
+            analysis = self.analyzer.analyze_audio(self.audio_path, features=["beats"])
+        self.assertTrue(analysis["beats"])
+        self.assertIn("duration_seconds", analysis)
+        self.assertNotIn("sections", analysis)
+        self.assertNotIn("energy_timeseries", analysis)
+
+    def test_cached_features_do_not_reload_audio(self):
+        first = self.analyzer.analyze_audio(self.audio_path, features=["beats"])
+        self.assertEqual((self.analyzer.loaded_features, self.analyzer.computed_features), ([], ["duration", "beats"]))
+        with patch.object(AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            second = AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(self.audio_path, features=["beats"])
+        self.assertEqual(first, second)
+
+        # Only the missing feature is computed when more are requested later
+        with patch.object(audio_analyzer_core.librosa.beat, "beat_track",
+                          side_effect=AssertionError("beats recomputed")):
+            combined = self.analyzer.analyze_audio(self.audio_path, features=["beats", "energy"])
+        self.assertEqual(combined["beats"], first["beats"])
+        self.assertIn("energy_timeseries", combined)
+        self.assertEqual((self.analyzer.loaded_features, self.analyzer.computed_features),
+                         (["duration", "beats"], ["energy"]))
+
+    def test_features_match_full_analysis(self):
+        full = self.analyzer.analyze_audio(self.audio_path)
+        selected = AudioAnalyzer(cache_dir=tempfile.mkdtemp(dir=self.temp_dir)).analyze_audio(
+            self.audio_path, features=list(audio_analyzer_core.ANALYSIS_FEATURES))
+        self.assertEqual(selected, full)
+
+    def test_full_analysis_fills_feature_cache(self):
+        full = self.analyzer.analyze_audio(self.audio_path)
+        with patch.object(AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            beats = AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(self.audio_path, features=["beats"])
+        self.assertEqual(beats["beats"], full["beats"])
+
+    def test_full_analysis_cache_reports_loaded_features(self):
+        self.analyzer.analyze_audio(self.audio_path)
+        # Without the per-feature entries the full analysis document is used on its own
+        for name in os.listdir(self.cache_dir):
+            if "_feature_" in name:
+                os.remove(os.path.join(self.cache_dir, name))
+        analyzer = AudioAnalyzer(cache_dir=self.cache_dir)
+        with patch.object(AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            analyzer.analyze_audio(self.audio_path)
+        self.assertEqual(analyzer.loaded_features, list(audio_analyzer_core.ANALYSIS_FEATURES))
+        self.assertEqual(analyzer.computed_features, [])
+
+    def test_feature_cache_is_keyed_by_content(self):
+        first = self.analyzer.analyze_audio(self.audio_path, features=["beats"])
+        copy_path = os.path.join(self.cache_dir, "copy.wav")
+        shutil.copyfile(self.audio_path, copy_path)
+        with patch.object(AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio reloaded")):
+            copy = AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(copy_path, features=["beats"])
+        self.assertEqual(copy["beats"], first["beats"])
+        self.assertEqual(copy["song_title"], "copy.wav")
+
+    def test_feature_params_only_recompute_that_feature(self):
+        default = self.analyzer.analyze_audio(self.audio_path, features=["beats", "energy"])
+        params = {"feature_params": {"energy": {"hop_length": 1024}}}
+        with patch.object(audio_analyzer_core.librosa.beat, "beat_track",
+                          side_effect=AssertionError("beats recomputed")):
+            coarse = AudioAnalyzer(cache_dir=self.cache_dir).analyze_audio(
+                self.audio_path, analysis_params=params, features=["beats", "energy"])
+        self.assertEqual(coarse["beats"], default["beats"])
+        self.assertAlmostEqual(len(coarse["energy_timeseries"]["times"]),
+                               len(default["energy_timeseries"]["times"]) / 2, delta=1)
+
+    def test_unknown_feature_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_audio(self.audio_path, features=["mfcc_everything"])
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_audio(self.audio_path, features=["beats"],
+                                        analysis_params={"feature_params": {"beats": {"hop": 256}}})
+
+
+class TestCompilerAudioFeatures(unittest.TestCase):
+    """Test cases for how compile_seqdesign decides what to analyze."""
+
+    def test_required_features_follow_effect_types(self):
+        timeline = [
+            {"type": "solid_color"},
+            {"type": "Pulse_On_Beat"},
+            {"type": "pulse_on_beat"},
+            {"type": "apply_section_theme_from_audio"},
+        ]
+        self.assertEqual(required_audio_features(timeline), ["beats", "sections", "energy"])
+        self.assertEqual(required_audio_features([{"type": "strobe"}]), [])
+
+    def test_compiler_import_does_not_load_analyzer(self):
+        code = ("import sys, roocode_sequence_designer_tools.compile_seqdesign; "
+                "print(any(m in sys.modules for m in ('librosa', 'lyricsgenius', 'requests')))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the compile profiler.
+
+This script checks the per-effect and per-phase timings CompileProfiler collects
+from compile_effects_timeline and compile_design, and its table, JSON and Chrome
+trace output.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from roocode_sequence_designer_tools.compile_seqdesign import compile_design, compile_effects_timeline
+from roocode_sequence_designer_tools.pattern_templates import expand_pattern_templates
+from roocode_sequence_designer_tools.tool_utils.compile_profiler import CompileProfiler
+
+METADATA = {"target_prg_refresh_rate": 100, "default_pixels": 4, "default_base_rgb": (0, 0, 0)}
+
+EFFECTS = [
+    {"id": "red", "type": "solid_color", "timing": {"start_seconds": 0, "end_seconds": 5},
+     "params": {"color": {"name": "red"}}},
+    {"id": "strobe", "type": "strobe", "timing": {"start_seconds": 5, "end_seconds": 10},
+     "params": {"color_on": {"name": "white"}, "color_off": {"name": "black"}, "frequency_hz": 10}},
+    {"id": "mystery", "type": "no_such_effect", "timing": {"start_seconds": 0, "end_seconds": 1}, "params": {}}
+]
+
+
+class TestCompileProfiler(unittest.TestCase):
+    """Test cases for CompileProfiler."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_records_each_rendered_effect(self):
+        profiler = CompileProfiler()
+        final_segments, _ = compile_effects_timeline(EFFECTS, 10.0, METADATA, profiler=profiler)
+        unprofiled, _ = compile_effects_timeline(EFFECTS, 10.0, METADATA)
+
+        self.assertEqual(final_segments, unprofiled)
+        items = {item["id"]: item for item in profiler.items}
+        self.assertEqual(set(items), {"red", "strobe"})
+        self.assertEqual(items["red"]["items"], 1)
+        self.assertEqual(items["strobe"]["items"], 100)
+        self.assertEqual(items["strobe"]["type"], "strobe")
+        # Two events per effect: rendering and merging
+        self.assertEqual(len(profiler.to_chrome_trace()["traceEvents"]), 4)
+
+    def test_report_sorted_by_cost_with_phases(self):
+        profiler = CompileProfiler()
+        profiler.record_item("cheap", "fade", 0.0, 0.001, 1)
+        profiler.record_item("dear", "strobe", 0.0, 0.002, 50, merge_start=0.002, merge_seconds=0.003)
+        with profiler.phase("write"):
+            pass
+        with profiler.phase("write"):
+            pass
+
+        profile = profiler.to_dict()
+        self.assertEqual([item["id"] for item in profile["items"]], ["dear", "cheap"])
+        self.assertEqual(profile["item_count"], 51)
+        self.assertEqual(list(profile["phases"]), ["write"])
+        table = profiler.format_table(limit=1)
+        self.assertLess(table.index("dear"), table.index("... 1 more"))
+        self.assertIn("write", table)
+
+    def test_compile_design_writes_profile_files(self):
+        design_path = os.path.join(self.temp_dir, "show.seqdesign.json")
+        with open(design_path, 'w') as f:
+            json.dump({"metadata": {"target_prg_refresh_rate": 100, "default_pixels": 4,
+                                    "total_duration_seconds": 10},
+                       "effects_timeline": EFFECTS[:2]}, f)
+        args = argparse.Namespace(
+            input_seqdesign_json_path=design_path, output_prg_json_path=os.path.join(self.temp_dir, "show.prg.json"),
+            audio_dir=self.temp_dir, emit_prg=None, no_build_cache=True, print_json=False, push_to_gui=False,
+            smproj=None
+        )
+        profiler = CompileProfiler()
+        compile_design(args, profiler=profiler)
+
+        phases = profiler.phase_totals()
+        for name in ("load design", "effects", "build PRG-JSON", "write .prg.json"):
+            self.assertIn(name, phases)
+        trace_path = os.path.join(self.temp_dir, "trace.json")
+        profiler.write_chrome_trace(trace_path)
+        with open(trace_path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertTrue(all(event["ph"] == "X" and event["dur"] >= 0 for event in events))
+        self.assertIn("load design", [event["name"] for event in events])
+
+    def test_pattern_expansion_is_recorded(self):
+        design = {"effects_timeline": [], "pattern_templates": [
+            {"id": "beats", "pattern_type": "BeatSync", "parameters": {"beat_source": "audio_analysis"}},
+            {"id": "bogus", "pattern_type": "Bogus"}
+        ]}
+        profiler = CompileProfiler()
+        expand_pattern_templates(design, audio_analysis_data={"beats": [1.0, 2.0, 3.0]}, profiler=profiler)
+
+        self.assertEqual([item["id"] for item in profiler.items], ["beats"])
+        self.assertEqual(profiler.items[0]["category"], "pattern")
+        self.assertEqual(profiler.items[0]["items"], len(design["effects_timeline"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental compilation with the effect cache.
+
+This script checks that compile_effects_timeline with an EffectCache produces the
+same timeline as a full compile, re-renders only edited effects, and replays the
+merge from the last checkpoint before the first edit.
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from roocode_sequence_designer_tools.compile_seqdesign import compile_effects_timeline
+from roocode_sequence_designer_tools.tool_utils.effect_cache import EffectCache
+
+METADATA = {"default_pixels": 4, "target_prg_refresh_rate": 100, "default_base_rgb": (0, 0, 0)}
+TOTAL_DURATION = 60.0
+
+
+def make_timeline(count):
+    """Alternating solid, fade and strobe effects, one per 3 seconds."""
+    timeline = []
+    for i in range(count):
+        timing = {"start_seconds": i * 3.0, "end_seconds": i * 3.0 + 4.0}
+        if i % 3 == 0:
+            effect = {"type": "solid_color", "params": {"color": {"rgb": [i * 10 % 256, 0, 255]}}}
+        elif i % 3 == 1:
+            effect = {"type": "fade", "params": {"color_start": {"rgb": [255, 0, 0]},
+                                                 "color_end": {"rgb": [0, 0, i * 10 % 256]}}}
+        else:
+            effect = {"type": "strobe", "params": {"color_on": {"rgb": [255, 255, 255]},
+                                                   "color_off": {"rgb": [0, 0, 0]}, "frequency_hz": 4}}
+        effect.update({"id": f"effect_{i}", "timing": timing})
+        timeline.append(effect)
+    return timeline
+
+
+class TestEffectCache(unittest.TestCase):
+    """Test cases for EffectCache and compile_effects_timeline."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_cached_compile_matches_full_compile(self):
+        timeline = make_timeline(20)
+        expected, _ = compile_effects_timeline(timeline, TOTAL_DURATION, METADATA)
+        cache = EffectCache()
+
+        cold, cold_report = compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, effect_cache=cache)
+        warm, warm_report = compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, effect_cache=cache)
+
+        self.assertEqual(cold, expected)
+        self.assertEqual(warm, expected)
+        self.assertEqual(len(cold_report["recomputed"]), 20)
+        # Every effect, strobes included, renders segments that reach the cache and the merge
+        self.assertEqual(len(cache.segments), 20)
+        for segments in cache.segments.values():
+            self.assertTrue(segments)
+        self.assertEqual(warm_report["recomputed"], [])
+        self.assertEqual(warm_report["replayed_from"], 20)
+
+    def test_edit_recomputes_only_the_edited_effect(self):
+        timeline = make_timeline(20)
+        cache = EffectCache(checkpoint_interval=8)
+        compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, effect_cache=cache)
+
+        edited = copy.deepcopy(timeline)
+        edited[13]["params"]["color_end"] = {"rgb": [0, 255, 0]}
+        expected, _ = compile_effects_timeline(edited, TOTAL_DURATION, METADATA)
+        result, report = compile_effects_timeline(edited, TOTAL_DURATION, METADATA, effect_cache=cache)
+
+        self.assertEqual(result, expected)
+        self.assertEqual(report["recomputed"], ["effect_13"])
+        # The checkpoint after effects 0-7 is still valid; the one after 0-15 is not
+        self.assertEqual(report["replayed_from"], 8)
+        self.assertEqual(report["reused"], [f"effect_{i}" for i in range(8, 20) if i != 13])
+
+    def test_persisted_cache_restores_segments(self):
+        timeline = make_timeline(10)
+        cache_path = os.path.join(self.temp_dir, "effects.json")
+        expected, _ = compile_effects_timeline(timeline, TOTAL_DURATION, METADATA)
+        first = EffectCache(cache_path)
+        compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, effect_cache=first)
+        first.save()
+
+        second = EffectCache(cache_path)
+        result, report = compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, effect_cache=second)
+        self.assertEqual(result, expected)
+        self.assertEqual(report["recomputed"], [])
+        for segments in second.segments.values():
+            for segment in segments:
+                self.assertIsInstance(segment, tuple)
+                self.assertIsInstance(segment[2], tuple)
+
+    def test_analysis_fingerprint_changes_effect_key(self):
+        self.assertNotEqual(
+            EffectCache.effect_key("pulse_on_beat", 0.0, 1.0, {}, METADATA,
+                                   EffectCache.analysis_fingerprint({"beats": [0.5]}, ("beats",))),
+            EffectCache.effect_key("pulse_on_beat", 0.0, 1.0, {}, METADATA,
+                                   EffectCache.analysis_fingerprint({"beats": [0.6]}, ("beats",))),
+        )
+        self.assertIsNone(EffectCache.analysis_fingerprint(None, ("beats",)))
+
+    def test_analysis_fingerprint_covers_only_declared_features(self):
+        analysis = {"beats": [0.5, 1.0], "downbeats": [0.5], "sections": []}
+        with_energy = dict(analysis, energy_timeseries={"times": [0.0], "values": [0.1]})
+        self.assertEqual(EffectCache.analysis_fingerprint(analysis, ("beats",)),
+                         EffectCache.analysis_fingerprint(with_energy, ("beats",)))
+        self.assertNotEqual(EffectCache.analysis_fingerprint(analysis, ("energy",)),
+                            EffectCache.analysis_fingerprint(with_energy, ("energy",)))
+
+    def test_compile_without_cache_skips_fingerprint(self):
+        timeline = [{"id": "pulse", "type": "pulse_on_beat", "timing": {"start_seconds": 0, "end_seconds": 4},
+                     "params": {"color": {"rgb": [255, 0, 0]}, "beat_source": "all_beats",
+                                "pulse_duration_seconds": 0.1}}]
+        analysis = {"beats": [0.5, 1.0, 1.5]}
+        with patch.object(EffectCache, "analysis_fingerprint", side_effect=AssertionError("fingerprinted")):
+            compile_effects_timeline(timeline, TOTAL_DURATION, METADATA, analysis)
+
+
+if __name__ == '__main__':
+    unittest.main()
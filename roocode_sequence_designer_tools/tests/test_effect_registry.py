@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the effect registry.
+
+This script checks effect lookup by name and alias, the feature declarations
+that decide what audio analysis is computed, lazy importing of effect modules,
+and effects added by plugins through entry points.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from roocode_sequence_designer_tools.compile_seqdesign import render_effect, required_audio_features
+from roocode_sequence_designer_tools.effect_implementations import registry
+from roocode_sequence_designer_tools.effect_implementations.registry import (
+    available_effects, get_effect, register_effect
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+METADATA = {"target_prg_refresh_rate": 100, "default_pixels": 4, "default_base_rgb": (0, 0, 0)}
+
+
+class _EntryPoint:
+    """Stand-in for an importlib.metadata.EntryPoint whose load() registers an effect."""
+
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+
+
+class TestEffectRegistry(unittest.TestCase):
+    """Test cases for register_effect and get_effect."""
+
+    def setUp(self):
+        self.registered = dict(registry._EFFECTS)
+
+    def tearDown(self):
+        registry._EFFECTS.clear()
+        registry._EFFECTS.update(self.registered)
+
+    def test_lookup_by_name_and_alias(self):
+        spec = get_effect("SolidColor")
+        self.assertIs(spec, get_effect("solid_color"))
+        self.assertEqual(spec.name, "solid_color")
+        self.assertEqual(spec.module, "roocode_sequence_designer_tools.effect_implementations.common_effects")
+        self.assertIsNone(get_effect("no_such_effect"))
+
+    def test_every_shipped_effect_is_found_by_the_scan(self):
+        names = [spec.name for spec in available_effects()]
+        for name in ("solid_color", "fade", "strobe", "snap_on_flash_off", "pulse_on_beat",
+                     "apply_section_theme_from_audio"):
+            self.assertIn(name, names)
+        self.assertEqual(set(registry._scan_package()), set(registry._EFFECTS))
+
+    def test_features_come_from_the_registry(self):
+        @register_effect("test_energy_wash", aliases=["test_wash"], features=["energy_timeseries", "beats"])
+        def apply_energy_wash(start, end, params, metadata, audio_analysis_data=None):
+            return [(start, end, (0, 0, 255), metadata["default_pixels"])]
+
+        timeline = [{"type": "Test_Wash"}, {"type": "pulse_on_beat"}, {"type": "unknown"}, "not an effect"]
+        self.assertEqual(required_audio_features(timeline), ["energy_timeseries", "beats"])
+        self.assertEqual(render_effect("wash", "test_wash", 1.0, 2.0, {}, METADATA), [(1.0, 2.0, (0, 0, 255), 4)])
+        self.assertIsNone(render_effect("x", "unknown", 1.0, 2.0, {}, METADATA))
+
+    def test_conflicting_registration_raises(self):
+        with self.assertRaises(ValueError):
+            @register_effect("test_flash", aliases=["strobe"])
+            def apply_flash(start, end, params, metadata, audio_analysis_data=None):
+                return []
+        self.assertIsNone(get_effect("test_flash"))
+
+    def test_plugin_entry_point_is_loaded_on_first_use(self):
+        def load():
+            @register_effect("test_plugin_sparkle", vectorized=True)
+            def apply_sparkle(start, end, params, metadata, audio_analysis_data=None):
+                return []
+            return apply_sparkle
+
+        with patch.object(registry, "_PLUGIN_INDEX", {"test_plugin_sparkle": _EntryPoint("test_plugin_sparkle", load)}):
+            spec = get_effect("test_plugin_sparkle")
+        self.assertTrue(spec.vectorized)
+
+    def test_compile_imports_only_used_effect_modules(self):
+        code = ("import sys; from roocode_sequence_designer_tools.compile_seqdesign import required_audio_features, "
+                "render_effect; required_audio_features([{'type': 'strobe'}]); "
+                "print(sorted(m.rsplit('.', 1)[1] for m in sys.modules if '.effect_implementations.' in m))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), "['common_effects', 'registry']")
+
+
+if __name__ == '__main__':
+    unittest.main()
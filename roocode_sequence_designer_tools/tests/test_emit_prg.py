@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for compiling designs straight to binary .prg files.
+
+This script checks that build_prg_segments gives the encoder exactly the segments
+it would parse from the PRG-JSON data, so --emit-prg writes the same bytes as
+compiling to .prg.json and running prg_generator.py on it.
+"""
+
+import random
+import unittest
+
+from roocode_sequence_designer_tools.compile_seqdesign import build_prg_json, build_prg_segments
+from roocode_sequence_designer_tools.tool_utils.segment_timeline import apply_segment_overrides
+from prg_generator import PRGGenerationError, encode_prg, parse_sequence
+
+
+def random_timeline(rng, total_duration, default_pixels):
+    """A merged timeline of random solids and fades, including very short segments."""
+    timeline = [(0.0, total_duration, (0, 0, 0), default_pixels)]
+    new_segments = []
+    for _ in range(rng.randrange(1, 60)):
+        start = rng.uniform(0, total_duration)
+        end = min(total_duration, start + rng.choice([0.004, 0.013, 0.25, rng.uniform(0, 5)]))
+        pixels = rng.choice([default_pixels, 1, 4])
+        if rng.random() < 0.3:
+            colors = ((rng.randrange(256), 0, 255), (0, rng.randrange(256), 0))
+            new_segments.append((start, end, colors, pixels, "fade"))
+        else:
+            new_segments.append((start, end, (rng.randrange(256), 128, 0), pixels))
+    return apply_segment_overrides(timeline, new_segments)
+
+
+class TestBuildPrgSegments(unittest.TestCase):
+    """Test cases for build_prg_segments."""
+
+    def test_matches_parsing_the_prg_json(self):
+        rng = random.Random(42)
+        for refresh_rate in (100, 50, 30, 40):
+            for _ in range(50):
+                metadata = {"default_pixels": rng.choice([1, 3, 4]), "target_prg_refresh_rate": refresh_rate}
+                total_duration = rng.choice([10.0, 33.337])
+                timeline = random_timeline(rng, total_duration, metadata["default_pixels"])
+
+                prg_json_data = build_prg_json(timeline, metadata, total_duration)
+                _, expected = parse_sequence(prg_json_data)
+                segments = build_prg_segments(timeline, metadata, total_duration)
+
+                self.assertEqual(segments, expected)
+                self.assertEqual(encode_prg(segments, metadata["default_pixels"]), encode_prg(prg_json_data))
+
+    def test_invalid_timeline_raises(self):
+        metadata = {"default_pixels": 4, "target_prg_refresh_rate": 100}
+        with self.assertRaises(PRGGenerationError):
+            build_prg_segments([(0.0, 1.0, (300, 0, 0), 4)], metadata, 1.0)
+        with self.assertRaises(PRGGenerationError):
+            build_prg_segments([], metadata, 1.0)
+        with self.assertRaises(PRGGenerationError):
+            build_prg_segments([(0.0, 1.0, (255, 0, 0), 4)], {"default_pixels": 6, "target_prg_refresh_rate": 100}, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
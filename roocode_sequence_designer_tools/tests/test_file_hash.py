@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the file content hash memo.
+
+This script checks that FileHashMemo only re-hashes files whose size, mtime or
+inode changed, that it persists across instances, and that AudioAnalyzer and
+CacheManager go through it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from roocode_sequence_designer_tools.tool_utils import file_hash
+from roocode_sequence_designer_tools.tool_utils.cache_manager import CacheManager
+from roocode_sequence_designer_tools.tool_utils.file_hash import FileHashMemo, get_file_hash_memo, hash_file
+
+
+class TestFileHashMemo(unittest.TestCase):
+    """Test cases for hash_file and FileHashMemo."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.memo_path = os.path.join(self.temp_dir, "memo", "file_hashes.json")
+        self.audio_path = self._write("song.wav", b"RIFF" + bytes(range(256)) * 5000, age_seconds=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, data, age_seconds):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        mtime = time.time() - age_seconds
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_hash_file_is_blake2b(self):
+        with open(self.audio_path, 'rb') as f:
+            expected = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        self.assertEqual(hash_file(self.audio_path), expected)
+        self.assertEqual(hash_file(self.audio_path, buffer_size=1000), expected)
+
+    def test_unchanged_file_is_not_hashed_again(self):
+        memo = FileHashMemo(self.memo_path)
+        first = memo.file_hash(self.audio_path)
+        with patch.object(file_hash, "hash_file", side_effect=AssertionError("hashed again")):
+            self.assertEqual(memo.file_hash(self.audio_path), first)
+            # A new instance reads the persisted memo
+            self.assertEqual(FileHashMemo(self.memo_path).file_hash(self.audio_path), first)
+
+    def test_changed_file_is_hashed_again(self):
+        memo = FileHashMemo(self.memo_path)
+        first = memo.file_hash(self.audio_path)
+        self._write("song.wav", b"RIFF" + bytes(range(256)) * 4000, age_seconds=30)
+        second = memo.file_hash(self.audio_path)
+        self.assertNotEqual(second, first)
+        self.assertEqual(second, hash_file(self.audio_path))
+
+    def test_recently_modified_file_is_not_remembered(self):
+        fresh_path = self._write("fresh.wav", b"data", age_seconds=0)
+        memo = FileHashMemo(self.memo_path)
+        memo.file_hash(fresh_path)
+        self.assertNotIn(os.path.abspath(fresh_path), memo.entries)
+
+    def test_entries_saved_by_other_instances_are_merged(self):
+        other_path = self._write("other.wav", b"other", age_seconds=60)
+        first = FileHashMemo(self.memo_path)
+        second = FileHashMemo(self.memo_path)
+        first.file_hash(self.audio_path)
+        second.file_hash(other_path)
+        with open(self.memo_path) as f:
+            saved = json.load(f)["entries"]
+        self.assertEqual(set(saved), {os.path.abspath(self.audio_path), os.path.abspath(other_path)})
+
+    def test_max_entries(self):
+        memo = FileHashMemo(self.memo_path, max_entries=1)
+        other_path = self._write("other.wav", b"other", age_seconds=60)
+        memo.file_hash(self.audio_path)
+        memo.file_hash(other_path)
+        self.assertEqual(list(memo.entries), [os.path.abspath(other_path)])
+
+    def test_cache_manager_uses_memo(self):
+        manager = CacheManager(cache_dir=os.path.join(self.temp_dir, "cache"))
+        key = manager.generate_cache_key("tool", {"a": 1}, file_path_for_hash=self.audio_path)
+        with patch.object(file_hash, "hash_file", side_effect=AssertionError("hashed again")):
+            self.assertEqual(manager.generate_cache_key("tool", {"a": 1}, file_path_for_hash=self.audio_path), key)
+        self.assertIs(get_file_hash_memo(manager.cache_root_dir), get_file_hash_memo(manager.cache_root_dir))
+
+
+class TestAnalyzerFileHash(unittest.TestCase):
+    """Test cases for AudioAnalyzer._calculate_file_hash."""
+
+    def test_analyzer_uses_memo(self):
+        from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, "song.wav")
+        with open(path, 'wb') as f:
+            f.write(b"audio" * 1000)
+        os.utime(path, (time.time() - 60, time.time() - 60))
+        analyzer = AudioAnalyzer(cache_dir=os.path.join(temp_dir, "cache"))
+        first = analyzer._calculate_file_hash(path)
+        self.assertEqual(first, hash_file(path))
+        with patch.object(file_hash, "hash_file", side_effect=AssertionError("hashed again")):
+            self.assertEqual(analyzer._calculate_file_hash(path), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
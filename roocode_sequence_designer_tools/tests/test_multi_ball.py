@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-ball compilation.
+
+This script checks that compile_targets splits designs with per-ball effect
+tracks into one timeline per ball, analyzes each audio file once, and gives the
+same output in a process pool as in-process.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from roocode_sequence_designer_tools import compile_seqdesign
+from roocode_sequence_designer_tools.compile_seqdesign import (
+    compile_targets, effect_ball_targets, split_effects_by_ball
+)
+
+
+def solid(effect_id, start, end, color, **extra):
+    effect = {"id": effect_id, "type": "solid_color", "timing": {"start_seconds": start, "end_seconds": end},
+              "params": {"color": {"name": color}}}
+    effect.update(extra)
+    return effect
+
+
+class TestMultiBallCompile(unittest.TestCase):
+    """Test cases for per-ball splitting and compile_targets."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_design(self, name, effects, **metadata):
+        design = {"metadata": dict({"target_prg_refresh_rate": 100, "default_pixels": 4,
+                                    "total_duration_seconds": 10}, **metadata),
+                  "effects_timeline": effects}
+        path = os.path.join(self.temp_dir, f"{name}.seqdesign.json")
+        with open(path, 'w') as f:
+            json.dump(design, f)
+        return path
+
+    def read_output(self, name):
+        with open(os.path.join(self.output_dir, f"{name}.prg.json")) as f:
+            return json.load(f)["sequence"]
+
+    def test_effect_ball_targets(self):
+        self.assertIsNone(effect_ball_targets(solid("a", 0, 1, "red")))
+        self.assertEqual(effect_ball_targets(solid("a", 0, 1, "red", target_ball=2)), [2])
+        effect = solid("a", 0, 1, "red")
+        effect["params"]["ball_ids"] = ["ball3", "Ball 1"]
+        self.assertEqual(effect_ball_targets(effect), [1, 3])
+
+    def test_split_keeps_shared_effects_and_order(self):
+        effects = [solid("base", 0, 10, "blue"), solid("one", 1, 2, "red", target_ball=1),
+                   solid("two", 2, 3, "green", target_ball=2)]
+        self.assertIsNone(split_effects_by_ball({}, [effects[0]]))
+        by_ball = split_effects_by_ball({"num_balls": 3}, effects)
+        self.assertEqual({ball: [e["id"] for e in ball_effects] for ball, ball_effects in by_ball.items()},
+                         {1: ["base", "one"], 2: ["base", "two"], 3: ["base"]})
+
+    def test_pool_matches_in_process_and_per_ball_designs(self):
+        effects = [solid("base", 0, 10, "blue"), solid("one", 1, 2, "red", target_ball=1),
+                   solid("two", 2, 3, "green", target_ball=2)]
+        show = self.write_design("show", effects)
+        single = self.write_design("ball2_only", [effects[0], solid("two", 2, 3, "green")])
+
+        summary = compile_targets([show, single], self.output_dir, jobs=2, emit_prg=True, use_effect_cache=False,
+                                  use_build_cache=False)
+        self.assertEqual((summary["targets"], summary["failed"]), (3, 0))
+        pooled = {name: self.read_output(name) for name in ("show_Ball_1", "show_Ball_2", "ball2_only")}
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "show_Ball_1.prg")))
+
+        compile_targets([show, single], self.output_dir, jobs=1, use_effect_cache=False)
+        self.assertEqual({name: self.read_output(name) for name in pooled}, pooled)
+        self.assertEqual(pooled["show_Ball_2"], pooled["ball2_only"])
+        self.assertEqual(pooled["show_Ball_1"]["100"]["color"], [255, 0, 0])
+
+    def test_same_design_name_in_two_directories_is_rejected(self):
+        first = self.write_design("show", [solid("a", 0, 10, "red")])
+        os.makedirs(os.path.join(self.temp_dir, "b"))
+        second = self.write_design(os.path.join("b", "show"), [solid("a", 0, 10, "blue")])
+        with self.assertRaises(SystemExit):
+            compile_targets([first, second], self.output_dir, jobs=1, use_effect_cache=False)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "show.prg.json")))
+
+    def test_audio_is_analyzed_once_for_all_features(self):
+        audio_path = os.path.join(self.temp_dir, "song.wav")
+        open(audio_path, 'wb').close()
+        pulse = {"id": "pulse", "type": "pulse_on_beat", "timing": {"start_seconds": 0, "end_seconds": 10},
+                 "params": {"color": {"name": "white"}, "pulse_duration_seconds": 0.1}}
+        theme = {"id": "theme", "type": "apply_section_theme_from_audio",
+                 "timing": {"start_seconds": 0, "end_seconds": 10}, "params": {}}
+        first = self.write_design("first", [pulse], audio_file_path=audio_path)
+        second = self.write_design("second", [theme, dict(pulse, target_ball=2)], audio_file_path=audio_path)
+
+        analysis = {"duration": 10.0, "beats": [1.0, 2.0], "sections": []}
+        with patch.object(compile_seqdesign, "load_audio_analysis", return_value=analysis) as load:
+            summary = compile_targets([first, second], self.output_dir, jobs=1, use_effect_cache=False)
+
+        load.assert_called_once_with(os.path.abspath(audio_path), ["beats", "sections", "energy"])
+        self.assertEqual(summary["failed"], 0)
+        self.assertEqual(summary["targets"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the section/energy index.
+
+This script checks SectionIndex lookups against scanning the section and energy
+lists, its per-section energy statistics, that the compile's AnalysisIndex holds
+the section index of its analysis, and the section theme effect's energy mapping.
+"""
+
+import random
+import unittest
+
+from roocode_sequence_designer_tools.effect_implementations.audio_driven_effects import (
+    apply_section_theme_from_audio_effect
+)
+from roocode_sequence_designer_tools.tool_utils.analysis_index import AnalysisIndex
+from roocode_sequence_designer_tools.tool_utils.section_index import SectionIndex
+
+SECTIONS = [
+    {"label": "Intro", "start": 0.0, "end": 10.0},
+    {"label": "Verse", "start": 10.0, "end": 25.0},
+    {"label": "Chorus", "start": 25.0, "end": 40.0},
+    {"label": "Verse", "start": 40.0, "end": 55.0},
+    {"label": "Outro", "start": None, "end": 60.0},
+]
+
+
+class TestSectionIndex(unittest.TestCase):
+    """Test cases for SectionIndex."""
+
+    def test_label_and_window_queries(self):
+        index = SectionIndex(SECTIONS)
+        self.assertEqual(index.sections_with_label("Verse"), [1, 3])
+        self.assertEqual(index.sections_with_label("Bridge"), [])
+        self.assertEqual(index.overlapping_sections(5.0, 26.0), [0, 1, 2])
+        # Touching sections do not overlap; sections without times are not indexed
+        self.assertEqual(index.overlapping_sections(25.0, 40.0), [2])
+        self.assertEqual(index.overlapping_sections(56.0, 60.0), [])
+
+    def test_overlapping_sections_match_scan(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            sections = []
+            for _ in range(rng.randrange(1, 30)):
+                start = round(rng.uniform(0, 100), rng.choice([0, 1, 3]))
+                sections.append({"label": rng.choice("ABC"), "start": start, "end": start + rng.choice([0, 5, rng.uniform(0.1, 20)])})
+            index = SectionIndex(sections)
+            for _ in range(10):
+                start = rng.uniform(0, 110)
+                end = start + rng.uniform(0.1, 40)
+                expected = sorted((position for position, section in enumerate(sections)
+                                   if min(end, section["end"]) > max(start, section["start"])),
+                                  key=lambda position: max(start, sections[position]["start"]))
+                self.assertEqual(index.overlapping_sections(start, end), expected)
+
+    def test_energy_queries_and_statistics(self):
+        energy = [(t * 0.5, (t % 4) / 4) for t in range(120)]
+        shuffled = list(energy)
+        random.Random(1).shuffle(shuffled)
+        index = SectionIndex(SECTIONS, shuffled)
+
+        self.assertEqual(index.energy_points, energy)
+        self.assertEqual(index.energy_in(10.0, 12.0), [(10.0, 0.0), (10.5, 0.25), (11.0, 0.5), (11.5, 0.75)])
+        self.assertAlmostEqual(index.mean_energy(10.0, 12.0), 0.375)
+        self.assertIsNone(index.mean_energy(100.0, 110.0))
+
+        values = [value for time, value in energy if 25.0 <= time < 40.0]
+        self.assertEqual(index.energy_count[2], len(values))
+        self.assertAlmostEqual(index.energy_mean[2], sum(values) / len(values))
+        self.assertEqual((index.energy_min[2], index.energy_max[2]), (min(values), max(values)))
+        self.assertEqual(index.energy_peak, 0.75)
+        # Sections without valid times have no statistics
+        self.assertEqual(index.energy_count[4], 0)
+        self.assertIsNone(SectionIndex(SECTIONS).energy_peak)
+
+    def test_analysis_index_holds_section_index(self):
+        analysis = {"sections": SECTIONS, "energy": [{"time": 1.0, "value": 0.5}]}
+        index = AnalysisIndex(analysis).section_index
+        self.assertEqual(index.sections, SECTIONS)
+        self.assertEqual(index.energy_points, [(1.0, 0.5)])
+        self.assertIsNone(AnalysisIndex({"beats": [1.0]}).section_index)
+        # The analyzer's energy_timeseries format is read too
+        index = SectionIndex.from_analysis({"sections": SECTIONS,
+                                            "energy_timeseries": {"times": [2.0, 1.0], "values": [0.1, 0.2]}})
+        self.assertEqual(index.energy_points, [(1.0, 0.2), (2.0, 0.1)])
+
+
+
+class TestSectionThemeEnergyMapping(unittest.TestCase):
+    """Test cases for energy_mapping in apply_section_theme_from_audio_effect."""
+
+    ANALYSIS = {
+        "sections": SECTIONS[:3],
+        # Quiet intro, loud chorus, no energy points in the verse
+        "energy_timeseries": {"times": [1.0, 5.0, 30.0, 35.0], "values": [0.1, 0.3, 0.8, 0.8]},
+    }
+
+    def render(self, energy_mapping, **theme):
+        params = {"section_themes": [
+            dict({"section_label": label, "base_color": {"rgb": [255, 0, 0]}, "energy_mapping": energy_mapping}, **theme)
+            for label in ("Intro", "Verse", "Chorus")
+        ]}
+        return [segment[2] for segment in apply_section_theme_from_audio_effect(
+            0.0, 40.0, params, {"default_pixels": 4}, self.ANALYSIS, AnalysisIndex(self.ANALYSIS))]
+
+    def test_brightness_follows_section_mean_energy(self):
+        intro, verse, chorus = self.render("brightness")
+        # Intro mean 0.2 and chorus mean 0.8 of the 0.8 peak
+        self.assertEqual(tuple(intro), (63, 0, 0))
+        self.assertEqual(verse, (255, 0, 0))
+        self.assertEqual(tuple(chorus), (255, 0, 0))
+
+    def test_saturation_alpha_and_factor(self):
+        intro, _, _ = self.render("saturation")
+        self.assertEqual(tuple(intro), (255, 191, 191))
+        intro, _, _ = self.render("alpha", energy_factor=0.5)
+        self.assertEqual(tuple(intro), (159, 0, 0))
+        self.assertEqual(self.render("none"), [(255, 0, 0)] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the segment override engine.
+
+This script checks that apply_segment_overrides layers an effect's segments
+exactly like stamping them over the timeline one segment at a time.
+"""
+
+import random
+import time
+import unittest
+
+from roocode_sequence_designer_tools.tool_utils.segment_timeline import apply_segment_overrides
+
+
+def stamp_segment(final_segments, new_segment):
+    """Reference implementation: stamp one segment, re-sort and merge the whole timeline."""
+    ns, ne = new_segment[:2]
+    temp_segments = []
+    for old_segment in final_segments:
+        old_s, old_e, old_c_data, old_p = old_segment[:4]
+        marker = (old_segment[4],) if len(old_segment) == 5 and old_segment[4] else ()
+        if old_e <= ns or old_s >= ne:
+            temp_segments.append(old_segment)
+        else:
+            if old_s < ns:
+                temp_segments.append((old_s, ns, old_c_data, old_p) + marker)
+            if old_e > ne:
+                temp_segments.append((ne, old_e, old_c_data, old_p) + marker)
+    temp_segments.append(new_segment)
+    temp_segments.sort(key=lambda x: x[0])
+
+    cleaned = []
+    current = temp_segments[0]
+    for following in temp_segments[1:]:
+        curr_marker = current[4] if len(current) == 5 else None
+        next_marker = following[4] if len(following) == 5 else None
+        if (following[0] == current[1] and following[2:4] == current[2:4]
+                and next_marker == curr_marker):
+            current = (current[0], following[1], current[2], current[3]) + ((curr_marker,) if curr_marker else ())
+        else:
+            if current[1] > current[0]:
+                cleaned.append(current)
+            current = following
+    if current[1] > current[0]:
+        cleaned.append(current)
+    return cleaned
+
+
+def random_segment(rng, end_time):
+    start = rng.randrange(0, end_time * 4) / 4.0
+    end = min(end_time, start + rng.randrange(1, 12) / 4.0)
+    pixels = rng.choice([1, 4])
+    if rng.random() < 0.3:
+        colors = (rng.choice([(255, 0, 0), (0, 0, 255)]), rng.choice([(0, 255, 0), (0, 0, 0)]))
+        return (start, end, colors, pixels, "fade")
+    return (start, end, rng.choice([(255, 0, 0), (0, 0, 255), (0, 0, 0)]), pixels)
+
+
+class TestSegmentOverrides(unittest.TestCase):
+    """Test cases for apply_segment_overrides."""
+
+    def test_later_segment_wins_and_split_parts_are_kept(self):
+        timeline = [(0.0, 10.0, (255, 0, 0), 4)]
+        result = apply_segment_overrides(timeline, [(2.0, 5.0, (0, 0, 255), 4), (4.0, 6.0, (0, 255, 0), 4)])
+        self.assertEqual(result, [
+            (0.0, 2.0, (255, 0, 0), 4),
+            (2.0, 4.0, (0, 0, 255), 4),
+            (4.0, 6.0, (0, 255, 0), 4),
+            (6.0, 10.0, (255, 0, 0), 4),
+        ])
+
+    def test_identical_neighbours_merge(self):
+        timeline = [(0.0, 5.0, (255, 0, 0), 4), (5.0, 10.0, (0, 0, 255), 4)]
+        result = apply_segment_overrides(timeline, [(5.0, 10.0, (255, 0, 0), 4)])
+        self.assertEqual(result, [(0.0, 10.0, (255, 0, 0), 4)])
+
+    def test_zero_duration_segments_are_ignored(self):
+        timeline = [(0.0, 10.0, (255, 0, 0), 4)]
+        self.assertEqual(apply_segment_overrides(timeline, [(3.0, 3.0, (0, 0, 255), 4)]), timeline)
+
+    def test_matches_stamping_one_segment_at_a_time(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            timeline = [(0.0, 20.0, (0, 0, 0), 4)]
+            expected = list(timeline)
+            for _ in range(rng.randrange(1, 5)):
+                effect_segments = [random_segment(rng, 20) for _ in range(rng.randrange(0, 15))]
+                for segment in effect_segments:
+                    if segment[1] > segment[0]:
+                        expected = stamp_segment(expected, segment)
+                timeline = apply_segment_overrides(timeline, effect_segments)
+                self.assertEqual(timeline, expected)
+
+    def test_long_strobe_is_fast(self):
+        """A 5-minute 20 Hz strobe (12000 segments) is applied in one sweep."""
+        strobe = []
+        for i in range(12000):
+            color = (255, 255, 255) if i % 2 == 0 else (0, 0, 0)
+            strobe.append((i * 0.025, (i + 1) * 0.025, color, 4))
+        start = time.perf_counter()
+        result = apply_segment_overrides([(0.0, 300.0, (0, 0, 255), 4)], strobe)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(result), 12000)
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
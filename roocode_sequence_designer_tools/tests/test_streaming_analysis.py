@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for block-wise (streaming) audio analysis.
+
+This script checks that StreamingAnalysis reproduces librosa's in-memory RMS,
+onset strength and MFCCs for any block size, and that AudioAnalyzer(streaming=True)
+returns the same analysis as loading the whole file.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from roocode_sequence_designer_tools.tool_utils import audio_analyzer_core
+from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
+from roocode_sequence_designer_tools.tool_utils.streaming_analysis import StreamingAnalysis, can_stream
+
+
+class TestStreamingAnalysis(unittest.TestCase):
+    """Test cases for StreamingAnalysis and AudioAnalyzer(streaming=...)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.audio_path = os.path.join(cls.temp_dir, "clicks.wav")
+        # Stereo noise clicks at 120 BPM over a quiet tone
+        cls.sample_rate = 22050
+        rng = np.random.default_rng(0)
+        audio = 0.05 * np.sin(2 * np.pi * 220 * np.arange(cls.sample_rate * 20) / cls.sample_rate)
+        for beat in np.arange(0, 20, 0.5):
+            start = int(beat * cls.sample_rate)
+            audio[start:start + 2000] += rng.standard_normal(2000) * np.exp(-np.arange(2000) / 300)
+        stereo = np.stack((audio, 0.5 * audio), axis=1).astype(np.float32)
+        sf.write(cls.audio_path, stereo, cls.sample_rate)
+        cls.audio_data, _ = librosa.load(cls.audio_path, sr=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_features_match_in_memory_computation(self):
+        y, sr = self.audio_data, self.sample_rate
+        expected_rms = librosa.feature.rms(y=y)[0]
+        expected_onset = librosa.onset.onset_strength(y=y, sr=sr)
+        expected_beat_env = librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median)
+        expected_mfcc = librosa.feature.mfcc(y=y, sr=sr)
+
+        # Block sizes that do and do not divide the frame count
+        for block_frames in (1, 37, 100000):
+            with self.subTest(block_frames=block_frames):
+                stream = StreamingAnalysis(self.audio_path, block_frames=block_frames)
+                rms = stream.first_pass()
+                onset, beat_env, mfcc = stream.second_pass()
+                self.assertEqual(stream.num_samples, len(y))
+                np.testing.assert_allclose(rms, expected_rms, atol=1e-5)
+                np.testing.assert_allclose(onset, expected_onset, atol=1e-3)
+                np.testing.assert_allclose(beat_env, expected_beat_env, atol=1e-3)
+                np.testing.assert_allclose(mfcc, expected_mfcc, atol=1e-2)
+
+    def test_second_pass_needs_mel_maximum(self):
+        stream = StreamingAnalysis(self.audio_path)
+        stream.first_pass(mel=False)
+        with self.assertRaises(RuntimeError):
+            stream.second_pass()
+
+    def test_streamed_analysis_matches_full_load(self):
+        full = AudioAnalyzer(cache_dir=tempfile.mkdtemp(dir=self.temp_dir), streaming=False)
+        expected = full.analyze_audio(self.audio_path)
+        streamed = AudioAnalyzer(cache_dir=tempfile.mkdtemp(dir=self.temp_dir), streaming=True)
+        with patch.object(AudioAnalyzer, "_load_audio", side_effect=AssertionError("audio loaded whole")):
+            analysis = streamed.analyze_audio(self.audio_path)
+        self.assertEqual(analysis.keys(), expected.keys())
+        self.assertEqual(analysis["beats"], expected["beats"])
+        self.assertEqual(analysis["sections"], expected["sections"])
+        self.assertAlmostEqual(analysis["duration_seconds"], expected["duration_seconds"])
+        for key in ("energy_timeseries", "onset_strength_timeseries"):
+            self.assertEqual(analysis[key]["times"], expected[key]["times"])
+            np.testing.assert_allclose(analysis[key]["values"], expected[key]["values"], atol=1e-3)
+
+    def test_short_files_are_loaded_whole_by_default(self):
+        analyzer = AudioAnalyzer(cache_dir=tempfile.mkdtemp(dir=self.temp_dir))
+        self.assertFalse(analyzer._use_streaming(self.audio_path, ["beats", "energy"]))
+        with patch.object(audio_analyzer_core, "STREAMING_MIN_SECONDS", 10):
+            self.assertTrue(analyzer._use_streaming(self.audio_path, ["beats", "energy"]))
+
+    def test_unsupported_parameters_fall_back_to_full_load(self):
+        analyzer = AudioAnalyzer(cache_dir=tempfile.mkdtemp(dir=self.temp_dir), streaming=True)
+        analyzer.feature_params = analyzer._resolve_feature_params({"feature_params": {"energy": {"frame_length": 1024}}})
+        self.assertFalse(analyzer._use_streaming(self.audio_path, ["energy"]))
+        self.assertTrue(analyzer._use_streaming(self.audio_path, ["beats"]))
+
+        missing = os.path.join(self.temp_dir, "missing.mp3")
+        self.assertFalse(can_stream(missing))
+
+
+if __name__ == "__main__":
+    unittest.main()
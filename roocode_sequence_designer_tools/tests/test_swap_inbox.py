@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for pushing compiled designs to the Sequence Maker swap inbox.
+
+This script checks the inbox entries written by push_to_swap_inbox and the
+--emit-prg / --push-to-gui outputs of compile_seqdesign.compile_design.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from roocode_sequence_designer_tools import generate_smproj_from_prg
+from roocode_sequence_designer_tools.compile_seqdesign import compile_design, default_smproj_path, watch_design
+from roocode_sequence_designer_tools.tool_utils import swap_inbox
+from roocode_sequence_designer_tools.tool_utils.swap_inbox import push_to_swap_inbox, read_swap_inbox
+
+DESIGN = {
+    "metadata": {"target_prg_refresh_rate": 100, "default_pixels": 4, "total_duration_seconds": 10,
+                 "title": "Inbox Test", "default_base_color": {"name": "black"}},
+    "effects_timeline": [
+        {"id": "red", "type": "solid_color", "timing": {"start_seconds": 0, "end_seconds": 5},
+         "params": {"color": {"name": "red"}}},
+        {"id": "fade", "type": "fade", "timing": {"start_seconds": 5, "end_seconds": 10},
+         "params": {"color_start": {"name": "blue"}, "color_end": {"name": "green"}}}
+    ]
+}
+
+
+class TestSwapInbox(unittest.TestCase):
+    """Test cases for push_to_swap_inbox and compile_design outputs."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.inbox_path = os.path.join(self.temp_dir, "inbox", "sequence_swap_inbox.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_push_writes_absolute_path_and_unique_timestamps(self):
+        smproj_path = os.path.join(self.temp_dir, "show.smproj")
+        with open(smproj_path, 'w') as f:
+            json.dump({}, f)
+
+        push_to_swap_inbox(os.path.relpath(smproj_path), "First", "v1", inbox_path=self.inbox_path)
+        with open(self.inbox_path) as f:
+            first = json.load(f)
+        push_to_swap_inbox(smproj_path, "Second", inbox_path=self.inbox_path)
+        with open(self.inbox_path) as f:
+            second = json.load(f)
+
+        self.assertEqual(first["smproj_path"], smproj_path)
+        self.assertEqual(first["description"], "First")
+        self.assertEqual(first["version_name"], "v1")
+        self.assertNotEqual(first["timestamp"], second["timestamp"])
+        self.assertEqual(os.listdir(os.path.dirname(self.inbox_path)), ["sequence_swap_inbox.json"])
+
+    def test_push_requires_existing_smproj(self):
+        with self.assertRaises(FileNotFoundError):
+            push_to_swap_inbox(os.path.join(self.temp_dir, "missing.smproj"), "", inbox_path=self.inbox_path)
+        self.assertFalse(os.path.exists(self.inbox_path))
+
+    def test_default_smproj_path(self):
+        self.assertEqual(default_smproj_path("out/ball1.prg.json"), "out/ball1.smproj")
+        self.assertEqual(default_smproj_path("out/ball1.json"), "out/ball1.smproj")
+
+    def test_compile_design_emits_prg_and_pushes(self):
+        design_path = os.path.join(self.temp_dir, "ball1.seqdesign.json")
+        with open(design_path, 'w') as f:
+            json.dump(DESIGN, f)
+        output_path = os.path.join(self.temp_dir, "out", "ball1.prg.json")
+        args = argparse.Namespace(
+            input_seqdesign_json_path=design_path, output_prg_json_path=output_path, audio_dir=self.temp_dir,
+            emit_prg=os.path.join(self.temp_dir, "out", "ball1.prg"), no_build_cache=True, print_json=False,
+            push_to_gui=True, smproj=None
+        )
+
+        with patch.object(swap_inbox, "SWAP_INBOX_FILE", self.inbox_path):
+            prg_json_data = compile_design(args)
+
+        with open(output_path) as f:
+            self.assertEqual(json.load(f), prg_json_data)
+        with open(args.emit_prg, 'rb') as f:
+            self.assertEqual(f.read()[:2], b"PR")
+        with open(self.inbox_path) as f:
+            entry = json.load(f)
+        self.assertEqual(entry["smproj_path"], os.path.join(self.temp_dir, "out", "ball1_a.smproj"))
+        self.assertTrue(os.path.exists(entry["smproj_path"]))
+        self.assertIn("Inbox Test", entry["description"])
+
+    def make_push_args(self):
+        design_path = os.path.join(self.temp_dir, "ball1.seqdesign.json")
+        with open(design_path, 'w') as f:
+            json.dump(DESIGN, f)
+        return argparse.Namespace(
+            input_seqdesign_json_path=design_path, output_prg_json_path=os.path.join(self.temp_dir, "ball1.prg.json"),
+            audio_dir=self.temp_dir, emit_prg=None, no_build_cache=True, print_json=False,
+            push_to_gui=True, smproj=None, profile=False, watch_interval=0
+        )
+
+    def test_pushes_alternate_between_two_smproj_paths(self):
+        # The GUI auto-saves the open project to its path before loading the next push,
+        # so a push to the previous push's path would be overwritten with the old project
+        args = self.make_push_args()
+        pushed = []
+        with patch.object(swap_inbox, "SWAP_INBOX_FILE", self.inbox_path):
+            for _ in range(4):
+                compile_design(args)
+                pushed.append(read_swap_inbox()["smproj_path"])
+        self.assertEqual(pushed, [os.path.join(self.temp_dir, name)
+                                  for name in ("ball1_a.smproj", "ball1_b.smproj") * 2])
+        self.assertEqual(sorted(name for name in os.listdir(self.temp_dir) if name.endswith(".smproj")),
+                         ["ball1_a.smproj", "ball1_b.smproj"])
+
+    def test_watch_survives_smproj_generation_errors(self):
+        args = self.make_push_args()
+        with patch.object(swap_inbox, "SWAP_INBOX_FILE", self.inbox_path), \
+                patch.object(generate_smproj_from_prg, "generate_smproj_from_prg_files",
+                             side_effect=ValueError("bad prg")), \
+                patch("time.sleep", side_effect=KeyboardInterrupt):
+            watch_design(args, None)
+        self.assertFalse(os.path.exists(self.inbox_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized effect implementations.
+
+This script checks that the NumPy versions of pulse_on_beat, strobe and
+snap_on_flash_off return exactly the segments of the original per-beat and
+per-segment loops, reproduced here as reference implementations.
+"""
+
+import random
+import unittest
+
+from roocode_sequence_designer_tools.compile_seqdesign import compile_effects_timeline
+from roocode_sequence_designer_tools.effect_implementations.audio_driven_effects import apply_pulse_on_beat_effect
+from roocode_sequence_designer_tools.tool_utils.analysis_index import AnalysisIndex
+from roocode_sequence_designer_tools.effect_implementations.common_effects import (
+    apply_snap_on_flash_off_effect, apply_strobe_effect
+)
+from roocode_sequence_designer_tools.tool_utils.color_parser import interpolate_color
+
+METADATA = {"default_pixels": 4}
+
+
+def reference_pulses(start, end, beat_times, pulse_duration, color, pixels):
+    segments = []
+    for beat_t in beat_times:
+        pulse_s, pulse_e = beat_t, beat_t + pulse_duration
+        if pulse_e > start and pulse_s < end:
+            actual_s, actual_e = max(pulse_s, start), min(pulse_e, end)
+            if actual_e > actual_s:
+                segments.append((actual_s, actual_e, color, pixels))
+    segments.sort(key=lambda x: x[0])
+    return segments
+
+
+def reference_strobe(start, end, on_duration, off_duration, color_on, color_off, pixels):
+    segments = []
+    current_time = start
+    while current_time < end:
+        on_e = min(current_time + on_duration, end)
+        segments.append((current_time, on_e, color_on, pixels))
+        current_time = on_e
+        if current_time >= end:
+            break
+        off_e = min(current_time + off_duration, end)
+        segments.append((current_time, off_e, color_off, pixels))
+        current_time = off_e
+    return segments
+
+
+def reference_fade_steps(fade_start, end, fade_out_duration, steps_per_second, color_from, color_to, pixels):
+    num_steps = max(2, round(fade_out_duration * steps_per_second))
+    step_duration = fade_out_duration / num_steps
+    segments = []
+    for i in range(num_steps):
+        segment_end = end if i == num_steps - 1 else fade_start + ((i + 1) * step_duration)
+        segments.append((fade_start + (i * step_duration), segment_end,
+                         interpolate_color(color_from, color_to, i / (num_steps - 1)), pixels))
+    return segments
+
+
+class TestVectorizedEffects(unittest.TestCase):
+    """Randomized equivalence tests against the reference loops."""
+
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def random_window(self):
+        start = self.rng.choice([0.0, self.rng.uniform(0, 60), round(self.rng.uniform(0, 60), 2)])
+        return start, start + self.rng.choice([self.rng.uniform(0.01, 15), round(self.rng.uniform(0.1, 15), 2)])
+
+    def test_pulse_on_beat(self):
+        for _ in range(300):
+            start, end = self.random_window()
+            beats = sorted(round(self.rng.uniform(0, 80), 3) for _ in range(self.rng.randrange(1, 200)))
+            if self.rng.random() < 0.3:
+                self.rng.shuffle(beats)
+            duration = self.rng.choice([0.1, 0.25, self.rng.uniform(0.001, 3)])
+            params = {"color": {"name": "red"}, "pulse_duration_seconds": duration}
+            self.assertEqual(apply_pulse_on_beat_effect(start, end, params, METADATA, {"beats": beats}),
+                             reference_pulses(start, end, beats, duration, (255, 0, 0), 4))
+
+    def test_pulse_window_boundaries(self):
+        # Pulses ending exactly at the effect start are excluded, beats at the effect end too
+        params = {"color": {"name": "red"}, "pulse_duration_seconds": 0.1}
+        beats = [0.9, 0.95, 1.0, 1.9, 2.0]
+        self.assertEqual(apply_pulse_on_beat_effect(1.0, 2.0, params, METADATA, {"beats": beats}),
+                         reference_pulses(1.0, 2.0, beats, 0.1, (255, 0, 0), 4))
+
+    def test_pulse_reads_analyzer_and_legacy_keys(self):
+        # AudioAnalyzer emits "beats"/"downbeats"; older analysis files have "beat_times"/"downbeat_times"
+        params = {"color": {"name": "red"}, "pulse_duration_seconds": 0.1}
+        analyzer_data = {"beats": [1.0, 1.5, 2.0, 2.5], "downbeats": [1.0, 2.0]}
+        legacy_data = {"beat_times": [1.0, 1.5, 2.0, 2.5], "downbeat_times": [1.0, 2.0]}
+        for beat_source, beats in (("all_beats", analyzer_data["beats"]), ("downbeats", analyzer_data["downbeats"])):
+            expected = reference_pulses(0.0, 3.0, beats, 0.1, (255, 0, 0), 4)
+            source_params = dict(params, beat_source=beat_source)
+            self.assertEqual(apply_pulse_on_beat_effect(0.0, 3.0, source_params, METADATA, analyzer_data), expected)
+            self.assertEqual(apply_pulse_on_beat_effect(0.0, 3.0, source_params, METADATA, legacy_data), expected)
+
+    def test_pulse_with_analysis_index(self):
+        for _ in range(50):
+            start, end = self.random_window()
+            beats = sorted(round(self.rng.uniform(0, 80), 3) for _ in range(self.rng.randrange(1, 200)))
+            if self.rng.random() < 0.3:
+                self.rng.shuffle(beats)
+            analysis = {"beats": beats, "downbeats": beats[::4]}
+            index = AnalysisIndex(analysis)
+            for beat_source in ("all_beats", "downbeats"):
+                params = {"color": {"name": "red"}, "pulse_duration_seconds": 0.25, "beat_source": beat_source}
+                self.assertEqual(apply_pulse_on_beat_effect(start, end, params, METADATA, analysis, analysis_index=index),
+                                 apply_pulse_on_beat_effect(start, end, params, METADATA, analysis))
+
+    def test_compile_sees_beats_edited_in_place(self):
+        # The beat arrays are built per compile, so editing the analysis between compiles is never stale
+        timeline = [{"id": "pulse", "type": "pulse_on_beat", "timing": {"start_seconds": 0, "end_seconds": 4},
+                     "params": {"color": {"name": "red"}, "pulse_duration_seconds": 0.1}}]
+        metadata = dict(METADATA, default_base_rgb=(0, 0, 0), target_prg_refresh_rate=100)
+        analysis = {"beats": [1.0, 2.0]}
+        first, _ = compile_effects_timeline(timeline, 4.0, metadata, analysis)
+        analysis["beats"][1] = 3.0
+        second, _ = compile_effects_timeline(timeline, 4.0, metadata, analysis)
+        self.assertIn((2.0, 2.1, (255, 0, 0), 4), first)
+        self.assertIn((3.0, 3.1, (255, 0, 0), 4), second)
+        self.assertNotIn((2.0, 2.1, (255, 0, 0), 4), second)
+
+    def test_strobe(self):
+        for _ in range(300):
+            start, end = self.random_window()
+            if self.rng.random() < 0.5:
+                frequency = self.rng.choice([5, 10, 13.7, self.rng.uniform(0.2, 40)])
+                params = {"frequency_hz": frequency}
+                on_duration = off_duration = (1.0 / frequency) / 2.0
+            else:
+                on_duration, off_duration = self.rng.uniform(0.01, 1), self.rng.uniform(0.01, 1)
+                params = {"on_duration_seconds": on_duration, "off_duration_seconds": off_duration}
+            params.update({"color_on": {"name": "white"}, "color_off": {"name": "blue"}})
+            self.assertEqual(apply_strobe_effect(start, end, params, METADATA),
+                             reference_strobe(start, end, on_duration, off_duration, (255, 255, 255), (0, 0, 255), 4))
+
+    def test_snap_on_flash_off(self):
+        for _ in range(200):
+            start, end = self.random_window()
+            target = tuple(self.rng.randrange(256) for _ in range(3))
+            post = tuple(self.rng.randrange(256) for _ in range(3))
+            fade_out = self.rng.choice([0.5, self.rng.uniform(0.01, 20)])
+            steps_per_second = self.rng.choice([20, 7, 3.3, 60])
+            params = {"pre_base_color": {"name": "black"}, "target_color": {"rgb": list(target)},
+                      "post_base_color": {"rgb": list(post)}, "fade_out_duration": fade_out,
+                      "steps_per_second": steps_per_second}
+            segments = apply_snap_on_flash_off_effect(start, end, params, METADATA)
+
+            fade_out = min(fade_out, end - start)
+            flash_end = start + (end - start - fade_out)
+            expected = [(start, flash_end, target, 4)] if end - start - fade_out > 0 else []
+            expected += reference_fade_steps(flash_end, end, fade_out, steps_per_second, target, post, 4)
+            self.assertEqual(segments, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the analysis cache warmer.
+
+This script checks that warm_analysis_cache expands directories and playlists,
+fills the per-feature and Sequence Maker caches in a process pool, and computes
+nothing again on a second run.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from roocode_sequence_designer_tools.tool_utils.analysis_store import MANIFEST_SUFFIX
+from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import ANALYSIS_FEATURES, AudioAnalyzer
+from roocode_sequence_designer_tools.warm_analysis_cache import (
+    collect_audio_files, format_seconds, warm_analysis_cache
+)
+
+
+class TestWarmAnalysisCache(unittest.TestCase):
+    """Test cases for collect_audio_files and warm_analysis_cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.library_dir = os.path.join(self.temp_dir, "library")
+        os.makedirs(os.path.join(self.library_dir, "album"))
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.sequence_maker_cache_dir = os.path.join(self.temp_dir, "sequence_maker_cache")
+        self.tracks = []
+        for index, name in enumerate(("a.wav", os.path.join("album", "b.wav"))):
+            path = os.path.join(self.library_dir, name)
+            sample_rate = 22050
+            times = np.arange(sample_rate * (3 + index)) / sample_rate
+            sf.write(path, (0.3 * np.sin(2 * np.pi * 220 * (index + 1) * times)).astype(np.float32), sample_rate)
+            self.tracks.append(path)
+        with open(os.path.join(self.library_dir, "notes.txt.bak"), 'w') as f:
+            f.write("not audio")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def warm(self, **kwargs):
+        return warm_analysis_cache(self.tracks, cache_dir=self.cache_dir,
+                                   sequence_maker_cache_dir=self.sequence_maker_cache_dir, **kwargs)
+
+    def test_collect_directories_and_playlists(self):
+        playlist_path = os.path.join(self.temp_dir, "setlist.m3u")
+        with open(playlist_path, 'w') as f:
+            f.write("#EXTM3U\n#EXTINF:3,Track B\nlibrary/album/b.wav\n\nlibrary/missing.wav\n")
+            f.write(f"{self.tracks[0]}\n")
+
+        self.assertEqual(collect_audio_files([self.library_dir]), self.tracks)
+        self.assertEqual(collect_audio_files([playlist_path]), [self.tracks[1], self.tracks[0]])
+        # Tracks given twice are analyzed once
+        self.assertEqual(collect_audio_files([playlist_path, self.library_dir]), [self.tracks[1], self.tracks[0]])
+
+    def test_pool_fills_caches_once(self):
+        summary = self.warm(jobs=2)
+        self.assertEqual(summary["failed"], 0)
+        self.assertEqual([result["audio_path"] for result in summary["results"]], sorted(self.tracks))
+        for result in summary["results"]:
+            self.assertEqual(result["cached"], [])
+        manifests = [name for name in os.listdir(self.sequence_maker_cache_dir)
+                     if name.endswith(".analysis_report" + MANIFEST_SUFFIX)]
+        self.assertEqual(len(manifests), len(self.tracks))
+
+        summary = self.warm(jobs=1)
+        for result in summary["results"]:
+            self.assertEqual(result["computed"], [])
+
+        # The analyzer used by the compiler and extract_audio_features reads the warmed features
+        analyzer = AudioAnalyzer(cache_dir=self.cache_dir)
+        analysis = analyzer.analyze_audio(self.tracks[0], features=["beats", "energy"])
+        self.assertIn("energy_timeseries", analysis)
+
+    def test_selected_features_only(self):
+        summary = self.warm(jobs=1, features=["duration"], sequence_maker=False)
+        self.assertEqual(summary["results"][0]["computed"], ["duration"])
+        self.assertFalse(os.path.exists(self.sequence_maker_cache_dir))
+
+        summary = self.warm(jobs=1, features=["duration", "energy"], sequence_maker=False)
+        self.assertEqual(summary["results"][0]["cached"], ["duration"])
+        self.assertEqual(summary["results"][0]["computed"], ["energy"])
+
+    def test_full_analysis_cache_counts_as_cached(self):
+        self.warm(jobs=1, sequence_maker=False)
+        # Only the full analysis documents are left; analyze_audio returns them without computing
+        for name in os.listdir(self.cache_dir):
+            if "_feature_" in name:
+                os.remove(os.path.join(self.cache_dir, name))
+        summary = self.warm(jobs=1, sequence_maker=False)
+        for result in summary["results"]:
+            self.assertEqual(result["computed"], [])
+            self.assertEqual(result["cached"], list(ANALYSIS_FEATURES))
+
+    def test_unreadable_track_fails_alone(self):
+        with open(self.tracks[1], 'wb') as f:
+            f.write(b"not audio")
+        summary = self.warm(jobs=1, sequence_maker=False)
+        self.assertEqual(summary["succeeded"], 1)
+        self.assertEqual(summary["failed"], 1)
+        failed = [result for result in summary["results"] if not result["ok"]]
+        self.assertEqual(failed[0]["audio_path"], self.tracks[1])
+        self.assertTrue(failed[0]["error"])
+
+    def test_format_seconds(self):
+        self.assertEqual(format_seconds(45.2), "45s")
+        self.assertEqual(format_seconds(187), "3m07s")
+        self.assertEqual(format_seconds(3720), "1h02m")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,21 @@
 Tool Utilities for Roocode Sequence Designer
 
 This package contains utility modules for the Roocode Sequence Designer tools.
+AudioAnalyzer and LyricsProcessor are imported on first access, since they pull
+in librosa, requests and lyricsgenius.
 """
 
+import importlib
+
 from .color_parser import parse_color, interpolate_color
 from .cache_manager import CacheManager
-from .audio_analyzer_core import AudioAnalyzer, LyricsProcessor
+from .segment_timeline import apply_segment_overrides
+from .effect_cache import EffectCache
+from .swap_inbox import SWAP_INBOX_FILE, push_to_swap_inbox, read_swap_inbox
+from .compile_profiler import CompileProfiler
+from .section_index import SectionIndex
+from .analysis_index import AnalysisIndex
+from .analysis_store import find_document, load_document, save_document
 from .color_utils_core import (
     NAMED_COLORS,
     resolve_color,
@@ -48,6 +58,18 @@ __all__ = [
     'parse_color', 'interpolate_color',
     # from cache_manager
     'CacheManager',
+    # from segment_timeline
+    'apply_segment_overrides',
+    # from effect_cache
+    'EffectCache',
+    # from swap_inbox
+    'SWAP_INBOX_FILE', 'push_to_swap_inbox', 'read_swap_inbox',
+    # from compile_profiler
+    'CompileProfiler',
+    # from section_index
+    'SectionIndex', 'AnalysisIndex',
+    # from analysis_store
+    'find_document', 'load_document', 'save_document',
     # from audio_analyzer_core
     'AudioAnalyzer', 'LyricsProcessor',
     # from color_utils_core
@@ -62,4 +84,18 @@ __all__ = [
     'get_file_size', 'get_file_modification_time', 'is_file_newer_than',
     'find_files_by_extension', 'find_sequence_files', 'get_sequence_metadata',
     'list_sequence_metadata', 'convert_sequence_format_segments_to_ltx'
-]
\ No newline at end of file
+]
+
+
+# Names imported from their module on first access
+_LAZY_IMPORTS = {
+    'AudioAnalyzer': '.audio_analyzer_core',
+    'LyricsProcessor': '.audio_analyzer_core',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
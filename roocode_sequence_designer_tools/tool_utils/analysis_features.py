@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Analysis Features Module for Roocode Sequence Designer Tools
+
+The audio analysis features AudioAnalyzer computes and caches individually, and
+the analysis_data keys each one provides. Kept apart from audio_analyzer_core so
+the compiler can map an effect's declared features to the data it reads without
+importing librosa.
+"""
+
+# Features that analyze_audio(features=[...]) computes and caches individually, with the
+# analysis_data keys each one provides. "duration" is always included.
+ANALYSIS_FEATURES = {
+    "duration": ("song_title", "duration_seconds"),
+    "beats": ("estimated_tempo", "time_signature_guess", "beats", "downbeats"),
+    "sections": ("sections",),
+    "energy": ("energy_timeseries",),
+    "onset": ("onset_strength_timeseries",),
+}
+# Keys older analysis files used for a feature's data, which effects still read as a fallback
+LEGACY_FEATURE_KEYS = {
+    "beats": ("beat_times", "downbeat_times"),
+}
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Analysis Index Module for Roocode Sequence Designer Tools
+
+Audio-driven effects search the analysis' beats and sections for every effect.
+Converting a song's beats to an array, or indexing its sections, once per effect
+repeats the same O(n) work for every effect of a design.
+
+compile_seqdesign builds one AnalysisIndex per compile, right after loading the
+audio analysis, and passes it to every effect declaring audio features. It holds:
+- the beat and downbeat times as float arrays, with a flag telling whether they
+  are sorted (so a time window is a binary search),
+- the SectionIndex of the sections and energy timeseries, if there are sections.
+The index is rebuilt with every compile, so it always matches the analysis data
+it was built from.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from roocode_sequence_designer_tools.tool_utils.section_index import SectionIndex
+
+# Keys holding each beat source, in order of preference: the analyzer's key, then the
+# key of analysis files written by extract_audio_features
+BEAT_SOURCE_KEYS = {
+    "all_beats": ("beats", "beat_times"),
+    "downbeats": ("downbeats", "downbeat_times"),
+}
+
+
+def beat_array(beat_times: Sequence[float]) -> Tuple[np.ndarray, bool]:
+    """
+    Convert beat times to a float array and check whether they are sorted.
+
+    Returns:
+        Tuple of (beat time array, sorted flag)
+    """
+    beats = np.asarray(beat_times, dtype=float)
+    return beats, bool(np.all(beats[1:] >= beats[:-1]))
+
+
+def beat_times_of(audio_analysis_data: Dict[str, Any], beat_source: str) -> Sequence[float]:
+    """The beat times of a beat source ("all_beats" or "downbeats"), or [] if there are none."""
+    for key in BEAT_SOURCE_KEYS.get(beat_source, ()):
+        if audio_analysis_data.get(key):
+            return audio_analysis_data[key]
+    return []
+
+
+class AnalysisIndex:
+    """
+    Lookups derived from one audio analysis, built once per compile.
+
+    The analysis data must not be modified while the index is in use.
+
+    Attributes:
+        section_index: SectionIndex of the analysis, or None without sections
+    """
+
+    def __init__(self, audio_analysis_data: Optional[Dict[str, Any]]):
+        """
+        Build the index.
+
+        Args:
+            audio_analysis_data: The audio analysis passed to effect implementations
+        """
+        self.audio_analysis_data = audio_analysis_data or {}
+        self._beats = {}
+        for beat_source in BEAT_SOURCE_KEYS:
+            beat_times = beat_times_of(self.audio_analysis_data, beat_source)
+            if beat_times:
+                self._beats[beat_source] = beat_array(beat_times)
+        self.section_index: Optional[SectionIndex] = None
+        if self.audio_analysis_data.get("sections"):
+            self.section_index = SectionIndex.from_analysis(self.audio_analysis_data)
+
+    def beats(self, beat_source: str) -> Optional[Tuple[np.ndarray, bool]]:
+        """
+        The (beat time array, sorted flag) of a beat source, as beat_array() returns
+        them, or None if the analysis has no such beats.
+        """
+        return self._beats.get(beat_source)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Analysis Store Module for Roocode Sequence Designer Tools
+
+Audio analysis caches are mostly long float lists: the RMS energy, onset strength
+and spectral timeseries hold one value per analysis frame, and chroma and spectral
+contrast one row of them per band. Writing them as JSON text makes every cache hit
+parse megabytes of numbers.
+
+The columnar format stores a cache document (any JSON-compatible dict) in two files:
+- <stem>.columns.json, a small JSON manifest with the document in which every
+  long list of floats (and every list of equal-length float rows) is replaced by
+  a reference to a column, and
+- <stem>.columns.bin, the raw little-endian column data. A column is stored as
+  float32 when that represents all its values exactly (librosa features are
+  float32) and as float64 otherwise, so loading gives back the same floats.
+
+load_document() memory-maps the data file and reads either format, so caches
+written as plain JSON by earlier versions still load.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+COLUMNAR_FORMAT = "roocode-analysis-columns"
+COLUMNAR_FORMAT_VERSION = 1
+MANIFEST_SUFFIX = ".columns.json"
+DATA_SUFFIX = ".columns.bin"
+# Shorter float lists stay in the manifest
+MIN_COLUMN_LENGTH = 16
+_COLUMN_ALIGNMENT = 8
+
+PathLike = Union[str, Path]
+
+
+def columnar_path(json_path: PathLike) -> Path:
+    """
+    Manifest path of the columnar version of a JSON cache file,
+    e.g. abc_analysis.json -> abc_analysis.columns.json.
+    """
+    json_path = Path(json_path)
+    name = json_path.name[:-len(".json")] if json_path.name.endswith(".json") else json_path.name
+    return json_path.with_name(name + MANIFEST_SUFFIX)
+
+
+def _data_path(manifest_path: Path) -> Path:
+    return manifest_path.with_name(manifest_path.name[:-len(MANIFEST_SUFFIX)] + DATA_SUFFIX)
+
+
+def find_document(json_path: PathLike) -> Optional[Path]:
+    """
+    The existing cache file for a JSON cache path: its columnar manifest if there
+    is one, else the JSON file itself, else None.
+    """
+    manifest_path = columnar_path(json_path)
+    if os.path.exists(manifest_path):
+        return manifest_path
+    if os.path.exists(json_path):
+        return Path(json_path)
+    return None
+
+
+def _float_column(value: Any) -> Optional[np.ndarray]:
+    """The array to store a list as, or None if it stays in the manifest."""
+    if not isinstance(value, list) or not value:
+        return None
+    if all(type(item) is float for item in value):
+        if len(value) < MIN_COLUMN_LENGTH:
+            return None
+        return np.array(value, dtype=np.float64)
+    # Rows of a 2D feature such as chroma
+    if all(isinstance(row, list) and row and all(type(item) is float for item in row) for row in value):
+        row_length = len(value[0])
+        if all(len(row) == row_length for row in value) and len(value) * row_length >= MIN_COLUMN_LENGTH:
+            return np.array(value, dtype=np.float64)
+    return None
+
+
+def _extract_columns(value: Any, columns: List[np.ndarray]) -> Any:
+    """Copy of a document with its float columns moved to columns and replaced by references."""
+    if isinstance(value, dict):
+        return {key: _extract_columns(item, columns) for key, item in value.items()}
+    column = _float_column(value)
+    if column is not None:
+        columns.append(column)
+        return {"__column__": len(columns) - 1}
+    if isinstance(value, (list, tuple)):
+        return [_extract_columns(item, columns) for item in value]
+    return value
+
+
+def _write_atomic(path: Path, write) -> None:
+    """Write a file through a temporary file in the same directory, then replace it."""
+    fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def save_document(json_path: PathLike, document: Dict[str, Any]) -> Path:
+    """
+    Save a cache document in the columnar format, replacing a JSON file at json_path.
+
+    Args:
+        json_path: The JSON cache path the document belongs to; the files are
+            written next to it (see columnar_path())
+        document: JSON-compatible data
+
+    Returns:
+        Path: The manifest path
+    """
+    manifest_path = columnar_path(json_path)
+    columns: List[np.ndarray] = []
+    manifest_document = _extract_columns(document, columns)
+
+    column_entries = []
+    offset = 0
+    stored = []
+    for column in columns:
+        narrow = column.astype('<f4')
+        if np.array_equal(narrow.astype(np.float64), column, equal_nan=True):
+            column = narrow
+        else:
+            column = column.astype('<f8')
+        offset += -offset % _COLUMN_ALIGNMENT
+        column_entries.append({"dtype": column.dtype.str, "shape": list(column.shape), "offset": offset})
+        stored.append((offset, column))
+        offset += column.nbytes
+
+    def write_data(f):
+        position = 0
+        for column_offset, column in stored:
+            f.write(b"\0" * (column_offset - position))
+            f.write(column.tobytes())
+            position = column_offset + column.nbytes
+
+    data_path = _data_path(manifest_path)
+    if stored:
+        _write_atomic(data_path, write_data)
+    elif os.path.exists(data_path):
+        os.remove(data_path)
+
+    manifest = {
+        "format": COLUMNAR_FORMAT,
+        "format_version": COLUMNAR_FORMAT_VERSION,
+        "data_size": offset,
+        "columns": column_entries,
+        "document": manifest_document
+    }
+    _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+    if os.path.exists(json_path):
+        os.remove(json_path)
+    return manifest_path
+
+
+def _restore_columns(value: Any, columns: List[Any]) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and "__column__" in value:
+            return columns[value["__column__"]]
+        return {key: _restore_columns(item, columns) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore_columns(item, columns) for item in value]
+    return value
+
+
+def _load_columns(manifest_path: Path, manifest: Dict[str, Any]) -> List[np.ndarray]:
+    entries = manifest.get("columns", [])
+    if not entries:
+        return []
+    data = np.memmap(_data_path(manifest_path), dtype=np.uint8, mode='r')
+    if data.size != manifest.get("data_size"):
+        raise ValueError(f"Column data of {manifest_path} has {data.size} bytes, expected {manifest.get('data_size')}")
+    columns = []
+    for entry in entries:
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        start = entry["offset"]
+        columns.append(data[start:start + count * dtype.itemsize].view(dtype).reshape(shape))
+    return columns
+
+
+def load_document(path: PathLike, as_arrays: bool = False) -> Any:
+    """
+    Load a cache document from a columnar manifest or a plain JSON file.
+
+    Args:
+        path: A manifest path (see find_document()) or a JSON file written by
+            earlier versions
+        as_arrays: Return the columns as read-only memory-mapped NumPy arrays
+            instead of lists; the document is then not JSON-serializable
+
+    Returns:
+        The document, equal to the one that was saved
+
+    Raises:
+        OSError: If a file cannot be read
+        ValueError: If a file is not valid JSON or the column data does not match its manifest
+    """
+    path = Path(path)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not (isinstance(data, dict) and data.get("format") == COLUMNAR_FORMAT):
+        return data
+    if data.get("format_version") != COLUMNAR_FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar cache version in {path}: {data.get('format_version')}")
+    columns = _load_columns(path, data)
+    if not as_arrays:
+        columns = [column.tolist() for column in columns]
+    return _restore_columns(data.get("document"), columns)
+
+
+def remove_document(json_path: PathLike) -> int:
+    """
+    Remove a cache document in either format.
+
+    Returns:
+        int: Number of cache entries removed (0 or 1)
+    """
+    manifest_path = columnar_path(json_path)
+    removed = 0
+    for path in (Path(json_path), manifest_path):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = 1
+    data_path = _data_path(manifest_path)
+    if os.path.exists(data_path):
+        os.remove(data_path)
+    return removed
+
+
+def document_files(path: PathLike) -> Tuple[Path, ...]:
+    """The files making up a cache document found with find_document() or a glob."""
+    path = Path(path)
+    if path.name.endswith(MANIFEST_SUFFIX):
+        data_path = _data_path(path)
+        return (path, data_path) if os.path.exists(data_path) else (path,)
+    return (path,)
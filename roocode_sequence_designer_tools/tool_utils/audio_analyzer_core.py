@@ -22,6 +22,16 @@ import requests
 import lyricsgenius
 from typing import Dict, List, Tuple, Union, Optional, Any
 
+from roocode_sequence_designer_tools.tool_utils.analysis_store import (
+    find_document, load_document, save_document, remove_document, document_files,
+    MANIFEST_SUFFIX, DATA_SUFFIX
+)
+from roocode_sequence_designer_tools.tool_utils.analysis_features import ANALYSIS_FEATURES
+from roocode_sequence_designer_tools.tool_utils.file_hash import HASH_BUFFER_SIZE, get_file_hash_memo
+from roocode_sequence_designer_tools.tool_utils.streaming_analysis import (
+    MEL_N_FFT, StreamingAnalysis, can_stream, stream_duration
+)
+
 try:
     import librosa
     import numpy as np
@@ -36,6 +46,22 @@ except ImportError:
 DEFAULT_APP_DIR_NAME_ROOCODE = ".roocode_sequence_designer"
 ANALYSIS_CACHE_SUBDIR_ROOCODE = "analysis_cache_core" # Subdirectory for this specific analyzer's cache
 
+# Parameters of each feature's computation, defaulting to librosa's defaults. An analysis
+# can override them with analysis_params["feature_params"], e.g. {"sections": {"num_segments": 6}}.
+FEATURE_DEFAULT_PARAMS = {
+    "duration": {},
+    "beats": {"hop_length": 512, "beats_per_bar": 4},
+    "sections": {"hop_length": 512, "num_segments": 8},
+    "energy": {"frame_length": 2048, "hop_length": 512},
+    "onset": {"hop_length": 512},
+}
+# Files at least this long are analyzed block by block (see streaming_analysis) unless
+# AudioAnalyzer(streaming=False) is used
+STREAMING_MIN_SECONDS = 600
+# Analyzer version in the per-feature cache keys. Bump when a feature's computation
+# changes so stale per-feature cache entries are ignored
+FEATURE_CACHE_VERSION = 2
+
 class AudioAnalyzer:
     """
     Comprehensive audio analysis tool for extracting musical features from audio files.
@@ -45,15 +71,19 @@ class AudioAnalyzer:
     re-analyzing the same audio file unnecessarily.
     
     The caching system works as follows:
-    1. Cache keys are generated based on the audio file path, file content hash, and
-       analysis parameters.
+    1. Each feature (see ANALYSIS_FEATURES) is cached separately, keyed by the file
+       content hash, the feature name, its parameters and the analyzer version, so
+       only missing features are computed. The merged full analysis is also cached,
+       keyed by the audio file path, file content hash, and analysis parameters.
     2. Cache files are stored in a configurable directory (defaults to
        ~/.roocode_sequence_designer/analysis_cache_core).
     3. Cache invalidation is based on file modification time and content hash.
-    4. Cache files use JSON format for compatibility and readability.
+    4. Cache files use the columnar format of analysis_store: a small JSON manifest
+       plus raw float columns for the timeseries, read memory-mapped. Caches written
+       as plain JSON by earlier versions are still read.
     """
     
-    def __init__(self, cache_dir=None, api_keys_path=None):
+    def __init__(self, cache_dir=None, api_keys_path=None, streaming=None):
         """
         Initialize the audio analyzer with optional custom cache directory.
         
@@ -62,6 +92,10 @@ class AudioAnalyzer:
                 If not provided, defaults to ~/.roocode_sequence_designer/analysis_cache_core.
             api_keys_path (str, optional): Path to the API keys JSON file for lyrics processing.
                 If not provided, defaults to standard locations within the new app dir.
+            streaming (bool, optional): True computes features from fixed-size blocks of the
+                file, with memory use independent of its duration; False always loads the
+                whole file. Defaults to None, which streams files of at least
+                STREAMING_MIN_SECONDS. Files soundfile cannot read are always loaded whole.
         """
         self.logger = logging.getLogger("RoocodeAudioAnalyzerCore") # Updated logger name
         
@@ -78,8 +112,14 @@ class AudioAnalyzer:
         self.current_analysis_path = None
         self.current_audio_path = None
         
+        # Features of the last analysis read from a cache, and computed from the audio
+        self.loaded_features = []
+        self.computed_features = []
+        
         # Analysis parameters - can be extended in the future
         self.analysis_params = {}
+        self.feature_params = self._resolve_feature_params(None)
+        self.streaming = streaming
         
         # Store API keys path
         self.api_keys_path = api_keys_path # LyricsProcessor will handle its default location logic
@@ -91,7 +131,7 @@ class AudioAnalyzer:
         if not LIBROSA_AVAILABLE:
             self.logger.warning("Librosa not available. Audio analysis functionality will be limited.")
     
-    def analyze_audio(self, audio_file_path, force_reanalysis=False, analysis_params=None):
+    def analyze_audio(self, audio_file_path, force_reanalysis=False, analysis_params=None, features=None):
         """
         Analyze audio file to extract musical features.
         
@@ -112,19 +152,35 @@ class AudioAnalyzer:
                 - conservative_lyrics_alignment (bool): If True, use conservative alignment for lyrics
                 - user_provided_lyrics (str): User-provided lyrics text, if available
                 - request_duration (bool): If True, only basic duration info is prioritized. (New hint)
+                - feature_params (dict): Per-feature overrides of FEATURE_DEFAULT_PARAMS
+            features (list, optional): Names from ANALYSIS_FEATURES to compute, e.g. ["beats"].
+                Each feature is cached separately, keyed by the audio content hash, the
+                feature name, its parameters and FEATURE_CACHE_VERSION, and only missing
+                ones are computed, so asking for beats never runs section segmentation.
+                Defaults to None, which runs the full analysis (from the same per-feature
+                cache entries).
         
         Returns:
-            dict: Analysis data containing musical features
+            dict: Analysis data containing musical features. Afterwards, loaded_features and
+            computed_features list the features (including "duration", which is always
+            analyzed) that were read from a cache and that were computed from the audio.
             
         Raises:
             FileNotFoundError: If the audio file doesn't exist
             RuntimeError: If there's an error loading or analyzing the audio file
+            ValueError: If an unknown feature or feature parameter is requested
         """
+        if features is not None:
+            unknown = [feature for feature in features if feature not in ANALYSIS_FEATURES]
+            if unknown:
+                raise ValueError(f"Unknown analysis features: {unknown}. Supported: {list(ANALYSIS_FEATURES)}")
+        feature_params = self._resolve_feature_params(analysis_params)
+
         if not LIBROSA_AVAILABLE:
             self.logger.error("Librosa is not available, cannot perform audio analysis.")
             # Potentially return a very minimal structure or raise error
             # For now, let's assume if analyze_audio is called, user expects analysis.
-            # This path primarily affects _extract_features.
+            # This path primarily affects the feature computations.
             # analyze_audio can still return duration if only that is requested (handled by some tools)
             # For full analysis, it relies on librosa.
             if not (analysis_params and analysis_params.get('request_duration')):
@@ -139,6 +195,9 @@ class AudioAnalyzer:
         # Store the current audio path and analysis parameters
         self.current_audio_path = audio_file_path
         self.analysis_params = analysis_params or {}
+        self.feature_params = feature_params
+        self.loaded_features = []
+        self.computed_features = []
         
         # Calculate file content hash for more robust cache invalidation
         file_hash = self._calculate_file_hash(audio_file_path)
@@ -148,19 +207,21 @@ class AudioAnalyzer:
         self.current_analysis_path = analysis_path
         
         # Check if analysis already exists and is valid
-        if not force_reanalysis and os.path.exists(analysis_path):
+        cache_file = None if force_reanalysis else find_document(analysis_path)
+        if cache_file is not None:
             try:
                 # Load the cache file
-                with open(analysis_path, 'r') as f:
-                    cache_data = json.load(f)
+                cache_data = load_document(cache_file)
                 
                 # Validate cache metadata
                 cache_valid = self._validate_cache(cache_data, audio_file_path, file_hash)
                 
                 if cache_valid:
-                    self.logger.info(f"Using valid cached analysis from {analysis_path}")
+                    self.logger.info(f"Using valid cached analysis from {cache_file}")
                     analysis_data = cache_data.get("analysis_data", {})
                     self.current_analysis_data = analysis_data
+                    self.loaded_features = self._requested_features(
+                        features if features is not None else list(ANALYSIS_FEATURES))
                     return analysis_data
                 else:
                     self.logger.info("Cache invalid or outdated, will reanalyze")
@@ -169,29 +230,26 @@ class AudioAnalyzer:
             except Exception as e:
                 self.logger.warning(f"Error loading existing analysis, will recreate: {e}")
         
+        if features is not None:
+            analysis_data = self._analyze_selected_features(audio_file_path, file_hash, features, force_reanalysis)
+            self.current_analysis_data = analysis_data
+            self._add_requested_lyrics(audio_file_path, analysis_data)
+            return analysis_data
+
         # Special case: if only duration is requested and librosa is not available,
         # try a fallback if possible, or just fail if no other way.
         # This class is librosa-dependent for actual analysis.
         # The get_audio_duration in combine_audio_data.py uses this.
         # If 'request_duration' is true, we might not need full librosa processing.
-        # However, the current _extract_features always uses librosa.
-        # For simplicity, if librosa is unavailable, _extract_features will fail.
+        # However, the feature computations always use librosa.
+        # For simplicity, if librosa is unavailable, computing a missing feature will fail.
         # The `request_duration` key is more of a hint for `get_audio_duration` which might
         # call this method.
 
-        # Load audio using librosa
-        try:
-            self.logger.info(f"Loading audio for analysis: {audio_file_path}")
-            if not LIBROSA_AVAILABLE: # Should have been caught earlier if not just duration
-                 raise RuntimeError("Librosa not available for loading audio.")
-            audio_data, sample_rate = librosa.load(audio_file_path, sr=None)
-        except Exception as e:
-            self.logger.error(f"Error loading audio file: {e}")
-            raise RuntimeError(f"Error loading audio file: {e}")
-        
-        # Extract features
+        # Extract features, reusing the ones cached by earlier (full or selective) analyses
         self.logger.info("Performing comprehensive audio analysis...")
-        analysis_data = self._extract_features(audio_data, sample_rate, audio_file_path)
+        analysis_data = self._analyze_selected_features(audio_file_path, file_hash, list(ANALYSIS_FEATURES),
+                                                        force_reanalysis)
         
         # Create cache data structure with metadata
         cache_data = {
@@ -205,11 +263,10 @@ class AudioAnalyzer:
             "analysis_data": analysis_data
         }
         
-        # Save to JSON
+        # Save to the cache
         try:
-            with open(analysis_path, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-            self.logger.info(f"Analysis saved to {analysis_path}")
+            saved_path = save_document(analysis_path, cache_data)
+            self.logger.info(f"Analysis saved to {saved_path}")
         except Exception as e:
             self.logger.error(f"Error saving analysis data: {e}")
             # Continue execution even if saving fails
@@ -217,7 +274,23 @@ class AudioAnalyzer:
         # Store the current analysis data
         self.current_analysis_data = analysis_data
         
-        # Process lyrics if requested
+        self._add_requested_lyrics(audio_file_path, analysis_data)
+        
+        return analysis_data
+    
+    def _load_audio(self, audio_file_path):
+        """Load audio at its native sample rate using librosa."""
+        try:
+            self.logger.info(f"Loading audio for analysis: {audio_file_path}")
+            if not LIBROSA_AVAILABLE: # Should have been caught earlier if not just duration
+                 raise RuntimeError("Librosa not available for loading audio.")
+            return librosa.load(audio_file_path, sr=None)
+        except Exception as e:
+            self.logger.error(f"Error loading audio file: {e}")
+            raise RuntimeError(f"Error loading audio file: {e}")
+    
+    def _add_requested_lyrics(self, audio_file_path, analysis_data):
+        """Process lyrics into analysis_data if the analysis parameters request them."""
         if self.analysis_params and self.analysis_params.get('request_lyrics', False):
             self.logger.info("Processing lyrics as requested")
             
@@ -235,37 +308,136 @@ class AudioAnalyzer:
             # Add lyrics data to analysis data
             analysis_data['lyrics_info'] = lyrics_data
             self.current_analysis_data = analysis_data # Update with lyrics
+    
+    def _analyze_selected_features(self, audio_file_path, file_hash, features, force_reanalysis=False):
+        """
+        Compute or load from cache only the requested features.
         
+        Args:
+            audio_file_path (str): Path to the audio file
+            file_hash (str): Hash of the file content
+            features (list): Names from ANALYSIS_FEATURES
+            force_reanalysis (bool, optional): If True, ignore cached features
+            
+        Returns:
+            dict: Analysis data with the keys of the requested features
+        """
+        results = {}
+        missing = []
+        for feature in self._requested_features(features):
+            cached = None if force_reanalysis else self._load_feature_cache(file_hash, feature)
+            if cached is None:
+                missing.append(feature)
+            else:
+                results[feature] = cached
+        self.loaded_features = list(results)
+        
+        if missing:
+            if not LIBROSA_AVAILABLE:
+                raise RuntimeError("Librosa is required for audio analysis but is not installed.")
+            self.logger.info(f"Computing audio features: {', '.join(missing)}")
+            if self._use_streaming(audio_file_path, missing):
+                results.update(self._compute_streamed_features(audio_file_path, missing))
+            else:
+                audio_data, sample_rate = self._load_audio(audio_file_path)
+                for feature in missing:
+                    duration = results["duration"]["duration_seconds"] if "duration" in results else None
+                    results[feature] = self._compute_feature(feature, audio_data, sample_rate, duration)
+            for feature in missing:
+                self._save_feature_cache(audio_file_path, file_hash, feature, results[feature])
+        self.computed_features = missing
+        
+        # The title depends on the file name, not the content the cache entries are keyed by
+        analysis_data = {"song_title": os.path.basename(audio_file_path)}
+        for feature in ANALYSIS_FEATURES:
+            if feature in results:
+                analysis_data.update(results[feature])
         return analysis_data
     
-    def _extract_features(self, audio_data, sample_rate, audio_file_path=None):
-        """Extract musical features from audio data."""
-        if not LIBROSA_AVAILABLE:
-            # This should ideally not be reached if checks are done earlier,
-            # but as a safeguard:
-            self.logger.error("Cannot extract features: Librosa is not available.")
-            # Return a minimal structure or what's possible without librosa
-            # For example, if duration was calculated by another means and passed in, return that.
-            # For now, this indicates a problem if full feature extraction is expected.
-            return {"error": "Librosa not available for feature extraction."}
-
-        # Basic features
-        duration = librosa.get_duration(y=audio_data, sr=sample_rate)
-        tempo, beat_frames = librosa.beat.beat_track(y=audio_data, sr=sample_rate)
-        beat_times = librosa.frames_to_time(beat_frames, sr=sample_rate)
+    def _requested_features(self, features):
+        """The features analyzed for a request: "duration" first, then the others, without duplicates."""
+        return list(dict.fromkeys(["duration"] + [feature for feature in features if feature != "duration"]))
+    
+    def _resolve_feature_params(self, analysis_params):
+        """
+        FEATURE_DEFAULT_PARAMS with the overrides of analysis_params["feature_params"] applied.
         
-        # Derive downbeats (assuming 4/4 time signature)
-        downbeats = beat_times[::4]  # Every 4th beat
+        Raises:
+            ValueError: If an override names an unknown feature or parameter
+        """
+        overrides = (analysis_params or {}).get("feature_params") or {}
+        unknown = [feature for feature in overrides if feature not in FEATURE_DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Unknown features in feature_params: {unknown}. Supported: {list(FEATURE_DEFAULT_PARAMS)}")
+        feature_params = {}
+        for feature, defaults in FEATURE_DEFAULT_PARAMS.items():
+            feature_overrides = overrides.get(feature) or {}
+            unknown = [name for name in feature_overrides if name not in defaults]
+            if unknown:
+                raise ValueError(f"Unknown parameters for feature '{feature}': {unknown}. Supported: {list(defaults)}")
+            feature_params[feature] = {**defaults, **feature_overrides}
+        return feature_params
+    
+    def _compute_feature(self, feature, audio_data, sample_rate, duration=None):
+        """
+        Compute one entry of ANALYSIS_FEATURES with the current feature parameters.
+        
+        Args:
+            feature (str): Feature name
+            audio_data (np.ndarray): Audio samples
+            sample_rate (int): Sample rate of audio_data
+            duration (float, optional): Duration in seconds, needed by "sections"
+            
+        Returns:
+            dict: The analysis_data keys provided by the feature (except "song_title",
+            which analyze_audio adds from the file name)
+        """
+        compute = getattr(self, f"_compute_{feature}", None)
+        if feature not in ANALYSIS_FEATURES or compute is None:
+            raise ValueError(f"Unknown analysis feature: {feature}")
+        return compute(audio_data, sample_rate, self.feature_params[feature], duration)
+    
+    def _compute_duration(self, audio_data, sample_rate, params, duration=None):
+        """Duration of the audio in seconds."""
+        return {"duration_seconds": float(librosa.get_duration(y=audio_data, sr=sample_rate))}
+    
+    def _compute_beats(self, audio_data, sample_rate, params, duration=None):
+        """Tempo, beat times and downbeats (every beats_per_bar-th beat)."""
+        hop_length = params["hop_length"]
+        tempo, beat_frames = librosa.beat.beat_track(y=audio_data, sr=sample_rate, hop_length=hop_length)
+        return self._beats_result(tempo, beat_frames, sample_rate, params)
+    
+    def _beats_result(self, tempo, beat_frames, sample_rate, params):
+        """The "beats" feature from the output of librosa.beat.beat_track."""
+        beat_times = librosa.frames_to_time(beat_frames, sr=sample_rate, hop_length=params["hop_length"])
+        
+        # Derive downbeats (assuming the first beat starts a bar)
+        downbeats = beat_times[::params["beats_per_bar"]]
+        return {
+            "estimated_tempo": float(np.atleast_1d(tempo)[0]), # Newer librosa returns a 1-element array
+            "time_signature_guess": f"{params['beats_per_bar']}/4", # Librosa doesn't directly give this, common placeholder
+            "beats": [float(t) for t in beat_times],
+            "downbeats": [float(t) for t in downbeats]
+        }
+    
+    def _compute_sections(self, audio_data, sample_rate, params, duration=None):
+        """Labeled sections from agglomerative segmentation of the MFCCs."""
+        if duration is None:
+            duration = librosa.get_duration(y=audio_data, sr=sample_rate)
         
         # Segment analysis for section detection
-        mfcc = librosa.feature.mfcc(y=audio_data, sr=sample_rate)
+        mfcc = librosa.feature.mfcc(y=audio_data, sr=sample_rate, hop_length=params["hop_length"])
+        return self._sections_result(mfcc, sample_rate, params, duration)
+    
+    def _sections_result(self, mfcc, sample_rate, params, duration):
+        """The "sections" feature from the MFCCs of the audio."""
         # Adjust number of segments if duration is very short
-        num_segments = 8
+        num_segments = params["num_segments"]
         if duration < 30: # e.g., less than 30 seconds
-            num_segments = max(2, int(duration / 5)) # at least 2 segments, or one per 5s
+            num_segments = min(num_segments, max(2, int(duration / 5))) # at least 2 segments, or one per 5s
         
         segment_boundaries = librosa.segment.agglomerative(mfcc, num_segments) 
-        segment_times = librosa.frames_to_time(segment_boundaries, sr=sample_rate)
+        segment_times = librosa.frames_to_time(segment_boundaries, sr=sample_rate, hop_length=params["hop_length"])
         
         # Create labeled sections
         sections = []
@@ -278,52 +450,155 @@ class AudioAnalyzer:
                 "start": float(segment_times[i]),
                 "end": float(segment_times[i+1])
             })
+        return {"sections": sections}
+    
+    def _compute_energy(self, audio_data, sample_rate, params, duration=None):
+        """Librosa-style RMS energy timeseries."""
+        rms = librosa.feature.rms(y=audio_data, frame_length=params["frame_length"], hop_length=params["hop_length"])[0]
+        return self._timeseries_result("energy_timeseries", rms, sample_rate, params["hop_length"])
+    
+    def _compute_onset(self, audio_data, sample_rate, params, duration=None):
+        """Librosa-style onset strength timeseries."""
+        onset_env = librosa.onset.onset_strength(y=audio_data, sr=sample_rate, hop_length=params["hop_length"])
+        return self._timeseries_result("onset_strength_timeseries", onset_env, sample_rate, params["hop_length"])
+    
+    def _timeseries_result(self, key, values, sample_rate, hop_length):
+        """A {key: {"times": [...], "values": [...]}} feature from per-frame values."""
+        return {
+            key: {
+                "times": [float(t) for t in librosa.times_like(values, sr=sample_rate, hop_length=hop_length)],
+                "values": [float(v) for v in values]
+            }
+        }
+    
+    def _use_streaming(self, audio_file_path, features):
+        """Whether to compute features from blocks of the file instead of loading it whole."""
+        if self.streaming is False:
+            return False
+        hop_lengths = {self.feature_params[feature]["hop_length"] for feature in features
+                       if "hop_length" in self.feature_params[feature]}
+        reason = None
+        if not can_stream(audio_file_path):
+            reason = "the file format cannot be read in blocks"
+        elif len(hop_lengths) > 1:
+            reason = "the features use different hop lengths"
+        elif "energy" in features and self.feature_params["energy"]["frame_length"] != MEL_N_FFT:
+            reason = f"streamed energy needs frame_length {MEL_N_FFT}"
+        if reason:
+            if self.streaming:
+                self.logger.warning(f"Streaming analysis not possible ({reason}), loading the whole file")
+            return False
+        return self.streaming or stream_duration(audio_file_path) >= STREAMING_MIN_SECONDS
+    
+    def _compute_streamed_features(self, audio_file_path, features):
+        """
+        Compute features with StreamingAnalysis, reading the file in blocks.
+        
+        Returns:
+            dict: Feature name -> the analysis_data keys it provides, as _compute_feature
+            returns them
+        """
+        self.logger.info(f"Streaming analysis of {audio_file_path}")
+        hop_length = next((self.feature_params[feature]["hop_length"] for feature in features
+                           if "hop_length" in self.feature_params[feature]), FEATURE_DEFAULT_PARAMS["onset"]["hop_length"])
+        stream = StreamingAnalysis(audio_file_path, hop_length=hop_length)
+        mel_features = [feature for feature in features if feature in ("beats", "sections", "onset")]
+        rms = stream.first_pass(mel=bool(mel_features))
+        sample_rate = stream.sample_rate
+        duration = stream.num_samples / sample_rate
+        
+        results = {}
+        if "duration" in features:
+            results["duration"] = {"duration_seconds": float(duration)}
+        if "energy" in features:
+            results["energy"] = self._timeseries_result("energy_timeseries", rms, sample_rate, hop_length)
+        if mel_features:
+            onset_env, beat_env, mfcc = stream.second_pass(mfcc="sections" in features)
+            if "beats" in features:
+                tempo, beat_frames = librosa.beat.beat_track(onset_envelope=beat_env, sr=sample_rate,
+                                                             hop_length=hop_length)
+                results["beats"] = self._beats_result(tempo, beat_frames, sample_rate, self.feature_params["beats"])
+            if "sections" in features:
+                results["sections"] = self._sections_result(mfcc, sample_rate, self.feature_params["sections"], duration)
+            if "onset" in features:
+                results["onset"] = self._timeseries_result("onset_strength_timeseries", onset_env, sample_rate,
+                                                           hop_length)
+        return results
+    
+    def _get_feature_cache_path(self, file_hash, feature):
+        """
+        Path of the cache file for one feature of an audio file.
+        
+        The key is the content hash, not the path, so copies of a file share entries.
+        """
+        params_str = json.dumps(self.feature_params[feature], sort_keys=True)
+        key_components = f"{file_hash}_{feature}_{params_str}_v{FEATURE_CACHE_VERSION}"
+        path_hash = hashlib.md5(key_components.encode()).hexdigest()
+        return self.analysis_cache_dir / f"{path_hash}_feature_{feature}.json"
+    
+    def _load_feature_cache(self, file_hash, feature):
+        """
+        Load one cached feature.
         
-        # Energy and onset strength
-        rms = librosa.feature.rms(y=audio_data)[0]
-        onset_env = librosa.onset.onset_strength(y=audio_data, sr=sample_rate)
+        Returns:
+            dict: The feature's analysis_data keys, or None if there is no valid cache entry
+        """
+        cache_path = find_document(self._get_feature_cache_path(file_hash, feature))
+        if cache_path is None:
+            return None
+        try:
+            cache_data = load_document(cache_path)
+        except Exception as e:
+            self.logger.warning(f"Error loading cached feature '{feature}', will recompute: {e}")
+            return None
         
-        # Convert numpy arrays to lists for JSON serialization
-        times = librosa.times_like(rms, sr=sample_rate)
+        metadata = cache_data.get("metadata", {}) if isinstance(cache_data, dict) else {}
+        if (metadata.get("file_hash") != file_hash or
+                metadata.get("feature") != feature or
+                metadata.get("feature_params") != self.feature_params[feature] or
+                metadata.get("feature_cache_version") != FEATURE_CACHE_VERSION):
+            self.logger.debug(f"Cached feature '{feature}' is invalid or outdated, will recompute")
+            return None
         
-        # Create analysis data structure
-        return {
-            "song_title": os.path.basename(audio_file_path) if audio_file_path else "Unknown",
-            "duration_seconds": float(duration),
-            "estimated_tempo": float(tempo),
-            "time_signature_guess": "4/4", # Librosa doesn't directly give this, common placeholder
-            "beats": [float(t) for t in beat_times],
-            "downbeats": [float(t) for t in downbeats],
-            "sections": sections,
-            "energy_timeseries": { # Librosa-style RMS energy
-                "times": [float(t) for t in times],
-                "values": [float(v) for v in rms]
+        self.logger.info(f"Using cached feature '{feature}' from {cache_path}")
+        return cache_data.get("feature_data")
+    
+    def _save_feature_cache(self, audio_file_path, file_hash, feature, feature_data):
+        """Write one computed feature to its cache file."""
+        cache_path = self._get_feature_cache_path(file_hash, feature)
+        cache_data = {
+            "metadata": {
+                "audio_file_path": audio_file_path,
+                "file_hash": file_hash,
+                "feature": feature,
+                "feature_params": self.feature_params[feature],
+                "feature_cache_version": FEATURE_CACHE_VERSION,
+                "analysis_timestamp": time.time()
             },
-            "onset_strength_timeseries": { # Librosa-style onset strength
-                "times": [float(t) for t in librosa.times_like(onset_env, sr=sample_rate)],
-                "values": [float(v) for v in onset_env]
-            }
+            "feature_data": feature_data
         }
+        try:
+            save_document(cache_path, cache_data)
+        except Exception as e:
+            self.logger.error(f"Error saving cached feature '{feature}': {e}")
+            # Continue execution even if saving fails
     
-    def _calculate_file_hash(self, file_path, block_size=65536):
+    def _calculate_file_hash(self, file_path, block_size=HASH_BUFFER_SIZE):
         """
         Calculate a hash of the file content for more robust cache invalidation.
         
+        The hash is remembered in this analyzer's cache directory (see file_hash.FileHashMemo)
+        and the file is only read again when its size, modification time or inode change.
+        
         Args:
             file_path (str): Path to the file
-            block_size (int, optional): Size of blocks to read. Defaults to 65536.
+            block_size (int, optional): Size of blocks to read. Defaults to 1 MiB.
             
         Returns:
-            str: Hexadecimal hash of the file content
+            str: Hexadecimal BLAKE2b hash of the file content
         """
         try:
-            hasher = hashlib.md5()
-            with open(file_path, 'rb') as f:
-                buf = f.read(block_size)
-                while len(buf) > 0:
-                    hasher.update(buf)
-                    buf = f.read(block_size)
-            return hasher.hexdigest()
+            return get_file_hash_memo(self.analysis_cache_dir).file_hash(file_path, block_size)
         except Exception as e:
             self.logger.warning(f"Error calculating file hash for {file_path}: {e}")
             # Fall back to using the file path and mtime
@@ -340,6 +615,10 @@ class AudioAnalyzer:
         """
         Generate a path for the analysis JSON based on the audio file path and content hash.
         
+        The cache is stored in the columnar format next to this path (see
+        analysis_store.columnar_path()); the path itself is where earlier versions
+        wrote the JSON cache.
+        
         Args:
             audio_file_path (str): Path to the audio file
             file_hash (str, optional): Hash of the file content. If None, only path is used.
@@ -432,15 +711,20 @@ class AudioAnalyzer:
                 params_to_use = analysis_params_for_key if analysis_params_for_key is not None else self.analysis_params
                 cache_path = self._get_analysis_path_for_audio(audio_file_path, file_hash, params_to_use)
                 
-                if os.path.exists(cache_path):
-                    os.remove(cache_path)
+                if remove_document(cache_path):
                     count = 1
                     self.logger.info(f"Cleared cache for {audio_file_path} with params {params_to_use} at {cache_path}")
             else:
-                # Clear all cache files in this analyzer's specific cache directory
-                for cache_file in self.analysis_cache_dir.glob("*_analysis.json"):
+                # Clear all cache files in this analyzer's specific cache directory,
+                # counting each columnar manifest and its column data as one file
+                cache_files = set()
+                for pattern in ("*_analysis.json", "*_feature_*.json", f"*{MANIFEST_SUFFIX}"):
+                    cache_files.update(self.analysis_cache_dir.glob(pattern))
+                for cache_file in cache_files:
                     os.remove(cache_file)
                     count += 1
+                for data_file in self.analysis_cache_dir.glob(f"*{DATA_SUFFIX}"):
+                    os.remove(data_file)
                 self.logger.info(f"Cleared {count} cache files from {self.analysis_cache_dir}")
         except Exception as e:
             self.logger.error(f"Error clearing cache: {e}")
@@ -567,17 +851,16 @@ class AudioAnalyzer:
                 # Get info for specific file
                 file_hash = self._calculate_file_hash(audio_file_path)
                 params_to_use = analysis_params_for_key if analysis_params_for_key is not None else self.analysis_params
-                cache_path = self._get_analysis_path_for_audio(audio_file_path, file_hash, params_to_use)
+                cache_path = find_document(self._get_analysis_path_for_audio(audio_file_path, file_hash, params_to_use))
                 
-                if os.path.exists(cache_path):
+                if cache_path is not None:
                     try:
-                        with open(cache_path, 'r') as f:
-                            cache_data = json.load(f)
+                        cache_data = load_document(cache_path, as_arrays=True)
                         
                         metadata = cache_data.get("metadata", {})
                         cache_info["cache_files"].append({
                             "path": str(cache_path),
-                            "size": os.path.getsize(cache_path),
+                            "size": sum(os.path.getsize(path) for path in document_files(cache_path)),
                             "created_timestamp": os.path.getctime(cache_path), # Use clearer key
                             "audio_file": metadata.get("audio_file_path", "Unknown"),
                             "analysis_timestamp": metadata.get("analysis_timestamp", 0),
@@ -587,15 +870,16 @@ class AudioAnalyzer:
                         self.logger.warning(f"Error reading cache file {cache_path}: {e}")
             else:
                 # Get info for all cache files in this analyzer's specific cache directory
-                for cache_file in self.analysis_cache_dir.glob("*_analysis.json"):
+                cache_files = (list(self.analysis_cache_dir.glob("*_analysis.json")) +
+                               list(self.analysis_cache_dir.glob(f"*_analysis{MANIFEST_SUFFIX}")))
+                for cache_file in cache_files:
                     try:
-                        with open(cache_file, 'r') as f:
-                            cache_data = json.load(f)
+                        cache_data = load_document(cache_file, as_arrays=True)
                         
                         metadata = cache_data.get("metadata", {})
                         cache_info["cache_files"].append({
                             "path": str(cache_file),
-                            "size": os.path.getsize(cache_file),
+                            "size": sum(os.path.getsize(path) for path in document_files(cache_file)),
                             "created_timestamp": os.path.getctime(cache_file),
                             "audio_file": metadata.get("audio_file_path", "Unknown"),
                             "analysis_timestamp": metadata.get("analysis_timestamp", 0),
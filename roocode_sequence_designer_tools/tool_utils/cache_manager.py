@@ -12,6 +12,8 @@ import hashlib
 import shutil
 from typing import Dict, Any, Optional, Union
 
+from .file_hash import get_file_hash_memo
+
 DEFAULT_CACHE_DIR_NAME = "cache"
 DEFAULT_APP_DIR_NAME = ".roocode_sequence_designer"
 
@@ -43,20 +45,19 @@ class CacheManager:
 
     def _get_file_hash(self, file_path: str) -> str:
         """
-        Generates an MD5 hash for the content of a file.
+        Generates a BLAKE2b hash for the content of a file.
+
+        The hash is remembered in the cache directory (see file_hash.FileHashMemo), so
+        the file is only read again when its size, modification time or inode change.
 
         Args:
             file_path: Path to the file.
 
         Returns:
-            MD5 hash string of the file content.
+            Hash string of the file content.
         """
-        hasher = hashlib.md5()
         try:
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(8192): # Read in 8KB chunks
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            return get_file_hash_memo(self.cache_root_dir).file_hash(file_path)
         except FileNotFoundError:
             # If file not found during hashing, this will be part of cache key gen issue.
             # Or, we can decide to return a specific marker or raise error earlier.
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Compile Profiler Module for Roocode Sequence Designer Tools
+
+Records where the time of a compile goes: per effect (or pattern template) the
+time spent generating its output, the number of items it produced and the time
+spent merging them, plus named phases such as audio analysis loading and output
+writing. The result can be printed as a table sorted by cost, saved as JSON, or
+saved in Chrome trace format for chrome://tracing and Perfetto.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class CompileProfiler:
+    """
+    Collects per-item and per-phase timings for one compile.
+
+    Items are effects in compile_seqdesign.py (items = segments emitted) and
+    pattern templates in pattern_templates.py (items = effects emitted).
+    """
+
+    def __init__(self):
+        """Initialize an empty profile; trace timestamps are relative to this moment."""
+        self._origin = time.perf_counter()
+        self.items = []
+        self.phases = []
+        self.events = []
+
+    def _add_event(self, name: str, category: str, start: float, seconds: float,
+                   args: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round(seconds * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": args or {}
+        })
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a named phase of the compile, e.g. "audio analysis" or "write .prg.json".
+
+        Phases with the same name are added up in the report.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases.append((name, seconds))
+            self._add_event(name, "phase", start, seconds)
+
+    def record_item(self, item_id: str, item_type: str, apply_start: float, apply_seconds: float,
+                    items: int, merge_start: Optional[float] = None, merge_seconds: float = 0.0,
+                    category: str = "effect", cached: bool = False) -> None:
+        """
+        Record the cost of one effect or pattern template.
+
+        Args:
+            item_id: Effect or pattern id
+            item_type: Effect type or pattern type
+            apply_start: time.perf_counter() when generation started
+            apply_seconds: Time spent generating the output (apply_*_effect or expand_*_pattern)
+            items: Number of segments or effects produced
+            merge_start: time.perf_counter() when merging started, if the output was merged
+            merge_seconds: Time spent merging the output into the timeline
+            category: "effect" or "pattern"
+            cached: The output came from a cache instead of being generated
+        """
+        self.items.append({
+            "id": str(item_id),
+            "type": item_type,
+            "category": category,
+            "apply_seconds": apply_seconds,
+            "merge_seconds": merge_seconds,
+            "total_seconds": apply_seconds + merge_seconds,
+            "items": items,
+            "cached": cached
+        })
+        args = {"type": item_type, "items": items, "cached": cached}
+        self._add_event(f"{item_id} ({item_type})", category, apply_start, apply_seconds, args)
+        if merge_start is not None:
+            self._add_event(f"merge {item_id}", "merge", merge_start, merge_seconds, {"items": items})
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Seconds per phase name, in first-seen order."""
+        totals = {}
+        for name, seconds in self.phases:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the profile to a dictionary, items sorted by total time, most expensive first.
+
+        Returns:
+            Dict with "phases" (seconds per phase), "items", and "apply_seconds",
+            "merge_seconds" and "item_count" summed over all items.
+        """
+        items = sorted(self.items, key=lambda item: item["total_seconds"], reverse=True)
+        return {
+            "phases": self.phase_totals(),
+            "items": items,
+            "apply_seconds": sum(item["apply_seconds"] for item in items),
+            "merge_seconds": sum(item["merge_seconds"] for item in items),
+            "item_count": sum(item["items"] for item in items)
+        }
+
+    def format_table(self, limit: Optional[int] = 25) -> str:
+        """
+        Format the profile as a text table, most expensive items first.
+
+        Args:
+            limit: Maximum number of item rows; None shows all.
+
+        Returns:
+            str: The table, followed by the phase timings.
+        """
+        profile = self.to_dict()
+        items = profile["items"]
+        shown = items if limit is None else items[:limit]
+        id_width = max([len("id")] + [len(item["id"]) for item in shown])
+        type_width = max([len("type")] + [len(item["type"]) for item in shown])
+
+        lines = [f"{'id':<{id_width}}  {'type':<{type_width}}  {'apply ms':>9}  {'merge ms':>9}  "
+                 f"{'total ms':>9}  {'items':>7}"]
+        lines.append("-" * len(lines[0]))
+        for item in shown:
+            lines.append(f"{item['id']:<{id_width}}  {item['type']:<{type_width}}  "
+                         f"{item['apply_seconds'] * 1000:>9.2f}  {item['merge_seconds'] * 1000:>9.2f}  "
+                         f"{item['total_seconds'] * 1000:>9.2f}  {item['items']:>7}"
+                         f"{'  (cached)' if item['cached'] else ''}")
+        if len(shown) < len(items):
+            lines.append(f"... {len(items) - len(shown)} more")
+        lines.append(f"{'all':<{id_width}}  {'':<{type_width}}  {profile['apply_seconds'] * 1000:>9.2f}  "
+                     f"{profile['merge_seconds'] * 1000:>9.2f}  "
+                     f"{(profile['apply_seconds'] + profile['merge_seconds']) * 1000:>9.2f}  "
+                     f"{profile['item_count']:>7}")
+
+        if profile["phases"]:
+            lines.append("")
+            for name, seconds in profile["phases"].items():
+                lines.append(f"{name:<{id_width + type_width + 2}}  {seconds * 1000:>9.2f} ms")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """The recorded events in Chrome trace event format."""
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write_json(self, path: str) -> None:
+        """Write to_dict() to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Write to_chrome_trace() to a JSON file loadable in chrome://tracing or Perfetto."""
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
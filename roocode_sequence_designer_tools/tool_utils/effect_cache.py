@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Effect Cache Module for Roocode Sequence Designer Tools
+
+Caches what compile_seqdesign.py computes per effect so that recompiling an
+edited design only re-renders the effects that changed:
+
+- The segment list each effect generated, keyed by a hash of its type, params,
+  resolved timing, the compile metadata and a fingerprint of the audio analysis
+  features it declares.
+- Checkpoints of the merged timeline after every few effects, keyed by a hash
+  chained over all effects up to that point, so the merge can be replayed from
+  the last checkpoint before the first changed effect.
+
+The cache lives in memory and can be persisted to a JSON file between runs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from roocode_sequence_designer_tools.tool_utils.analysis_features import ANALYSIS_FEATURES, LEGACY_FEATURE_KEYS
+
+DEFAULT_APP_DIR_NAME = ".roocode_sequence_designer"
+DEFAULT_EFFECT_CACHE_DIR_NAME = "effect_cache"
+# Bump when effect implementations or the merge change so older cache files are ignored
+EFFECT_CACHE_VERSION = 1
+# Store a timeline checkpoint after this many effects
+DEFAULT_CHECKPOINT_INTERVAL = 8
+
+
+def _hash_json(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _restore_segment(segment: List[Any]) -> Tuple[Any, ...]:
+    """Turn a segment loaded from JSON back into the tuple form effects produce."""
+    start, end, color_data, pixels = segment[:4]
+    if len(segment) == 5 and segment[4] == "fade":
+        color_data = tuple(tuple(color) for color in color_data)
+    else:
+        color_data = tuple(color_data)
+    return (start, end, color_data, pixels) + tuple(segment[4:])
+
+
+class EffectCache:
+    """
+    Per-effect segment lists and merged-timeline checkpoints for incremental compiles.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_path: JSON file to load from and save to. None keeps the cache in memory only.
+            checkpoint_interval: Number of effects between timeline checkpoints.
+        """
+        self.cache_path = cache_path
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self.segments = {}
+        self.checkpoints = {}
+        self._used_segments = set()
+        self._used_checkpoints = set()
+        if cache_path:
+            self.load()
+
+    @staticmethod
+    def default_cache_path(design_path: str) -> str:
+        """
+        Default cache file for a design: ~/.roocode_sequence_designer/effect_cache/<hash>.json.
+
+        Args:
+            design_path: Path to the .seqdesign.json file.
+        """
+        design_hash = hashlib.md5(os.path.abspath(design_path).encode('utf-8')).hexdigest()
+        return os.path.join(os.path.expanduser("~"), DEFAULT_APP_DIR_NAME, DEFAULT_EFFECT_CACHE_DIR_NAME,
+                            f"{design_hash}.json")
+
+    @staticmethod
+    def analysis_fingerprint(audio_analysis_data: Optional[Dict[str, Any]],
+                             features: Sequence[str]) -> Optional[str]:
+        """
+        Hash of the audio analysis data an effect reads, or None if there is none.
+
+        Args:
+            audio_analysis_data: The audio analysis passed to effect implementations.
+            features: The features the effect declares (see ANALYSIS_FEATURES). Only their
+                keys are hashed, so adding another feature to the analysis keeps the key.
+                An unknown feature hashes the whole analysis.
+        """
+        if not audio_analysis_data:
+            return None
+        if any(feature not in ANALYSIS_FEATURES for feature in features):
+            return _hash_json(audio_analysis_data)
+        keys = sorted({key for feature in features
+                       for key in ANALYSIS_FEATURES[feature] + LEGACY_FEATURE_KEYS.get(feature, ())})
+        return _hash_json({key: audio_analysis_data.get(key) for key in keys})
+
+    @staticmethod
+    def effect_key(effect_type: str, start_sec: float, end_sec: float, params: Dict[str, Any],
+                   metadata: Dict[str, Any], analysis_fingerprint: Optional[str] = None) -> str:
+        """
+        Key for the segments one effect generates.
+
+        Args:
+            effect_type: Effect type, lower case.
+            start_sec: Resolved and clamped effect start.
+            end_sec: Resolved and clamped effect end.
+            params: The effect's params.
+            metadata: The processed metadata passed to effect implementations.
+            analysis_fingerprint: analysis_fingerprint() of the data the effect reads, if any.
+        """
+        return _hash_json([EFFECT_CACHE_VERSION, effect_type, repr(start_sec), repr(end_sec), params,
+                           metadata, analysis_fingerprint])
+
+    @staticmethod
+    def initial_chain_key(initial_segments: List[Tuple[Any, ...]]) -> str:
+        """Chain key of the timeline before any effect is applied."""
+        return _hash_json([EFFECT_CACHE_VERSION, repr(initial_segments)])
+
+    @staticmethod
+    def next_chain_key(chain_key: str, effect_key: Optional[str]) -> str:
+        """Chain key after applying an effect; effect_key is None for skipped effects."""
+        if effect_key is None:
+            return chain_key
+        return hashlib.sha256(f"{chain_key}:{effect_key}".encode('utf-8')).hexdigest()
+
+    def get_segments(self, effect_key: str) -> Optional[List[Tuple[Any, ...]]]:
+        """Cached segments for an effect key, or None."""
+        segments = self.segments.get(effect_key)
+        if segments is not None:
+            self._used_segments.add(effect_key)
+        return segments
+
+    def put_segments(self, effect_key: str, segments: List[Tuple[Any, ...]]) -> None:
+        self.segments[effect_key] = list(segments)
+        self._used_segments.add(effect_key)
+
+    def get_checkpoint(self, chain_key: str) -> Optional[List[Tuple[Any, ...]]]:
+        """Merged timeline stored for a chain key, or None."""
+        timeline = self.checkpoints.get(chain_key)
+        if timeline is not None:
+            self._used_checkpoints.add(chain_key)
+            return list(timeline)
+        return None
+
+    def put_checkpoint(self, chain_key: str, timeline: List[Tuple[Any, ...]]) -> None:
+        self.checkpoints[chain_key] = list(timeline)
+        self._used_checkpoints.add(chain_key)
+
+    def load(self) -> None:
+        """Load the cache file, ignoring it if it is missing, corrupt or from another version."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable effect cache {self.cache_path}: {e}")
+            return
+        if not isinstance(data, dict) or data.get("version") != EFFECT_CACHE_VERSION:
+            return
+        self.segments = {key: [_restore_segment(segment) for segment in segments]
+                         for key, segments in data.get("segments", {}).items()}
+        self.checkpoints = {key: [_restore_segment(segment) for segment in timeline]
+                            for key, timeline in data.get("checkpoints", {}).items()}
+
+    def save(self) -> None:
+        """
+        Write the entries used since the last save to the cache file.
+
+        Entries no compile has used since then (from effects that were edited or
+        removed) are dropped, so the file tracks the current design.
+        """
+        self.segments = {key: value for key, value in self.segments.items() if key in self._used_segments}
+        self.checkpoints = {key: value for key, value in self.checkpoints.items() if key in self._used_checkpoints}
+        self._used_segments = set()
+        self._used_checkpoints = set()
+        if not self.cache_path:
+            return
+        data = {"version": EFFECT_CACHE_VERSION, "segments": self.segments, "checkpoints": self.checkpoints}
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save effect cache {self.cache_path}: {e}")
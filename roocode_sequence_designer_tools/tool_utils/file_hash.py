@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+File Hash Module for Roocode Sequence Designer Tools
+
+Audio analysis caches are keyed by a hash of the audio file content. Hashing a
+large WAV or FLAC master on every analyze_audio() or generate_cache_key() call
+costs more than loading the cached analysis.
+
+FileHashMemo remembers the content hash of each file together with its size,
+modification time (ns) and inode, and persists the table as a small JSON file
+next to the cache it serves. A file is only hashed again when one of those
+changes. Hashes are BLAKE2b with a 16-byte digest (32 hex characters, the length
+of the MD5 digests used before), read through a 1 MiB buffer.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+HASH_BUFFER_SIZE = 1 << 20
+HASH_DIGEST_SIZE = 16
+MEMO_FILE_NAME = "file_hashes.json"
+# Bump when the hash function changes so remembered hashes are discarded
+FILE_HASH_MEMO_VERSION = 1
+# Oldest entries are dropped beyond this many files
+DEFAULT_MAX_ENTRIES = 10000
+# Files modified this recently are not remembered: on filesystems with coarse
+# timestamps another write in the same tick would keep the same identity
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def hash_file(file_path: str, buffer_size: int = HASH_BUFFER_SIZE) -> str:
+    """
+    BLAKE2b hash of a file's content.
+
+    Args:
+        file_path: Path to the file
+        buffer_size: Bytes read per call
+
+    Returns:
+        str: Hexadecimal digest
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    hasher = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            hasher.update(view[:count])
+    return hasher.hexdigest()
+
+
+def _file_identity(stat_result: os.stat_result) -> Tuple[int, int, int]:
+    return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+
+
+class FileHashMemo:
+    """
+    Persistent (path, size, mtime_ns, inode) -> content hash table.
+    """
+
+    def __init__(self, memo_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the memo, loading memo_path if it exists.
+
+        Args:
+            memo_path: JSON file to load from and save to. None keeps the memo in memory only.
+            max_entries: Maximum number of files remembered.
+        """
+        self.memo_path = memo_path
+        self.max_entries = max(1, max_entries)
+        self.entries: Dict[str, Dict[str, object]] = {}
+        if memo_path:
+            self.entries = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, object]]:
+        """The entries stored in memo_path, or {} if it is missing or unreadable."""
+        try:
+            with open(self.memo_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable file hash memo {self.memo_path}: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != FILE_HASH_MEMO_VERSION:
+            return {}
+        entries = data.get("entries")
+        return entries if isinstance(entries, dict) else {}
+
+    def file_hash(self, file_path: str, buffer_size: int = HASH_BUFFER_SIZE) -> str:
+        """
+        Content hash of a file, hashing it only if it is new or has changed.
+
+        Args:
+            file_path: Path to the file
+            buffer_size: Bytes read per call when the file has to be hashed
+
+        Returns:
+            str: Hexadecimal BLAKE2b digest
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        path = os.path.abspath(file_path)
+        identity = _file_identity(os.stat(path))
+        entry = self.entries.get(path)
+        if (entry is None or tuple(entry.get("identity", ())) != identity) and self.memo_path:
+            # Another process may have hashed it since the memo was loaded
+            entry = self._read().get(path)
+        if entry is not None and tuple(entry.get("identity", ())) == identity:
+            self.entries[path] = entry
+            return entry["hash"]
+
+        content_hash = hash_file(path, buffer_size)
+        # Re-check in case the file changed while it was read
+        if _file_identity(os.stat(path)) == identity and time.time_ns() - identity[1] > RACY_WINDOW_NS:
+            self.entries.pop(path, None)
+            self.entries[path] = {"identity": list(identity), "hash": content_hash}
+            while len(self.entries) > self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.save()
+        return content_hash
+
+    def save(self) -> None:
+        """
+        Write the memo to memo_path, merged with entries other processes saved meanwhile.
+
+        Errors are reported as warnings; the memo is only an optimization.
+        """
+        if not self.memo_path:
+            return
+        merged = self._read()
+        for path in self.entries:
+            merged.pop(path, None)
+        merged.update(self.entries)
+        while len(merged) > self.max_entries:
+            merged.pop(next(iter(merged)))
+        self.entries = merged
+
+        directory = os.path.dirname(os.path.abspath(self.memo_path))
+        temp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".file_hashes_", suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"version": FILE_HASH_MEMO_VERSION, "entries": merged}, f)
+            os.replace(temp_path, self.memo_path)
+        except OSError as e:
+            print(f"Warning: Could not save file hash memo {self.memo_path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+# Memos returned by get_file_hash_memo(), by absolute memo path
+_MEMOS: Dict[str, FileHashMemo] = {}
+
+
+def get_file_hash_memo(cache_dir: str) -> FileHashMemo:
+    """
+    The FileHashMemo stored in a cache directory, shared by every user of that
+    directory in this process.
+    """
+    memo_path = os.path.join(os.path.abspath(str(cache_dir)), MEMO_FILE_NAME)
+    memo = _MEMOS.get(memo_path)
+    if memo is None:
+        memo = _MEMOS[memo_path] = FileHashMemo(memo_path)
+    return memo
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Section Index Module for Roocode Sequence Designer Tools
+
+Section- and energy-driven effects and pattern templates look up which song
+sections overlap a time window, the sections with a given label, and the energy
+points inside a section. Scanning the section and energy lists for every effect
+makes a design with a theme per section of a long DJ mix quadratic.
+
+SectionIndex is built once per compile (compile_seqdesign keeps it in the
+compile's AnalysisIndex, see analysis_index.py) or once per pattern expansion,
+and answers these queries with binary searches:
+- sections as arrays sorted by start time, plus a label -> sections map,
+- the energy timeseries sorted by time, with cumulative sums so the mean energy
+  of any window is O(log n),
+- per-section energy statistics (point count, mean, min, max), which the
+  section theme effect maps to brightness or saturation.
+
+Queries return positions in the original section list and the original section
+and energy values, so results are the same as scanning the lists in order.
+"""
+
+from numbers import Real
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _is_time(value: Any) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def _energy_points(audio_analysis_data: Dict[str, Any]) -> List[Tuple[Any, Any]]:
+    """
+    The energy timeseries of an analysis as (time, value) pairs, in the stored order.
+
+    Reads "energy" (a list of [time, value] pairs or {"time": t, "value": v} dicts,
+    as used by pattern templates) or else the analyzer's "energy_timeseries"
+    ({"times": [...], "values": [...]}).
+    """
+    energy = audio_analysis_data.get("energy")
+    if energy:
+        if isinstance(energy[0], dict):
+            return [(point['time'], point['value']) for point in energy]
+        return [(point[0], point[1]) for point in energy]
+    energy_timeseries = audio_analysis_data.get("energy_timeseries")
+    if isinstance(energy_timeseries, dict):
+        return list(zip(energy_timeseries.get("times", []), energy_timeseries.get("values", [])))
+    return []
+
+
+class SectionIndex:
+    """
+    Precomputed lookups over the sections and energy timeseries of one analysis.
+
+    Attributes:
+        sections: The analysis' section dicts, in their original order
+        energy_points: (time, value) pairs sorted by time (stable, so points with
+            equal times keep their order)
+        energy_count, energy_mean, energy_min, energy_max: Per-section energy
+            statistics over the points with start <= time < end, indexed like
+            sections (NaN mean/min/max for sections without points or valid times)
+        energy_peak: Highest energy value of the analysis, or None without points
+    """
+
+    def __init__(self, sections: Optional[Sequence[Dict[str, Any]]],
+                 energy_points: Optional[Sequence[Tuple[Any, Any]]] = None):
+        """
+        Build the index.
+
+        Args:
+            sections: Section dicts with "label", "start" and "end" keys
+            energy_points: (time, value) pairs in any order
+        """
+        self.sections = list(sections or [])
+
+        # Sections by label, in original order
+        self._by_label: Dict[Any, List[int]] = {}
+        for position, section in enumerate(self.sections):
+            if isinstance(section, dict):
+                self._by_label.setdefault(section.get("label"), []).append(position)
+
+        # Sections with a label and numeric times, sorted by start (stable)
+        timed = [position for position, section in enumerate(self.sections)
+                 if isinstance(section, dict) and section.get("label") is not None
+                 and _is_time(section.get("start")) and _is_time(section.get("end"))]
+        starts = np.array([self.sections[position]["start"] for position in timed], dtype=float)
+        ends = np.array([self.sections[position]["end"] for position in timed], dtype=float)
+        order = np.argsort(starts, kind='stable')
+        self._positions = np.array(timed, dtype=int)[order]
+        self._starts = starts[order]
+        self._ends = ends[order]
+        # With non-overlapping sections the ends are sorted too and both window bounds are binary searches
+        self._ends_sorted = bool(np.all(self._ends[1:] >= self._ends[:-1]))
+
+        # Energy points sorted by time, with cumulative sums for windowed means
+        points = sorted(energy_points or [], key=lambda point: point[0])
+        self.energy_points = points
+        self._energy_times = np.array([point[0] for point in points], dtype=float)
+        values = np.array([point[1] for point in points], dtype=float)
+        self._energy_cumsum = np.concatenate(([0.0], np.cumsum(values)))
+        self.energy_peak = float(values.max()) if len(values) else None
+
+        # Per-section energy statistics
+        section_count = len(self.sections)
+        self.energy_count = np.zeros(section_count, dtype=int)
+        self.energy_mean = np.full(section_count, np.nan)
+        self.energy_min = np.full(section_count, np.nan)
+        self.energy_max = np.full(section_count, np.nan)
+        if timed and points:
+            lo = np.searchsorted(self._energy_times, starts, side='left')
+            hi = np.maximum(lo, np.searchsorted(self._energy_times, ends, side='left'))
+            counts = hi - lo
+            self.energy_count[timed] = counts
+            has_points = counts > 0
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = (self._energy_cumsum[hi] - self._energy_cumsum[lo]) / counts
+            self.energy_mean[timed] = np.where(has_points, means, np.nan)
+            if has_points.any():
+                # reduceat over the non-empty ranges gives the min/max of each
+                starts_with_points = lo[has_points]
+                bounds = np.column_stack((starts_with_points, hi[has_points])).ravel()
+                with_points = np.array(timed)[has_points]
+                self.energy_min[with_points] = np.minimum.reduceat(np.append(values, 0.0), bounds)[::2]
+                self.energy_max[with_points] = np.maximum.reduceat(np.append(values, 0.0), bounds)[::2]
+
+    @classmethod
+    def from_analysis(cls, audio_analysis_data: Dict[str, Any]) -> "SectionIndex":
+        """Build the index from audio analysis data ("sections" and the energy timeseries)."""
+        return cls(audio_analysis_data.get("sections"), _energy_points(audio_analysis_data))
+
+    def sections_with_label(self, label: Any) -> List[int]:
+        """Positions of the sections with a label, in original order."""
+        return list(self._by_label.get(label, ()))
+
+    def overlapping_sections(self, start: float, end: float) -> List[int]:
+        """
+        Positions of the sections (with a label and start/end times) that overlap
+        a time window, ordered by their start clamped to the window, then by position.
+
+        A section overlaps if min(end, section end) > max(start, section start).
+        """
+        hi = int(np.searchsorted(self._starts, end, side='left'))
+        lo = int(np.searchsorted(self._ends, start, side='right')) if self._ends_sorted else 0
+        if lo >= hi:
+            return []
+        starts = self._starts[lo:hi]
+        ends = self._ends[lo:hi]
+        clamped_starts = np.maximum(starts, start)
+        overlap = np.minimum(ends, end) > clamped_starts
+        positions = self._positions[lo:hi][overlap]
+        order = np.lexsort((positions, clamped_starts[overlap]))
+        return positions[order].tolist()
+
+    def energy_range(self, start: float, end: float) -> Tuple[int, int]:
+        """Index range [lo, hi) of the energy_points with start <= time < end."""
+        lo = int(np.searchsorted(self._energy_times, start, side='left'))
+        hi = int(np.searchsorted(self._energy_times, end, side='left'))
+        return lo, max(lo, hi)
+
+    def energy_in(self, start: float, end: float) -> List[Tuple[Any, Any]]:
+        """The (time, value) energy points with start <= time < end, sorted by time."""
+        lo, hi = self.energy_range(start, end)
+        return self.energy_points[lo:hi]
+
+    def mean_energy(self, start: float, end: float) -> Optional[float]:
+        """Mean value of the energy points with start <= time < end, or None without points."""
+        lo, hi = self.energy_range(start, end)
+        if hi == lo:
+            return None
+        return float((self._energy_cumsum[hi] - self._energy_cumsum[lo]) / (hi - lo))
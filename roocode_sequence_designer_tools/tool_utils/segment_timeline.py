@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Segment Timeline Module for Roocode Sequence Designer Tools
+
+This module layers the segments generated by an effect over the timeline built
+so far. Segments are tuples (start_sec, end_sec, color_data, pixels) with an
+optional fifth element "fade", in which case color_data is (start_rgb, end_rgb).
+
+The result matches stamping each new segment over the timeline one at a time:
+later segments win wherever they overlap, and adjacent segments with the same
+color data, pixels and type are merged. Instead of rebuilding the whole list per
+segment, a whole effect's segment list is applied in one sweep over the segment
+boundaries, which is O((N + M) log(N + M)) for N existing and M new segments.
+"""
+
+import heapq
+from typing import Any, List, Sequence, Tuple
+
+Segment = Tuple[Any, ...]
+
+
+def _segment_key(segment: Segment) -> Tuple[Any, Any, Any]:
+    """Return the (color_data, pixels, type marker) that decides whether segments merge."""
+    return (segment[2], segment[3], segment[4] if len(segment) == 5 else None)
+
+
+def _make_segment(start: float, end: float, key: Tuple[Any, Any, Any]) -> Segment:
+    color_data, pixels, type_marker = key
+    return (start, end, color_data, pixels) + ((type_marker,) if type_marker else ())
+
+
+def apply_segment_overrides(segments: Sequence[Segment], new_segments: Sequence[Segment]) -> List[Segment]:
+    """
+    Layer new segments over an existing timeline.
+
+    Args:
+        segments: The current timeline, sorted by start time, non-overlapping and
+            with adjacent identical segments already merged.
+        new_segments: Segments generated by one effect, in the order they were
+            generated. Later segments override earlier ones where they overlap.
+
+    Returns:
+        List[Segment]: The updated timeline, sorted, non-overlapping, without
+            zero-duration segments and with adjacent identical segments merged.
+            Split fades keep their full start and end colors.
+    """
+    # Zero-duration segments never change the timeline
+    new_segments = [segment for segment in new_segments if segment[1] > segment[0]]
+    if not new_segments:
+        return list(segments)
+
+    # Existing segments do not overlap each other, so any priority below every new segment works
+    layers = list(segments) + new_segments
+    order = sorted(range(len(layers)), key=lambda i: layers[i][0])
+    boundaries = sorted({time for segment in layers for time in segment[:2]})
+
+    result = []
+    active = []  # Heap of (-layer index, layer index); ended layers are removed lazily
+    next_start = 0
+    current_start = current_end = current_key = None
+
+    for boundary_index in range(len(boundaries) - 1):
+        start = boundaries[boundary_index]
+        end = boundaries[boundary_index + 1]
+
+        while next_start < len(order) and layers[order[next_start]][0] <= start:
+            index = order[next_start]
+            heapq.heappush(active, (-index, index))
+            next_start += 1
+        while active and layers[active[0][1]][1] <= start:
+            heapq.heappop(active)
+
+        if not active:
+            # A gap in the timeline; nothing merges across it
+            if current_key is not None:
+                result.append(_make_segment(current_start, current_end, current_key))
+                current_key = None
+            continue
+
+        owner = active[0][1]
+        key = _segment_key(layers[owner])
+        if current_key is not None and current_end == start and key == current_key:
+            current_end = end
+            continue
+        if current_key is not None:
+            result.append(_make_segment(current_start, current_end, current_key))
+        current_start, current_end, current_key = start, end, key
+
+    if current_key is not None:
+        result.append(_make_segment(current_start, current_end, current_key))
+    return result
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Streaming Analysis Module for Roocode Sequence Designer Tools
+
+librosa.load() decodes a whole file into memory before any feature runs, which
+for an hour-long DJ set or rehearsal recording is gigabytes of float32 samples.
+StreamingAnalysis reads the file in fixed-size blocks with soundfile instead, so
+the audio held in memory does not depend on the file's duration; only the
+per-frame results (one value per hop, or one MFCC column) grow with it.
+
+Each block overlaps the previous one by frame_length - hop_length samples and
+the stream is padded with frame_length // 2 zeros at both ends, which is what
+librosa's centered framing does, so every frame covers the same samples as in
+the in-memory computation. The features are accumulated per frame:
+- RMS energy and the sample count (duration) in a first pass, together with the
+  maximum mel power, which power_to_db's top_db clipping is relative to,
+- the dB mel spectrogram in a second pass, from which the onset strength
+  envelope (mean over mel bands), the beat tracking envelope (median, as
+  librosa.beat.beat_track uses) and the MFCCs are taken.
+Results match librosa.load() + librosa.feature/onset within float32 rounding.
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import librosa
+    import scipy.fft
+    import soundfile as sf
+    STREAMING_AVAILABLE = True
+except ImportError:
+    STREAMING_AVAILABLE = False
+
+# Frame length of the mel spectrogram behind onset strength and MFCC (librosa's default n_fft)
+MEL_N_FFT = 2048
+# Frames analyzed per block; a block at the default hop is about 1M samples (4 MB)
+DEFAULT_BLOCK_FRAMES = 2048
+# power_to_db defaults used by librosa's onset strength and MFCC
+_AMIN = 1e-10
+_TOP_DB = 80.0
+_N_MFCC = 20
+
+
+def can_stream(audio_file_path: str) -> bool:
+    """True if the file can be read in blocks (a format soundfile/libsndfile decodes)."""
+    if not STREAMING_AVAILABLE:
+        return False
+    try:
+        sf.info(audio_file_path)
+    except Exception:
+        return False
+    return True
+
+
+def stream_duration(audio_file_path: str) -> float:
+    """Duration in seconds from the file header, without decoding the audio."""
+    info = sf.info(audio_file_path)
+    return info.frames / info.samplerate
+
+
+class StreamingAnalysis:
+    """
+    Block-wise computation of the frame-based features of one audio file.
+
+    Attributes:
+        sample_rate: Native sample rate of the file
+        num_samples: Number of (mono) samples, known after the first pass
+    """
+
+    def __init__(self, audio_file_path: str, hop_length: int = 512, frame_length: int = MEL_N_FFT,
+                 block_frames: int = DEFAULT_BLOCK_FRAMES):
+        """
+        Args:
+            audio_file_path: Path to a file soundfile can read (see can_stream())
+            hop_length: Samples between frames
+            frame_length: Samples per frame; must equal MEL_N_FFT for the mel features
+            block_frames: Frames analyzed per block
+        """
+        self.audio_file_path = audio_file_path
+        self.hop_length = hop_length
+        self.frame_length = frame_length
+        self.block_frames = max(1, block_frames)
+        self.sample_rate = sf.info(audio_file_path).samplerate
+        self.num_samples: Optional[int] = None
+        self._mel_basis = None
+        self._mel_max: Optional[float] = None
+
+    def _blocks(self) -> Iterator[Tuple[np.ndarray, int]]:
+        """
+        Yield (block, frame_count) over the centered-padded mono signal; each block
+        holds exactly frame_count frames and starts at the first of them.
+        """
+        hop = self.hop_length
+        pad = self.frame_length // 2
+        block_samples = self.frame_length + (self.block_frames - 1) * hop
+        buffer = np.zeros(pad, dtype=np.float32)
+        num_samples = 0
+        with sf.SoundFile(self.audio_file_path) as f:
+            while True:
+                data = f.read(self.block_frames * hop, dtype='float32', always_2d=True)
+                if len(data):
+                    # Down-mix like librosa.to_mono
+                    mono = data[:, 0] if data.shape[1] == 1 else np.mean(data, axis=1, dtype=np.float32)
+                    num_samples += len(mono)
+                    buffer = np.concatenate((buffer, mono))
+                else:
+                    buffer = np.concatenate((buffer, np.zeros(pad, dtype=np.float32)))
+                while len(buffer) >= block_samples:
+                    yield buffer[:block_samples], self.block_frames
+                    buffer = buffer[self.block_frames * hop:]
+                if not len(data):
+                    break
+        self.num_samples = num_samples
+        if len(buffer) >= self.frame_length:
+            frame_count = 1 + (len(buffer) - self.frame_length) // hop
+            yield buffer[:self.frame_length + (frame_count - 1) * hop], frame_count
+
+    def _mel_power(self, block: np.ndarray) -> np.ndarray:
+        """Mel power spectrogram of a block, as librosa.feature.melspectrogram computes it."""
+        stft = librosa.stft(block, n_fft=MEL_N_FFT, hop_length=self.hop_length, center=False)
+        if self._mel_basis is None:
+            self._mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=MEL_N_FFT, dtype=stft.real.dtype)
+        return np.einsum("...ft,mf->...mt", np.abs(stft) ** 2, self._mel_basis, optimize=True)
+
+    def first_pass(self, mel: bool = True) -> np.ndarray:
+        """
+        Read the file once, counting samples and computing RMS energy.
+
+        Args:
+            mel: Also find the maximum mel power, needed by second_pass()
+
+        Returns:
+            np.ndarray: RMS energy per frame (librosa.feature.rms)
+        """
+        rms = []
+        mel_max = 0.0
+        for block, _ in self._blocks():
+            rms.append(librosa.feature.rms(y=block, frame_length=self.frame_length,
+                                           hop_length=self.hop_length, center=False)[0])
+            if mel:
+                mel_max = max(mel_max, float(self._mel_power(block).max()))
+        if mel:
+            self._mel_max = mel_max
+        return np.concatenate(rms) if rms else np.zeros(0, dtype=np.float32)
+
+    def second_pass(self, mfcc: bool = True) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Read the file again and compute the features of the dB mel spectrogram.
+
+        Args:
+            mfcc: Also compute the MFCCs
+
+        Returns:
+            Tuple of the onset strength envelope (librosa.onset.onset_strength),
+            the beat tracking envelope (onset strength with median aggregation) and
+            the MFCCs (librosa.feature.mfcc, n_mfcc x frames) or None
+        """
+        if self._mel_max is None:
+            raise RuntimeError("first_pass(mel=True) must run before second_pass()")
+        mel_max = np.float32(self._mel_max)
+        # power_to_db clips at top_db below the maximum of the whole spectrogram
+        floor = 10.0 * np.log10(np.maximum(np.float32(_AMIN), mel_max)) - np.float32(_TOP_DB)
+
+        mean_diffs, median_diffs, mfccs = [], [], []
+        previous = None
+        for block, _ in self._blocks():
+            log_mel = 10.0 * np.log10(np.maximum(np.float32(_AMIN), self._mel_power(block)))
+            log_mel = np.maximum(log_mel, floor)
+            if mfcc:
+                mfccs.append(scipy.fft.dct(log_mel, axis=-2, type=2, norm='ortho')[:_N_MFCC])
+            # Onset strength: positive dB increase over the previous frame, aggregated over bands
+            frames = log_mel if previous is None else np.concatenate((previous, log_mel), axis=1)
+            diff = np.maximum(0.0, frames[:, 1:] - frames[:, :-1])
+            mean_diffs.append(np.mean(diff, axis=0))
+            median_diffs.append(np.median(diff, axis=0))
+            previous = log_mel[:, -1:]
+
+        frame_count = sum(len(diffs) for diffs in mean_diffs) + 1
+        # onset_strength pads by lag + n_fft // (2 * hop_length) frames and trims to the frame count
+        pad_width = 1 + MEL_N_FFT // (2 * self.hop_length)
+
+        def envelope(diffs):
+            values = np.concatenate([np.zeros(pad_width, dtype=np.float32)] + diffs)
+            return values[:frame_count]
+
+        return (envelope(mean_diffs), envelope(median_diffs),
+                np.concatenate(mfccs, axis=1) if mfcc else None)
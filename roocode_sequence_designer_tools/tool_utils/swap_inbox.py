@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Swap Inbox Module for Roocode Sequence Designer Tools
+
+Pushes a compiled sequence into a running Sequence Maker through its hot-swap
+inbox (~/.sequence_maker/sequence_swap_inbox.json). The GUI's
+SequenceSwapManager watches that file, auto-saves the current project and loads
+the .smproj named in the entry.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+SWAP_INBOX_FILE = os.path.join(os.path.expanduser("~"), ".sequence_maker", "sequence_swap_inbox.json")
+
+
+def push_to_swap_inbox(smproj_path: str, description: str, version_name: Optional[str] = None,
+                       inbox_path: Optional[str] = None) -> str:
+    """
+    Write a swap inbox entry so the running Sequence Maker loads a project.
+
+    The entry is written to a temporary file and moved into place, so the GUI
+    never reads a half-written inbox.
+
+    Args:
+        smproj_path: Path to the .smproj file to load. It must exist before pushing.
+        description: Description shown in the GUI status bar.
+        version_name: Optional version label stored with the entry.
+        inbox_path: Inbox file to write. Default: SWAP_INBOX_FILE.
+
+    Returns:
+        str: Path of the inbox file written.
+
+    Raises:
+        FileNotFoundError: If smproj_path does not exist.
+        OSError: If the inbox cannot be written.
+    """
+    smproj_path = os.path.abspath(smproj_path)
+    if not os.path.exists(smproj_path):
+        raise FileNotFoundError(f"Sequence file not found: {smproj_path}")
+
+    inbox_path = inbox_path or SWAP_INBOX_FILE
+    swap_data = {
+        "smproj_path": smproj_path,
+        "description": description,
+        # The GUI skips entries whose timestamp it has already processed
+        "timestamp": datetime.now().isoformat(),
+        "version_name": version_name or ""
+    }
+
+    inbox_dir = os.path.dirname(os.path.abspath(inbox_path))
+    os.makedirs(inbox_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=inbox_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(swap_data, f, indent=2)
+        os.replace(temp_path, inbox_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return inbox_path
+
+
+def read_swap_inbox(inbox_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    The current swap inbox entry, i.e. the project the GUI has loaded or is about to load.
+
+    Args:
+        inbox_path: Inbox file to read. Default: SWAP_INBOX_FILE.
+
+    Returns:
+        dict: The entry written by push_to_swap_inbox(), or None if there is no
+        readable entry.
+    """
+    try:
+        with open(inbox_path or SWAP_INBOX_FILE, 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) else None
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Analysis Cache Warmer
+
+This script analyzes every track of a music library or setlist in a process pool
+so the audio analysis caches are already filled when a design is compiled, a
+feature is extracted or a track is opened in Sequence Maker.
+
+Tracks are given as audio files, directories (searched recursively) or playlist
+files (.m3u, .m3u8 or a plain text file with one path per line). Each track is
+analyzed with AudioAnalyzer, which computes only the features missing from its
+per-feature cache, and, unless --no-sequence-maker is given, with Sequence
+Maker's AudioAnalysisManager, which keeps its own cache of the analysis it shows.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+# Add the project root to sys.path so sequence_maker can be imported when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+# Import the process pool runner shared with compile_seqdesign --targets
+from process_pool import positive_int, resolve_jobs, run_pool
+
+# File extensions analyzed when a directory is given
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg", ".m4a", ".aac", ".aif", ".aiff")
+# File extensions read as playlists, one track per line
+PLAYLIST_EXTENSIONS = (".m3u", ".m3u8", ".txt")
+
+
+def read_playlist(playlist_path: str) -> List[str]:
+    """
+    Track paths of a playlist file.
+
+    Blank lines and lines starting with '#' (M3U directives) are skipped, and
+    relative paths are resolved against the playlist's directory.
+
+    Args:
+        playlist_path: Path to an .m3u, .m3u8 or .txt playlist
+
+    Returns:
+        List[str]: Absolute track paths in playlist order
+    """
+    base_dir = os.path.dirname(os.path.abspath(playlist_path))
+    tracks = []
+    with open(playlist_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("file://"):
+                line = line[len("file://"):]
+            tracks.append(os.path.abspath(os.path.join(base_dir, os.path.expanduser(line))))
+    return tracks
+
+
+def collect_audio_files(sources: List[str]) -> List[str]:
+    """
+    Expand audio files, directories and playlists into a list of tracks.
+
+    Args:
+        sources: Audio file, directory or playlist paths
+
+    Returns:
+        List[str]: Absolute paths of the existing tracks, without duplicates,
+        in the order they were given
+    """
+    tracks = []
+    for source in sources:
+        if os.path.isdir(source):
+            for dir_path, dir_names, file_names in os.walk(source):
+                dir_names.sort()
+                tracks.extend(os.path.abspath(os.path.join(dir_path, name)) for name in sorted(file_names)
+                              if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif source.lower().endswith(PLAYLIST_EXTENSIONS):
+            for track in read_playlist(source):
+                if os.path.isfile(track):
+                    tracks.append(track)
+                else:
+                    print(f"Warning: Track not found: {track} (listed in {source})")
+        elif os.path.isfile(source):
+            tracks.append(os.path.abspath(source))
+        else:
+            print(f"Warning: Not found: {source}")
+    return list(dict.fromkeys(tracks))
+
+
+def format_seconds(seconds: float) -> str:
+    """Short human-readable duration, e.g. '45s', '3m07s' or '1h02m'."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+# Analyzers reused by every track warmed in a worker process, keyed by cache dir and streaming
+_worker_analyzers = {}
+
+
+def _get_analyzer(cache_dir: Optional[str], streaming: Optional[bool]):
+    """The AudioAnalyzer of this process for a cache directory and streaming mode."""
+    from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import AudioAnalyzer
+
+    key = (cache_dir, streaming)
+    if key not in _worker_analyzers:
+        _worker_analyzers[key] = AudioAnalyzer(cache_dir=cache_dir, streaming=streaming)
+    return _worker_analyzers[key]
+
+
+def _warm_one(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analyze one track into the caches.
+
+    Args:
+        task: audio_path, features (None for the full analysis), cache_dir,
+            streaming, sequence_maker and sequence_maker_cache_dir
+
+    Returns:
+        Dict with the track path, ok flag, error, seconds, and the features that
+        were computed and that were already cached (as reported by AudioAnalyzer)
+    """
+    audio_path = task["audio_path"]
+    result = {"audio_path": audio_path, "ok": False, "error": None, "seconds": 0.0,
+              "computed": [], "cached": []}
+    start_time = time.perf_counter()
+    try:
+        analyzer = _get_analyzer(task["cache_dir"], task["streaming"])
+        analyzer.analyze_audio(audio_path, features=task["features"])
+        result["computed"] = list(analyzer.computed_features)
+        result["cached"] = list(analyzer.loaded_features)
+
+        if task["sequence_maker"]:
+            from sequence_maker.managers.audio_analysis_manager import AudioAnalysisManager
+
+            manager = AudioAnalysisManager(None, analysis_cache_dir=task["sequence_maker_cache_dir"])
+            if manager.analyze_audio(audio_path) is None:
+                raise RuntimeError("Sequence Maker analysis failed")
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def warm_analysis_cache(audio_paths: List[str], features: Optional[List[str]] = None,
+                        jobs: Optional[int] = None, cache_dir: Optional[str] = None,
+                        streaming: Optional[bool] = None, sequence_maker: bool = True,
+                        sequence_maker_cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze several tracks in a process pool, filling the analysis caches.
+
+    The largest files are started first so a long recording does not end up
+    running alone at the end. A progress line with an ETA is printed per track.
+
+    Args:
+        audio_paths: Tracks to analyze (see collect_audio_files())
+        features: Names from ANALYSIS_FEATURES to warm. Default: the full analysis
+        jobs: Worker processes, at least 1. Defaults to the CPU count; 1 analyzes in-process
+        cache_dir: AudioAnalyzer cache directory. Default: AudioAnalyzer's default
+        streaming: AudioAnalyzer streaming mode (see AudioAnalyzer)
+        sequence_maker: Also fill Sequence Maker's AudioAnalysisManager cache
+        sequence_maker_cache_dir: AudioAnalysisManager cache directory. Default: its default
+
+    Returns:
+        Dict summary with per-track results, counts and total seconds
+
+    Raises:
+        ValueError: If jobs is less than 1
+    """
+    start_time = time.perf_counter()
+    tasks = [{
+        "audio_path": audio_path,
+        "features": features,
+        "cache_dir": cache_dir,
+        "streaming": streaming,
+        "sequence_maker": sequence_maker,
+        "sequence_maker_cache_dir": sequence_maker_cache_dir
+    } for audio_path in sorted(audio_paths, key=os.path.getsize, reverse=True)]
+
+    jobs = resolve_jobs(jobs)
+    print(f"Analyzing {len(tasks)} track(s) with {min(jobs, max(len(tasks), 1))} job(s)...")
+    width = len(str(len(tasks)))
+
+    def record(result, done, total):
+        elapsed = time.perf_counter() - start_time
+        eta = f"ETA {format_seconds(elapsed / done * (total - done))}" if done < total else "done"
+        if not result["ok"]:
+            detail = f"Error: {result['error']}"
+        elif result["computed"]:
+            detail = f"computed {', '.join(result['computed'])}"
+        else:
+            detail = "all features cached"
+        status = "OK  " if result["ok"] else "FAIL"
+        print(f"[{done:>{width}}/{total}] {status} {result['seconds']:7.1f}s  "
+              f"{os.path.basename(result['audio_path'])}: {detail}  ({eta})", flush=True)
+
+    summary = run_pool(_warm_one, tasks, jobs, record, sort_key=lambda result: result["audio_path"],
+                       start_time=start_time)
+    print(f"Warmed {summary['succeeded']}/{summary['tasks']} track(s) in {format_seconds(summary['seconds'])}")
+    return {
+        "tracks": summary["tasks"],
+        "succeeded": summary["succeeded"],
+        "failed": summary["failed"],
+        "seconds": summary["seconds"],
+        "jobs": summary["jobs"],
+        "results": summary["results"]
+    }
+
+
+def main() -> None:
+    """Main function to parse arguments and warm the analysis caches."""
+    parser = argparse.ArgumentParser(
+        description="Analyze a music library or setlist in parallel to fill the audio analysis caches")
+
+    parser.add_argument("sources", nargs="+", metavar="PATH",
+                        help="Audio files, directories (searched recursively) or playlists (.m3u, .m3u8, .txt)")
+
+    parser.add_argument("--jobs", type=positive_int,
+                        help="Worker processes (default: CPU count)")
+
+    parser.add_argument("--features",
+                        help="Comma-separated features to analyze (duration, beats, sections, energy, onset). "
+                             "Default: the full analysis")
+
+    parser.add_argument("--cache-dir",
+                        help="Analysis cache directory. Default: ~/.roocode_sequence_designer/analysis_cache_core")
+
+    parser.add_argument("--no-sequence-maker", action="store_true",
+                        help="Do not fill Sequence Maker's analysis cache")
+
+    parser.add_argument("--sequence-maker-cache-dir",
+                        help="Sequence Maker analysis cache directory. Default: ~/.sequence_maker/analysis_cache")
+
+    streaming_group = parser.add_mutually_exclusive_group()
+    streaming_group.add_argument("--streaming", dest="streaming", action="store_true", default=None,
+                                 help="Always analyze in fixed-size blocks with bounded memory")
+    streaming_group.add_argument("--no-streaming", dest="streaming", action="store_false",
+                                 help="Always load whole files (default: stream only long recordings)")
+
+    args = parser.parse_args()
+
+    features = None
+    if args.features:
+        from roocode_sequence_designer_tools.tool_utils.audio_analyzer_core import ANALYSIS_FEATURES
+
+        features = list(dict.fromkeys(feature.strip() for feature in args.features.split(",") if feature.strip()))
+        unknown = [feature for feature in features if feature not in ANALYSIS_FEATURES]
+        if unknown:
+            parser.error(f"unknown features: {', '.join(unknown)}. Supported: {', '.join(ANALYSIS_FEATURES)}")
+
+    audio_paths = collect_audio_files(args.sources)
+    if not audio_paths:
+        print("Error: No audio files found")
+        sys.exit(1)
+
+    summary = warm_analysis_cache(audio_paths, features, args.jobs, args.cache_dir, args.streaming,
+                                  not args.no_sequence_maker, args.sequence_maker_cache_dir)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import subprocess
 import binascii
 import tempfile
 
+from prg_decoder import diff_prg, PRGDecodeError
+
 def get_hex_dump(data):
     """Converts binary data to a hex dump string."""
     return binascii.hexlify(data).decode('ascii')
@@ -10,38 +12,20 @@ def get_hex_dump(data):
 def run_tests():
     """
     Runs tests by comparing the output of prg_generator.py with corresponding .prg files.
+
+    The pytest suite in tests/test_prg_golden.py runs the same comparison in process
+    over every fixture directory.
     """
-    tests_directory = '/home/twain/Projects/ltx_guru/tests'
     prg_generator_script_name = 'prg_generator.py' # Keep it simple
-    
-    # Determine paths relative to this script's location
+
+    # Both are located relative to this script, which lives in the repository root
     script_dir = os.path.dirname(os.path.abspath(__file__))
     prg_generator_script = os.path.join(script_dir, prg_generator_script_name)
-
-    # Attempt to locate 'tests' directory relative to script_dir or its parent
-    # This makes the script more portable if it's moved along with prg_generator.py and tests/
-    potential_tests_dir_1 = os.path.join(script_dir, 'tests') # tests/ alongside this script
-    potential_tests_dir_2 = os.path.join(os.path.dirname(script_dir), 'tests') # tests/ alongside parent of this script
-
-    if os.path.isdir(tests_directory): # Explicit path first
-        pass # Use the hardcoded path
-    elif os.path.isdir(potential_tests_dir_1):
-        tests_directory = potential_tests_dir_1
-    elif os.path.isdir(potential_tests_dir_2):
-        tests_directory = potential_tests_dir_2
-    else:
-        print(f"Error: Could not automatically locate tests directory. Tried: {tests_directory}, {potential_tests_dir_1}, {potential_tests_dir_2}")
-        return
+    tests_directory = os.path.join(script_dir, 'tests')
 
     if not os.path.exists(prg_generator_script):
-        # Fallback if prg_generator.py is not next to run_prg_tests.py
-        # Try the original hardcoded path if it exists
-        hardcoded_prg_generator_path = '/home/twain/Projects/ltx_guru/prg_generator.py'
-        if os.path.exists(hardcoded_prg_generator_path):
-            prg_generator_script = hardcoded_prg_generator_path
-        else:
-            print(f"Error: prg_generator.py not found. Tried: {prg_generator_script} and {hardcoded_prg_generator_path}")
-            return
+        print(f"Error: prg_generator.py not found at {prg_generator_script}")
+        return
 
     print(f"Looking for tests in: {tests_directory}")
     print(f"Using prg_generator: {prg_generator_script}")
@@ -137,6 +121,13 @@ def run_tests():
                                  print(f"    Generated file is longer. First extra byte at offset {limit} (0x{limit:X}): {generated_prg_data[limit]:02X}")
                              else:
                                  print(f"    Expected file is longer. First extra byte at offset {limit} (0x{limit:X}): {expected_prg_data[limit]:02X}")
+
+                        # Structural view of the same difference (header field, block or segment)
+                        try:
+                            for difference in diff_prg(generated_prg_data, expected_prg_data, max_differences=10):
+                                print(f"    Structural: {difference}")
+                        except PRGDecodeError as e:
+                            print(f"    Structural diff unavailable: {e}")
                                  
                 except subprocess.CalledProcessError as e:
                     print(f"  ERROR: prg_generator.py execution failed for {filename}.")
@@ -5,29 +5,45 @@ This module defines the PRGExporter class, which exports sequences to PRG format
 """
 
 import os
+import io
+import sys
 import json
 import logging
-import subprocess
-import tempfile
+
+# prg_generator.py lives in the repository root, two levels above this package.
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from prg_generator import PRGGenerationError, PRGDiagnostics, DIAGNOSTICS_QUIET, DIAGNOSTICS_TRACE
+from prg_build_cache import PRGBuildCache
 
 
 class PRGExporter:
     """Exports sequences to PRG format."""
     
-    def __init__(self, app):
+    def __init__(self, app, build_cache=None):
         """
         Initialize the PRG exporter.
         
         Args:
             app: The main application instance.
+            build_cache (PRGBuildCache, optional): Cache of encoded PRG files. Defaults to
+                the shared cache in ~/.sequence_maker/prg_build_cache.
         """
         self.logger = logging.getLogger("SequenceMaker.PRGExporter")
         self.app = app
+        self.last_report = None
+        self.build_cache = build_cache
     
     def export_timeline(self, timeline, file_path): # refresh_rate parameter removed
         """
         Export a timeline to a PRG file.
         The internal JSON generated for prg_generator.py will always be 1000Hz based.
+        The PRG data is encoded in-process by prg_generator.encode_prg(), or taken from
+        the PRG build cache if this exact sequence was encoded before. The encoder report
+        (restored from the cache on a hit) is kept in self.last_report and any encoder
+        warnings are logged.
         
         Args:
             timeline: Timeline to export.
@@ -37,56 +53,48 @@ class PRGExporter:
             bool: True if successful, False otherwise.
         """
         try:
-            # Create temporary JSON file
-            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
-                temp_json_path = temp_file.name
-            
             # Get JSON data
             self.logger.debug(f"Generating internal JSON (1000Hz scale) for PRG export.")
             json_data = timeline.to_json_sequence() # refresh_rate argument removed
             
-            # Write JSON to temporary file
-            with open(temp_json_path, 'w') as f:
-                json.dump(json_data, f, indent=2)
-            # --- BEGIN DEBUG LOGGING ---
-            try:
-                with open(temp_json_path, 'r') as f_read:
-                    temp_json_content = f_read.read()
-                self.logger.debug(f"Temporary JSON content for PRG export ({os.path.basename(file_path)}):\n{temp_json_content}")
-            except Exception as log_e:
-                self.logger.error(f"Error reading temporary JSON for logging: {log_e}")
-            # --- END DEBUG LOGGING ---
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
-            
-            # Call prg_generator.py with absolute path
-            root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-            prg_generator_path = os.path.join(root_dir, "prg_generator.py")
-            
-            self.logger.debug(f"Using prg_generator at: {prg_generator_path}")
-            self.logger.debug(f"Calling prg_generator with: python3 {prg_generator_path} {temp_json_path} {file_path}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"JSON content for PRG export ({os.path.basename(file_path)}):\n{json.dumps(json_data, indent=2)}")
             
+            # Encode the PRG data; the generator stays quiet unless debug logging is enabled
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+            generator_output = io.StringIO() if debug_enabled else None
+            diagnostics = PRGDiagnostics(
+                DIAGNOSTICS_TRACE if debug_enabled else DIAGNOSTICS_QUIET,
+                stream=generator_output
+            )
+            diagnostics.report.source = file_path
+            self.last_report = diagnostics.report
+            if self.build_cache is None:
+                self.build_cache = PRGBuildCache()
+            prg_bytes, cache_hit = self.build_cache.get_or_encode(json_data, diagnostics=diagnostics)
+            if cache_hit:
+                self.logger.debug(f"Reusing cached PRG data for {os.path.basename(file_path)}")
             
-            result = subprocess.run(
-                ["python3", prg_generator_path, temp_json_path, file_path],
-                capture_output=True,
-                text=True,
-                check=True
+            if generator_output is not None:
+                self.logger.debug(f"prg_generator output: {generator_output.getvalue()}")
+            for warning in diagnostics.report.warnings:
+                self.logger.warning(f"prg_generator: {warning}")
+            self.logger.debug(
+                f"PRG report: {diagnostics.report.segment_count} segments, "
+                f"{diagnostics.report.total_size} bytes"
             )
             
-            # Log output
-            self.logger.debug(f"prg_generator output: {result.stdout}")
+            # Create directory if it doesn't exist
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
             
-            # Clean up temporary file
-            os.unlink(temp_json_path)
+            with open(file_path, 'wb') as f:
+                f.write(prg_bytes)
             
             self.logger.info(f"Exported timeline to {file_path}")
             return True
         
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Error calling prg_generator: {e}")
-            self.logger.error(f"prg_generator stderr: {e.stderr}")
+        except PRGGenerationError as e:
+            self.logger.error(f"Error encoding PRG data: {e}")
             return False
         
         except Exception as e:
@@ -132,6 +140,9 @@ class PRGExporter:
                 success_count += 1
         
         self.logger.info(f"Exported {success_count}/{total_count} timelines to {directory}")
+        if self.build_cache is not None:
+            stats = self.build_cache.stats()
+            self.logger.info(f"PRG build cache: {stats['hits']} hits, {stats['misses']} misses")
         return success_count, total_count
     def export(self, file_path): # refresh_rate parameter removed
         """
@@ -2,15 +2,19 @@
 Sequence Maker - Audio Analysis Manager
 
 This module defines the AudioAnalysisManager class, which handles comprehensive audio analysis
-using librosa and stores results in a structured JSON format.
+using librosa and caches results in the columnar format of the sequence designer's
+analysis store (a JSON manifest plus raw float columns).
 """
 
 import os
-import json
 import logging
 import hashlib
 from pathlib import Path
 
+from roocode_sequence_designer_tools.tool_utils.analysis_store import (
+    find_document, load_document, save_document
+)
+
 try:
     import librosa
     import numpy as np
@@ -23,22 +27,29 @@ class AudioAnalysisManager:
     """
     Manages comprehensive audio analysis and caching of analysis results.
     
-    This manager performs detailed audio analysis using librosa and stores the results
-    in JSON format for later use by LLM tools and other components.
+    This manager performs detailed audio analysis using librosa and caches the results
+    for later use by LLM tools and other components. The timeseries and the chroma and
+    spectral contrast rows are stored as binary columns, so loading a cached analysis
+    does not parse them as JSON text; caches written as plain JSON are still read.
     """
     
-    def __init__(self, app):
+    def __init__(self, app, analysis_cache_dir=None):
         """
         Initialize the audio analysis manager.
         
         Args:
             app: The main application instance.
+            analysis_cache_dir: Directory of the analysis cache. Defaults to
+                ~/.sequence_maker/analysis_cache.
         """
         self.app = app
         self.logger = logging.getLogger("SequenceMaker.AudioAnalysisManager")
         
         # Create analysis cache directory
-        self.analysis_cache_dir = Path.home() / ".sequence_maker" / "analysis_cache"
+        if analysis_cache_dir:
+            self.analysis_cache_dir = Path(analysis_cache_dir)
+        else:
+            self.analysis_cache_dir = Path.home() / ".sequence_maker" / "analysis_cache"
         self.analysis_cache_dir.mkdir(parents=True, exist_ok=True)
         
         # Current analysis path
@@ -72,14 +83,7 @@ class AudioAnalysisManager:
             if not audio_file_path or not os.path.exists(audio_file_path):
                 self.logger.error(f"Audio file not found: {audio_file_path}")
                 return None
-                
-            # Load audio using librosa
-            try:
-                self.logger.info(f"Loading audio for analysis: {audio_file_path}")
-                audio_data, sample_rate = librosa.load(audio_file_path, sr=None)
-            except Exception as e:
-                self.logger.error(f"Error loading audio file: {e}")
-                return None
+            audio_data = sample_rate = None
         
         # Generate analysis file path based on audio file path
         analysis_path = self._get_analysis_path_for_audio(audio_file_path)
@@ -93,27 +97,36 @@ class AudioAnalysisManager:
         self.current_analysis_path = analysis_path
         
         # Check if analysis already exists and is recent
-        if os.path.exists(analysis_path):
+        existing_path = find_document(analysis_path)
+        if existing_path is not None:
             audio_mtime = os.path.getmtime(audio_file_path) if audio_file_path else 0
-            analysis_mtime = os.path.getmtime(analysis_path)
+            analysis_mtime = os.path.getmtime(existing_path)
             
             if analysis_mtime >= audio_mtime:
-                self.logger.info(f"Using existing analysis from {analysis_path}")
+                self.logger.info(f"Using existing analysis from {existing_path}")
                 try:
-                    with open(analysis_path, 'r') as f:
-                        return json.load(f)
+                    return load_document(existing_path)
                 except Exception as e:
                     self.logger.warning(f"Error loading existing analysis, will recreate: {e}")
         
+        # Load audio using librosa only once the cache missed, so a cached analysis of a
+        # long recording does not decode the whole file into memory first
+        if audio_data is None:
+            try:
+                self.logger.info(f"Loading audio for analysis: {audio_file_path}")
+                audio_data, sample_rate = librosa.load(audio_file_path, sr=None)
+            except Exception as e:
+                self.logger.error(f"Error loading audio file: {e}")
+                return None
+        
         # Extract features
         self.logger.info("Performing comprehensive audio analysis...")
         analysis_data = self._extract_features(audio_data, sample_rate, audio_file_path)
         
-        # Save to JSON
+        # Save to the cache
         try:
-            with open(analysis_path, 'w') as f:
-                json.dump(analysis_data, f, indent=2)
-            self.logger.info(f"Analysis saved to {analysis_path}")
+            saved_path = save_document(analysis_path, analysis_data)
+            self.logger.info(f"Analysis saved to {saved_path}")
         except Exception as e:
             self.logger.error(f"Error saving analysis data: {e}")
         
@@ -214,6 +227,9 @@ class AudioAnalysisManager:
         """
         Generate a path for the analysis JSON based on the audio file path.
         
+        The analysis is cached in the columnar format next to this path (see
+        analysis_store.columnar_path()); earlier versions wrote JSON to the path itself.
+        
         Args:
             audio_file_path: Path to the audio file
             
@@ -229,29 +245,35 @@ class AudioAnalysisManager:
     
     def get_analysis_path(self):
         """
-        Get the path to the current analysis JSON.
+        Get the path of the current analysis cache file.
+        
+        This is the columnar manifest (see analysis_store.find_document()), or the
+        JSON file for an analysis cached by an earlier version. The JSON path in
+        current_analysis_path no longer exists once the analysis has been saved.
         
         Returns:
-            Path: Path to the current analysis JSON file
+            Path: Path to the current analysis cache file, or None if there is none
         """
-        return self.current_analysis_path
+        if not self.current_analysis_path:
+            return None
+        return find_document(self.current_analysis_path)
     
     def load_analysis(self):
         """
-        Load the current analysis data from JSON.
+        Load the current analysis data from the cache.
         
         Returns:
             dict: Analysis data, or None if no analysis is available
         """
-        if not self.current_analysis_path or not os.path.exists(self.current_analysis_path):
+        existing_path = find_document(self.current_analysis_path) if self.current_analysis_path else None
+        if existing_path is None:
             # Try to analyze current audio if available
             if hasattr(self.app, 'audio_manager') and self.app.audio_manager.audio_file:
                 return self.analyze_audio()
             return None
         
         try:
-            with open(self.current_analysis_path, 'r') as f:
-                return json.load(f)
+            return load_document(existing_path)
         except Exception as e:
             self.logger.error(f"Error loading analysis data: {e}")
             return None
@@ -77,6 +77,28 @@ def test_get_analysis_path_for_audio(audio_analysis_manager_with_temp_dir):
     assert analysis_path.name == "unknown_audio_analysis.json"
 
 
+def test_get_analysis_path_returns_saved_cache_file(audio_analysis_manager_with_temp_dir):
+    """
+    Test that get_analysis_path returns the columnar manifest save_document writes.
+    
+    Args:
+        audio_analysis_manager_with_temp_dir: The audio_analysis_manager_with_temp_dir fixture
+    """
+    from roocode_sequence_designer_tools.tool_utils.analysis_store import MANIFEST_SUFFIX, save_document
+    
+    manager = audio_analysis_manager_with_temp_dir
+    assert manager.get_analysis_path() is None
+    
+    manager.current_analysis_path = manager._get_analysis_path_for_audio("/path/to/test_audio.mp3")
+    assert manager.get_analysis_path() is None
+    
+    save_document(manager.current_analysis_path, {"beat_times": [0.5, 1.0]})
+    analysis_path = manager.get_analysis_path()
+    assert analysis_path.name.endswith(MANIFEST_SUFFIX)
+    assert analysis_path.exists()
+    assert not manager.current_analysis_path.exists()
+
+
 @patch('librosa.load')
 @patch('librosa.get_duration')
 @patch('librosa.beat.beat_track')
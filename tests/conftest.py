@@ -0,0 +1,21 @@
+"""
+PRG Generator - Test Fixtures
+
+Pytest fixtures for the prg_generator.py tests. The JSON files in this
+directory double as encoder fixtures for run_prg_tests.py.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the repository root to the path so prg_generator.py can be imported
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def fixture_json_path():
+    """Path to a small mixed solid/fade fixture sequence."""
+    return REPO_ROOT / "tests" / "red1s_red-blue1s_green1s_100r.json"
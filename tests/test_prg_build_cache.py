@@ -0,0 +1,106 @@
+"""
+PRG Build Cache Tests
+
+Tests for the content-addressed cache of encoded PRG files in prg_build_cache.py.
+"""
+
+import json
+import os
+
+from prg_build_cache import PRGBuildCache
+from prg_generator import PRGDiagnostics, encode_prg
+
+
+def _sequence(color):
+    return {"default_pixels": 1, "refresh_rate": 100, "end_time": 100,
+            "sequence": {"0": {"color": color}}}
+
+
+def test_unchanged_sequence_is_encoded_once(tmp_path, fixture_json_path):
+    """A second request for the same sequence is served from the cache."""
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+    cache = PRGBuildCache(str(tmp_path))
+
+    first, first_hit = cache.get_or_encode(data)
+    # Key order and formatting do not change the key
+    reordered = json.loads(json.dumps(data, sort_keys=True, indent=4))
+    second, second_hit = cache.get_or_encode(reordered)
+
+    assert (first_hit, second_hit) == (False, True)
+    assert first == second == encode_prg(data)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_sequence_or_encoder_version_misses(tmp_path, monkeypatch):
+    """Different content or a different encoder version produces a different key."""
+    cache = PRGBuildCache(str(tmp_path))
+    red_key = cache.key_for(_sequence([255, 0, 0]))
+    assert red_key != cache.key_for(_sequence([0, 255, 0]))
+
+    monkeypatch.setattr("prg_build_cache.ENCODER_VERSION", "test-version")
+    assert red_key != cache.key_for(_sequence([255, 0, 0]))
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    """Entries beyond the size cap are evicted oldest-use first."""
+    cache = PRGBuildCache(str(tmp_path), max_bytes=2 * 400)
+    keys = [cache.key_for(_sequence([i, 0, 0])) for i in range(3)]
+
+    cache.put(keys[0], b"a" * 400)
+    cache.put(keys[1], b"b" * 400)
+    # Entry 1 was last used long ago; reading entry 0 marks it as recently used
+    os.utime(cache._entry_path(keys[1]), ns=(1, 1))
+    assert cache.get(keys[0]) == b"a" * 400
+    cache.put(keys[2], b"c" * 400)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == b"a" * 400
+    assert cache.get(keys[2]) == b"c" * 400
+    assert cache.evictions == 1
+    assert cache.stats()["total_bytes"] <= 800
+
+
+def test_segment_lists_are_cached(tmp_path):
+    """Parsed segment lists are keyed by their segments and header pixel count."""
+    cache = PRGBuildCache(str(tmp_path))
+    segments = [(50, (255, 0, 0), 2, 'solid'), (50, ((255, 0, 0), (0, 0, 255)), 2, 'fade')]
+
+    first, first_hit = cache.get_or_encode(segments, default_pixels=2)
+    second, second_hit = cache.get_or_encode(list(segments), default_pixels=2)
+
+    assert (first_hit, second_hit) == (False, True)
+    assert first == second == encode_prg(segments, 2)
+    assert cache.key_for(segments, 2) != cache.key_for(segments, 3)
+
+
+def test_hit_restores_encode_report(tmp_path):
+    """A cache hit fills the caller's report with the warnings, counts and sizes of the encode."""
+    cache = PRGBuildCache(str(tmp_path))
+    # No end_time: the encoder warns about the default duration of the last segment
+    data = {"default_pixels": 1, "refresh_rate": 100, "sequence": {"0": {"color": [255, 0, 0]}}}
+
+    miss = PRGDiagnostics()
+    prg_bytes, hit = cache.get_or_encode(data, diagnostics=miss)
+    assert not hit and len(miss.report.warnings) == 1
+
+    hit_diagnostics = PRGDiagnostics()
+    hit_diagnostics.report.source = "again.prg"
+    assert cache.get_or_encode(data, diagnostics=hit_diagnostics) == (prg_bytes, True)
+    report = hit_diagnostics.report.to_dict()
+    assert report["source"] == "again.prg"
+    assert report["warnings"] == miss.report.warnings
+    assert report["segment_count"] == miss.report.segment_count == 1
+    assert report["sizes"] == miss.report.to_dict()["sizes"]
+    assert report["sizes"]["total"] == len(prg_bytes)
+
+    # Entries stored without a report are encoded again to recover it
+    key = cache.key_for(data)
+    os.remove(cache._report_path(cache._entry_path(key)))
+    recovered = PRGDiagnostics()
+    assert cache.get_or_encode(data, diagnostics=recovered) == (prg_bytes, False)
+    assert recovered.report.warnings == miss.report.warnings
+    assert cache.get_report(key)["warnings"] == miss.report.warnings
+
+    cache.clear()
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,93 @@
+"""
+PRG Decoder Tests
+
+Tests for reading generated PRG files back with prg_decoder.py.
+"""
+
+import contextlib
+import io
+import os
+
+import pytest
+
+import prg_generator
+from prg_decoder import PRGFile, PRGDecodeError, diff_prg, verify_segments
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MIXED_PRG = os.path.join(TESTS_DIR, "red1s_red-blue1s_green1s_100r.prg")
+FADE_PRG = os.path.join(TESTS_DIR, "red-blue_3s_100r.prg")
+
+
+def test_header_and_segments_are_decoded():
+    """Header fields, duration blocks and segment colors decode from a mixed file."""
+    with PRGFile.open(MIXED_PRG) as prg:
+        assert prg.segment_count == 3
+        assert prg.pointer1 == 21 + 19 * 2
+        assert prg.rgb_start_pointer == prg_generator.HEADER_SIZE + 3 * prg_generator.DURATION_BLOCK_SIZE
+        assert prg.block(2)["marker"] == prg_generator.LAST_BLOCK_CONST_09
+        assert prg.validate() == []
+        assert prg.to_segments() == [
+            (100, (255, 0, 0), 4, 'solid'),
+            (100, ((255, 0, 0), (0, 0, 255)), 4, 'fade'),
+            (100, (0, 255, 0), 4, 'solid'),
+        ]
+
+
+def test_segment_rgb_is_a_view_of_the_file():
+    """Segment RGB data is exposed as memoryview slices rather than copies."""
+    with open(FADE_PRG, 'rb') as f:
+        data = bytearray(f.read())
+    prg = PRGFile.from_bytes(data)
+    segment = prg.segments[0]
+    assert isinstance(segment.rgb, memoryview)
+    assert segment.triple_count == 300
+    data[segment.rgb_offset] = 7
+    assert segment.start_color[0] == 7
+    prg.close()
+
+
+def test_decoded_segments_reencode_identically():
+    """Re-encoding the decoded segments reproduces the original file."""
+    with open(MIXED_PRG, 'rb') as f:
+        original = f.read()
+    prg = PRGFile.from_bytes(original)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reencoded = prg_generator.encode_segments(prg.to_segments(), prg.default_pixels)
+    assert reencoded == original
+
+
+def test_diff_reports_structural_differences():
+    """diff_prg() names the changed fields instead of byte offsets."""
+    with open(MIXED_PRG, 'rb') as f:
+        original = f.read()
+    assert diff_prg(MIXED_PRG, original) == []
+
+    changed = bytearray(original)
+    with PRGFile.open(MIXED_PRG) as prg:
+        offset = prg.segments[2].rgb_offset
+    changed[offset + 3 * 10] = 1
+    differences = diff_prg(original, bytes(changed))
+    assert differences == ["segment 2 RGB differs from triple 10: (0, 255, 0) != (1, 255, 0)"]
+
+
+def test_verify_segments_detects_mismatch():
+    """verify_segments() passes for the source segments and flags a wrong color."""
+    default_pixels, parsed_segments = prg_generator.parse_sequence(
+        prg_generator.load_sequence_json(os.path.join(TESTS_DIR, "red1s_red-blue1s_green1s_100r.json")))
+    segments = prg_generator.finalize_segments(parsed_segments)
+    assert verify_segments(MIXED_PRG, segments, default_pixels) == []
+
+    wrong = list(segments)
+    wrong[2] = (100, (0, 0, 255), 4, 'solid', 100)
+    problems = verify_segments(MIXED_PRG, wrong, default_pixels)
+    assert len(problems) == 1 and problems[0].startswith("segment 2 solid color")
+
+
+def test_truncated_file_is_reported():
+    """Truncated data is rejected or reported as invalid rather than misread."""
+    with open(MIXED_PRG, 'rb') as f:
+        original = f.read()
+    with pytest.raises(PRGDecodeError):
+        PRGFile.from_bytes(original[:20])
+    problems = PRGFile.from_bytes(original[:-50]).validate()
+    assert problems
@@ -0,0 +1,282 @@
+"""
+PRG Generator - In-process Encoder Tests
+
+Tests for the importable encoder API in prg_generator.py.
+"""
+
+import io
+import json
+
+import pytest
+
+import prg_generator
+from prg_generator import encode_prg, parse_sequence, generate_prg_file, PRGGenerationError
+
+
+def test_encode_prg_matches_generated_file(tmp_path, fixture_json_path):
+    """encode_prg() returns exactly the bytes generate_prg_file() writes."""
+    output_path = tmp_path / "out.prg"
+    generate_prg_file(str(fixture_json_path), str(output_path))
+
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+
+    assert encode_prg(data) == output_path.read_bytes()
+
+
+def test_encode_prg_accepts_segment_list(fixture_json_path):
+    """A parsed segment list encodes to the same bytes as the JSON dict."""
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+
+    default_pixels, segments = parse_sequence(data)
+
+    assert encode_prg(segments, default_pixels=default_pixels) == encode_prg(data)
+
+
+def test_encode_prg_raises_instead_of_exiting():
+    """Invalid input raises PRGGenerationError rather than calling sys.exit."""
+    with pytest.raises(PRGGenerationError):
+        encode_prg({"default_pixels": 4, "refresh_rate": 100, "sequence": {}})
+
+    with pytest.raises(PRGGenerationError):
+        encode_prg({"default_pixels": 9, "refresh_rate": 100, "sequence": {"0": {"color": [1, 2, 3]}}})
+
+    with pytest.raises(PRGGenerationError):
+        encode_prg([(100, (255, 0, 0), 4, 'sparkle')], default_pixels=4)
+
+
+def test_generate_prg_file_missing_input(tmp_path):
+    """A missing input file is reported as PRGGenerationError."""
+    with pytest.raises(PRGGenerationError):
+        generate_prg_file(str(tmp_path / "missing.json"), str(tmp_path / "out.prg"))
+
+
+def test_header_overflow_is_reported():
+    """Sequences too long for the 16-bit header fields raise PRGGenerationError."""
+    segments = [(100, (i % 256, 0, 0), 4, 'solid') for i in range(4000)]
+
+    with pytest.raises(PRGGenerationError):
+        prg_generator.encode_segments(segments, default_pixels=4)
+
+
+def test_offset_table_matches_per_block_sums():
+    """Prefix-sum offsets equal the per-block sums of the original step rules."""
+    segments = [
+        (100, (255, 0, 0), 4, 'solid', 100),
+        (250, ((0, 0, 0), (255, 255, 255)), 4, 'fade', 250),
+        (50, (0, 255, 0), 4, 'solid', 50),
+        (1200, (0, 0, 255), 4, 'solid', 1200),
+        (75, ((255, 0, 0), (0, 0, 255)), 4, 'fade', 75),
+    ]
+    index1_steps = [300, 250, 300, 300 + 3 * 1200, 75]
+    index2_steps = [500, 250, 300, 300 + 3 * 1200]
+    count = len(segments)
+    offset_table = prg_generator._calculate_horizontal_offset_table(segments)
+
+    for target_index in range(1, count):
+        expected = 370 + (count - 2) * 19 + sum(index1_steps[:target_index - 1])
+        assert prg_generator._calculate_intermediate_block_index1_base(
+            target_index, count, segments, True, offset_table) == expected
+
+    part1, part2 = prg_generator._calculate_last_block_index2_bases(count, segments, True, offset_table)
+    assert part1 == 304 + sum(index2_steps)
+    assert part2 == 100 * count
+
+
+def _scalar_fade_ramp(start_rgb, end_rgb, num_steps):
+    """Reference ramp using the original per-step formula."""
+    if num_steps == 1:
+        return bytes(max(0, min(255, c)) for c in start_rgb)
+    out = bytearray()
+    for i in range(num_steps):
+        for channel in range(3):
+            value = start_rgb[channel] + i * (end_rgb[channel] - start_rgb[channel]) / (num_steps - 1.0)
+            out.append(max(0, min(255, int(round(value)))))
+    return bytes(out)
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+@pytest.mark.parametrize("start_rgb,end_rgb,num_steps", [
+    ((255, 0, 0), (0, 0, 255), 1),
+    ((255, 0, 0), (0, 0, 255), 2),
+    ((0, 0, 0), (255, 255, 255), 511),
+    ((10, 200, 3), (250, 7, 128), 4000),
+    ((0, 1, 2), (1, 2, 3), 65535),
+])
+def test_fade_ramp_matches_scalar_formula(monkeypatch, numpy_available, start_rgb, end_rgb, num_steps):
+    """Vectorized and pure Python fade ramps both round exactly like the per-step formula."""
+    if numpy_available and not prg_generator.NUMPY_AVAILABLE:
+        pytest.skip("numpy not installed")
+    monkeypatch.setattr(prg_generator, "NUMPY_AVAILABLE", numpy_available)
+    expected = _scalar_fade_ramp(start_rgb, end_rgb, num_steps)
+    assert prg_generator.fade_ramp_bytes(start_rgb, end_rgb, num_steps) == expected
+
+
+def test_library_encode_is_quiet_by_default(capsys, fixture_json_path):
+    """encode_prg() writes nothing to stdout unless diagnostics are requested."""
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+    encode_prg(data)
+    assert capsys.readouterr().out == ""
+
+
+def test_diagnostics_levels_gate_output(fixture_json_path):
+    """Normal output omits the per-segment lines that trace adds."""
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+
+    normal_stream = io.StringIO()
+    encode_prg(data, diagnostics=prg_generator.PRGDiagnostics(prg_generator.DIAGNOSTICS_NORMAL, stream=normal_stream))
+    trace_stream = io.StringIO()
+    encode_prg(data, diagnostics=prg_generator.PRGDiagnostics(prg_generator.DIAGNOSTICS_TRACE, stream=trace_stream))
+
+    assert "[HEADER_CALC]" in normal_stream.getvalue()
+    assert "[SEGMENT_CALC] - Seg 0" not in normal_stream.getvalue()
+    assert "[SEGMENT_CALC] - Seg 0" in trace_stream.getvalue()
+
+    with pytest.raises(ValueError):
+        prg_generator.PRGDiagnostics("verbose")
+
+
+def test_encode_report_describes_output(fixture_json_path):
+    """The report carries segment count, block offsets and byte sizes of the encoded file."""
+    with open(fixture_json_path, 'r') as f:
+        data = json.load(f)
+    diagnostics = prg_generator.PRGDiagnostics()
+    prg_bytes = encode_prg(data, diagnostics=diagnostics)
+    report = diagnostics.report.to_dict()
+
+    segment_count = report["segment_count"]
+    assert segment_count == len(parse_sequence(data)[1])
+    assert report["block_offsets"] == [prg_generator.HEADER_SIZE + i * prg_generator.DURATION_BLOCK_SIZE for i in range(segment_count)]
+    assert report["rgb_offsets"][0] == report["header"]["rgb_start_pointer"]
+    sizes = report["sizes"]
+    assert sizes["total"] == len(prg_bytes)
+    assert sizes["header"] + sizes["duration_blocks"] + sizes["rgb_data"] + sizes["footer"] == len(prg_bytes)
+    assert report["warnings"] == []
+
+
+def test_warnings_are_recorded_in_report():
+    """Warnings reach the report even when output is quiet."""
+    data = {"default_pixels": 1, "refresh_rate": 100, "sequence": {"0": {"color": [255, 0, 0]}}}
+    diagnostics = prg_generator.PRGDiagnostics()
+    encode_prg(data, diagnostics=diagnostics)
+    assert len(diagnostics.report.warnings) == 1
+    assert "end_time" in diagnostics.report.warnings[0]
+
+
+def test_unknown_segment_type_warns_through_diagnostics(capsys):
+    """Offset calculation reports unknown segment types as warnings instead of printing."""
+    segments = [(50, (255, 0, 0), 1, 'sparkle', 50), (50, (0, 0, 255), 1, 'fade', 50)]
+    prg_generator._calculate_horizontal_offset_table(segments)
+    assert capsys.readouterr().out == ""
+
+    diagnostics = prg_generator.PRGDiagnostics()
+    assert prg_generator._calculate_horizontal_offset_table(segments, diagnostics) == ([0, 300, 350], 300)
+    assert len(diagnostics.report.warnings) == 2
+    assert all("'sparkle' at index 0" in warning for warning in diagnostics.report.warnings)
+
+
+def test_index_base_argument_warnings_go_through_diagnostics(capsys):
+    """Invalid arguments to the block index helpers are reported as warnings instead of printing."""
+    segments = [(50, (255, 0, 0), 1, 'solid'), (50, ((0, 0, 255), (0, 255, 0)), 1, 'fade')]
+    assert prg_generator._calculate_intermediate_block_index1_base(5, 2, segments, True) == 0
+    assert prg_generator._calculate_last_block_index2_bases(2, [], True) == (0, 0)
+    assert capsys.readouterr().out == ""
+
+    diagnostics = prg_generator.PRGDiagnostics()
+    prg_generator._calculate_intermediate_block_index1_base(5, 2, segments, True, diagnostics=diagnostics)
+    prg_generator._calculate_intermediate_block_index1_base(1, 2, [], True, diagnostics=diagnostics)
+    prg_generator._calculate_last_block_index2_bases(3, segments, True, diagnostics=diagnostics)
+    assert len(diagnostics.report.warnings) == 3
+    assert "invalid target_index 5" in diagnostics.report.warnings[0]
+    assert "empty segments_list" in diagnostics.report.warnings[1]
+    assert "total_segments=3 out of bounds" in diagnostics.report.warnings[2]
+
+
+def test_batch_generate_encodes_directory(tmp_path, fixture_json_path):
+    """batch_generate() encodes a directory tree in a process pool and reports failures."""
+    input_dir = tmp_path / "in"
+    (input_dir / "balls").mkdir(parents=True)
+    fixture = fixture_json_path.read_text()
+    (input_dir / "show.json").write_text(fixture)
+    (input_dir / "balls" / "show_Ball_1.prg.json").write_text(fixture)
+    (input_dir / "broken.json").write_text("{not json")
+    output_dir = tmp_path / "out"
+
+    summary = prg_generator.batch_generate(str(input_dir), str(output_dir), jobs=2, verify=True, progress=False)
+
+    assert summary["files"] == 3
+    assert summary["failed"] == 1
+    assert [r["input"].endswith("broken.json") for r in summary["results"] if not r["ok"]] == [True]
+    expected = fixture_json_path.with_suffix(".prg").read_bytes()
+    assert (output_dir / "show.prg").read_bytes() == expected
+    assert (output_dir / "balls" / "show_Ball_1.prg").read_bytes() == expected
+
+
+def _long_show_segments(count):
+    """Synthetic parsed segments mixing long fades, short solids and over-long solids."""
+    segments = []
+    for i in range(count):
+        if i % 5 == 4:
+            segments.append((70000 + i, (i % 256, 0, 0), 1 + i % 4, 'solid')) # Split into two blocks
+        elif i % 2:
+            segments.append((50 + i, (0, i % 256, 0), 2, 'solid'))
+        else:
+            segments.append((2000 + 37 * i, ((i % 256, 10, 20), (30, 40, i % 256)), 4, 'fade'))
+    return segments
+
+
+@pytest.mark.parametrize("segments", [
+    _long_show_segments(1),
+    [(100, (255, 0, 0), 4, 'solid')],
+    [(70000, (1, 2, 3), 1, 'solid')],
+    _long_show_segments(2),
+    _long_show_segments(41),
+    [(100 + i, (i, i, i), 1, 'solid') for i in range(30)],
+])
+def test_write_prg_stream_matches_encode_segments(tmp_path, segments):
+    """The streaming writer produces exactly the bytes of the in-memory encoder."""
+    output_path = tmp_path / "stream.prg"
+    report = prg_generator.write_prg_stream(lambda: iter(segments), str(output_path), default_pixels=3)
+    expected = prg_generator.encode_segments(segments, default_pixels=3)
+    assert output_path.read_bytes() == expected
+    assert report.total_size == len(expected)
+
+
+def test_write_prg_stream_rejects_one_shot_iterator(tmp_path):
+    """A plain iterator cannot be read twice and is rejected up front."""
+    with pytest.raises(PRGGenerationError):
+        prg_generator.write_prg_stream(iter(_long_show_segments(3)), str(tmp_path / "x.prg"))
+
+
+def test_streaming_file_sorts_sequence_once(tmp_path, fixture_json_path, monkeypatch):
+    """generate_prg_file(streaming=True) sorts the JSON sequence once for all passes."""
+    prepare_calls = []
+    prepare = prg_generator._prepare_sequence
+    monkeypatch.setattr(prg_generator, "_prepare_sequence",
+                        lambda data, diag: prepare_calls.append(1) or prepare(data, diag))
+    output_path = tmp_path / "stream.prg"
+    prg_generator.generate_prg_file(fixture_json_path, str(output_path), streaming=True)
+    assert len(prepare_calls) == 1
+    with open(fixture_json_path, 'r') as f:
+        assert output_path.read_bytes() == encode_prg(json.load(f))
+
+
+def test_write_prg_stream_memory_is_bounded(tmp_path):
+    """Peak memory while streaming stays far below the size of the file written."""
+    import tracemalloc
+
+    def segments():
+        for i in range(400):
+            yield (20000, ((i % 256, 0, 0), (0, 0, i % 256)), 4, 'fade')
+
+    tracemalloc.start()
+    report = prg_generator.write_prg_stream(segments, str(tmp_path / "long.prg"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Two write buffers plus one fade ramp, regardless of the number of segments
+    assert report.total_size > 20_000_000
+    assert peak < 2 * prg_generator.STREAM_BUFFER_SIZE + 2_000_000
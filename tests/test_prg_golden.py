@@ -0,0 +1,75 @@
+"""
+PRG Golden File Tests
+
+Encodes every fixture JSON in tests/, generated_test_prg_json/ and seq2/jsonv2 in
+process and checks the output is byte-identical to its expected .prg file, through
+both the in-memory and the streaming writer. The seq2/jsonv2 expectations live in
+tests/golden/seq2_jsonv2.
+"""
+
+import json
+import os
+
+import pytest
+
+import prg_generator
+from benchmark_prg_generator import (
+    fixture_cases, make_sequence_segments, benchmark_encode, append_history, find_regressions
+)
+from prg_decoder import diff_prg
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_CASES = fixture_cases(REPO_ROOT)
+
+
+def _case_id(case):
+    return os.path.relpath(case[0], REPO_ROOT)
+
+
+def _assert_matches_golden(generated, prg_path):
+    with open(prg_path, 'rb') as f:
+        expected = f.read()
+    if generated != expected:
+        differences = "\n".join(diff_prg(generated, expected, max_differences=10))
+        pytest.fail(f"Output differs from {os.path.relpath(prg_path, REPO_ROOT)}:\n{differences}")
+
+
+def test_every_fixture_directory_has_cases():
+    """A moved or renamed fixture directory must not silently shrink the suite."""
+    directories = {os.path.relpath(os.path.dirname(json_path), REPO_ROOT) for json_path, _ in GOLDEN_CASES}
+    assert {"tests", "generated_test_prg_json", os.path.join("seq2", "jsonv2")} <= directories
+
+
+@pytest.mark.parametrize("case", GOLDEN_CASES, ids=_case_id)
+def test_encode_matches_golden(case):
+    json_path, prg_path = case
+    _assert_matches_golden(prg_generator.encode_prg(prg_generator.load_sequence_json(json_path)), prg_path)
+
+
+@pytest.mark.parametrize("case", GOLDEN_CASES, ids=_case_id)
+def test_streaming_matches_golden(tmp_path, case):
+    json_path, prg_path = case
+    output_prg = tmp_path / "out.prg"
+    prg_generator.generate_prg_file(json_path, str(output_prg), prg_generator.PRGDiagnostics(), streaming=True)
+    _assert_matches_golden(output_prg.read_bytes(), prg_path)
+
+
+@pytest.mark.parametrize("shape", ["solid", "fade", "mixed"])
+def test_benchmark_records_history(tmp_path, shape):
+    """The benchmark encodes each synthetic shape and appends its results to the history."""
+    assert len(make_sequence_segments(shape, 10)) == 10
+    result = benchmark_encode(shape, 20, repeat=1)
+    assert result["output_bytes"] == len(prg_generator.encode_segments(make_sequence_segments(shape, 20), 4))
+    assert result["peak_bytes"] > 0
+
+    history_path = str(tmp_path / "history.json")
+    append_history(history_path, [result])
+    append_history(history_path, [result])
+    with open(history_path, 'r') as f:
+        history = json.load(f)
+    assert len(history) == 2
+    assert history[-1]["encoder_version"] == prg_generator.ENCODER_VERSION
+
+    slower = dict(result, seconds=result["seconds"] * 2)
+    assert find_regressions(history[-1], [slower], max_ratio=1.5)
+    assert not find_regressions(history[-1], [result], max_ratio=1.5)
@@ -0,0 +1,74 @@
+"""
+PRG Optimizer Tests
+
+Tests for the optional size optimizer in prg_optimizer.py.
+"""
+
+import pytest
+
+from prg_generator import encode_segments, fade_ramp_bytes
+from prg_optimizer import optimize_segments, estimate_prg_size, fade_to_steps
+
+SLOW_FADE = (3000, ((255, 0, 0), (250, 10, 0)), 4, 'fade')
+
+
+def _tick_colors(segments):
+    """Color shown at every 10 ms tick of parsed segments."""
+    colors = []
+    for duration, color, _, segment_type in segments:
+        if segment_type == 'fade':
+            ramp = fade_ramp_bytes(color[0], color[1], duration)
+            colors.extend(tuple(ramp[i:i + 3]) for i in range(0, len(ramp), 3))
+        else:
+            colors.extend([tuple(color)] * duration)
+    return colors
+
+
+def test_adjacent_identical_solids_are_merged():
+    """Equal neighbours merge; a different pixel count or color keeps the boundary."""
+    segments = [(100, (255, 0, 0), 4, 'solid'), (50, (255, 0, 0), 4, 'solid'),
+                (50, (255, 0, 0), 2, 'solid'), (10, (0, 0, 255), 2, 'solid')]
+    optimized, report = optimize_segments(segments)
+    assert optimized == [(150, (255, 0, 0), 4, 'solid'), (50, (255, 0, 0), 2, 'solid'),
+                         (10, (0, 0, 255), 2, 'solid')]
+    assert report.merged_solids == 1
+    assert report.bytes_saved == len(encode_segments(segments)) - len(encode_segments(optimized))
+
+
+def test_zero_tolerance_keeps_every_tick_exact():
+    """A slow fade becomes a staircase showing exactly the same color at every tick."""
+    optimized, report = optimize_segments([SLOW_FADE], tolerance=0)
+    assert report.approximated_fades == 1
+    assert report.bytes_saved > 0
+    assert _tick_colors(optimized) == _tick_colors([SLOW_FADE])
+
+
+@pytest.mark.parametrize("tolerance", [1, 3, 20])
+def test_approximated_fade_stays_within_tolerance(tolerance):
+    """No tick of the staircase is further than tolerance from the exact ramp."""
+    fade = (500, ((0, 40, 200), (90, 0, 180)), 1, 'fade')
+    steps = fade_to_steps(fade, tolerance)
+    assert sum(step[0] for step in steps) == fade[0]
+    for exact, approx in zip(_tick_colors([fade]), _tick_colors(steps)):
+        assert max(abs(a - b) for a, b in zip(exact, approx)) <= tolerance
+
+
+def test_fast_fade_is_left_alone():
+    """A fade that changes every tick is smaller as a fade and is not replaced."""
+    segments = [(100, ((0, 0, 0), (255, 255, 255)), 1, 'fade')]
+    optimized, report = optimize_segments(segments)
+    assert optimized == segments
+    assert report.bytes_saved == 0
+
+
+def test_size_estimate_matches_encoder():
+    """estimate_prg_size() predicts the encoded length, including split long solids."""
+    segments = [(70000, (1, 2, 3), 1, 'solid'), SLOW_FADE, (5, (0, 0, 0), 1, 'solid')]
+    assert estimate_prg_size(segments) == len(encode_segments(segments))
+    optimized, report = optimize_segments(segments, tolerance=2)
+    assert report.bytes_after == len(encode_segments(optimized))
+
+
+def test_invalid_tolerance_is_rejected():
+    with pytest.raises(ValueError):
+        optimize_segments([SLOW_FADE], tolerance=-1)
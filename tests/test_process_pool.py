@@ -0,0 +1,59 @@
+"""
+Process Pool Tests
+
+Tests for the shared batch runner in process_pool.py.
+"""
+
+import argparse
+
+import pytest
+
+from process_pool import positive_int, resolve_jobs, run_pool
+
+_offset = 0
+
+
+def _init(offset):
+    global _offset
+    _offset = offset
+
+
+def _square(value):
+    if value < 0:
+        return {"ok": False, "error": "negative", "value": value}
+    return {"ok": True, "error": None, "value": value * value + _offset}
+
+
+def test_pool_and_in_process_runs_agree():
+    """Both paths run the initializer, report progress and summarize the results."""
+    for jobs in (1, 2):
+        progress = []
+        summary = run_pool(_square, [3, -1, 2], jobs=jobs, initializer=_init, initargs=(10,),
+                           record=lambda result, done, total: progress.append((done, total)),
+                           sort_key=lambda result: result["value"])
+        assert [result["value"] for result in summary["results"]] == [-1, 14, 19]
+        assert (summary["tasks"], summary["succeeded"], summary["failed"]) == (3, 2, 1)
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+        assert summary["jobs"] == jobs
+        _init(0)
+
+
+def test_no_tasks():
+    summary = run_pool(_square, [], jobs=4)
+    assert (summary["tasks"], summary["failed"], summary["results"]) == (0, 0, [])
+
+
+def test_jobs_must_be_positive():
+    """A job count below 1 is rejected with a clear error, on the command line too."""
+    for jobs in (0, -2):
+        with pytest.raises(ValueError, match="jobs must be at least 1"):
+            run_pool(_square, [1, 2], jobs=jobs)
+    assert resolve_jobs(3) == 3
+    assert resolve_jobs(None) >= 1
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=positive_int)
+    assert parser.parse_args(["--jobs", "4"]).jobs == 4
+    for value in ("0", "-1", "two"):
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--jobs", value])